@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, City, IdentityClaim
+from .models import CustomUser, City, DeadLetterMessage, IdentityClaim, OutboundMessage
+from .outbox import requeue_dead_letters
 from .services.identity_claim_service import reject_national_id, verify_national_id
 from . import mfa_utils
 
@@ -95,3 +96,25 @@ class IdentityClaimAdmin(admin.ModelAdmin):
             except Exception:
                 continue
         self.message_user(request, f"Rejected {rejected} claim(s).")
+
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display = ["id", "channel", "recipient", "attempts", "next_attempt_at", "expires_at", "created_at"]
+    list_filter = ["channel"]
+    search_fields = ["recipient"]
+    readonly_fields = ["payload", "attempts", "last_error", "created_at"]
+
+
+@admin.register(DeadLetterMessage)
+class DeadLetterMessageAdmin(admin.ModelAdmin):
+    list_display = ["id", "channel", "recipient", "attempts", "last_error", "queued_at", "failed_at"]
+    list_filter = ["channel", "failed_at"]
+    search_fields = ["recipient", "last_error"]
+    readonly_fields = ["payload", "attempts", "last_error", "expires_at", "queued_at", "failed_at"]
+    actions = ["requeue"]
+
+    @admin.action(description="Re-queue selected messages for delivery")
+    def requeue(self, request, queryset):
+        count = requeue_dead_letters(queryset)
+        self.message_user(request, f"Re-queued {count} message(s).")
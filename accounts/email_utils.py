@@ -14,18 +14,18 @@ from django.core.signing import TimestampSigner, BadSignature, SignatureExpired
 EMAIL_VERIFICATION_TOKEN_EXPIRY = 15 * 60  # 15 minutes
 
 
-def _get_brevo_api():
+def _get_brevo_api(pool_maxsize=None):
     """Initialize and return Brevo API instance"""
     configuration = sib_api_v3_sdk.Configuration()
     configuration.api_key["api-key"] = os.environ.get("BREVO_API_KEY")
+    if pool_maxsize:
+        configuration.connection_pool_maxsize = pool_maxsize
     api_client = sib_api_v3_sdk.ApiClient(configuration)
     return sib_api_v3_sdk.TransactionalEmailsApi(api_client)
 
 
-def _send_email(to_email, subject, html_content, text_content):
-    """Send a single transactional email via Brevo"""
-    api_instance = _get_brevo_api()
-
+def _deliver_email(api_instance, to_email, subject, html_content, text_content):
+    """Send a single transactional email via Brevo (outbox worker only)."""
     send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
         to=[{"email": to_email}],
         sender={"name": "Clinic Website", "email": "msamalq306@gmail.com"},
@@ -37,6 +37,14 @@ def _send_email(to_email, subject, html_content, text_content):
     api_instance.send_transac_email(send_smtp_email)
 
 
+def _send_email(to_email, subject, html_content, text_content, expires_in=None):
+    """Queue a single transactional email for the outbox worker
+    (accounts/outbox.py); delivery via Brevo happens off the request path."""
+    from accounts.outbox import enqueue_email
+
+    enqueue_email(to_email, subject, html_content, text_content, expires_in=expires_in)
+
+
 def generate_email_verification_token(user, email):
     """Generate a stateless signed token containing user ID and email"""
     signer = TimestampSigner()
@@ -206,7 +214,7 @@ def send_email_otp(email, recipient_name):
     )
 
     try:
-        _send_email(email, subject, html_content, text_content)
+        _send_email(email, subject, html_content, text_content, expires_in=EMAIL_OTP_EXPIRY_SECONDS)
     except Exception as e:
         logger.error("[EMAIL OTP] Failed to send to %s: %r", email, e)
         cache.delete(_email_otp_key(email))
@@ -457,6 +465,31 @@ def send_appointment_booking_email(patient, appointment):
         return False
 
 
+def appointment_reminder_email(patient, appointment):
+    """(subject, html_content, text_content) of the 24-hour reminder email."""
+    doctor_name = appointment.doctor.name if appointment.doctor else "الطبيب"
+    date_str = appointment.appointment_date.strftime("%Y-%m-%d")
+    time_str = appointment.appointment_time.strftime("%H:%M")
+    clinic_name = appointment.clinic.name
+
+    subject = "تذكير بموعدك غداً — Clinic"
+    text_content = (
+        f"عزيزي {patient.name}،\n\n"
+        f"تذكير: لديك موعد غداً مع {doctor_name} "
+        f"بتاريخ {date_str} الساعة {time_str} "
+        f"في {clinic_name}.\n\n"
+        f"مع تحيات،\nفريق كلينك"
+    )
+    html_content = (
+        f"<p>عزيزي <strong>{patient.name}</strong>،</p>"
+        f"<p>تذكير: لديك موعد غداً مع <strong>{doctor_name}</strong> "
+        f"بتاريخ <strong>{date_str}</strong> الساعة <strong>{time_str}</strong> "
+        f"في <strong>{clinic_name}</strong>.</p>"
+        f"<br><p>مع تحيات،<br>فريق كلينك</p>"
+    )
+    return subject, html_content, text_content
+
+
 def send_appointment_reminder_email(patient, appointment):
     """
     Send a 24-hour reminder email to the patient.
@@ -472,27 +505,7 @@ def send_appointment_reminder_email(patient, appointment):
         return False
 
     try:
-        doctor_name = appointment.doctor.name if appointment.doctor else "الطبيب"
-        date_str = appointment.appointment_date.strftime("%Y-%m-%d")
-        time_str = appointment.appointment_time.strftime("%H:%M")
-        clinic_name = appointment.clinic.name
-
-        subject = "تذكير بموعدك غداً — Clinic"
-        text_content = (
-            f"عزيزي {patient.name}،\n\n"
-            f"تذكير: لديك موعد غداً مع {doctor_name} "
-            f"بتاريخ {date_str} الساعة {time_str} "
-            f"في {clinic_name}.\n\n"
-            f"مع تحيات،\nفريق كلينك"
-        )
-        html_content = (
-            f"<p>عزيزي <strong>{patient.name}</strong>،</p>"
-            f"<p>تذكير: لديك موعد غداً مع <strong>{doctor_name}</strong> "
-            f"بتاريخ <strong>{date_str}</strong> الساعة <strong>{time_str}</strong> "
-            f"في <strong>{clinic_name}</strong>.</p>"
-            f"<br><p>مع تحيات،<br>فريق كلينك</p>"
-        )
-
+        subject, html_content, text_content = appointment_reminder_email(patient, appointment)
         _send_email(patient.email, subject, html_content, text_content)
         logger.info(
             "[EMAIL] Reminder email sent to user_id=%s email=%s",
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.conf import settings
+
+from accounts.outbox import deliver_due
+
+
+class Command(BaseCommand):
+    help = (
+        'Delivers queued email/SMS from the outbox. '
+        'With --loop, keeps polling every --interval seconds (background worker).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Run forever, polling on an interval.')
+        parser.add_argument('--interval', type=int, default=getattr(settings, 'OUTBOX_POLL_SECONDS', 2))
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            totals = deliver_due(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                'Outbox: {sent} sent, {retried} scheduled for retry, {dead} dead-lettered.'.format(**totals)
+            ))
+            return
+
+        self.stdout.write(f"Outbox worker polling every {options['interval']}s...")
+        while True:
+            try:
+                totals = deliver_due(options['batch_size'])
+                if any(totals.values()):
+                    self.stdout.write(
+                        'Outbox: {sent} sent, {retried} retrying, {dead} dead-lettered.'.format(**totals)
+                    )
+                    # Work was found — poll again at once; only an idle pass sleeps.
+                    continue
+            except Exception as exc:
+                # Keep the loop alive; the next pass retries.
+                self.stderr.write(f'Outbox pass failed: {exc!r}')
+            time.sleep(options['interval'])
@@ -0,0 +1,27 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from accounts.middleware import SESSION_WRITE_STATS_KEYS, flush_session_write_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Shows how many session writes SessionRefreshMiddleware performed vs. '
+        'coalesced away (skipped). Counters are shared across processes via the cache.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing.')
+
+    def handle(self, *args, **options):
+        flush_session_write_stats()
+        counts = cache.get_many(SESSION_WRITE_STATS_KEYS.values())
+        written = counts.get(SESSION_WRITE_STATS_KEYS['written'], 0)
+        skipped = counts.get(SESSION_WRITE_STATS_KEYS['skipped'], 0)
+        total = written + skipped
+        saved = f'{100 * skipped / total:.1f}%' if total else 'n/a'
+        self.stdout.write(self.style.SUCCESS(
+            f'Session requests: {total}, written: {written}, skipped: {skipped} (writes saved: {saved})'
+        ))
+        if options['reset']:
+            cache.delete_many(SESSION_WRITE_STATS_KEYS.values())
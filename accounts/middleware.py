@@ -1,3 +1,8 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import translation
 
 
@@ -74,3 +79,86 @@ class LanguagePreferenceMiddleware:
 
         # 3. Hard default
         return "ar"
+
+
+# Session key holding the unix time of the session's last storage write.
+SESSION_REFRESHED_AT_KEY = "_refreshed_at"
+
+SESSION_WRITE_STATS_KEYS = {
+    "written": "session_refresh:written",
+    "skipped": "session_refresh:skipped",
+}
+# Local counts are pushed to the cache once this many decisions accumulate.
+_SESSION_STATS_FLUSH_EVERY = 200
+_session_stats = {"written": 0, "skipped": 0}
+_session_stats_lock = threading.Lock()
+
+
+def _record_session_decision(outcome):
+    """Count a save/skip decision; flush to the shared cache in batches so the
+    metric itself doesn't add a cache write per request."""
+    with _session_stats_lock:
+        _session_stats[outcome] += 1
+        if sum(_session_stats.values()) < _SESSION_STATS_FLUSH_EVERY:
+            return
+        pending = dict(_session_stats)
+        _session_stats.update(written=0, skipped=0)
+    flush_session_write_stats(pending)
+
+
+def flush_session_write_stats(pending=None):
+    """Add locally-counted decisions to the shared counters (fail-open)."""
+    if pending is None:
+        with _session_stats_lock:
+            pending = dict(_session_stats)
+            _session_stats.update(written=0, skipped=0)
+    for outcome, count in pending.items():
+        if not count:
+            continue
+        key = SESSION_WRITE_STATS_KEYS[outcome]
+        try:
+            cache.add(key, 0, timeout=None)
+            cache.incr(key, count)
+        except Exception:
+            pass
+
+
+class SessionRefreshMiddleware:
+    """
+    Coalesced rolling expiry for the 60-minute idle timeout.
+
+    Replaces SESSION_SAVE_EVERY_REQUEST, which rewrote the session on every
+    request (HTMX polls included). The session is saved only when something
+    else already modified it, or when its remaining TTL has dropped below
+    SESSION_REFRESH_THRESHOLD_SECONDS; each save re-stamps the full
+    SESSION_COOKIE_AGE in the store. An idle session therefore expires between
+    THRESHOLD and SESSION_COOKIE_AGE seconds after the last request.
+
+    Must sit directly AFTER SessionMiddleware so this runs first on the way
+    out and SessionMiddleware persists the change.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.refresh_after = settings.SESSION_COOKIE_AGE - getattr(
+            settings, "SESSION_REFRESH_THRESHOLD_SECONDS", settings.SESSION_COOKIE_AGE - 60
+        )
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        session = getattr(request, "session", None)
+        if session is None:
+            return response
+        refreshed_at = session.get(SESSION_REFRESHED_AT_KEY, 0)
+        if session.is_empty():
+            # Anonymous/stale cookie, or flushed by logout — never create a session.
+            return response
+
+        now = int(time.time())
+        if session.modified or now - refreshed_at >= self.refresh_after:
+            session[SESSION_REFRESHED_AT_KEY] = now  # also marks it modified → saved
+            _record_session_decision("written")
+        else:
+            _record_session_decision("skipped")
+        return response
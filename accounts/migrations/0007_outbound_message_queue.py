@@ -0,0 +1,50 @@
+# Generated by Django 6.0.6 on 2026-10-16 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_customuser_mfa_device_salt_customuser_mfa_enabled_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeadLetterMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('EMAIL', 'Email'), ('SMS', 'SMS')], max_length=10)),
+                ('recipient', models.CharField(max_length=254)),
+                ('payload', models.JSONField(default=dict)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('queued_at', models.DateTimeField()),
+                ('failed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Dead-letter Message',
+                'verbose_name_plural': 'Dead-letter Messages',
+                'ordering': ['-failed_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboundMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('EMAIL', 'Email'), ('SMS', 'SMS')], max_length=10)),
+                ('recipient', models.CharField(max_length=254)),
+                ('payload', models.JSONField(default=dict)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField()),
+                ('expires_at', models.DateTimeField(blank=True, help_text='Undelivered after this point → dead-lettered unsent (e.g. OTP codes).', null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Outbound Message',
+                'verbose_name_plural': 'Outbound Messages',
+                'indexes': [models.Index(fields=['channel', 'next_attempt_at'], name='outbox_channel_due_idx')],
+            },
+        ),
+    ]
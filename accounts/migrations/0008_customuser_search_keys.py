@@ -0,0 +1,39 @@
+from django.db import migrations, models
+
+from core.search_text import normalize_name, phone_digits
+
+
+def populate_search_keys(apps, schema_editor):
+    """Fill the search keys of existing users (historical models have no save() hook)."""
+    User = apps.get_model("accounts", "CustomUser")
+    batch = []
+    for user in User.objects.only("id", "name", "phone").order_by("id").iterator(chunk_size=2000):
+        user.search_name = normalize_name(user.name)
+        user.search_phone = phone_digits(user.phone)
+        batch.append(user)
+        if len(batch) >= 2000:
+            User.objects.bulk_update(batch, ["search_name", "search_phone"])
+            batch = []
+    if batch:
+        User.objects.bulk_update(batch, ["search_name", "search_phone"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0007_outbound_message_queue"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="search_name",
+            field=models.CharField(blank=True, default="", editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="customuser",
+            name="search_phone",
+            field=models.CharField(blank=True, default="", editable=False, max_length=20),
+        ),
+        migrations.RunPython(populate_search_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+import logging
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import DatabaseError, migrations, models
+
+logger = logging.getLogger(__name__)
+
+
+def create_name_trigram_index(apps, schema_editor):
+    """Substring index for roster name search — only where pg_trgm can be installed,
+    so it is not part of the model state (patients/search.py works without it)."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except DatabaseError as exc:
+            logger.warning("pg_trgm unavailable (%s); patient name search runs without a trigram index", exc)
+            return
+        cursor.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS user_search_name_trgm_idx "
+            "ON accounts_customuser USING gin (search_name gin_trgm_ops)"
+        )
+
+
+def drop_name_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS user_search_name_trgm_idx")
+
+
+class Migration(migrations.Migration):
+    # Built CONCURRENTLY so deploying does not block writes to the user table.
+    atomic = False
+
+    dependencies = [
+        ("accounts", "0008_customuser_search_keys"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="customuser",
+            index=models.Index(fields=["search_phone"], name="user_search_phone_idx", opclasses=["varchar_pattern_ops"]),
+        ),
+        migrations.RunPython(create_name_trigram_index, drop_name_trigram_index, atomic=False),
+    ]
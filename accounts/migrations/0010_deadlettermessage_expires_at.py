@@ -0,0 +1,18 @@
+# Generated by Django 6.0.6 on 2026-10-16 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_customuser_search_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deadlettermessage',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, help_text='Carried over from the queued message; expired ones are not re-queued.', null=True),
+        ),
+    ]
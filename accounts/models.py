@@ -13,6 +13,7 @@ from core.validators.file_validators import (
     validate_file_signature,
     validate_file_size,
 )
+from core.search_text import normalize_name, phone_digits
 from .constants import IdentityClaimStatus
 
 
@@ -106,6 +107,12 @@ class CustomUser(AbstractUser):
     )
     city = models.ForeignKey("City", on_delete=models.SET_NULL, null=True, blank=True)
 
+    # Search keys for the patient rosters (patients/search.py), kept in step
+    # by save(): the folded name (core/search_text.py) and the digits-only
+    # local phone. bulk_create / queryset.update() callers must set them.
+    search_name = models.CharField(max_length=255, blank=True, default="", editable=False)
+    search_phone = models.CharField(max_length=20, blank=True, default="", editable=False)
+
     LANGUAGE_CHOICES = [
         ("ar", "Arabic / العربية"),
         ("en", "English"),
@@ -168,9 +175,22 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return f"{self.name} ({self.phone}) - {self.role}"
 
+    def save(self, *args, **kwargs):
+        self.search_name = normalize_name(self.name)
+        self.search_phone = phone_digits(self.phone)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"name", "phone"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "search_name", "search_phone"}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "User"
         verbose_name_plural = "Users"
+        indexes = [
+            # Phone-prefix lookups from the patient rosters (patients/search.py);
+            # national_id prefixes use the _like index its db_index already made.
+            models.Index(fields=["search_phone"], name="user_search_phone_idx", opclasses=["varchar_pattern_ops"]),
+        ]
 
 
 class StaffMfaBackupCode(models.Model):
@@ -265,3 +285,66 @@ class IdentityClaim(models.Model):
 
     def __str__(self):
         return f"{self.user_id} - {self.national_id} ({self.status})"
+
+
+class OutboundMessage(models.Model):
+    """A queued email/SMS awaiting delivery by the outbox worker.
+
+    Request paths enqueue a row (accounts/outbox.py) instead of calling the
+    provider inline; ``manage.py deliver_outbox`` delivers due rows in batches
+    and deletes them on success. ``next_attempt_at`` doubles as the claim
+    lease: a claimed row is pushed into the future, so a crashed worker's
+    batch simply becomes due again.
+    """
+
+    class Channel(models.TextChoices):
+        EMAIL = "EMAIL", "Email"
+        SMS = "SMS", "SMS"
+
+    channel = models.CharField(max_length=10, choices=Channel.choices)
+    recipient = models.CharField(max_length=254)
+    payload = models.JSONField(default=dict)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    expires_at = models.DateTimeField(
+        null=True, blank=True,
+        help_text="Undelivered after this point → dead-lettered unsent (e.g. OTP codes).",
+    )
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Outbound Message"
+        verbose_name_plural = "Outbound Messages"
+        indexes = [
+            models.Index(fields=["channel", "next_attempt_at"], name="outbox_channel_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} to {self.recipient} (attempt {self.attempts})"
+
+
+class DeadLetterMessage(models.Model):
+    """An outbound message that exhausted its retries, hit a permanent
+    provider error, or expired before delivery. Kept for inspection and
+    manual re-queue from the admin."""
+
+    channel = models.CharField(max_length=10, choices=OutboundMessage.Channel.choices)
+    recipient = models.CharField(max_length=254)
+    payload = models.JSONField(default=dict)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    expires_at = models.DateTimeField(
+        null=True, blank=True,
+        help_text="Carried over from the queued message; expired ones are not re-queued.",
+    )
+    queued_at = models.DateTimeField()
+    failed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Dead-letter Message"
+        verbose_name_plural = "Dead-letter Messages"
+        ordering = ["-failed_at"]
+
+    def __str__(self):
+        return f"{self.channel} to {self.recipient}: {self.last_error[:60]}"
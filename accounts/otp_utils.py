@@ -6,7 +6,8 @@ import time
 from django.core.cache import cache
 from django.conf import settings
 
-from accounts.services.tweetsms import send_sms as tweetsms_send_sms
+# SMS goes through the outbox worker (accounts/outbox.py), never inline.
+from accounts.outbox import enqueue_sms
 
 logger = logging.getLogger(__name__)
 
@@ -153,10 +154,10 @@ def request_otp(phone):
         message = f"Your verification code is: {otp}"
 
         try:
-            tweetsms_send_sms(sms_phone, message)
+            enqueue_sms(sms_phone, message, expires_in=OTP_EXPIRY_SECONDS)
             otp_sent_via_sms = True
 
-            logger.info("[OTP] TweetsMS send OK for phone=%s as=%s", phone, sms_phone)
+            logger.info("[OTP] SMS queued for phone=%s as=%s", phone, sms_phone)
 
         except Exception as e:
             logger.exception(
@@ -241,7 +242,7 @@ def send_account_exists_sms(phone):
     if _is_using_tweetsms():
         sms_phone = _normalize_phone(phone)
         try:
-            tweetsms_send_sms(sms_phone, message)
+            enqueue_sms(sms_phone, message)
             delivered = True
         except Exception as e:
             logger.exception("[ACCOUNT-EXISTS] Failed to notify %s (as %s): %r", phone, sms_phone, e)
@@ -0,0 +1,309 @@
+"""
+Durable outbound delivery queue for email (Brevo) and SMS (TweetsMS).
+
+Request and commit paths (booking, cancellation, OTP, invitations) call
+``enqueue_email`` / ``enqueue_sms``, which only INSERT an OutboundMessage row.
+The worker — ``manage.py deliver_outbox --loop`` — claims due rows per channel,
+delivers them through the channel's provider and settles the results:
+
+- success                 → row deleted
+- transient failure       → attempts + 1, retried with exponential backoff
+- permanent failure, too
+  many attempts, or past
+  ``expires_at``          → moved to DeadLetterMessage
+
+A slow or down provider therefore only delays the worker, never a gunicorn
+worker. Each provider is instantiated once per worker process and keeps a
+pooled keep-alive HTTP connection set; ``concurrency`` bounds how many sends
+run against it in parallel.
+
+Providers are configured by dotted path in ``settings.OUTBOX_PROVIDERS``;
+tests point a channel at ``StubProvider`` to exercise the worker locally.
+"""
+
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import DeadLetterMessage, OutboundMessage
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = getattr(settings, "OUTBOX_BATCH_SIZE", 50)
+OUTBOX_MAX_ATTEMPTS = getattr(settings, "OUTBOX_MAX_ATTEMPTS", 6)
+OUTBOX_RETRY_BASE_SECONDS = getattr(settings, "OUTBOX_RETRY_BASE_SECONDS", 30)
+OUTBOX_RETRY_MAX_SECONDS = 60 * 60
+# Max parallel sends per provider (also its HTTP connection pool size).
+OUTBOX_CONCURRENCY = getattr(settings, "OUTBOX_CONCURRENCY", {"EMAIL": 4, "SMS": 2})
+# How long a claimed batch is hidden from other workers. Longer than any
+# batch can take (provider timeouts are 10s); a crashed worker's claim lapses.
+OUTBOX_CLAIM_LEASE_SECONDS = 5 * 60
+
+DEFAULT_PROVIDERS = {
+    OutboundMessage.Channel.EMAIL: "accounts.outbox.BrevoEmailProvider",
+    OutboundMessage.Channel.SMS: "accounts.outbox.TweetSmsProvider",
+}
+
+
+class PermanentDeliveryError(Exception):
+    """The provider rejected the message in a way retrying cannot fix."""
+
+
+# ============================================
+# ENQUEUE (request paths)
+# ============================================
+def _enqueue(channel, recipient, payload, expires_in=None):
+    now = timezone.now()
+    message = OutboundMessage.objects.create(
+        channel=channel,
+        recipient=recipient,
+        payload=payload,
+        next_attempt_at=now,
+        expires_at=now + timedelta(seconds=expires_in) if expires_in else None,
+    )
+    logger.info("[OUTBOX] Queued %s id=%s to=%s", channel, message.id, recipient)
+    return message
+
+
+def enqueue_email(to_email, subject, html_content, text_content, expires_in=None):
+    """Queue a transactional email. ``expires_in`` (seconds) drops it unsent
+    if it cannot be delivered in time — use it for one-time codes."""
+    return _enqueue(
+        OutboundMessage.Channel.EMAIL,
+        to_email,
+        {"subject": subject, "html": html_content, "text": text_content},
+        expires_in,
+    )
+
+
+def enqueue_emails(messages):
+    """Queue many transactional emails with one INSERT.
+
+    ``messages`` is an iterable of (to_email, subject, html_content, text_content).
+    """
+    now = timezone.now()
+    queued = OutboundMessage.objects.bulk_create([
+        OutboundMessage(
+            channel=OutboundMessage.Channel.EMAIL,
+            recipient=to_email,
+            payload={"subject": subject, "html": html_content, "text": text_content},
+            next_attempt_at=now,
+        )
+        for to_email, subject, html_content, text_content in messages
+    ])
+    if queued:
+        logger.info("[OUTBOX] Queued %s EMAIL message(s)", len(queued))
+    return queued
+
+
+def enqueue_sms(to, message, expires_in=None):
+    """Queue an SMS. Same ``expires_in`` semantics as ``enqueue_email``."""
+    return _enqueue(OutboundMessage.Channel.SMS, to, {"message": message}, expires_in)
+
+
+# ============================================
+# PROVIDERS (worker side)
+# ============================================
+class BrevoEmailProvider:
+    """Brevo transactional email over one shared ApiClient (urllib3 pool)."""
+
+    def __init__(self):
+        from accounts.email_utils import _get_brevo_api
+
+        self.concurrency = OUTBOX_CONCURRENCY.get("EMAIL", 4)
+        self._api = _get_brevo_api(pool_maxsize=self.concurrency)
+
+    def send(self, recipient, payload):
+        from sib_api_v3_sdk.rest import ApiException
+        from accounts.email_utils import _deliver_email
+
+        try:
+            _deliver_email(self._api, recipient, payload["subject"], payload["html"], payload["text"])
+        except ApiException as exc:
+            # 4xx (bad address, invalid payload) won't succeed on retry; 429 will.
+            if exc.status and 400 <= exc.status < 500 and exc.status != 429:
+                raise PermanentDeliveryError(f"Brevo {exc.status}: {exc.reason}") from exc
+            raise
+
+
+class TweetSmsProvider:
+    """TweetsMS HTTP API over a pooled keep-alive requests.Session."""
+
+    def __init__(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.concurrency = OUTBOX_CONCURRENCY.get("SMS", 2)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+    def send(self, recipient, payload):
+        from accounts.services.tweetsms import TweetsmsError, send_sms
+
+        try:
+            send_sms(recipient, payload["message"], session=self._session)
+        except ValueError as exc:  # provider not configured
+            raise PermanentDeliveryError(str(exc)) from exc
+        except TweetsmsError as exc:
+            if exc.is_permanent:
+                raise PermanentDeliveryError(str(exc)) from exc
+            raise
+
+
+class StubProvider:
+    """In-process provider for tests and local development.
+
+    Records deliveries in ``StubProvider.sent`` as (recipient, payload)
+    tuples. Set ``StubProvider.fail_with`` to an exception instance to make
+    every send raise it.
+    """
+
+    sent = []
+    fail_with = None
+    concurrency = 1
+
+    def send(self, recipient, payload):
+        if StubProvider.fail_with is not None:
+            raise StubProvider.fail_with
+        StubProvider.sent.append((recipient, payload))
+
+
+_providers = {}
+
+
+def get_provider(channel):
+    """The (process-wide) provider instance for ``channel``."""
+    path = getattr(settings, "OUTBOX_PROVIDERS", {}).get(channel, DEFAULT_PROVIDERS[channel])
+    provider = _providers.get(path)
+    if provider is None:
+        provider = _providers[path] = import_string(path)()
+    return provider
+
+
+# ============================================
+# WORKER
+# ============================================
+def _claim(channel, limit):
+    """Lock up to ``limit`` due messages and lease them to this worker."""
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            OutboundMessage.objects.select_for_update(skip_locked=True)
+            .filter(channel=channel, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:limit]
+        )
+        if messages:
+            OutboundMessage.objects.filter(pk__in=[m.pk for m in messages]).update(
+                next_attempt_at=now + timedelta(seconds=OUTBOX_CLAIM_LEASE_SECONDS)
+            )
+    return messages
+
+
+def _attempt(provider, message):
+    """Deliver one message. Returns (message, error, permanent)."""
+    if message.expires_at and message.expires_at <= timezone.now():
+        return message, "expired before delivery", True
+    try:
+        provider.send(message.recipient, message.payload)
+        return message, None, False
+    except PermanentDeliveryError as exc:
+        return message, str(exc), True
+    except Exception as exc:
+        return message, repr(exc), False
+
+
+def _backoff(attempts):
+    delay = min(OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1), OUTBOX_RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay + random.uniform(0, OUTBOX_RETRY_BASE_SECONDS))
+
+
+def _settle(results):
+    """Apply a batch's outcomes. Returns (sent, retried, dead) counts."""
+    now = timezone.now()
+    delivered, retry, dead = [], [], []
+    for message, error, permanent in results:
+        if error is None:
+            delivered.append(message.pk)
+            continue
+        message.attempts += 1
+        message.last_error = error[:2000]
+        if permanent or message.attempts >= OUTBOX_MAX_ATTEMPTS:
+            dead.append(message)
+        else:
+            message.next_attempt_at = now + _backoff(message.attempts)
+            retry.append(message)
+
+    with transaction.atomic():
+        OutboundMessage.objects.filter(pk__in=delivered).delete()
+        OutboundMessage.objects.bulk_update(retry, ["attempts", "last_error", "next_attempt_at"])
+        if dead:
+            DeadLetterMessage.objects.bulk_create([
+                DeadLetterMessage(
+                    channel=m.channel, recipient=m.recipient, payload=m.payload,
+                    attempts=m.attempts, last_error=m.last_error, expires_at=m.expires_at,
+                    queued_at=m.created_at,
+                )
+                for m in dead
+            ])
+            OutboundMessage.objects.filter(pk__in=[m.pk for m in dead]).delete()
+
+    for message in dead:
+        logger.error(
+            "[OUTBOX] Dead-lettered %s id=%s to=%s after %s attempt(s): %s",
+            message.channel, message.id, message.recipient, message.attempts, message.last_error,
+        )
+    return len(delivered), len(retry), len(dead)
+
+
+def deliver_due(batch_size=None):
+    """One worker pass over every channel.
+
+    Returns {"sent": n, "retried": n, "dead": n}.
+    """
+    totals = {"sent": 0, "retried": 0, "dead": 0}
+    for channel in OutboundMessage.Channel.values:
+        messages = _claim(channel, batch_size or OUTBOX_BATCH_SIZE)
+        if not messages:
+            continue
+        try:
+            provider = get_provider(channel)
+        except Exception as exc:
+            logger.error("[OUTBOX] %s provider unavailable: %r", channel, exc)
+            results = [(m, f"provider unavailable: {exc!r}", False) for m in messages]
+        else:
+            with ThreadPoolExecutor(max_workers=max(1, provider.concurrency)) as pool:
+                results = list(pool.map(lambda m: _attempt(provider, m), messages))
+        sent, retried, dead = _settle(results)
+        totals["sent"] += sent
+        totals["retried"] += retried
+        totals["dead"] += dead
+    return totals
+
+
+def requeue_dead_letters(dead_letters):
+    """Move dead-lettered messages back onto the queue with a fresh attempt
+    budget (admin action, after fixing the provider or the recipient).
+
+    The message keeps its ``expires_at``; already-expired ones (e.g. stale
+    OTP codes) stay dead-lettered. Returns the number re-queued.
+    """
+    now = timezone.now()
+    dead_letters = [d for d in dead_letters if d.expires_at is None or d.expires_at > now]
+    with transaction.atomic():
+        OutboundMessage.objects.bulk_create([
+            OutboundMessage(
+                channel=d.channel, recipient=d.recipient, payload=d.payload,
+                next_attempt_at=now, expires_at=d.expires_at, last_error=d.last_error,
+            )
+            for d in dead_letters
+        ])
+        DeadLetterMessage.objects.filter(pk__in=[d.pk for d in dead_letters]).delete()
+    return len(dead_letters)
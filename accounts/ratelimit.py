@@ -19,6 +19,13 @@ Design notes:
 - Fail-open: every cache operation is wrapped so a Redis outage can never lock
   users out or 500 the login page. If the cache is unavailable we simply stop
   throttling until it recovers (and log it).
+- One round trip per call: when the default cache is Django's RedisCache, the
+  fixed-window counters and the strike escalation run as Lua scripts (INCR +
+  EXPIRE + ladder lookup + block marker in one atomic EVALSHA), and
+  ``is_blocked`` reads both of its keys with one MGET. Other cache backends
+  (LocMem in dev/tests) take the equivalent add/incr path. Both paths use the
+  same keys and plain integer values, so ``clear_failures`` and direct
+  ``cache.get`` reads work either way.
 - Keyed by phone (login) / user id (password change) / IP. Per-account keying
   means someone who knows a victim's phone could trip a temporary block on
   them; that is the standard, time-bounded trade-off for brute-force
@@ -26,9 +33,11 @@ Design notes:
 """
 
 import logging
+import time as time_mod
 
 from django.conf import settings
-from django.core.cache import cache
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
 
 logger = logging.getLogger(__name__)
 
@@ -75,6 +84,79 @@ def _strikes_key(scope, ident):
     return f"throttle:strikes:{scope}:{ident}"
 
 
+# ── Redis fast path ──────────────────────────────────────────────────────────
+# KEYS[1] counter; ARGV[1] window seconds. Returns the new count.
+_FIXED_WINDOW_LUA = """
+local total = redis.call('INCR', KEYS[1])
+if redis.call('TTL', KEYS[1]) < 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return total
+"""
+
+# KEYS: counter, strikes, block marker. ARGV: window, limit (0 = no escalation),
+# strikes TTL, then the lockout ladder. Returns {count, strikes, block seconds};
+# strikes and block seconds are 0 unless this failure reached the limit.
+_FAILURE_LUA = """
+local total = redis.call('INCR', KEYS[1])
+if redis.call('TTL', KEYS[1]) < 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+local limit = tonumber(ARGV[2])
+if limit == 0 or total ~= limit then
+    return {total, 0, 0}
+end
+local strikes = redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+local rung = math.min(strikes, #ARGV - 3)
+local block_seconds = tonumber(ARGV[3 + rung])
+redis.call('SET', KEYS[3], 1, 'EX', block_seconds)
+return {total, strikes, block_seconds}
+"""
+
+# KEYS: current window, previous window; ARGV[1] key TTL. Returns {current, previous}.
+_SLIDING_WINDOW_LUA = """
+local current = redis.call('INCR', KEYS[1])
+if redis.call('TTL', KEYS[1]) < 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return {current, tonumber(redis.call('GET', KEYS[2]) or '0')}
+"""
+
+_scripts = {}
+
+
+def _redis():
+    """``(client, make_key)`` when the default cache is Django's RedisCache, else None.
+
+    ``make_key`` applies the cache's prefix/version so scripted keys are the
+    ones ``cache.get`` / ``cache.delete_many`` see.
+    """
+    backend = caches["default"]
+    if not isinstance(backend, RedisCache):
+        return None
+    return backend._cache.get_client(write=True), backend.make_and_validate_key
+
+
+def _run_script(source, client, keys, args):
+    script = _scripts.get(source)
+    if script is None:
+        script = _scripts[source] = client.register_script(source)
+    return script(keys=keys, args=args, client=client)
+
+
+def _incr_window(key, window_seconds):
+    """Generic-backend fixed-window increment (add seeds the TTL)."""
+    if cache.add(key, 1, timeout=window_seconds):
+        return 1
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Key expired between add() and incr() — restart the window.
+        cache.set(key, 1, timeout=window_seconds)
+        return 1
+
+
 def client_ip(request):
     """Best-effort client IP.
 
@@ -105,10 +187,12 @@ def is_blocked(scope, ident, limit):
     Blocked either because an escalated block marker is active, or because the
     rolling failure counter has already reached ``limit`` in its window.
     """
+    block_key, key = _block_key(scope, ident), _key(scope, ident)
     try:
-        if cache.get(_block_key(scope, ident)):
+        values = cache.get_many([block_key, key])
+        if values.get(block_key):
             return True
-        return (cache.get(_key(scope, ident)) or 0) >= limit
+        return (values.get(key) or 0) >= limit
     except Exception:  # cache down → don't block anyone
         logger.warning("[throttle] cache read failed for %s:%s — failing open", scope, ident)
         return False
@@ -124,16 +208,23 @@ def register_failure(scope, ident, window_seconds, limit=None):
     """
     key = _key(scope, ident)
     try:
-        # add() only sets the key (and the window TTL) if it doesn't exist yet.
-        if cache.add(key, 1, timeout=window_seconds):
-            total = 1
-        else:
-            try:
-                total = cache.incr(key)
-            except ValueError:
-                # Key expired between add() and incr() — restart the window.
-                cache.set(key, 1, timeout=window_seconds)
-                total = 1
+        redis = _redis()
+        if redis is not None:
+            client, make_key = redis
+            ladder = LOGIN_LOCKOUT_LADDER or (LOGIN_WINDOW_SECONDS,)
+            total, strikes, block_seconds = _run_script(
+                _FAILURE_LUA, client,
+                keys=[make_key(key), make_key(_strikes_key(scope, ident)), make_key(_block_key(scope, ident))],
+                args=[window_seconds, limit or 0, STRIKES_TTL_SECONDS, *ladder],
+            )
+            if block_seconds:
+                logger.warning(
+                    "[throttle] %s:%s blocked for %ss (strike %s)",
+                    scope, ident, block_seconds, strikes,
+                )
+            return total
+
+        total = _incr_window(key, window_seconds)
 
         # Escalate exactly on the failure that crosses the threshold.
         if limit is not None and total == limit:
@@ -182,8 +273,8 @@ def clear_failures(scope, ident):
         pass
 
 
-def hit_rate_limit(scope, ident, limit, window_seconds):
-    """Count one event against a rolling fixed window for ``ident``.
+def hit_rate_limit(scope, ident, limit, window_seconds, sliding=False):
+    """Count one event against a rolling window for ``ident``.
 
     Returns True once the identity has made *more than* ``limit`` calls inside
     the window (i.e. the ``limit``-th call is allowed, the next is capped).
@@ -192,25 +283,53 @@ def hit_rate_limit(scope, ident, limit, window_seconds):
     actions (e.g. bulk CSV export): a plain per-identity counter with no strikes
     and no escalating lockout. Fail-open — a cache outage returns False so the
     action proceeds rather than being wrongly blocked.
+
+    ``sliding=True`` replaces the fixed window (which allows up to 2 × limit
+    calls across a window boundary) with a sliding-window estimate: the
+    previous window's count, weighted by how much of it still overlaps the
+    last ``window_seconds``, plus the current window's count.
     """
+    if sliding:
+        return _hit_sliding_window(scope, ident, limit, window_seconds)
     key = f"ratecap:{scope}:{ident}"
     try:
-        # add() seeds the counter (and the window TTL) only on the first call.
-        if cache.add(key, 1, timeout=window_seconds):
-            total = 1
+        redis = _redis()
+        if redis is not None:
+            client, make_key = redis
+            total = _run_script(_FIXED_WINDOW_LUA, client, keys=[make_key(key)], args=[window_seconds])
         else:
-            try:
-                total = cache.incr(key)
-            except ValueError:
-                # Key expired between add() and incr() — restart the window.
-                cache.set(key, 1, timeout=window_seconds)
-                total = 1
+            total = _incr_window(key, window_seconds)
         return total > limit
     except Exception:
         logger.warning("[ratecap] cache op failed for %s:%s — failing open", scope, ident)
         return False
 
 
+def _hit_sliding_window(scope, ident, limit, window_seconds):
+    now = time_mod.time()
+    window = int(now // window_seconds)
+    elapsed = (now % window_seconds) / window_seconds
+    current_key = f"ratecap:{scope}:{ident}:{window}"
+    previous_key = f"ratecap:{scope}:{ident}:{window - 1}"
+    # Each window's counter must outlive the next window, where it is "previous".
+    ttl = 2 * window_seconds
+    try:
+        redis = _redis()
+        if redis is not None:
+            client, make_key = redis
+            current, previous = _run_script(
+                _SLIDING_WINDOW_LUA, client,
+                keys=[make_key(current_key), make_key(previous_key)], args=[ttl],
+            )
+        else:
+            current = _incr_window(current_key, ttl)
+            previous = cache.get(previous_key) or 0
+        return previous * (1 - elapsed) + current > limit
+    except Exception:
+        logger.warning("[ratecap] cache op failed for %s:%s — failing open", scope, ident)
+        return False
+
+
 def export_rate_limited(ident):
     """True once ``ident`` exceeds the bulk-export cap in the rolling window.
 
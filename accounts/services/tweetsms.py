@@ -15,21 +15,42 @@ TWEETSMS_ERRORS = {
     "-116": "Invalid sender name",
 }
 
+# Codes that will fail the same way on every retry (bad request / account
+# configuration). Insufficient balance (-113) is retryable once topped up.
+TWEETSMS_PERMANENT_ERRORS = {"-100", "-110", "-115", "-116"}
 
-def send_sms(to: str, message: str) -> bool:
+
+class TweetsmsError(RuntimeError):
+    """Gateway rejected the message; ``code`` is the TweetsMS status string."""
+
+    def __init__(self, message, code=""):
+        super().__init__(message)
+        self.code = code
+
+    @property
+    def is_permanent(self):
+        return self.code in TWEETSMS_PERMANENT_ERRORS
+
+
+def send_sms(to: str, message: str, session=None) -> bool:
     """
     Send an SMS via the TweetsMS Legacy HTTP API (GET).
 
+    Request paths should not call this directly — use
+    accounts.outbox.enqueue_sms, which hands the message to the outbox worker.
+
     Args:
         to: Recipient phone number.
         message: SMS body text.
+        session: Optional requests.Session to reuse pooled keep-alive
+            connections (the outbox worker passes one).
 
     Returns:
         True if the SMS was accepted by the gateway.
 
     Raises:
         ValueError: If required settings are missing.
-        RuntimeError: If the gateway returns a known error code.
+        TweetsmsError: If the gateway returns an error status (a RuntimeError).
         requests.RequestException: On network / HTTP failures.
     """
     api_key = getattr(settings, "TWEETSMS_API_KEY", "")
@@ -51,7 +72,7 @@ def send_sms(to: str, message: str) -> bool:
 
     logger.info("[TWEETSMS] Sending SMS to=%s sender=%s", to, sender)
 
-    response = requests.get(base_url, params=params, timeout=10)
+    response = (session or requests).get(base_url, params=params, timeout=10)
     body = response.text.strip()
 
     # TweetsMS response format: "status:message_id:phone:tracking_id<br />"
@@ -72,7 +93,7 @@ def send_sms(to: str, message: str) -> bool:
         status_code = int(status_str)
     except ValueError:
         logger.error("[TWEETSMS] Non-numeric status sending to=%s: %r", to, body)
-        raise RuntimeError(f"TweetsMS unexpected response: {body!r}")
+        raise TweetsmsError(f"TweetsMS unexpected response: {body!r}")
 
     # Success: status >= 1
     if status_code >= 1:
@@ -85,8 +106,8 @@ def send_sms(to: str, message: str) -> bool:
         logger.error(
             "[TWEETSMS] Error sending to=%s: %s (code=%s)", to, error_msg, status_str
         )
-        raise RuntimeError(f"TweetsMS error: {error_msg} (code={status_str})")
+        raise TweetsmsError(f"TweetsMS error: {error_msg} (code={status_str})", code=status_str)
 
     # Unknown error
     logger.error("[TWEETSMS] Unknown error sending to=%s: %r", to, body)
-    raise RuntimeError(f"TweetsMS unknown error: {body!r}")
+    raise TweetsmsError(f"TweetsMS unknown error: {body!r}", code=status_str)
@@ -0,0 +1,199 @@
+"""Outbound delivery queue tests (accounts/outbox.py).
+
+Covers:
+- request paths only enqueue (``_send_email``, OTP SMS) — no provider call
+- the worker delivers due messages and deletes them
+- transient failures back off; exhausted / permanent / expired messages are
+  dead-lettered, and dead letters can be re-queued
+- the TweetsMS provider against a local stub HTTP gateway (pooled session,
+  permanent vs transient error codes)
+"""
+
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts import outbox
+from accounts.email_utils import _send_email
+from accounts.models import DeadLetterMessage, OutboundMessage
+from accounts.outbox import (
+    OUTBOX_MAX_ATTEMPTS,
+    PermanentDeliveryError,
+    StubProvider,
+    TweetSmsProvider,
+    deliver_due,
+    enqueue_sms,
+    requeue_dead_letters,
+)
+
+STUB_PROVIDERS = {
+    "EMAIL": "accounts.outbox.StubProvider",
+    "SMS": "accounts.outbox.StubProvider",
+}
+
+
+@override_settings(OUTBOX_PROVIDERS=STUB_PROVIDERS)
+class OutboxWorkerTests(TestCase):
+    def setUp(self):
+        StubProvider.sent = []
+        StubProvider.fail_with = None
+        self.addCleanup(setattr, StubProvider, "fail_with", None)
+
+    def test_send_email_only_enqueues(self):
+        with patch("accounts.email_utils._deliver_email") as deliver:
+            _send_email("a@example.com", "Subject", "<p>hi</p>", "hi")
+        deliver.assert_not_called()
+        message = OutboundMessage.objects.get()
+        self.assertEqual(message.channel, OutboundMessage.Channel.EMAIL)
+        self.assertEqual(message.payload["subject"], "Subject")
+
+    def test_worker_delivers_and_deletes(self):
+        _send_email("a@example.com", "Subject", "<p>hi</p>", "hi")
+        enqueue_sms("0591234567", "code 123456")
+        totals = deliver_due()
+        self.assertEqual(totals, {"sent": 2, "retried": 0, "dead": 0})
+        self.assertFalse(OutboundMessage.objects.exists())
+        self.assertEqual(
+            sorted(r for r, _ in StubProvider.sent), ["0591234567", "a@example.com"]
+        )
+
+    def test_not_yet_due_is_skipped(self):
+        message = enqueue_sms("0591234567", "later")
+        OutboundMessage.objects.filter(pk=message.pk).update(
+            next_attempt_at=timezone.now() + timedelta(minutes=5)
+        )
+        self.assertEqual(deliver_due()["sent"], 0)
+        self.assertEqual(StubProvider.sent, [])
+
+    def test_transient_failure_backs_off(self):
+        message = enqueue_sms("0591234567", "hello")
+        StubProvider.fail_with = ConnectionError("gateway timeout")
+        self.assertEqual(deliver_due()["retried"], 1)
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, 1)
+        self.assertIn("gateway timeout", message.last_error)
+        self.assertGreater(message.next_attempt_at, timezone.now())
+        # Not due again on the next pass.
+        self.assertEqual(deliver_due(), {"sent": 0, "retried": 0, "dead": 0})
+
+    def test_exhausted_retries_are_dead_lettered(self):
+        message = enqueue_sms("0591234567", "hello")
+        OutboundMessage.objects.filter(pk=message.pk).update(attempts=OUTBOX_MAX_ATTEMPTS - 1)
+        StubProvider.fail_with = ConnectionError("still down")
+        self.assertEqual(deliver_due()["dead"], 1)
+        self.assertFalse(OutboundMessage.objects.exists())
+        dead = DeadLetterMessage.objects.get()
+        self.assertEqual((dead.recipient, dead.attempts), ("0591234567", OUTBOX_MAX_ATTEMPTS))
+
+    def test_permanent_failure_is_dead_lettered_immediately(self):
+        enqueue_sms("0591234567", "hello")
+        StubProvider.fail_with = PermanentDeliveryError("invalid sender")
+        self.assertEqual(deliver_due()["dead"], 1)
+        self.assertEqual(DeadLetterMessage.objects.get().last_error, "invalid sender")
+
+    def test_expired_message_is_not_sent(self):
+        message = enqueue_sms("0591234567", "code 111111", expires_in=60)
+        OutboundMessage.objects.filter(pk=message.pk).update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(deliver_due()["dead"], 1)
+        self.assertEqual(StubProvider.sent, [])
+
+    def test_requeue_dead_letters(self):
+        enqueue_sms("0591234567", "hello")
+        StubProvider.fail_with = PermanentDeliveryError("boom")
+        deliver_due()
+        StubProvider.fail_with = None
+        self.assertEqual(requeue_dead_letters(DeadLetterMessage.objects.all()), 1)
+        self.assertEqual(deliver_due()["sent"], 1)
+        self.assertFalse(DeadLetterMessage.objects.exists())
+
+    def test_requeue_keeps_expiry_and_skips_expired(self):
+        enqueue_sms("0591234567", "code 111111", expires_in=60)
+        enqueue_sms("0597654321", "code 222222", expires_in=600)
+        StubProvider.fail_with = PermanentDeliveryError("boom")
+        deliver_due()
+        StubProvider.fail_with = None
+        DeadLetterMessage.objects.filter(recipient="0591234567").update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(requeue_dead_letters(DeadLetterMessage.objects.all()), 1)
+        requeued = OutboundMessage.objects.get()
+        self.assertEqual(requeued.recipient, "0597654321")
+        self.assertIsNotNone(requeued.expires_at)
+        self.assertTrue(DeadLetterMessage.objects.filter(recipient="0591234567").exists())
+
+    def test_command_one_shot(self):
+        enqueue_sms("0591234567", "hello")
+        out = StringIO()
+        call_command("deliver_outbox", stdout=out)
+        self.assertIn("1 sent", out.getvalue())
+
+
+class _StubGateway(BaseHTTPRequestHandler):
+    """Minimal TweetsMS-compatible gateway: replies with the status given in
+    ``reply`` and records each request's query string."""
+
+    reply = "1:msgid:0591234567:track<br />"
+    requests_seen = []
+
+    def do_GET(self):
+        _StubGateway.requests_seen.append(parse_qs(urlparse(self.path).query))
+        body = _StubGateway.reply.encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TweetSmsProviderStubGatewayTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubGateway)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}/api.php"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        _StubGateway.requests_seen = []
+        _StubGateway.reply = "1:msgid:0591234567:track<br />"
+        outbox._providers.clear()
+        self.addCleanup(outbox._providers.clear)
+        overrides = override_settings(
+            TWEETSMS_API_KEY="key", TWEETSMS_SENDER="Clinic", TWEETSMS_BASE_URL=self.base_url,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_worker_delivers_through_gateway(self):
+        enqueue_sms("0591234567", "hello")
+        enqueue_sms("0597654321", "hi")
+        self.assertEqual(deliver_due()["sent"], 2)
+        self.assertEqual(
+            sorted(q["to"][0] for q in _StubGateway.requests_seen), ["0591234567", "0597654321"]
+        )
+
+    def test_gateway_error_codes_classified(self):
+        provider = TweetSmsProvider()
+        _StubGateway.reply = "-110"
+        with self.assertRaises(PermanentDeliveryError):
+            provider.send("0591234567", {"message": "x"})
+        _StubGateway.reply = "-113"  # insufficient balance — retryable
+        with self.assertRaises(RuntimeError):
+            provider.send("0591234567", {"message": "x"})
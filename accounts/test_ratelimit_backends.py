@@ -0,0 +1,134 @@
+"""Rate-limit counters on Redis and on other cache backends (accounts/ratelimit.py).
+
+Covers:
+- the fixed-window counter, strike escalation and block check behave the same
+  on a (fake) Redis cache, where they run as Lua scripts, and on LocMem
+- on Redis each register_failure / is_blocked / hit_rate_limit call is one
+  round trip, and scripted keys are plain integers the cache API can read
+- the sliding-window cap counts the previous window's overlap, so a burst
+  across a window boundary is capped where fixed windows would allow it
+- every path fails open when the cache is down
+"""
+
+from unittest.mock import patch
+
+import fakeredis
+import redis
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from accounts import ratelimit
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "ratelimit-tests"}}
+FAKE_REDIS = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": "redis://fake-ratelimit:6379",
+        "OPTIONS": {"connection_class": fakeredis.FakeConnection},
+    }
+}
+
+LADDER = (60, 600, 3600)
+
+
+class _CounterBehaviour:
+    """Shared assertions; subclasses pick the cache backend."""
+
+    def setUp(self):
+        cache.clear()
+        patcher = patch.object(ratelimit, "LOGIN_LOCKOUT_LADDER", LADDER)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_failures_escalate_and_block(self):
+        scope, ident = "login", "0590001000"
+        totals = [ratelimit.register_failure(scope, ident, 900, limit=3) for _ in range(3)]
+        self.assertEqual(totals, [1, 2, 3])
+        self.assertTrue(ratelimit.is_blocked(scope, ident, 3))
+        self.assertEqual(cache.get(ratelimit._strikes_key(scope, ident)), 1)
+
+        # Block and window elapse; strikes persist and the next breach escalates.
+        cache.delete_many([ratelimit._block_key(scope, ident), ratelimit._key(scope, ident)])
+        self.assertFalse(ratelimit.is_blocked(scope, ident, 3))
+        for _ in range(3):
+            ratelimit.register_failure(scope, ident, 900, limit=3)
+        self.assertEqual(cache.get(ratelimit._strikes_key(scope, ident)), 2)
+        self.assertTrue(ratelimit.is_blocked(scope, ident, 3))
+
+        ratelimit.clear_failures(scope, ident)
+        self.assertFalse(ratelimit.is_blocked(scope, ident, 3))
+        self.assertIsNone(cache.get(ratelimit._strikes_key(scope, ident)))
+
+    def test_failures_without_limit_never_escalate(self):
+        for _ in range(5):
+            ratelimit.register_failure("pw_change", 7, 900)
+        self.assertEqual(cache.get(ratelimit._key("pw_change", 7)), 5)
+        self.assertIsNone(cache.get(ratelimit._block_key("pw_change", 7)))
+
+    def test_fixed_window_cap(self):
+        capped = [ratelimit.hit_rate_limit("csv_export", 1, 3, 600) for _ in range(4)]
+        self.assertEqual(capped, [False, False, False, True])
+
+    def test_sliding_window_caps_burst_across_boundary(self):
+        window = 60
+        with patch.object(ratelimit.time_mod, "time", return_value=10_000 * window + 50):
+            late = [ratelimit.hit_rate_limit("browse_slots", "ip", 4, window, sliding=True) for _ in range(4)]
+        self.assertEqual(late, [False] * 4)
+        # 5 s into the next window ~92 % of the previous burst still counts.
+        with patch.object(ratelimit.time_mod, "time", return_value=10_001 * window + 5):
+            self.assertTrue(ratelimit.hit_rate_limit("browse_slots", "ip", 4, window, sliding=True))
+            # The fixed window would have let it through.
+            self.assertFalse(ratelimit.hit_rate_limit("browse_slots", "ip", 4, window))
+        # Once the previous window has slid out, the identity is free again.
+        with patch.object(ratelimit.time_mod, "time", return_value=10_002 * window + 59):
+            self.assertFalse(ratelimit.hit_rate_limit("browse_slots", "ip", 4, window, sliding=True))
+
+
+@override_settings(CACHES=LOCMEM)
+class LocMemCounterTests(_CounterBehaviour, SimpleTestCase):
+    pass
+
+
+@override_settings(CACHES=FAKE_REDIS)
+class RedisCounterTests(_CounterBehaviour, SimpleTestCase):
+
+    def _round_trips(self, action):
+        with patch.object(redis.Redis, "execute_command", autospec=True,
+                          side_effect=redis.Redis.execute_command) as spy:
+            action()
+        return [call.args[1] for call in spy.call_args_list]
+
+    def test_one_round_trip_per_call(self):
+        # Warm the script cache so EVALSHA hits (a cold miss retries with EVAL).
+        ratelimit.register_failure("login", "warm", 900, limit=5)
+        ratelimit.hit_rate_limit("warm", 1, 5, 60)
+        ratelimit.hit_rate_limit("warm", 1, 5, 60, sliding=True)
+
+        self.assertEqual(
+            self._round_trips(lambda: ratelimit.register_failure("login", "0590002000", 900, limit=1)),
+            ["EVALSHA"],
+        )
+        self.assertEqual(self._round_trips(lambda: ratelimit.is_blocked("login", "0590002000", 1)), ["MGET"])
+        self.assertEqual(self._round_trips(lambda: ratelimit.hit_rate_limit("csv_export", 2, 5, 60)), ["EVALSHA"])
+        self.assertEqual(
+            self._round_trips(lambda: ratelimit.hit_rate_limit("browse_slots", "ip", 5, 60, sliding=True)),
+            ["EVALSHA"],
+        )
+
+    def test_script_keys_carry_ttls(self):
+        ratelimit.register_failure("login", "0590003000", 900, limit=1)
+        client, make_key = ratelimit._redis()
+        self.assertTrue(0 < client.ttl(make_key(ratelimit._key("login", "0590003000"))) <= 900)
+        self.assertTrue(0 < client.ttl(make_key(ratelimit._block_key("login", "0590003000"))) <= LADDER[0])
+        self.assertTrue(
+            0 < client.ttl(make_key(ratelimit._strikes_key("login", "0590003000"))) <= ratelimit.STRIKES_TTL_SECONDS
+        )
+
+    def test_fails_open_when_redis_is_down(self):
+        down = redis.ConnectionError("redis down")
+        with patch.object(ratelimit, "_run_script", side_effect=down):
+            self.assertEqual(ratelimit.register_failure("login", "x", 900, limit=5), 0)
+            self.assertFalse(ratelimit.hit_rate_limit("csv_export", 1, 0, 60))
+            self.assertFalse(ratelimit.hit_rate_limit("browse_slots", "ip", 0, 60, sliding=True))
+        with patch.object(redis.Redis, "mget", side_effect=down):
+            self.assertFalse(ratelimit.is_blocked("login", "x", 5))
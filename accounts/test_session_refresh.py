@@ -0,0 +1,91 @@
+"""Coalesced session refresh tests (accounts.middleware.SessionRefreshMiddleware).
+
+Covers:
+- an authenticated session is written on its first request, then skipped
+  until the refresh interval has passed
+- a request that modifies the session is always written
+- anonymous requests never create a session; logout is not resurrected
+- write/skip counters reach `manage.py session_write_stats`
+"""
+
+import time
+from importlib import import_module
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from accounts.middleware import (
+    SESSION_REFRESHED_AT_KEY,
+    SessionRefreshMiddleware,
+    flush_session_write_stats,
+)
+from accounts.models import CustomUser
+
+
+class SessionRefreshMiddlewareTests(TestCase):
+    def setUp(self):
+        flush_session_write_stats()  # drop counts left by earlier tests
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            phone="0594073158", name="Patient", password="TestPass123!@#", role="PATIENT",
+        )
+        self.client.force_login(self.user)
+        self.refresh_after = settings.SESSION_COOKIE_AGE - settings.SESSION_REFRESH_THRESHOLD_SECONDS
+
+    def _get_at(self, now):
+        with patch("accounts.middleware.time.time", return_value=now):
+            self.client.get(reverse("accounts:landing"))
+        return self.client.session.get(SESSION_REFRESHED_AT_KEY)
+
+    def test_refresh_is_coalesced(self):
+        start = int(time.time())
+        self.assertEqual(self._get_at(start), start)
+        # Inside the window: not rewritten.
+        self.assertEqual(self._get_at(start + self.refresh_after - 1), start)
+        # Remaining TTL below the threshold: rewritten (expiry re-stamped).
+        later = start + self.refresh_after
+        self.assertEqual(self._get_at(later), later)
+
+    def test_modified_session_is_always_saved(self):
+        engine = import_module(settings.SESSION_ENGINE)
+        request = RequestFactory().get("/")
+        request.session = engine.SessionStore()
+        request.session[SESSION_REFRESHED_AT_KEY] = 100
+        request.session.save()
+        request.session.modified = False
+
+        def view(req):
+            req.session["cart"] = "x"  # any write in the view
+            return HttpResponse()
+
+        with patch("accounts.middleware.time.time", return_value=101):
+            SessionRefreshMiddleware(view)(request)
+        self.assertEqual(request.session[SESSION_REFRESHED_AT_KEY], 101)
+        self.assertTrue(request.session.modified)
+
+    def test_logout_is_not_resurrected(self):
+        self.client.get(reverse("accounts:landing"))
+        self.client.post(reverse("accounts:logout"))
+        self.assertNotIn("_auth_user_id", self.client.session)
+        self.assertIsNone(self.client.session.get(SESSION_REFRESHED_AT_KEY))
+
+    def test_anonymous_request_creates_no_session(self):
+        self.client.logout()
+        self.client.cookies.clear()
+        response = self.client.get(reverse("accounts:landing"))
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+    def test_write_stats_command(self):
+        start = int(time.time())
+        for offset in (0, 1, 2):
+            self._get_at(start + offset)
+        flush_session_write_stats()
+        out = StringIO()
+        call_command("session_write_stats", "--reset", stdout=out)
+        self.assertIn("written: 1, skipped: 2", out.getvalue())
@@ -16,7 +16,7 @@ from patients.services import ensure_patient_profile
 
 # Isolated locmem cache for OTP-send flows so the 60s resend cooldown / daily
 # cap can't leak in from the real Redis the dev app shares. (The live SMS send
-# itself is neutralised per-test by patching accounts.otp_utils.tweetsms_send_sms
+# itself is neutralised per-test by patching accounts.otp_utils.enqueue_sms
 # — see _mock_sms below — because TweetsMS is "configured" in this env but its
 # gateway rejects the send, which otherwise makes request_otp return False and
 # the phone-submit step re-render with 200 instead of the expected 302.)
@@ -36,7 +36,7 @@ def _mock_sms(testcase):
 
     request_otp still generates + stores the OTP in cache and returns success;
     it just doesn't hit the real gateway."""
-    p = patch("accounts.otp_utils.tweetsms_send_sms", return_value=None)
+    p = patch("accounts.otp_utils.enqueue_sms", return_value=None)
     p.start()
     testcase.addCleanup(p.stop)
 
@@ -2211,7 +2211,7 @@ class LoginThrottleExtensionsTest(TestCase):
 
     # ── Fail-open ─────────────────────────────────────────────────────
     def test_throttle_fails_open_when_cache_down(self):
-        with patch.object(ratelimit.cache, "get", side_effect=Exception("redis down")):
+        with patch.object(ratelimit.cache, "get_many", side_effect=Exception("redis down")):
             self.assertFalse(ratelimit.is_blocked("login", "x", 5))
         with patch.object(ratelimit.cache, "add", side_effect=Exception("redis down")):
             self.assertEqual(
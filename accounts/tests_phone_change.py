@@ -30,7 +30,7 @@ class PhoneChangeTest(TestCase):
     def setUp(self):
         cache.clear()  # isolate OTP cooldown from prior tests / the dev Redis
         # request_otp still stores the OTP in cache; it just doesn't hit TweetsMS.
-        p = patch("accounts.otp_utils.tweetsms_send_sms", return_value=None)
+        p = patch("accounts.otp_utils.enqueue_sms", return_value=None)
         p.start()
         self.addCleanup(p.stop)
         # Create a city (referenced in some user signals or forms?)
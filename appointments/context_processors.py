@@ -3,29 +3,27 @@ Context processor: injects context-specific unread_notification_count into every
 
 Used by navbar bell badges across all dashboard types.
 Safe for anonymous users (returns 0).
+
+Counts come from the per-user cached counters in
+appointments/services/notification_counters.py — zero queries on a cache hit,
+one grouped aggregate on a miss.
 """
 
 from appointments.models import AppointmentNotification
+from appointments.services.notification_counters import get_unread_counts
 
 
 def unread_notifications(request):
     if not request.user.is_authenticated:
         return {}
-        
-    qs = AppointmentNotification.objects.filter(
-        patient=request.user,
-        is_read=False,
-    )
-    
-    patient_count = qs.filter(context_role=AppointmentNotification.ContextRole.PATIENT).count()
-    doctor_count = qs.filter(context_role=AppointmentNotification.ContextRole.DOCTOR).count()
-    secretary_count = qs.filter(context_role=AppointmentNotification.ContextRole.SECRETARY).count()
-    clinic_owner_count = qs.filter(context_role=AppointmentNotification.ContextRole.CLINIC_OWNER).count()
-    
+
+    counts = get_unread_counts(request.user.id)
+    Role = AppointmentNotification.ContextRole
+
     return {
-        "unread_patient_notification_count": patient_count,
-        "unread_doctor_notification_count": doctor_count,
-        "unread_secretary_notification_count": secretary_count,
-        "unread_clinic_owner_notification_count": clinic_owner_count,
-        "unread_notification_count": patient_count + doctor_count + secretary_count + clinic_owner_count,
+        "unread_patient_notification_count": counts[Role.PATIENT],
+        "unread_doctor_notification_count": counts[Role.DOCTOR],
+        "unread_secretary_notification_count": counts[Role.SECRETARY],
+        "unread_clinic_owner_notification_count": counts[Role.CLINIC_OWNER],
+        "unread_notification_count": sum(counts.values()),
     }
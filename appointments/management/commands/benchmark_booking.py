@@ -0,0 +1,148 @@
+"""
+Management command: benchmark_booking
+
+End-to-end latency benchmark for ``book_appointment``. Builds a throw-away
+clinic (doctor, availability, appointment type, patients) and books
+``--bookings`` distinct slots twice: once with the booking context dropped
+before every call (cold — what the first booking after a staff, verification
+or subscription change pays) and once with it cached (warm — the steady
+state). Reports p50 / p95 / max latency and the mean query count per booking.
+
+Everything runs inside one transaction that is rolled back, so the database
+is left untouched and no notification is sent. Exits with an error when the
+warm p95 exceeds ``--max-p95-ms`` (if given), so the number can be tracked.
+
+Usage:
+    python manage.py benchmark_booking
+    python manage.py benchmark_booking --bookings 400 --max-p95-ms 40
+"""
+
+import time as time_mod
+import uuid
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from appointments.models import AppointmentType
+from appointments.services import booking_context
+from appointments.services.booking_service import book_appointment
+from clinics.models import Clinic, ClinicStaff
+from doctors import slot_cache
+from doctors.models import DoctorAvailability, DoctorVerification
+
+User = get_user_model()
+
+SLOT_MINUTES = 15
+DAY_START, DAY_END = time(8, 0), time(20, 0)
+
+
+class _Rollback(Exception):
+    pass
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of ``samples`` (already sorted)."""
+    if not samples:
+        return 0.0
+    rank = max(1, -(-len(samples) * pct // 100))
+    return samples[int(rank) - 1]
+
+
+def _slots(start_day):
+    """Yield (date, time) for every slot from ``start_day`` onwards."""
+    day = start_day
+    while True:
+        minutes = DAY_START.hour * 60
+        while minutes < DAY_END.hour * 60:
+            yield day, time(minutes // 60, minutes % 60)
+            minutes += SLOT_MINUTES
+        day += timedelta(days=1)
+
+
+class Command(BaseCommand):
+    help = "Measure book_appointment latency (p50/p95) with a cold and a warm booking context."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bookings", type=int, default=200, help="Bookings per pass.")
+        parser.add_argument(
+            "--max-p95-ms", type=float, default=None,
+            help="Fail if the warm-context p95 exceeds this many milliseconds.",
+        )
+
+    def handle(self, *args, **options):
+        results = {}
+        try:
+            with transaction.atomic():
+                fixture = self._fixture(options["bookings"])
+                slots = _slots(date.today() + timedelta(days=7))
+                for label, cold in (("cold context", True), ("warm context", False)):
+                    results[label] = self._run(fixture, slots, options["bookings"], cold)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        for label, (latencies, queries) in results.items():
+            latencies.sort()
+            self.stdout.write(
+                f"{label}: {len(latencies)} booking(s)  "
+                f"p50 {percentile(latencies, 50):.1f} ms  "
+                f"p95 {percentile(latencies, 95):.1f} ms  "
+                f"max {latencies[-1]:.1f} ms  "
+                f"{sum(queries) / len(queries):.1f} queries/booking"
+            )
+
+        warm_p95 = percentile(results["warm context"][0], 95)
+        limit = options["max_p95_ms"]
+        if limit is not None and warm_p95 > limit:
+            raise CommandError(f"Warm p95 {warm_p95:.1f} ms exceeds {limit:.1f} ms.")
+        self.stdout.write(self.style.SUCCESS("Done (all writes rolled back)."))
+
+    def _fixture(self, bookings):
+        tag = uuid.uuid4().hex[:8]
+        owner = User.objects.create_user(phone=f"bench-{tag}-o", name="Bench Owner", role="MAIN_DOCTOR")
+        doctor = User.objects.create_user(phone=f"bench-{tag}-d", name="Bench Doctor", role="DOCTOR")
+        clinic = Clinic.objects.create(name=f"Bench {tag}", address="-", main_doctor=owner)
+        ClinicStaff.objects.create(clinic=clinic, user=doctor, role="DOCTOR", is_active=True)
+        DoctorVerification.objects.create(user=doctor, identity_status="IDENTITY_VERIFIED")
+        DoctorAvailability.objects.bulk_create([
+            DoctorAvailability(
+                doctor=doctor, clinic=clinic, day_of_week=day, start_time=DAY_START, end_time=DAY_END,
+            )
+            for day in range(7)
+        ])
+        appointment_type = AppointmentType.objects.create(
+            clinic=clinic, name="Bench", duration_minutes=SLOT_MINUTES, price=Decimal("10.00"),
+        )
+        patients = User.objects.bulk_create([
+            User(phone=f"bench-{tag}-{n}", password="!", name=f"Bench Patient {n}",
+                 role="PATIENT", roles=["PATIENT"])
+            for n in range(bookings)
+        ])
+        return clinic, doctor, appointment_type, patients
+
+    def _run(self, fixture, slots, bookings, cold):
+        clinic, doctor, appointment_type, patients = fixture
+        latencies, queries = [], []
+        for patient in patients[:bookings]:
+            day, start = next(slots)
+            if cold:
+                booking_context.invalidate_clinic(clinic.id)
+            with CaptureQueriesContext(connection) as ctx:
+                t0 = time_mod.perf_counter()
+                book_appointment(
+                    patient=patient,
+                    doctor_id=doctor.id,
+                    clinic_id=clinic.id,
+                    appointment_type_id=appointment_type.id,
+                    appointment_date=day,
+                    appointment_time=start,
+                )
+                latencies.append((time_mod.perf_counter() - t0) * 1000)
+            queries.append(len(ctx.captured_queries))
+            # Stand-in for the on-commit bump a real booking triggers.
+            slot_cache.invalidate_doctor_day(doctor.id, day)
+        return latencies, queries
@@ -0,0 +1,53 @@
+"""
+Management command: prune_notifications
+
+Deletes read notifications older than NOTIFICATION_RETENTION_DAYS (or --days),
+oldest first, in batches of --batch-size rows. Unread notifications are kept.
+With --archive, deleted rows are first appended to a gzipped JSON-lines file.
+
+Usage:
+    python manage.py prune_notifications
+    python manage.py prune_notifications --days 90 --archive /var/backups/notifications.jsonl.gz
+    python manage.py prune_notifications --dry-run
+"""
+
+import gzip
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from appointments.services.notification_retention import (
+    DEFAULT_BATCH_SIZE, expired_notifications, prune_read_notifications,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete read notifications older than the retention period in bounded batches, "
+        "optionally archiving them to a gzipped JSON-lines file first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.NOTIFICATION_RETENTION_DAYS,
+                            help='Keep read notifications younger than this many days.')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--archive', metavar='PATH',
+                            help='Append deleted rows to this .jsonl.gz file before deleting.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many notifications would be removed.')
+
+    def handle(self, *args, **options):
+        days = options['days']
+        if options['dry_run']:
+            count = expired_notifications(days).count()
+            self.stdout.write(f'{count} read notifications older than {days} days would be removed.')
+            return
+
+        if options['archive']:
+            with gzip.open(options['archive'], 'at', encoding='utf-8') as archive:
+                count = prune_read_notifications(days, options['batch_size'], archive=archive)
+        else:
+            count = prune_read_notifications(days, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Removed {count} read notifications older than {days} days.'
+        ))
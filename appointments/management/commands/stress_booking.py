@@ -0,0 +1,178 @@
+"""
+Management command: stress_booking
+
+Concurrent stress test for the booking critical section. Creates a
+throw-away clinic (committed, because every worker thread has its own
+database connection) and, for each BOOKING_LOCK_MODE:
+
+- throughput: ``--threads`` workers book ``--bookings`` distinct slots of the
+  same doctor, day by day, so every booking contends for the same doctor-day
+  lock; reports bookings per second;
+- races: ``--races`` times, every worker books the same slot on a day with no
+  appointments yet; more than one CONFIRMED winner is a double booking.
+
+The fixture (clinic, users, appointments) is deleted afterwards, even on
+failure. Exits with an error if advisory mode double-books.
+
+Usage:
+    python manage.py stress_booking
+    python manage.py stress_booking --threads 16 --bookings 400 --races 20
+"""
+
+import threading
+import time as time_mod
+import uuid
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from appointments.models import Appointment, AppointmentType
+from appointments.services.booking_locks import ADVISORY, ROWS
+from appointments.services.booking_service import BookingError, book_appointment
+from clinics.models import Clinic, ClinicStaff
+from doctors.models import DoctorAvailability, DoctorVerification
+from patients.models import ClinicPatient
+
+User = get_user_model()
+
+SLOT_MINUTES = 30
+DAY_START, DAY_END = time(8, 0), time(20, 0)
+SLOTS_PER_DAY = (DAY_END.hour - DAY_START.hour) * 60 // SLOT_MINUTES
+
+
+def _day_slots():
+    minutes = DAY_START.hour * 60
+    for n in range(SLOTS_PER_DAY):
+        start = minutes + n * SLOT_MINUTES
+        yield time(start // 60, start % 60)
+
+
+class Command(BaseCommand):
+    help = "Hammer book_appointment from concurrent threads in each lock mode."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--bookings", type=int, default=200, help="Distinct-slot bookings per mode.")
+        parser.add_argument("--races", type=int, default=10, help="Same-slot races per mode.")
+
+    def handle(self, *args, **options):
+        threads = options["threads"]
+        bookings = options["bookings"]
+        races = options["races"]
+        modes = [ROWS, ADVISORY] if connection.vendor == "postgresql" else [ROWS]
+
+        per_mode = bookings + races * threads
+        fixture = self._fixture(per_mode * len(modes))
+        days = (date.today() + timedelta(days=7 + n) for n in range(10_000))
+        doubles = {}
+        try:
+            for index, mode in enumerate(modes):
+                patients = iter(fixture["patients"][index * per_mode:(index + 1) * per_mode])
+                with override_settings(BOOKING_LOCK_MODE=mode):
+                    rate, errors = self._throughput(fixture, patients, days, threads, bookings)
+                    doubles[mode] = self._races(fixture, patients, days, threads, races)
+                self.stdout.write(
+                    f"{mode:>8}: {rate:.1f} bookings/s over {bookings} booking(s) "
+                    f"({errors} refused), {doubles[mode]} double booking(s) in {races} race(s)"
+                )
+        finally:
+            self._cleanup(fixture)
+
+        if doubles.get(ADVISORY):
+            raise CommandError("Advisory lock mode double-booked a slot.")
+        self.stdout.write(self.style.SUCCESS("Done (fixture removed)."))
+
+    # ── Phases ──────────────────────────────────────────────────────────────
+    def _throughput(self, fixture, patients, days, threads, bookings):
+        jobs = []
+        while len(jobs) < bookings:
+            day = next(days)
+            for start in list(_day_slots())[:bookings - len(jobs)]:
+                jobs.append((next(patients), day, start))
+        # Interleave so the workers book the same day at the same time.
+        per_thread = [jobs[i::threads] for i in range(threads)]
+        t0 = time_mod.perf_counter()
+        outcomes = self._run(fixture, per_thread)
+        elapsed = time_mod.perf_counter() - t0
+        return len(jobs) / elapsed, sum(1 for ok in outcomes if not ok)
+
+    def _races(self, fixture, patients, days, threads, races):
+        doubles = 0
+        for _ in range(races):
+            day = next(days)
+            self._run(fixture, [[(next(patients), day, time(9, 0))] for _ in range(threads)])
+            winners = Appointment.objects.filter(
+                doctor=fixture["doctor"], appointment_date=day, appointment_time=time(9, 0),
+                status=Appointment.Status.CONFIRMED,
+            ).count()
+            doubles += max(winners - 1, 0)
+        return doubles
+
+    def _run(self, fixture, per_thread):
+        """Run each job list on its own thread, all starting together."""
+        barrier = threading.Barrier(len(per_thread))
+        outcomes = []
+        lock = threading.Lock()
+
+        def worker(jobs):
+            try:
+                barrier.wait()
+                for patient, day, start in jobs:
+                    try:
+                        book_appointment(
+                            patient=patient,
+                            doctor_id=fixture["doctor"].id,
+                            clinic_id=fixture["clinic"].id,
+                            appointment_type_id=fixture["type"].id,
+                            appointment_date=day,
+                            appointment_time=start,
+                        )
+                        ok = True
+                    except BookingError:
+                        ok = False
+                    with lock:
+                        outcomes.append(ok)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, args=(jobs,)) for jobs in per_thread]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        return outcomes
+
+    # ── Fixture ─────────────────────────────────────────────────────────────
+    def _fixture(self, patient_count):
+        tag = uuid.uuid4().hex[:8]
+        owner = User.objects.create_user(phone=f"stress-{tag}-o", name="Stress Owner", role="MAIN_DOCTOR")
+        doctor = User.objects.create_user(phone=f"stress-{tag}-d", name="Stress Doctor", role="DOCTOR")
+        clinic = Clinic.objects.create(name=f"Stress {tag}", address="-", main_doctor=owner)
+        ClinicStaff.objects.create(clinic=clinic, user=doctor, role="DOCTOR", is_active=True)
+        DoctorVerification.objects.create(user=doctor, identity_status="IDENTITY_VERIFIED")
+        DoctorAvailability.objects.bulk_create([
+            DoctorAvailability(
+                doctor=doctor, clinic=clinic, day_of_week=day, start_time=DAY_START, end_time=DAY_END,
+            )
+            for day in range(7)
+        ])
+        appointment_type = AppointmentType.objects.create(
+            clinic=clinic, name="Stress", duration_minutes=SLOT_MINUTES, price=Decimal("10.00"),
+        )
+        patients = User.objects.bulk_create([
+            User(phone=f"stress-{tag}-{n}", password="!", name=f"Stress Patient {n}",
+                 role="PATIENT", roles=["PATIENT"])
+            for n in range(patient_count)
+        ])
+        # Registered patients book CONFIRMED, which is what occupies a slot.
+        ClinicPatient.objects.bulk_create([ClinicPatient(clinic=clinic, patient=p) for p in patients])
+        return {"tag": tag, "clinic": clinic, "doctor": doctor, "type": appointment_type, "patients": patients}
+
+    def _cleanup(self, fixture):
+        Appointment.objects.filter(clinic=fixture["clinic"]).delete()
+        fixture["clinic"].delete()
+        User.objects.filter(phone__startswith=f"stress-{fixture['tag']}-").delete()
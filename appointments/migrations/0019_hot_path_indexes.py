@@ -0,0 +1,44 @@
+# Generated by Django 6.0.6 on 2026-10-16 19:56
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Built CONCURRENTLY so deploying does not block writes to these tables.
+    atomic = False
+
+    dependencies = [
+        ('appointments', '0018_alter_appointmentnotification_notification_type'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='appointment',
+            index=models.Index(fields=['clinic', 'appointment_date', 'status'], name='appt_clinic_date_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'appointment_date', 'status'], name='appt_doctor_date_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'status', 'appointment_date'], name='appt_patient_status_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status__in', ('PENDING', 'CONFIRMED', 'CHECKED_IN', 'IN_PROGRESS'))), fields=['doctor', 'appointment_date', 'appointment_time'], name='appt_doctor_active_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status__in', ('PENDING', 'CONFIRMED', 'CHECKED_IN', 'IN_PROGRESS'))), fields=['appointment_date', 'appointment_time'], name='appt_active_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='appointmentnotification',
+            index=models.Index(fields=['patient', 'context_role', '-created_at'], name='notif_patient_role_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='appointmentnotification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['patient', 'context_role'], name='notif_unread_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 6.0.6 on 2026-10-16 21:10
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Built CONCURRENTLY so deploying does not block writes to this table.
+    atomic = False
+
+    dependencies = [
+        ('appointments', '0019_hot_path_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='appointmentnotification',
+            index=models.Index(condition=models.Q(('is_read', True)), fields=['created_at'], name='notif_read_created_idx'),
+        ),
+    ]
@@ -121,6 +121,11 @@ class DoctorClinicAppointmentType(models.Model):
                 )
 
 
+# Statuses of appointments that are still ahead of / in the visit. The partial
+# indexes on Appointment cover only these rows, so they stay small as history grows.
+ACTIVE_APPOINTMENT_STATUSES = ("PENDING", "CONFIRMED", "CHECKED_IN", "IN_PROGRESS")
+
+
 class Appointment(models.Model):
     """Core appointment booking record."""
 
@@ -218,6 +223,36 @@ class Appointment(models.Model):
         ordering = ["-appointment_date", "-appointment_time"]
         verbose_name = "Appointment"
         verbose_name_plural = "Appointments"
+        # Hot-path access patterns; guarded by appointments/tests/test_query_plans.py.
+        indexes = [
+            # Secretary day views, waiting room, reports, clinic-scoped sweeps.
+            models.Index(
+                fields=["clinic", "appointment_date", "status"],
+                name="appt_clinic_date_status_idx",
+            ),
+            # Doctor schedules and the slot engine's blocking-appointment scan.
+            models.Index(
+                fields=["doctor", "appointment_date", "status"],
+                name="appt_doctor_date_status_idx",
+            ),
+            # Patient upcoming/past lists and the same-day booking rule.
+            models.Index(
+                fields=["patient", "status", "appointment_date"],
+                name="appt_patient_status_date_idx",
+            ),
+            # Row-lock booking mode (BOOKING_LOCK_MODE="rows") over a doctor's live day.
+            models.Index(
+                fields=["doctor", "appointment_date", "appointment_time"],
+                name="appt_doctor_active_idx",
+                condition=models.Q(status__in=ACTIVE_APPOINTMENT_STATUSES),
+            ),
+            # Global no-show sweep: overdue PENDING/CONFIRMED across clinics.
+            models.Index(
+                fields=["appointment_date", "appointment_time"],
+                name="appt_active_date_idx",
+                condition=models.Q(status__in=ACTIVE_APPOINTMENT_STATUSES),
+            ),
+        ]
 
 
 class AppointmentAnswer(models.Model):
@@ -467,6 +502,25 @@ class AppointmentNotification(models.Model):
         verbose_name = "Appointment Notification"
         verbose_name_plural = "Appointment Notifications"
         ordering = ["-created_at"]
+        indexes = [
+            # Notification center lists (one context, newest first).
+            models.Index(
+                fields=["patient", "context_role", "-created_at"],
+                name="notif_patient_role_created_idx",
+            ),
+            # Badge recount and mark-all-read: only unread rows.
+            models.Index(
+                fields=["patient", "context_role"],
+                name="notif_unread_idx",
+                condition=models.Q(is_read=False),
+            ),
+            # Retention sweep (prune_notifications): oldest read rows first.
+            models.Index(
+                fields=["created_at"],
+                name="notif_read_created_idx",
+                condition=models.Q(is_read=True),
+            ),
+        ]
 
     def __str__(self):
         return f"[{self.notification_type}] \u2192 {self.patient.name} ({self.created_at:%Y-%m-%d})"
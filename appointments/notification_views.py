@@ -15,13 +15,20 @@ Security:
 - No cross-user, cross-role, or cross-tenant leakage possible.
 """
 
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
 from django.contrib import messages
+from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
 
 from appointments.models import AppointmentNotification
+from appointments.services.notification_counters import (
+    adjust_unread, get_unread_counts, invalidate_unread_counts,
+)
 
 
 def _resolve_appointment_url(notification):
@@ -79,20 +86,62 @@ def _resolve_appointment_url(notification):
     return None
 
 
+# Notification center pages are keyset-paginated on (created_at, id), newest
+# first: each page costs one index range scan however far back it is.
+NOTIFICATIONS_PAGE_SIZE = 20
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _encode_cursor(notification):
+    micros = (notification.created_at - _EPOCH) // _MICROSECOND
+    return f"{micros}-{notification.pk}"
+
+
+def _decode_cursor(raw):
+    """(created_at, id) from a page cursor, or None if absent or malformed."""
+    try:
+        micros, pk = raw.split("-")
+        created = _EPOCH + int(micros) * _MICROSECOND
+        return created, int(pk)
+    except (AttributeError, ValueError, OverflowError, OSError):
+        return None
+
+
 def _render_notifications(request, context_role, template, base_template):
+    """Render one page of a notification center.
+
+    The first page is the full center; ``?cursor=`` continues after the last
+    card of the previous page. Requests from the scroll loader (HX-Request)
+    get only the next page's cards (``items_template``).
+    """
+    from django.urls import reverse
+
     user = request.user
+    items_template = (
+        "appointments/partials/notif_items_owner.html"
+        if context_role == AppointmentNotification.ContextRole.CLINIC_OWNER
+        else "appointments/partials/notif_items.html"
+    )
     notifications_qs = (
         AppointmentNotification.objects.filter(patient=user, context_role=context_role)
         .select_related("appointment__clinic", "appointment__doctor", "subject_patient", "purchase_request")
-        .order_by("-created_at")
+        .order_by("-created_at", "-id")
     )
+    cursor = _decode_cursor(request.GET.get("cursor"))
+    if cursor:
+        created, pk = cursor
+        notifications_qs = notifications_qs.filter(
+            Q(created_at__lt=created) | Q(created_at=created, id__lt=pk)
+        )
 
-    unread_count = notifications_qs.filter(is_read=False).count()
-    total_count = notifications_qs.count()
-
-    from django.urls import reverse
+    notifications = list(notifications_qs[:NOTIFICATIONS_PAGE_SIZE + 1])
+    next_cursor = None
+    if len(notifications) > NOTIFICATIONS_PAGE_SIZE:
+        notifications = notifications[:NOTIFICATIONS_PAGE_SIZE]
+        next_cursor = _encode_cursor(notifications[-1])
 
-    notifications = list(notifications_qs)
     for notif in notifications:
         # Route link-based notifications through `open_notification` so the
         # notification is marked read when the user clicks "view appointment".
@@ -104,12 +153,23 @@ def _render_notifications(request, context_role, template, base_template):
 
     context = {
         "notifications": notifications,
-        "unread_count": unread_count,
-        "total_count": total_count,
-        "read_count": total_count - unread_count,
+        "next_cursor": next_cursor,
         "base_template": base_template,
         "context_role": context_role,
     }
+    if cursor and request.headers.get("HX-Request"):
+        return render(request, items_template, context)
+
+    # Header tallies: unread comes from the cached badge counters.
+    unread_count = get_unread_counts(user.id)[context_role]
+    total_count = AppointmentNotification.objects.filter(
+        patient=user, context_role=context_role
+    ).count()
+    context.update(
+        unread_count=unread_count,
+        total_count=total_count,
+        read_count=max(total_count - unread_count, 0),
+    )
     return render(request, template, context)
 
 
@@ -170,6 +230,7 @@ def mark_notification_read(request, pk):
     if not notif.is_read:
         notif.is_read = True
         notif.save(update_fields=["is_read"])
+        adjust_unread(request.user.id, notif.context_role, -1)
 
     next_url = request.POST.get("next") or request.META.get("HTTP_REFERER", "")
     if next_url:
@@ -190,6 +251,7 @@ def open_notification(request, pk):
     if not notif.is_read:
         notif.is_read = True
         notif.save(update_fields=["is_read"])
+        adjust_unread(request.user.id, notif.context_role, -1)
 
     dest = _resolve_appointment_url(notif)
     return redirect(dest or "accounts:home")
@@ -206,6 +268,11 @@ def mark_all_notifications_read(request):
         qs = qs.filter(context_role=context_role)
 
     updated = qs.update(is_read=True)
+    if updated:
+        if context_role:
+            adjust_unread(request.user.id, context_role, -updated)
+        else:
+            invalidate_unread_counts(request.user.id)
 
     if updated:
         messages.success(request, _("تم تحديد جميع الإشعارات كمقروءة."))
@@ -240,7 +307,13 @@ def delete_notifications(request):
     else:  # "selected"
         qs = qs.filter(pk__in=request.POST.getlist("ids"))
 
+    # Unread rows among the deleted ones come off the badge counters.
+    unread_removed = Counter()
+    if mode != "read":
+        unread_removed.update(qs.filter(is_read=False).values_list("context_role", flat=True))
     deleted, _unused = qs.delete()
+    for role, count in unread_removed.items():
+        adjust_unread(request.user.id, role, -count)
 
     if deleted:
         messages.success(request, _("تم حذف الإشعارات المحددة."))
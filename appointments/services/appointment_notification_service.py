@@ -12,7 +12,10 @@ Rules:
 
 import logging
 
+from django.db import transaction
+
 from appointments.models import AppointmentNotification
+from appointments.services.notification_counters import record_unread_created
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +53,7 @@ def _create_notification(patient, appointment, notification_type, title, message
             actor_name=actor_name,
             is_delivered=True,
         )
+        record_unread_created([notification])
         logger.info(
             "[NOTIFICATION] Created %s for patient_id=%s appointment_id=%s",
             notification_type, patient.id, appointment.id if appointment else None,
@@ -66,6 +70,80 @@ def _create_notification(patient, appointment, notification_type, title, message
         return None
 
 
+def _staff_recipients(appointment, include_doctor=True):
+    """
+    Resolve the staff audience of an appointment event as
+    (user_id, context_role) pairs: the appointment's doctor (DOCTOR context)
+    followed by every active secretary of the clinic (SECRETARY context).
+
+    One query, however many secretaries the clinic has.
+    """
+    from clinics.models import ClinicStaff
+
+    recipients = []
+    if include_doctor and appointment.doctor_id:
+        recipients.append((appointment.doctor_id, AppointmentNotification.ContextRole.DOCTOR))
+    secretary_ids = ClinicStaff.objects.filter(
+        clinic_id=appointment.clinic_id, role="SECRETARY", is_active=True,
+    ).values_list("user_id", flat=True)
+    recipients.extend(
+        (s_id, AppointmentNotification.ContextRole.SECRETARY) for s_id in secretary_ids
+    )
+    return recipients
+
+
+def _fan_out(recipients, event, exclude_user_ids=(), **fields):
+    """
+    Create one in-app notification per (user_id, context_role) recipient with
+    a single bulk INSERT. ``fields`` are the AppointmentNotification columns
+    shared by every row (appointment, notification_type, title, ...).
+
+    Duplicate recipients and ``exclude_user_ids`` are dropped. If the bulk
+    insert fails, each row is retried on its own so one bad recipient cannot
+    cost the others their notification. Failures are logged under ``event``,
+    never raised.
+
+    Returns the number of notifications created.
+    """
+    exclude = set(exclude_user_ids or ())
+    seen = set()
+    rows = []
+    for user_id, context_role in recipients:
+        if user_id in exclude or (user_id, context_role) in seen:
+            continue
+        seen.add((user_id, context_role))
+        rows.append(AppointmentNotification(
+            patient_id=user_id, context_role=context_role, is_delivered=True, **fields,
+        ))
+    if not rows:
+        return 0
+
+    try:
+        with transaction.atomic():
+            AppointmentNotification.objects.bulk_create(rows)
+        record_unread_created(rows)
+        return len(rows)
+    except Exception as exc:
+        logger.warning(
+            "[NOTIFICATION] Bulk %s fan-out failed (%s rows), retrying per recipient: %r",
+            event, len(rows), exc,
+        )
+
+    created = 0
+    for row in rows:
+        try:
+            with transaction.atomic():
+                row.save(force_insert=True)
+            record_unread_created([row])
+            created += 1
+        except Exception as exc:
+            logger.warning(
+                "[NOTIFICATION] Could not create %s notification for user_id=%s: %r",
+                event, row.patient_id, exc,
+            )
+    return created
+
+
 def _doctor_names(appointment):
     """Return (arabic, english) doctor display names with title prefix."""
     doc = appointment.doctor
@@ -273,8 +351,6 @@ def notify_secretaries_appointment_cancelled_by_doctor(appointment, by_staff=Non
     Safe to call from transaction.on_commit().
     """
     try:
-        from clinics.models import ClinicStaff
-
         patient_name = appointment.patient.name if appointment.patient else "مريض"
         doctor_ar, doctor_en = _doctor_names(appointment)
         date_str = appointment.appointment_date.strftime("%Y-%m-%d")
@@ -296,31 +372,18 @@ def notify_secretaries_appointment_cancelled_by_doctor(appointment, by_staff=Non
             actor_role = AppointmentNotification.ActorRole.DOCTOR
             actor_name = appointment.doctor.name if appointment.doctor else ""
 
-        secretary_ids = ClinicStaff.objects.filter(
-            clinic=appointment.clinic, role="SECRETARY", is_active=True,
-        ).values_list("user_id", flat=True)
-
-        for user_id in secretary_ids:
-            try:
-                AppointmentNotification.objects.create(
-                    patient_id=user_id,
-                    appointment=appointment,
-                    context_role=AppointmentNotification.ContextRole.SECRETARY,
-                    notification_type=AppointmentNotification.Type.APPOINTMENT_CANCELLED,
-                    title=title,
-                    message=message,
-                    title_en=title_en,
-                    message_en=message_en,
-                    actor_role=actor_role,
-                    actor_name=actor_name,
-                    is_delivered=True,
-                )
-            except Exception as exc:
-                logger.warning(
-                    "[NOTIFICATION] Could not create doctor-cancel notification "
-                    "for secretary user_id=%s appointment_id=%s: %r",
-                    user_id, appointment.id, exc,
-                )
+        _fan_out(
+            _staff_recipients(appointment, include_doctor=False),
+            "doctor-cancel",
+            appointment=appointment,
+            notification_type=AppointmentNotification.Type.APPOINTMENT_CANCELLED,
+            title=title,
+            message=message,
+            title_en=title_en,
+            message_en=message_en,
+            actor_role=actor_role,
+            actor_name=actor_name,
+        )
 
     except Exception as exc:
         logger.error("[NOTIFICATION] notify_secretaries_appointment_cancelled_by_doctor failed: %r", exc)
@@ -396,8 +459,6 @@ def notify_staff_patient_cancelled(appointment):
     Safe to call from transaction.on_commit().
     """
     try:
-        from clinics.models import ClinicStaff
-
         patient_name = appointment.patient.name if appointment.patient else "مريض"
         date_str = appointment.appointment_date.strftime("%Y-%m-%d")
         time_str = appointment.appointment_time.strftime("%H:%M")
@@ -416,41 +477,23 @@ def notify_staff_patient_cancelled(appointment):
         actor_role = AppointmentNotification.ActorRole.PATIENT
         actor_name = patient_name if appointment.patient else ""
 
-        recipients = []
-        if appointment.doctor_id:
-            recipients.append((appointment.doctor_id, AppointmentNotification.ContextRole.DOCTOR))
-        secretary_ids = ClinicStaff.objects.filter(
-            clinic=appointment.clinic, role="SECRETARY", is_active=True,
-        ).values_list("user_id", flat=True)
-        for s_id in secretary_ids:
-            recipients.append((s_id, AppointmentNotification.ContextRole.SECRETARY))
-
         # The clinic owner is intentionally NOT notified about appointment events
         # (booked/cancelled/edited) — the owner notification center is reserved for
         # business events such as purchase requests. If the owner is also the
-        # appointment's doctor they still get the DOCTOR-context notification above.
+        # appointment's doctor they still get the DOCTOR-context notification.
 
-        for user_id, ctx_role in recipients:
-            try:
-                AppointmentNotification.objects.create(
-                    patient_id=user_id,
-                    appointment=appointment,
-                    context_role=ctx_role,
-                    notification_type=AppointmentNotification.Type.APPOINTMENT_CANCELLED,
-                    title=title,
-                    message=message,
-                    title_en=title_en,
-                    message_en=message_en,
-                    actor_role=actor_role,
-                    actor_name=actor_name,
-                    is_delivered=True,
-                )
-            except Exception as exc:
-                logger.warning(
-                    "[NOTIFICATION] Could not create patient-cancel notification "
-                    "for user_id=%s appointment_id=%s: %r",
-                    user_id, appointment.id, exc,
-                )
+        _fan_out(
+            _staff_recipients(appointment),
+            "patient-cancel",
+            appointment=appointment,
+            notification_type=AppointmentNotification.Type.APPOINTMENT_CANCELLED,
+            title=title,
+            message=message,
+            title_en=title_en,
+            message_en=message_en,
+            actor_role=actor_role,
+            actor_name=actor_name,
+        )
 
     except Exception as exc:
         logger.error("[NOTIFICATION] notify_staff_patient_cancelled failed: %r", exc)
@@ -463,8 +506,6 @@ def notify_staff_patient_edited(appointment, old_date, old_time, old_type):
     Safe to call from transaction.on_commit().
     """
     try:
-        from clinics.models import ClinicStaff
-
         patient_name = appointment.patient.name if appointment.patient else "مريض"
         old_date_str = old_date.strftime("%Y-%m-%d")
         old_time_str = old_time.strftime("%H:%M")
@@ -487,52 +528,52 @@ def notify_staff_patient_edited(appointment, old_date, old_time, old_type):
         actor_role = AppointmentNotification.ActorRole.PATIENT
         actor_name = patient_name if appointment.patient else ""
 
-        recipients = []
-        if appointment.doctor_id:
-            recipients.append((appointment.doctor_id, AppointmentNotification.ContextRole.DOCTOR))
-        secretary_ids = ClinicStaff.objects.filter(
-            clinic=appointment.clinic, role="SECRETARY", is_active=True,
-        ).values_list("user_id", flat=True)
-        for s_id in secretary_ids:
-            recipients.append((s_id, AppointmentNotification.ContextRole.SECRETARY))
-
         # The clinic owner is intentionally NOT notified about appointment events.
 
-        for user_id, ctx_role in recipients:
-            try:
-                AppointmentNotification.objects.create(
-                    patient_id=user_id,
-                    appointment=appointment,
-                    context_role=ctx_role,
-                    notification_type=AppointmentNotification.Type.APPOINTMENT_EDITED,
-                    title=title,
-                    message=message,
-                    title_en=title_en,
-                    message_en=message_en,
-                    actor_role=actor_role,
-                    actor_name=actor_name,
-                    is_delivered=True,
-                )
-            except Exception as exc:
-                logger.warning(
-                    "[NOTIFICATION] Could not create patient-edit notification "
-                    "for user_id=%s appointment_id=%s: %r",
-                    user_id, appointment.id, exc,
-                )
+        _fan_out(
+            _staff_recipients(appointment),
+            "patient-edit",
+            appointment=appointment,
+            notification_type=AppointmentNotification.Type.APPOINTMENT_EDITED,
+            title=title,
+            message=message,
+            title_en=title_en,
+            message_en=message_en,
+            actor_role=actor_role,
+            actor_name=actor_name,
+        )
 
     except Exception as exc:
         logger.error("[NOTIFICATION] notify_staff_patient_edited failed: %r", exc)
 
 
+def reminder_text(appointment):
+    """(title, message, title_en, message_en) of an appointment's reminder."""
+    doctor_ar, doctor_en = _doctor_names(appointment)
+    date_str = appointment.appointment_date.strftime("%Y-%m-%d")
+    time_str = appointment.appointment_time.strftime("%H:%M")
+    clinic_name = appointment.clinic.name
+    return (
+        "تذكير بموعدك",
+        f"تذكير: لديك موعد مع {doctor_ar} "
+        f"بتاريخ {date_str} الساعة {time_str} "
+        f"في {clinic_name}.",
+        "Appointment Reminder",
+        f"Reminder: you have an appointment with {doctor_en} on "
+        f"{date_str} at {time_str} at {clinic_name}.",
+    )
+
+
 def notify_appointment_reminder(appointment):
     """
     Create in-app + email reminder notification to patient.
 
     Only creates a notification if appointment.reminder_sent is False.
-    This function does NOT flip reminder_sent — the caller (management command)
-    is responsible for setting it to True after calling this function.
+    This function does NOT flip reminder_sent — the caller is responsible for
+    setting it to True after calling this function.
 
-    Safe to call from the reminder management command.
+    Single-appointment path; the send_appointment_reminders command builds the
+    same notification in bulk (appointments/services/reminder_dispatcher.py).
     """
     try:
         if appointment.reminder_sent:
@@ -543,22 +584,7 @@ def notify_appointment_reminder(appointment):
             return
 
         patient = appointment.patient
-        doctor_ar, doctor_en = _doctor_names(appointment)
-        date_str = appointment.appointment_date.strftime("%Y-%m-%d")
-        time_str = appointment.appointment_time.strftime("%H:%M")
-        clinic_name = appointment.clinic.name
-
-        title = "تذكير بموعدك"
-        message = (
-            f"تذكير: لديك موعد مع {doctor_ar} "
-            f"بتاريخ {date_str} الساعة {time_str} "
-            f"في {clinic_name}."
-        )
-        title_en = "Appointment Reminder"
-        message_en = (
-            f"Reminder: you have an appointment with {doctor_en} on "
-            f"{date_str} at {time_str} at {clinic_name}."
-        )
+        title, message, title_en, message_en = reminder_text(appointment)
 
         notification = _create_notification(
             patient=patient,
@@ -609,7 +635,6 @@ def notify_staff_appointment_booked(appointment, exclude_user_ids=None, actor_ro
     """
     try:
         from appointments.models import Appointment as _Appt
-        from clinics.models import ClinicStaff
 
         patient_name = appointment.patient.name if appointment.patient else "مريض"
         doctor_ar, doctor_en = _doctor_names(appointment)
@@ -647,42 +672,21 @@ def notify_staff_appointment_booked(appointment, exclude_user_ids=None, actor_ro
             actor_name = creator.name if creator else ""
         else:
             actor_role, actor_name = _actor_from_booking(appointment)
-        exclude = set(exclude_user_ids or [])
-
-        recipients = []
-        if appointment.doctor_id:
-            recipients.append((appointment.doctor_id, AppointmentNotification.ContextRole.DOCTOR))
-        secretary_ids = ClinicStaff.objects.filter(
-            clinic=appointment.clinic, role="SECRETARY", is_active=True,
-        ).values_list("user_id", flat=True)
-        for s_id in secretary_ids:
-            recipients.append((s_id, AppointmentNotification.ContextRole.SECRETARY))
-
         # The clinic owner is intentionally NOT notified about appointment events.
 
-        for user_id, ctx_role in recipients:
-            if user_id in exclude:
-                continue
-            try:
-                AppointmentNotification.objects.create(
-                    patient_id=user_id,
-                    appointment=appointment,
-                    context_role=ctx_role,
-                    notification_type=AppointmentNotification.Type.APPOINTMENT_BOOKED,
-                    title=title,
-                    message=message,
-                    title_en=title_en,
-                    message_en=message_en,
-                    actor_role=actor_role,
-                    actor_name=actor_name,
-                    is_delivered=True,
-                )
-            except Exception as exc:
-                logger.warning(
-                    "[NOTIFICATION] Could not create staff-booked notification "
-                    "for user_id=%s appointment_id=%s: %r",
-                    user_id, appointment.id, exc,
-                )
+        _fan_out(
+            _staff_recipients(appointment),
+            "staff-booked",
+            exclude_user_ids=exclude_user_ids,
+            appointment=appointment,
+            notification_type=AppointmentNotification.Type.APPOINTMENT_BOOKED,
+            title=title,
+            message=message,
+            title_en=title_en,
+            message_en=message_en,
+            actor_role=actor_role,
+            actor_name=actor_name,
+        )
 
     except Exception as exc:
         logger.error("[NOTIFICATION] notify_staff_appointment_booked failed: %r", exc)
@@ -878,35 +882,20 @@ def notify_staff_note(note, actor_user):
             # A secretary's doctor-note must reach the doctor (even if multi-role same user).
             exclude_author = False
 
-        seen = set()
-        for user_id in recipient_ids:
-            if user_id in seen:
-                continue
-            seen.add(user_id)
-            if exclude_author and author_id is not None and user_id == author_id:
-                continue
-            try:
-                AppointmentNotification.objects.create(
-                    patient_id=user_id,
-                    appointment=appointment,
-                    subject_patient=patient,
-                    context_role=context_role,
-                    notification_type=notification_type,
-                    title=title,
-                    message=message,
-                    title_en=title_en,
-                    message_en=message_en,
-                    actor_role=actor_role,
-                    actor_name=actor_name,
-                    is_delivered=True,
-                )
-            except Exception as exc:
-                logger.warning(
-                    "[NOTIFICATION] Could not create staff-note notification "
-                    "for user_id=%s note_id=%s: %r",
-                    user_id, getattr(note, "id", None), exc,
-                )
-
+        _fan_out(
+            [(user_id, context_role) for user_id in recipient_ids],
+            "staff-note",
+            exclude_user_ids=[author_id] if exclude_author and author_id is not None else (),
+            appointment=appointment,
+            subject_patient=patient,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            title_en=title_en,
+            message_en=message_en,
+            actor_role=actor_role,
+            actor_name=actor_name,
+        )
 
     except Exception as exc:
         logger.error("[NOTIFICATION] notify_staff_note failed: %r", exc)
@@ -942,7 +931,7 @@ def notify_owner_purchase_request_submitted(purchase_request):
             f"(total ₪{purchase_request.total}). Please review and approve or reject."
         )
 
-        AppointmentNotification.objects.create(
+        notification = AppointmentNotification.objects.create(
             patient_id=owner_id,
             appointment=None,
             purchase_request=purchase_request,
@@ -956,6 +945,7 @@ def notify_owner_purchase_request_submitted(purchase_request):
             actor_name=actor_name,
             is_delivered=True,
         )
+        record_unread_created([notification])
         logger.info(
             "[NOTIFICATION] Purchase request %s submitted → owner_id=%s",
             getattr(purchase_request, "id", None), owner_id,
@@ -1000,7 +990,7 @@ def notify_secretary_purchase_request_reviewed(purchase_request):
             message += f" ملاحظة المالك: {owner_note}"
             message_en += f" Owner's note: {owner_note}"
 
-        AppointmentNotification.objects.create(
+        notification = AppointmentNotification.objects.create(
             patient_id=secretary_id,
             appointment=None,
             purchase_request=purchase_request,
@@ -1014,6 +1004,7 @@ def notify_secretary_purchase_request_reviewed(purchase_request):
             actor_name=actor_name,
             is_delivered=True,
         )
+        record_unread_created([notification])
         logger.info(
             "[NOTIFICATION] Purchase request %s reviewed (%s) → secretary_id=%s",
             getattr(purchase_request, "id", None), purchase_request.status, secretary_id,
@@ -1032,7 +1023,7 @@ def notify_doctor_new_review(review):
     try:
         stars = "★" * review.rating + "☆" * (5 - review.rating)
         snippet = f' — "{review.comment[:120]}"' if review.comment else ""
-        AppointmentNotification.objects.create(
+        notification = AppointmentNotification.objects.create(
             patient_id=review.doctor_id,  # generic recipient FK = the reviewed doctor
             appointment=None,
             context_role=AppointmentNotification.ContextRole.DOCTOR,
@@ -1045,6 +1036,7 @@ def notify_doctor_new_review(review):
             actor_name="",  # anonymous — never reveal the reviewer to the doctor
             is_delivered=True,
         )
+        record_unread_created([notification])
     except Exception:
         logger.exception(
             "Failed to create new-review notification for doctor_id=%s",
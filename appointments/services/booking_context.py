@@ -0,0 +1,221 @@
+"""
+Cached eligibility facts for ``book_appointment``.
+
+Before taking its lock, a booking used to run about a dozen sequential
+queries: Clinic, ClinicStaff, DoctorVerification, ClinicSubscription,
+ClinicHoliday, DoctorAvailabilityException, AppointmentType, the doctor's
+enabled types (twice, once more for the slot step) and the booking settings.
+All of them describe the (clinic, doctor) pair rather than the request, so
+they are loaded together into a ``BookingContext``:
+
+- one query for the clinic with its subscription and booking settings, plus
+  Exists() flags for "doctor on staff", "doctor verified" and "doctor has a
+  per-doctor type configuration";
+- one query for the clinic's active types, each annotated with the doctor's
+  DoctorClinicAppointmentType flag;
+- one UNION query for the active holiday / doctor-exception ranges still
+  ahead.
+
+The context is cached under version stamps (same scheme as
+doctors/slot_cache.py):
+- ``booking:ver:clinic:<id>``  — Clinic, ClinicStaff, ClinicSubscription,
+  ClinicBookingSettings, ClinicHoliday, DoctorAvailabilityException,
+  AppointmentType and DoctorClinicAppointmentType writes
+- ``booking:ver:doctor:<id>``  — DoctorVerification writes
+Bumps come from appointments/signals.py and happen right away and again on
+commit, so a context re-cached from pre-commit data mid-transaction cannot
+outlive the commit. BOOKING_CONTEXT_TTL_SECONDS bounds everything else.
+
+Time-dependent facts are evaluated per request from the cached values
+(subscription expiry, the requested date against the closure ranges).
+Fail-open: any cache error falls back to loading the context directly.
+"""
+
+import logging
+import time as time_mod
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Subquery, Value
+from django.utils import timezone
+
+from appointments.models import AppointmentType, DoctorClinicAppointmentType
+from appointments.services.appointment_type_service import DEFAULT_SLOT_STEP_MINUTES
+from clinics.models import (
+    Clinic, ClinicBookingSettings, ClinicHoliday, ClinicStaff, DoctorAvailabilityException,
+)
+from doctors.models import DoctorVerification
+
+logger = logging.getLogger(__name__)
+
+BOOKING_CONTEXT_TTL_SECONDS = getattr(settings, "BOOKING_CONTEXT_TTL_SECONDS", 60)
+
+DOCTOR_STAFF_ROLES = ("DOCTOR", "MAIN_DOCTOR")
+
+_HOLIDAY = "holiday"
+_EXCEPTION = "exception"
+
+
+class BookingContext:
+    """Static booking facts for one (clinic, doctor) pair."""
+
+    def __init__(
+        self, *, clinic, doctor_id, doctor_on_staff, doctor_verified,
+        subscription, booking_settings, clinic_type_ids, enabled_types, closures,
+    ):
+        self.clinic = clinic
+        self.doctor_id = doctor_id
+        self.doctor_on_staff = doctor_on_staff
+        self.doctor_verified = doctor_verified
+        self.subscription = subscription
+        self.booking_settings = booking_settings
+        self.clinic_type_ids = clinic_type_ids      # active types of the clinic
+        self.enabled_types = enabled_types          # {id: AppointmentType} the doctor offers
+        self.closures = closures                    # [(kind, start_date, end_date)]
+
+    @property
+    def doctor_is_active(self):
+        return self.doctor_on_staff or self.clinic.main_doctor_id == self.doctor_id
+
+    def subscription_allows_booking(self):
+        # No subscription record — allow booking.
+        return self.subscription is None or self.subscription.is_effectively_active()
+
+    def closure_on(self, target_date):
+        """``"holiday"``, ``"exception"`` or None for ``target_date``."""
+        kinds = {kind for kind, start, end in self.closures if start <= target_date <= end}
+        for kind in (_HOLIDAY, _EXCEPTION):
+            if kind in kinds:
+                return kind
+        return None
+
+    @property
+    def slot_step_minutes(self):
+        """Same rule as ``get_slot_step_minutes_for_doctor``."""
+        durations = [t.duration_minutes for t in self.enabled_types.values() if t.duration_minutes]
+        return min(durations) if durations else DEFAULT_SLOT_STEP_MINUTES
+
+
+# ── Loading ──────────────────────────────────────────────────────────────────
+def _load(clinic_id, doctor_id):
+    clinic = (
+        Clinic.objects.filter(id=clinic_id, is_active=True)
+        .select_related("subscription", "booking_settings")
+        .annotate(
+            doctor_on_staff=Exists(ClinicStaff.objects.filter(
+                clinic=OuterRef("pk"), user_id=doctor_id,
+                role__in=DOCTOR_STAFF_ROLES, is_active=True,
+            )),
+            doctor_verified=Exists(DoctorVerification.objects.filter(
+                user_id=doctor_id, identity_status="IDENTITY_VERIFIED",
+            )),
+            doctor_types_configured=Exists(DoctorClinicAppointmentType.objects.filter(
+                clinic=OuterRef("pk"), doctor_id=doctor_id,
+            )),
+        )
+        .order_by()
+        .first()
+    )
+    if clinic is None:
+        return None
+
+    types = list(
+        AppointmentType.objects.filter(clinic_id=clinic_id, is_active=True)
+        .annotate(doctor_enabled=Subquery(
+            DoctorClinicAppointmentType.objects.filter(
+                clinic_id=clinic_id, doctor_id=doctor_id, appointment_type=OuterRef("pk"),
+            ).order_by().values("is_active")[:1]
+        ))
+        .order_by()
+    )
+    # Backwards-compat (see get_appointment_types_for_doctor_in_clinic): with no
+    # per-doctor configuration every active clinic type is offered.
+    enabled = [
+        t for t in types
+        if not clinic.doctor_types_configured or t.doctor_enabled
+    ]
+
+    today = timezone.localdate()
+    holidays = ClinicHoliday.objects.filter(
+        clinic_id=clinic_id, is_active=True, end_date__gte=today,
+    ).order_by().annotate(kind=Value(_HOLIDAY)).values_list("kind", "start_date", "end_date")
+    exceptions = DoctorAvailabilityException.objects.filter(
+        clinic_id=clinic_id, doctor_id=doctor_id, is_active=True, end_date__gte=today,
+    ).order_by().annotate(kind=Value(_EXCEPTION)).values_list("kind", "start_date", "end_date")
+
+    subscription = getattr(clinic, "subscription", None)
+    # Read path only: a clinic that never saved its settings books with the
+    # defaults, without inserting the row here.
+    booking_settings = getattr(clinic, "booking_settings", None) or ClinicBookingSettings(clinic=clinic)
+
+    return BookingContext(
+        clinic=clinic,
+        doctor_id=doctor_id,
+        doctor_on_staff=clinic.doctor_on_staff,
+        doctor_verified=clinic.doctor_verified,
+        subscription=subscription,
+        booking_settings=booking_settings,
+        clinic_type_ids=frozenset(t.id for t in types),
+        enabled_types={t.id: t for t in enabled},
+        closures=[tuple(row) for row in holidays.union(exceptions, all=True)],
+    )
+
+
+# ── Version stamps ───────────────────────────────────────────────────────────
+def _clinic_version_key(clinic_id):
+    return f"booking:ver:clinic:{clinic_id}"
+
+
+def _doctor_version_key(doctor_id):
+    return f"booking:ver:doctor:{doctor_id}"
+
+
+def _current_versions(keys):
+    """Read the version stamps, seeding any missing one with a fresh clock value."""
+    versions = cache.get_many(keys)
+    missing = [k for k in keys if k not in versions]
+    if missing:
+        for k in missing:
+            cache.add(k, time_mod.time_ns(), timeout=None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(k, 0) for k in keys]
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time_mod.time_ns(), timeout=None)
+    except Exception:
+        logger.warning("[booking-context] version bump failed for %s", key)
+
+
+def invalidate_clinic(clinic_id):
+    """Drop the cached contexts of every doctor at ``clinic_id``."""
+    _bump(_clinic_version_key(clinic_id))
+
+
+def invalidate_doctor(doctor_id):
+    """Drop the cached contexts of ``doctor_id`` at every clinic."""
+    _bump(_doctor_version_key(doctor_id))
+
+
+def get_booking_context(clinic_id, doctor_id):
+    """The (cached) BookingContext, or None if the clinic is missing or inactive."""
+    try:
+        versions = _current_versions([_clinic_version_key(clinic_id), _doctor_version_key(doctor_id)])
+        key = "booking:ctx:{}:{}:{}".format(clinic_id, doctor_id, ".".join(str(v) for v in versions))
+        context = cache.get(key)
+    except Exception:
+        logger.warning("[booking-context] cache read failed — loading directly")
+        key, context = None, None
+    if context is not None:
+        return context
+
+    context = _load(clinic_id, doctor_id)
+    if context is not None and key is not None:
+        try:
+            cache.set(key, context, timeout=BOOKING_CONTEXT_TTL_SECONDS)
+        except Exception:
+            logger.warning("[booking-context] cache write failed for %s", key)
+    return context
@@ -5,13 +5,18 @@ Handles the complete booking flow:
 1. Validate the appointment type exists and is active
 2. Validate the requested date is not in the past
 3. Validate the requested time is a valid slot for the doctor
-4. Acquire a row-level lock to prevent race conditions
-5. Re-check slot availability under the lock
+4. Take the doctor-day lock to prevent race conditions
+5. Re-check the requested slot (availability + conflicts) under the lock
 6. Create the appointment record
 
-Uses select_for_update() for pessimistic locking to prevent
-double-booking when two patients try to book the same slot
-simultaneously.
+The lock (booking_locks.lock_doctor_day — a PostgreSQL advisory lock on
+(doctor, date) by default) prevents double-booking when two patients try
+to book the same slot simultaneously, even on a day with no appointments.
+
+Everything checked before the lock that depends only on the (clinic, doctor)
+pair is read from a cached BookingContext (booking_context.py), and the
+fail-fast slot check reads the cached slot grid, so an uncontended booking
+spends its queries inside the locked section.
 """
 
 from datetime import date, datetime, timedelta, time
@@ -19,9 +24,11 @@ from datetime import date, datetime, timedelta, time
 from django.db import transaction
 from django.utils.translation import gettext_lazy as _
 
-from appointments.models import Appointment, AppointmentType
-from clinics.models import Clinic
-from doctors.services import generate_slots_for_date
+from appointments.models import Appointment
+from appointments.services.booking_context import get_booking_context
+from appointments.services.booking_locks import lock_doctor_day
+from doctors.services import is_slot_booked, is_slot_in_availability
+from doctors.slot_cache import get_cached_slots_for_date
 
 
 class BookingError(Exception):
@@ -117,95 +124,59 @@ def book_appointment(
         if appointment_time <= now:
             raise PastDateError("Cannot book a slot that has already passed today.")
 
-    # ── 2. Validate clinic exists ─────────────────────────────────────
-    try:
-        clinic = Clinic.objects.get(id=clinic_id, is_active=True)
-    except Clinic.DoesNotExist:
+    # ── 2. Load the (clinic, doctor) booking context ─────────────────
+    # Clinic, staff, verification, subscription, closures, types and
+    # booking settings come from one cached context (see booking_context.py).
+    context = get_booking_context(clinic_id, doctor_id)
+    if context is None:
         raise BookingError("Clinic not found or inactive.", code="invalid_clinic")
+    clinic = context.clinic
 
     # ── 2a. Validate compliance (block if patient is blocked) ───────
-    from compliance.services.compliance_service import is_patient_blocked
-    if hasattr(patient, 'patient_profile'):
-        if is_patient_blocked(clinic, patient.patient_profile):
-            raise BookingError(
-                _("عذراً، لا يمكنك الحجز في هذه العيادة لأنك محظور بسبب تكرار عدم الحضور. لرفع الحظر يرجى مراجعة العيادة شخصياً."),
-                code="patient_blocked",
-            )
+    # Read-only cached lookup: no compliance row is created for clean patients.
+    from compliance.services.blocked_cache import is_blocked
+    if is_blocked(clinic.id, patient.id):
+        raise BookingError(
+            _("عذراً، لا يمكنك الحجز في هذه العيادة لأنك محظور بسبب تكرار عدم الحضور. لرفع الحظر يرجى مراجعة العيادة شخصياً."),
+            code="patient_blocked",
+        )
 
     # ── 2b. Validate doctor is active at this clinic ──────────────────
-    from clinics.models import ClinicStaff
-    is_main_doctor = (clinic.main_doctor_id == doctor_id)
-    is_active_staff = ClinicStaff.objects.filter(
-        clinic=clinic, user_id=doctor_id, role__in=["DOCTOR", "MAIN_DOCTOR"], is_active=True
-    ).exists()
-    if not is_main_doctor and not is_active_staff:
+    if not context.doctor_is_active:
         raise BookingError(
             "This doctor is not available at this clinic.",
             code="doctor_not_active",
         )
 
     # ── 2c. Validate doctor identity is verified ──────────────────────
-    from doctors.models import DoctorVerification
-    try:
-        verification = DoctorVerification.objects.get(user_id=doctor_id)
-        if verification.identity_status != "IDENTITY_VERIFIED":
-            raise BookingError(
-                "This doctor is not available for booking at this time.",
-                code="doctor_not_verified",
-            )
-    except DoctorVerification.DoesNotExist:
+    if not context.doctor_verified:
         raise BookingError(
             "This doctor is not available for booking at this time.",
             code="doctor_not_verified",
         )
 
     # ── 2d. Validate clinic subscription is active ────────────────────
-    from clinics.models import ClinicSubscription
-    try:
-        subscription = ClinicSubscription.objects.get(clinic=clinic)
-        if not subscription.is_effectively_active():
-            raise BookingError(
-                "Appointments cannot be booked at this clinic right now.",
-                code="clinic_subscription_inactive",
-            )
-    except ClinicSubscription.DoesNotExist:
-        pass  # No subscription record — allow booking
-
-    # ── 2e. Check for clinic holiday on the requested date ────────────
-    from clinics.models import ClinicHoliday
-    if ClinicHoliday.objects.filter(
-        clinic=clinic,
-        is_active=True,
-        start_date__lte=appointment_date,
-        end_date__gte=appointment_date,
-    ).exists():
+    if not context.subscription_allows_booking():
+        raise BookingError(
+            "Appointments cannot be booked at this clinic right now.",
+            code="clinic_subscription_inactive",
+        )
+
+    # ── 2e/2f. Clinic holiday or doctor availability exception ────────
+    closure = context.closure_on(appointment_date)
+    if closure == "holiday":
         raise BookingError(
             "The clinic is closed on the selected date.",
             code="clinic_holiday",
         )
-
-    # ── 2f. Check for doctor availability exception on the date ───────
-    from clinics.models import DoctorAvailabilityException
-    if DoctorAvailabilityException.objects.filter(
-        doctor_id=doctor_id,
-        clinic=clinic,
-        is_active=True,
-        start_date__lte=appointment_date,
-        end_date__gte=appointment_date,
-    ).exists():
+    if closure == "exception":
         raise BookingError(
             "The doctor is not available on the selected date.",
             code="doctor_exception",
         )
 
     # ── 3. Validate appointment type belongs to clinic ────────────────
-    try:
-        appointment_type = AppointmentType.objects.get(
-            id=appointment_type_id,
-            clinic_id=clinic_id,
-            is_active=True,
-        )
-    except AppointmentType.DoesNotExist:
+    if appointment_type_id not in context.clinic_type_ids:
         raise BookingError(
             "Appointment type not found for this clinic.",
             code="invalid_appointment_type",
@@ -214,22 +185,19 @@ def book_appointment(
     # ── 3.5. Validate appointment type is enabled for this doctor ─────
     # Uses backwards-compat fall-back: if no DCAT rows configured for the
     # (doctor, clinic) pair, all active clinic types are allowed.
-    from appointments.services.appointment_type_service import (
-        get_appointment_types_for_doctor_in_clinic,
-    )
-    enabled_types = get_appointment_types_for_doctor_in_clinic(doctor_id, clinic_id)
-    if not any(t.id == appointment_type.id for t in enabled_types):
+    appointment_type = context.enabled_types.get(appointment_type_id)
+    if appointment_type is None:
         raise BookingError(
             "هذا النوع من المواعيد غير متاح لدى هذا الطبيب في هذه العيادة.",
             code="type_not_enabled_for_doctor",
         )
 
     # ── 4. Validate the slot is a legitimate generated slot ───────────
-    from appointments.services.appointment_type_service import (
-        get_slot_step_minutes_for_doctor,
-    )
-    slot_step = get_slot_step_minutes_for_doctor(doctor_id, clinic_id)
-    slots = generate_slots_for_date(
+    # The cached grid (which may be stale for up to SLOT_CACHE_TTL_SECONDS)
+    # is only a fail-fast check; the slot is re-checked against the doctor's
+    # availability and bookings under the lock below.
+    slot_step = context.slot_step_minutes
+    slots = get_cached_slots_for_date(
         doctor_id=doctor_id,
         clinic_id=clinic_id,
         target_date=appointment_date,
@@ -252,47 +220,27 @@ def book_appointment(
 
     # ── 5. Acquire lock and re-validate (atomic) ─────────────────────
     with transaction.atomic():
-        # Lock all CONFIRMED/CHECKED_IN/IN_PROGRESS appointments for
-        # this doctor on this date across ALL clinics (R-03 global check).
-        # This prevents two concurrent requests from both passing the
-        # availability check and creating duplicate bookings.
-        _locked_appointments = (
-            Appointment.objects.select_for_update()
-            .filter(
-                doctor_id=doctor_id,
-                appointment_date=appointment_date,
-                status__in=[
-                    Appointment.Status.CONFIRMED,
-                    Appointment.Status.CHECKED_IN,
-                    Appointment.Status.IN_PROGRESS,
-                ],
-            )
-            .values_list("appointment_time", flat=True)
-        )
-
-        # Force query evaluation to acquire the locks
-        locked_times = list(_locked_appointments)
-
-        # Re-generate slots under the lock to get fresh availability
-        slots_under_lock = generate_slots_for_date(
-            doctor_id=doctor_id,
-            clinic_id=clinic_id,
-            target_date=appointment_date,
-            duration_minutes=appointment_type.duration_minutes,
-            slot_step_minutes=slot_step,
-        )
-
-        slot_under_lock = None
-        for slot in slots_under_lock:
-            if slot["time"] == appointment_time:
-                slot_under_lock = slot
-                break
-
-        if slot_under_lock is None or not slot_under_lock["is_available"]:
+        # Serialize every booking write for this doctor on this date
+        # across ALL clinics (R-03 global check) — including the first
+        # booking of an empty day (see booking_locks.py).
+        lock_doctor_day(doctor_id, appointment_date)
+
+        # Re-check just the requested slot under the lock: it must still be
+        # in the doctor's availability (not only in the cached grid) and
+        # must not overlap a booking. Holidays and exceptions come from the
+        # version-invalidated BookingContext checked above.
+        if not is_slot_in_availability(
+            doctor_id, clinic_id, appointment_date, appointment_time,
+            appointment_type.duration_minutes, slot_step,
+        ):
+            raise InvalidSlotError()
+        if is_slot_booked(
+            doctor_id, appointment_date, appointment_time, appointment_type.duration_minutes
+        ):
             raise SlotUnavailableError()
 
         # ── 6. Resolve booking status from clinic settings ────────────
-        booking_settings = clinic.get_or_create_booking_settings()
+        booking_settings = context.booking_settings
         status = Appointment.Status.CONFIRMED
 
         # Same-day rule (forces PENDING even if auto-confirm is ON)
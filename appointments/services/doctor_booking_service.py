@@ -14,6 +14,7 @@ from datetime import date, time
 from django.db import transaction
 
 from appointments.models import Appointment, AppointmentType
+from appointments.services.booking_locks import lock_doctor_day
 
 
 class DoctorSchedulingError(Exception):
@@ -144,11 +145,11 @@ def schedule_followup(
             name__icontains="follow",
         ).first()
 
-    # ── 7. Conflict check + create (atomic, with row-level lock) ──
+    # ── 7. Conflict check + create (atomic, under the doctor-day lock) ──
     with transaction.atomic():
+        lock_doctor_day(doctor.id, appointment_date)
         conflict_exists = (
-            Appointment.objects.select_for_update()
-            .filter(
+            Appointment.objects.filter(
                 doctor=doctor,
                 appointment_date=appointment_date,
                 appointment_time=appointment_time,
@@ -0,0 +1,108 @@
+"""
+Cached unread-notification counters for the navbar bell badges.
+
+The badge context processor used to run one COUNT per context role on every
+template render. Counts now live in the default cache (Redis in production),
+one integer per (user, context_role):
+
+    notif:unread:<user_id>:<context_role>
+
+- A miss recomputes all roles for the user with ONE grouped aggregate
+  (values("context_role").annotate(Count)) and caches them.
+- Writers keep the counters current with atomic incr/decr: the notification
+  service on create, the mark-read / delete views on read or removal.
+  Adjustments run on transaction commit, so a rolled-back write never moves a
+  badge.
+- A counter that was never cached is left alone (the next read recomputes);
+  a negative value is treated as a miss. Paths that don't adjust (cascade
+  deletes when an appointment or user is removed) are bounded by
+  NOTIFICATION_COUNTER_TTL_SECONDS.
+
+Fail-open: cache errors fall back to the aggregate query.
+"""
+
+import logging
+from collections import Counter
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from appointments.models import AppointmentNotification
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_COUNTER_TTL_SECONDS = getattr(settings, "NOTIFICATION_COUNTER_TTL_SECONDS", 15 * 60)
+
+CONTEXT_ROLES = tuple(AppointmentNotification.ContextRole.values)
+
+
+def _key(user_id, context_role):
+    return f"notif:unread:{user_id}:{context_role}"
+
+
+def get_unread_counts(user_id):
+    """Return {context_role: unread count} for every role (zero queries on a hit)."""
+    keys = {role: _key(user_id, role) for role in CONTEXT_ROLES}
+    try:
+        cached = cache.get_many(keys.values())
+    except Exception:
+        logger.warning("[notif-counter] cache read failed — counting directly")
+        cached = None
+
+    if cached is not None and all(cached.get(k, -1) >= 0 for k in keys.values()):
+        return {role: cached[key] for role, key in keys.items()}
+
+    counts = dict.fromkeys(CONTEXT_ROLES, 0)
+    counts.update(
+        AppointmentNotification.objects.filter(patient_id=user_id, is_read=False)
+        .values("context_role")
+        .annotate(n=Count("id"))
+        .values_list("context_role", "n")
+    )
+    if cached is not None:
+        try:
+            cache.set_many(
+                {keys[role]: counts[role] for role in CONTEXT_ROLES},
+                timeout=NOTIFICATION_COUNTER_TTL_SECONDS,
+            )
+        except Exception:
+            logger.warning("[notif-counter] cache write failed for user_id=%s", user_id)
+    return counts
+
+
+def _apply(user_id, context_role, delta):
+    try:
+        cache.incr(_key(user_id, context_role), delta)
+    except ValueError:
+        pass  # not cached — the next read recomputes
+    except Exception:
+        logger.warning(
+            "[notif-counter] could not adjust user_id=%s role=%s", user_id, context_role
+        )
+        invalidate_unread_counts(user_id)
+
+
+def adjust_unread(user_id, context_role, delta):
+    """Add ``delta`` (may be negative) to one badge counter, on commit."""
+    if delta:
+        transaction.on_commit(partial(_apply, user_id, context_role, delta))
+
+
+def record_unread_created(notifications):
+    """Count freshly-inserted unread notifications into their owners' badges."""
+    created = Counter(
+        (n.patient_id, n.context_role) for n in notifications if not n.is_read
+    )
+    for (user_id, context_role), count in created.items():
+        adjust_unread(user_id, context_role, count)
+
+
+def invalidate_unread_counts(user_id):
+    """Drop a user's counters; the next badge render recomputes them."""
+    try:
+        cache.delete_many([_key(user_id, role) for role in CONTEXT_ROLES])
+    except Exception:
+        logger.warning("[notif-counter] invalidation failed for user_id=%s", user_id)
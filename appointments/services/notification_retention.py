@@ -0,0 +1,67 @@
+"""
+Notification retention.
+
+AppointmentNotification rows are never pruned by the app itself, so the table
+(and every center's index range) only grows. ``prune_read_notifications``
+removes READ notifications older than a cutoff, oldest first, in bounded
+batches — each batch is one short transaction, so a large backlog never holds
+long locks or one huge DELETE.
+
+- Unread notifications are kept whatever their age: they still show on the
+  badge, and deleting only read rows leaves the cached unread counters
+  (notification_counters.py) correct.
+- With ``archive``, each batch is written as JSON lines (one row per line)
+  before it is deleted, inside the same transaction.
+
+Driven by ``manage.py prune_notifications`` (NOTIFICATION_RETENTION_DAYS).
+"""
+
+import json
+import logging
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from appointments.models import AppointmentNotification
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+_ARCHIVE_FIELDS = tuple(f.attname for f in AppointmentNotification._meta.concrete_fields)
+
+
+def expired_notifications(older_than_days, now=None):
+    """Read notifications created more than ``older_than_days`` days ago."""
+    cutoff = (now or timezone.now()) - timedelta(days=older_than_days)
+    return AppointmentNotification.objects.filter(is_read=True, created_at__lt=cutoff)
+
+
+def prune_read_notifications(older_than_days, batch_size=DEFAULT_BATCH_SIZE, archive=None, now=None):
+    """Delete expired read notifications in batches; return how many were removed.
+
+    ``archive`` is an optional text stream that receives each deleted row as a
+    JSON line.
+    """
+    expired = expired_notifications(older_than_days, now=now).order_by("created_at", "id")
+    removed = 0
+    while True:
+        with transaction.atomic():
+            if archive is None:
+                ids = list(expired.values_list("id", flat=True)[:batch_size])
+            else:
+                rows = list(expired.values(*_ARCHIVE_FIELDS)[:batch_size])
+                ids = [row["id"] for row in rows]
+                for row in rows:
+                    archive.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n")
+            if ids:
+                AppointmentNotification.objects.filter(id__in=ids).delete()
+        removed += len(ids)
+        if len(ids) < batch_size:
+            break
+    if removed:
+        logger.info("[notif-retention] removed %d read notifications older than %d days",
+                    removed, older_than_days)
+    return removed
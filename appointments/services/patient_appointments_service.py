@@ -25,6 +25,7 @@ from django.utils import timezone
 from django.utils.translation import get_language
 
 from appointments.models import Appointment
+from appointments.services.booking_locks import lock_doctor_day
 
 logger = logging.getLogger(__name__)
 
@@ -160,10 +161,12 @@ def get_patient_appointments(patient_user, upcoming_limit=None, past_limit=None)
     local_now = timezone.localtime(now)
     today = local_now.date()
 
-    # Persist any overdue no-shows first so the upcoming/past split and
-    # status_display are accurate without relying on the cron command.
-    from compliance.services.compliance_service import apply_due_no_shows
-    apply_due_no_shows(Appointment.objects.filter(patient=patient_user))
+    # Make sure overdue no-shows are persisted so the upcoming/past split and
+    # status_display are accurate (a watermark check when the sweeper runs).
+    from compliance.services.no_show_sweeper import ensure_no_shows_swept
+    ensure_no_shows_swept(
+        f"patient:{patient_user.id}", Appointment.objects.filter(patient=patient_user)
+    )
 
     base = _base_qs(patient_user)
 
@@ -418,18 +421,7 @@ def edit_appointment(appointment_id, patient, new_date, new_time, new_type_id=No
 
     # Atomic update with lock
     with transaction.atomic():
-        list(
-            Appointment.objects.select_for_update()
-            .filter(
-                doctor_id=doctor_id, appointment_date=new_date,
-                status__in=[
-                    Appointment.Status.CONFIRMED, Appointment.Status.CHECKED_IN,
-                    Appointment.Status.IN_PROGRESS, Appointment.Status.PENDING,
-                ],
-            )
-            .exclude(id=appointment.id)
-            .values_list("appointment_time", flat=True)
-        )
+        lock_doctor_day(doctor_id, new_date)
 
         slots_locked = generate_slots_for_date(
             doctor_id=doctor_id, clinic_id=clinic_id,
@@ -554,20 +546,20 @@ def _notify_patient_cancellation(appointment, clinic_staff):
 
     try:
         from accounts.otp_utils import _normalize_phone
-        from accounts.services.tweetsms import send_sms
+        from accounts.outbox import enqueue_sms
 
         patient = appointment.patient
         phone = _normalize_phone(patient.phone)
         _, sms_message = _build_cancellation_message(appointment)
-        send_sms(phone, sms_message)
+        enqueue_sms(phone, sms_message)
         logger.info(
-            "[SMS] Cancellation SMS sent to patient_id=%s phone=%s",
+            "[SMS] Cancellation SMS queued for patient_id=%s phone=%s",
             patient.id,
             phone,
         )
     except Exception as exc:
         logger.error(
-            "[SMS] Failed to send cancellation SMS to patient_id=%s: %r",
+            "[SMS] Failed to queue cancellation SMS for patient_id=%s: %r",
             appointment.patient.id if appointment.patient else None,
             exc,
         )
@@ -0,0 +1,138 @@
+"""
+Batched reminder dispatch for ``manage.py send_appointment_reminders``.
+
+Reminders go out for CONFIRMED appointments starting within the next
+REMINDER_HOURS_BEFORE hours that have not had one yet. Dispatch works in
+claimed batches, each one transaction:
+
+1. claim  — lock up to REMINDER_BATCH_SIZE due rows with
+            ``SELECT … FOR UPDATE SKIP LOCKED`` and flip ``reminder_sent``
+            with one UPDATE;
+2. build  — create their in-app notifications with one bulk INSERT;
+3. queue  — hand the emails (verified addresses only) to the outbox with one
+            bulk INSERT; the outbox worker (``deliver_outbox``) sends them
+            through its concurrent provider pool.
+
+Rows locked by another dispatcher are skipped, not waited for, and a claimed
+row is already ``reminder_sent`` when its transaction commits. Several
+dispatchers can therefore drain one window side by side without sending a
+reminder twice. A batch that fails rolls back whole, claim included, so its
+appointments are picked up again on the next run.
+
+The window is resolved once per run and matched in SQL (date + time), not per
+row in Python.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from appointments.models import Appointment, AppointmentNotification
+from appointments.services.appointment_notification_service import reminder_text
+from appointments.services.notification_counters import record_unread_created
+
+logger = logging.getLogger(__name__)
+
+# Number of hours ahead to look for appointments when sending reminders.
+REMINDER_HOURS_BEFORE = 24
+
+REMINDER_BATCH_SIZE = getattr(settings, "REMINDER_BATCH_SIZE", 200)
+
+
+def due_reminders(now=None):
+    """CONFIRMED, not-yet-reminded appointments starting in (now, now + window]."""
+    now = now or timezone.now()
+    start = timezone.localtime(now)
+    end = timezone.localtime(now + timedelta(hours=REMINDER_HOURS_BEFORE))
+    return Appointment.objects.filter(
+        Q(appointment_date__gt=start.date())
+        | Q(appointment_date=start.date(), appointment_time__gt=start.time()),
+        Q(appointment_date__lt=end.date())
+        | Q(appointment_date=end.date(), appointment_time__lte=end.time()),
+        appointment_date__range=(start.date(), end.date()),
+        status=Appointment.Status.CONFIRMED,
+        reminder_sent=False,
+    )
+
+
+def _claim(now, limit):
+    """Lock up to ``limit`` due appointments and mark them reminded (caller's transaction)."""
+    ids = list(
+        due_reminders(now)
+        .select_for_update(skip_locked=True)
+        .order_by("appointment_date", "appointment_time", "id")
+        .values_list("id", flat=True)[:limit]
+    )
+    if ids:
+        Appointment.objects.filter(pk__in=ids).update(reminder_sent=True, updated_at=timezone.now())
+    return ids
+
+
+def _dispatch_batch(now, limit):
+    """Claim one batch and create its notifications and emails.
+
+    Returns (claimed, emailed).
+    """
+    from accounts.email_utils import appointment_reminder_email
+    from accounts.outbox import enqueue_emails
+
+    with transaction.atomic():
+        ids = _claim(now, limit)
+        if not ids:
+            return 0, 0
+        appointments = (
+            Appointment.objects.filter(pk__in=ids)
+            .select_related("patient", "doctor", "clinic")
+            .order_by("appointment_date", "appointment_time", "id")
+        )
+        notifications, emails = [], []
+        for appointment in appointments:
+            patient = appointment.patient
+            emailed = bool(patient.email and patient.email_verified)
+            title, message, title_en, message_en = reminder_text(appointment)
+            notifications.append(AppointmentNotification(
+                patient=patient,
+                appointment=appointment,
+                context_role=AppointmentNotification.ContextRole.PATIENT,
+                notification_type=AppointmentNotification.Type.APPOINTMENT_REMINDER,
+                title=title,
+                message=message,
+                title_en=title_en,
+                message_en=message_en,
+                is_delivered=True,
+                sent_via_email=emailed,
+            ))
+            if emailed:
+                emails.append((patient.email, *appointment_reminder_email(patient, appointment)))
+        AppointmentNotification.objects.bulk_create(notifications)
+        enqueue_emails(emails)
+        record_unread_created(notifications)
+    return len(ids), len(emails)
+
+
+def dispatch_due_reminders(batch_size=None, now=None):
+    """Send every reminder due now, batch by batch.
+
+    Returns {"reminded": n, "emailed": n}. A failing batch is logged and ends
+    the run; its appointments stay due for the next one.
+    """
+    now = now or timezone.now()
+    limit = batch_size or REMINDER_BATCH_SIZE
+    totals = {"reminded": 0, "emailed": 0}
+    while True:
+        try:
+            claimed, emailed = _dispatch_batch(now, limit)
+        except Exception as exc:
+            logger.error("[REMINDER] Batch failed, will retry next run: %r", exc)
+            break
+        totals["reminded"] += claimed
+        totals["emailed"] += emailed
+        if claimed:
+            logger.info("[REMINDER] Sent %s reminder(s), %s email(s) queued", claimed, emailed)
+        if claimed < limit:
+            break
+    return totals
@@ -0,0 +1,61 @@
+"""
+Booking-context invalidation (see appointments/services/booking_context.py).
+
+Every write to a model the booking context is built from bumps the clinic's
+(or, for identity verification, the doctor's) version stamp — right away and
+again once the surrounding transaction commits.
+"""
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from clinics.models import (
+    Clinic,
+    ClinicBookingSettings,
+    ClinicHoliday,
+    ClinicStaff,
+    ClinicSubscription,
+    DoctorAvailabilityException,
+)
+from doctors.models import DoctorVerification
+
+from .models import AppointmentType, DoctorClinicAppointmentType
+from .services import booking_context
+
+
+def _invalidate(func, *args):
+    func(*args)
+    transaction.on_commit(partial(func, *args))
+
+
+@receiver(post_save, sender=Clinic)
+@receiver(post_delete, sender=Clinic)
+def invalidate_clinic_booking_context(sender, instance, **kwargs):
+    _invalidate(booking_context.invalidate_clinic, instance.pk)
+
+
+@receiver(post_save, sender=ClinicStaff)
+@receiver(post_delete, sender=ClinicStaff)
+@receiver(post_save, sender=ClinicSubscription)
+@receiver(post_delete, sender=ClinicSubscription)
+@receiver(post_save, sender=ClinicBookingSettings)
+@receiver(post_delete, sender=ClinicBookingSettings)
+@receiver(post_save, sender=ClinicHoliday)
+@receiver(post_delete, sender=ClinicHoliday)
+@receiver(post_save, sender=DoctorAvailabilityException)
+@receiver(post_delete, sender=DoctorAvailabilityException)
+@receiver(post_save, sender=AppointmentType)
+@receiver(post_delete, sender=AppointmentType)
+@receiver(post_save, sender=DoctorClinicAppointmentType)
+@receiver(post_delete, sender=DoctorClinicAppointmentType)
+def invalidate_clinic_scoped_booking_context(sender, instance, **kwargs):
+    _invalidate(booking_context.invalidate_clinic, instance.clinic_id)
+
+
+@receiver(post_save, sender=DoctorVerification)
+@receiver(post_delete, sender=DoctorVerification)
+def invalidate_doctor_booking_context(sender, instance, **kwargs):
+    _invalidate(booking_context.invalidate_doctor, instance.user_id)
@@ -0,0 +1,99 @@
+"""
+Booking concurrency (appointments/services/booking_locks.py).
+
+Covers:
+- concurrent bookings of the same slot on a day with no appointments yet
+  produce exactly one appointment (the advisory lock exists before any row)
+- concurrent bookings of distinct slots of one doctor-day all succeed
+- the stress_booking command reports throughput per lock mode, finds no
+  double booking in advisory mode and removes its fixture
+"""
+
+import threading
+from datetime import time
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+
+from appointments.models import Appointment
+from appointments.services import BookingError, SlotUnavailableError, book_appointment
+from clinics.models import Clinic
+from patients.models import ClinicPatient
+
+from .test_main import BookingTestMixin
+
+User = get_user_model()
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "booking-concurrency-tests"}}
+
+
+@skipUnless(connection.vendor == "postgresql", "advisory locks are PostgreSQL-only")
+@override_settings(CACHES=LOCMEM, BOOKING_LOCK_MODE="advisory")
+class ConcurrentBookingTests(BookingTestMixin, TransactionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.racers = [
+            User.objects.create_user(phone=f"05930000{n:02d}", name=f"Racer {n}", role="PATIENT")
+            for n in range(6)
+        ]
+        ClinicPatient.objects.bulk_create([ClinicPatient(clinic=self.clinic, patient=p) for p in self.racers])
+
+    def _race(self, times):
+        """Book ``times[i]`` for ``self.racers[i]`` from one thread each."""
+        barrier = threading.Barrier(len(times))
+        outcomes = {}
+
+        def worker(patient, at):
+            try:
+                barrier.wait()
+                book_appointment(
+                    patient=patient,
+                    doctor_id=self.doctor.id,
+                    clinic_id=self.clinic.id,
+                    appointment_type_id=self.appointment_type.id,
+                    appointment_date=self.next_monday,
+                    appointment_time=at,
+                )
+                outcomes[patient.id] = "booked"
+            except BookingError as exc:
+                outcomes[patient.id] = exc.code
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=pair) for pair in zip(self.racers, times)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return sorted(outcomes.values())
+
+    def test_same_slot_on_empty_day_books_once(self):
+        outcomes = self._race([time(9, 0)] * len(self.racers))
+        self.assertEqual(outcomes.count("booked"), 1)
+        self.assertEqual(outcomes.count(SlotUnavailableError().code), len(self.racers) - 1)
+        self.assertEqual(Appointment.objects.filter(appointment_date=self.next_monday).count(), 1)
+
+    def test_distinct_slots_all_succeed(self):
+        times = [time(9, 0), time(9, 30), time(10, 0), time(10, 30), time(11, 0), time(11, 30)]
+        self.assertEqual(self._race(times), ["booked"] * len(times))
+
+
+@skipUnless(connection.vendor == "postgresql", "advisory locks are PostgreSQL-only")
+@override_settings(CACHES=LOCMEM)
+class StressBookingCommandTests(TransactionTestCase):
+
+    def test_reports_both_modes_and_cleans_up(self):
+        out = StringIO()
+        call_command("stress_booking", threads=4, bookings=12, races=2, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(any(line.strip().startswith("rows:") for line in lines), lines)
+        advisory = next(line for line in lines if line.strip().startswith("advisory:"))
+        self.assertIn("bookings/s", advisory)
+        self.assertIn("0 double booking(s)", advisory)
+        self.assertFalse(Clinic.objects.filter(name__startswith="Stress ").exists())
+        self.assertFalse(User.objects.filter(phone__startswith="stress-").exists())
@@ -0,0 +1,155 @@
+"""
+Cached booking context (appointments/services/booking_context.py).
+
+Covers:
+- a warm context answers every pre-lock eligibility check without a query;
+  a cold one costs three, and never inserts default booking settings
+- staff, verification, subscription, holiday and per-doctor type changes
+  reach the next booking through the version stamps
+- a slot withdrawn from the doctor's availability is refused under the lock
+  even while the cached grid still offers it
+- the benchmark_booking command reports latencies and leaves no rows behind
+"""
+
+from datetime import time, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from appointments.models import Appointment, DoctorClinicAppointmentType
+from appointments.services import BookingError, book_appointment
+from appointments.services.booking_context import get_booking_context
+from clinics.models import Clinic, ClinicBookingSettings, ClinicHoliday, ClinicStaff, ClinicSubscription
+from doctors.models import DoctorAvailability, DoctorVerification
+from doctors.slot_cache import get_cached_slots_for_date
+
+from .test_main import BookingTestMixin
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "booking-context-tests"}}
+
+PRE_LOCK_TABLES = (
+    "clinics_clinicstaff", "doctors_doctorverification", "clinics_clinicsubscription",
+    "clinics_clinicholiday", "clinics_doctoravailabilityexception",
+    "appointments_appointmenttype", "appointments_doctorclinicappointmenttype",
+    "clinics_clinicbookingsettings",
+)
+
+
+@override_settings(CACHES=LOCMEM)
+class BookingContextTests(BookingTestMixin, TestCase):
+
+    def _book(self, at=time(9, 0), patient=None):
+        return book_appointment(
+            patient=patient or self.patient,
+            doctor_id=self.doctor.id,
+            clinic_id=self.clinic.id,
+            appointment_type_id=self.appointment_type.id,
+            appointment_date=self.next_monday,
+            appointment_time=at,
+        )
+
+    def _assert_refused(self, code, at=time(9, 0)):
+        with self.assertRaises(BookingError) as caught:
+            self._book(at)
+        self.assertEqual(caught.exception.code, code)
+
+    def test_cold_context_is_three_queries_warm_is_none(self):
+        self.clinic.get_or_create_booking_settings()
+        with self.assertNumQueries(3):
+            get_booking_context(self.clinic.id, self.doctor.id)
+        with self.assertNumQueries(0):
+            context = get_booking_context(self.clinic.id, self.doctor.id)
+        self.assertTrue(context.doctor_is_active)
+        self.assertEqual(context.slot_step_minutes, 30)
+        self.assertIsNone(get_booking_context(self.clinic.id + 10_000, self.doctor.id))
+
+    def test_missing_booking_settings_use_defaults_without_insert(self):
+        context = get_booking_context(self.clinic.id, self.doctor.id)
+        self.assertTrue(context.booking_settings.auto_confirm_patient_bookings)
+        self.assertFalse(ClinicBookingSettings.objects.filter(clinic=self.clinic).exists())
+
+    def test_warm_booking_skips_eligibility_queries(self):
+        self._book(time(9, 0))
+        with CaptureQueriesContext(connection) as ctx:
+            appointment = self._book(time(10, 0), patient=self.patient2)
+        self.assertEqual(appointment.status, Appointment.Status.CONFIRMED)
+        sqls = [q["sql"] for q in ctx.captured_queries]
+        lock = next(i for i, sql in enumerate(sqls) if "pg_advisory_xact_lock" in sql)
+        touched = [t for t in PRE_LOCK_TABLES if any(t in sql for sql in sqls[:lock])]
+        self.assertEqual(touched, [])
+
+    def test_staff_revocation_invalidates(self):
+        get_booking_context(self.clinic.id, self.doctor.id)
+        staff = ClinicStaff.objects.get(clinic=self.clinic, user=self.doctor)
+        staff.is_active = False
+        staff.save()
+        self._assert_refused("doctor_not_active")
+
+    def test_verification_change_invalidates(self):
+        get_booking_context(self.clinic.id, self.doctor.id)
+        verification = DoctorVerification.objects.get(user=self.doctor)
+        verification.identity_status = "IDENTITY_REVOKED"
+        verification.save()
+        self._assert_refused("doctor_not_verified")
+
+    def test_subscription_change_invalidates_and_expiry_is_live(self):
+        subscription = ClinicSubscription.objects.create(
+            clinic=self.clinic, status="ACTIVE", expires_at=timezone.now() + timedelta(days=30),
+        )
+        get_booking_context(self.clinic.id, self.doctor.id)
+        subscription.status = "SUSPENDED"
+        subscription.save()
+        self._assert_refused("clinic_subscription_inactive")
+
+        # An expiry passing while the context is cached is still seen.
+        subscription.status = "ACTIVE"
+        subscription.save()
+        context = get_booking_context(self.clinic.id, self.doctor.id)
+        context.subscription.expires_at = timezone.now() - timedelta(seconds=1)
+        self.assertFalse(context.subscription_allows_booking())
+
+    def test_holiday_and_doctor_types_invalidate(self):
+        get_booking_context(self.clinic.id, self.doctor.id)
+        holiday = ClinicHoliday.objects.create(
+            clinic=self.clinic, title="Eid", start_date=self.next_monday, end_date=self.next_monday,
+        )
+        self._assert_refused("clinic_holiday")
+        holiday.delete()
+
+        DoctorClinicAppointmentType.objects.create(
+            doctor=self.doctor, clinic=self.clinic, appointment_type=self.appointment_type, is_active=False,
+        )
+        self._assert_refused("type_not_enabled_for_doctor")
+
+    def test_stale_cached_grid_cannot_admit_a_withdrawn_slot(self):
+        self._book(time(9, 0))  # warms the cached grid for the day
+        # Shrink the availability behind the signals: the cached grid still
+        # offers 11:00, the locked re-check must not.
+        DoctorAvailability.objects.filter(doctor=self.doctor, clinic=self.clinic).update(end_time=time(10, 0))
+        cached = get_cached_slots_for_date(self.doctor.id, self.clinic.id, self.next_monday, 30, 30)
+        self.assertIn(time(11, 0), [s["time"] for s in cached if s["is_available"]])
+        self._assert_refused("invalid_slot", at=time(11, 0))
+        self.assertEqual(self._book(time(9, 30), patient=self.patient2).appointment_time, time(9, 30))
+
+    def test_clinic_deactivation_invalidates(self):
+        get_booking_context(self.clinic.id, self.doctor.id)
+        clinic = Clinic.objects.get(pk=self.clinic.pk)
+        clinic.is_active = False
+        clinic.save()
+        self._assert_refused("invalid_clinic")
+
+
+@override_settings(CACHES=LOCMEM)
+class BenchmarkBookingCommandTests(TestCase):
+
+    def test_reports_percentiles_and_rolls_back(self):
+        out = StringIO()
+        call_command("benchmark_booking", bookings=3, stdout=out)
+        self.assertIn("warm context: 3 booking(s)", out.getvalue())
+        self.assertIn("p95", out.getvalue())
+        self.assertFalse(Appointment.objects.exists())
+        self.assertFalse(Clinic.objects.filter(name__startswith="Bench ").exists())
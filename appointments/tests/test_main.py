@@ -560,7 +560,7 @@ class StaffCancellationNotificationTests(TransactionTestCase):
 
     # ── Test 1: In-app notification created on successful cancellation ─────────
 
-    @patch("accounts.services.tweetsms.send_sms")
+    @patch("accounts.outbox.enqueue_sms")
     @patch("accounts.email_utils._send_email")
     def test_notification_created_on_cancellation(self, mock_email, mock_sms):
         """ClinicStaff cancels CONFIRMED appointment → in-app notification created."""
@@ -587,7 +587,7 @@ class StaffCancellationNotificationTests(TransactionTestCase):
 
     # ── Test 2: PENDING appointment also notified ──────────────────────────────
 
-    @patch("accounts.services.tweetsms.send_sms")
+    @patch("accounts.outbox.enqueue_sms")
     @patch("accounts.email_utils._send_email")
     def test_pending_appointment_also_notified(self, mock_email, mock_sms):
         """ClinicStaff cancels PENDING appointment → notification created."""
@@ -604,7 +604,7 @@ class StaffCancellationNotificationTests(TransactionTestCase):
 
     # ── Test 3: Email sent when patient has verified email ─────────────────────
 
-    @patch("accounts.services.tweetsms.send_sms")
+    @patch("accounts.outbox.enqueue_sms")
     @patch("accounts.email_utils._send_email")
     def test_email_sent_to_verified_email(self, mock_email, mock_sms):
         """Email is sent when patient.email is set AND email_verified=True."""
@@ -621,7 +621,7 @@ class StaffCancellationNotificationTests(TransactionTestCase):
 
     # ── Test 4: No email when email_verified=False ─────────────────────────────
 
-    @patch("accounts.services.tweetsms.send_sms")
+    @patch("accounts.outbox.enqueue_sms")
     @patch("accounts.email_utils._send_email")
     def test_no_email_when_not_verified(self, mock_email, mock_sms):
         """No email when patient has an email but email_verified=False."""
@@ -635,7 +635,7 @@ class StaffCancellationNotificationTests(TransactionTestCase):
 
     # ── Test 5: No email when patient has no email at all ─────────────────────
 
-    @patch("accounts.services.tweetsms.send_sms")
+    @patch("accounts.outbox.enqueue_sms")
     @patch("accounts.email_utils._send_email")
     def test_no_email_when_email_is_none(self, mock_email, mock_sms):
         """No email when patient.email is None (not set)."""
@@ -649,7 +649,7 @@ class StaffCancellationNotificationTests(TransactionTestCase):
 
     # ── Test 6: Duplicate cancellation raises ValueError; no double notification
 
-    @patch("accounts.services.tweetsms.send_sms")
+    @patch("accounts.outbox.enqueue_sms")
     @patch("accounts.email_utils._send_email")
     def test_duplicate_cancellation_raises_error(self, mock_email, mock_sms):
         """Already-CANCELLED appointment raises ValueError; no extra notification."""
@@ -675,7 +675,7 @@ class StaffCancellationNotificationTests(TransactionTestCase):
 
     # ── Test 7: Unauthorized staff raises ValueError; no notification ──────────
 
-    @patch("accounts.services.tweetsms.send_sms")
+    @patch("accounts.outbox.enqueue_sms")
     @patch("accounts.email_utils._send_email")
     def test_unauthorized_staff_cannot_cancel(self, mock_email, mock_sms):
         """Staff from a different clinic are rejected; no notification created."""
@@ -691,7 +691,7 @@ class StaffCancellationNotificationTests(TransactionTestCase):
 
     # ── FIX 2: cancelled_by_staff audit field is correctly stored ─────────────
 
-    @patch("accounts.services.tweetsms.send_sms")
+    @patch("accounts.outbox.enqueue_sms")
     @patch("accounts.email_utils._send_email")
     def test_cancelled_by_staff_is_stored(self, mock_email, mock_sms):
         """FIX 2: notification.cancelled_by_staff equals the acting ClinicStaff."""
@@ -707,7 +707,7 @@ class StaffCancellationNotificationTests(TransactionTestCase):
     # ── FIX 3: Multiple notifications of the same type are now allowed ────────
     # (UniqueConstraint was removed to support reminders and status change events)
 
-    @patch("accounts.services.tweetsms.send_sms")
+    @patch("accounts.outbox.enqueue_sms")
     @patch("accounts.email_utils._send_email")
     def test_multiple_notifications_of_same_type_allowed(self, mock_email, mock_sms):
         """
@@ -744,7 +744,7 @@ class StaffCancellationNotificationTests(TransactionTestCase):
     @patch("accounts.email_utils._send_email")
     def test_sms_skipped_when_not_configured(self, mock_email):
         """
-        FIX 4: when SMS_PROVIDER is blank, send_sms is never called.
+        FIX 4: when SMS_PROVIDER is blank, no SMS is queued.
         Uses override_settings to ensure deterministic behaviour regardless
         of the real local .env configuration.
         """
@@ -757,14 +757,29 @@ class StaffCancellationNotificationTests(TransactionTestCase):
             # Confirm the gate returns False under these settings
             self.assertFalse(_is_sms_configured())
 
-            # Assert send_sms is never reached
+            # Assert enqueue_sms is never reached
+            with _patch("accounts.outbox.enqueue_sms") as mock_sms:
+                self._cancel_by_staff()
+                mock_sms.assert_not_called()
+
+    @patch("accounts.email_utils._send_email")
+    def test_sms_is_queued_not_sent_inline(self, mock_email):
+        """The cancellation SMS goes to the outbox; TweetsMS is never called in-request."""
+        from django.test import override_settings
+        from accounts.models import OutboundMessage
+        from unittest.mock import patch as _patch
+
+        with override_settings(SMS_PROVIDER="TWEETSMS", TWEETSMS_API_KEY="k", TWEETSMS_SENDER="clinic"):
             with _patch("accounts.services.tweetsms.send_sms") as mock_sms:
                 self._cancel_by_staff()
                 mock_sms.assert_not_called()
+        self.assertTrue(
+            OutboundMessage.objects.filter(channel=OutboundMessage.Channel.SMS).exists()
+        )
 
     # ── FIX 5: email failure does NOT block in-app notification ──────────
 
-    @patch("accounts.services.tweetsms.send_sms")
+    @patch("accounts.outbox.enqueue_sms")
     @patch(
         "accounts.email_utils._send_email",
         side_effect=Exception("Brevo outage"),
@@ -1184,7 +1199,7 @@ class DoctorCancellationNotifiesTest(TransactionTestCase):
         setattr(req, "_messages", FallbackStorage(req))
         return req
 
-    @patch("accounts.services.tweetsms.send_sms")
+    @patch("accounts.outbox.enqueue_sms")
     @patch("accounts.email_utils._send_email")
     def test_cancel_notifies_patient_and_secretary(self, mock_email, mock_sms):
         from doctors.views import apply_status_transition
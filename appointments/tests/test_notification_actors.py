@@ -7,11 +7,16 @@ B. Service population — booking/staff notifiers store actor_role + actor_name
 C. Doctor follow-up booking notifies secretary + owner (not the booking doctor)
 D. Template name-visibility per portal (secretary name hidden in patient portal,
    doctor name shown in secretary portal)
+E. Staff fan-out — one INSERT per event regardless of clinic size, with a
+   per-recipient fallback when the bulk insert fails
 """
 
 from datetime import date, time, timedelta
+from unittest import mock
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
@@ -21,6 +26,7 @@ from appointments.services.appointment_notification_service import (
     _actor_from_staff,
     notify_appointment_booked,
     notify_owner_purchase_request_submitted,
+    notify_secretaries_appointment_cancelled_by_doctor,
     notify_staff_appointment_booked,
 )
 from clinics.models import Clinic, ClinicStaff
@@ -310,3 +316,53 @@ class ActorNameVisibilityTests(_BaseClinicFixture):
         resp = self.client.get(reverse("appointments:secretary_notifications"))
         self.assertEqual(resp.status_code, 200)
         self.assertContains(resp, self.DOCTOR_NAME)
+
+
+class StaffFanOutTests(_BaseClinicFixture):
+    """E. Bulk fan-out of staff notifications."""
+
+    def _add_secretaries(self, count):
+        for i in range(count):
+            user = make_user(f"05911{i:05d}", role="SECRETARY", name=f"سكرتير {i}")
+            ClinicStaff.objects.create(
+                clinic=self.clinic, user=user, role="SECRETARY", is_active=True
+            )
+
+    def _queries_for_booking(self, appt):
+        with CaptureQueriesContext(connection) as ctx:
+            notify_staff_appointment_booked(
+                appt, actor_role=AppointmentNotification.ActorRole.PATIENT
+            )
+        return len(ctx.captured_queries)
+
+    def test_query_count_independent_of_secretary_count(self):
+        small = self._queries_for_booking(self._appointment(created_by=self.patient, day=15))
+        self._add_secretaries(8)
+        appt = self._appointment(created_by=self.patient, day=16)
+        self.assertEqual(self._queries_for_booking(appt), small)
+        self.assertEqual(
+            AppointmentNotification.objects.filter(appointment=appt).count(), 1 + 9
+        )
+
+    def test_doctor_cancel_reaches_every_secretary_only(self):
+        self._add_secretaries(3)
+        appt = self._appointment(created_by=self.patient)
+        notify_secretaries_appointment_cancelled_by_doctor(appt)
+        contexts = set(
+            AppointmentNotification.objects.filter(appointment=appt)
+            .values_list("context_role", flat=True)
+        )
+        self.assertEqual(contexts, {AppointmentNotification.ContextRole.SECRETARY})
+        self.assertEqual(AppointmentNotification.objects.filter(appointment=appt).count(), 4)
+
+    def test_bulk_failure_falls_back_per_recipient(self):
+        appt = self._appointment(created_by=self.patient)
+        with mock.patch.object(
+            AppointmentNotification.objects, "bulk_create", side_effect=RuntimeError("boom")
+        ):
+            notify_staff_appointment_booked(appt)
+        recipients = set(
+            AppointmentNotification.objects.filter(appointment=appt)
+            .values_list("patient_id", flat=True)
+        )
+        self.assertEqual(recipients, {self.doctor.id, self.secretary.id})
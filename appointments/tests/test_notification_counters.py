@@ -0,0 +1,142 @@
+"""
+Cached unread-notification counters (appointments/services/notification_counters.py).
+
+Covers:
+- badge render is 0 queries on a cache hit, 1 grouped aggregate on a miss
+- creating a notification through the service increments the counter
+- mark-read, mark-all and delete decrement it
+- the doctor's pending-invitation badge is cached and dropped on invitation writes
+"""
+
+from datetime import date, time, timedelta
+
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from appointments.context_processors import unread_notifications
+from appointments.models import Appointment, AppointmentNotification
+from appointments.services.appointment_notification_service import _create_notification
+from appointments.services.notification_counters import get_unread_counts
+from clinics.models import Clinic, ClinicInvitation
+from doctors.context_processors import doctor_context
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+Role = AppointmentNotification.ContextRole
+
+
+@override_settings(CACHES=LOCMEM)
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.patient = CustomUser.objects.create_user(
+            phone="0590000101", password="testpass", name="Ali", role="PATIENT"
+        )
+        owner = CustomUser.objects.create_user(
+            phone="0590000102", password="testpass", name="Dr. Owner", role="MAIN_DOCTOR"
+        )
+        self.clinic = Clinic.objects.create(name="Clinic", address="Addr", main_doctor=owner)
+        self.appointment = Appointment.objects.create(
+            patient=self.patient,
+            clinic=self.clinic,
+            appointment_date=date(2030, 1, 15),
+            appointment_time=time(10, 0),
+            status=Appointment.Status.CONFIRMED,
+        )
+        self.request = RequestFactory().get("/")
+        self.request.user = self.patient
+
+    def _notify(self, context_role=Role.PATIENT):
+        with self.captureOnCommitCallbacks(execute=True):
+            return _create_notification(
+                self.patient, self.appointment,
+                AppointmentNotification.Type.APPOINTMENT_BOOKED, "t", "m",
+                context_role=context_role,
+            )
+
+    def _post(self, name, *args, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse(f"appointments:{name}", args=args), data=data)
+
+    def test_hit_costs_no_query_and_miss_one(self):
+        self._notify()
+        with self.assertNumQueries(1):
+            first = unread_notifications(self.request)
+        with self.assertNumQueries(0):
+            second = unread_notifications(self.request)
+        self.assertEqual(first, second)
+        self.assertEqual(second["unread_patient_notification_count"], 1)
+
+    def test_create_increments_cached_counter(self):
+        get_unread_counts(self.patient.id)  # prime
+        self._notify()
+        self._notify(Role.DOCTOR)
+        with self.assertNumQueries(0):
+            counts = get_unread_counts(self.patient.id)
+        self.assertEqual((counts[Role.PATIENT], counts[Role.DOCTOR]), (1, 1))
+
+    def test_mark_read_and_mark_all_decrement(self):
+        first = self._notify()
+        self._notify()
+        self._notify()
+        get_unread_counts(self.patient.id)
+        self.client.force_login(self.patient)
+
+        self._post("mark_notification_read", first.pk)
+        self.assertEqual(get_unread_counts(self.patient.id)[Role.PATIENT], 2)
+
+        self._post("mark_all_notifications_read", context_role=Role.PATIENT)
+        self.assertEqual(get_unread_counts(self.patient.id)[Role.PATIENT], 0)
+
+    def test_delete_selected_decrements_unread_only(self):
+        unread = self._notify()
+        read = self._notify()
+        AppointmentNotification.objects.filter(pk=read.pk).update(is_read=True)
+        cache.clear()
+        self.assertEqual(get_unread_counts(self.patient.id)[Role.PATIENT], 1)
+        self.client.force_login(self.patient)
+
+        self._post(
+            "delete_notifications",
+            context_role=Role.PATIENT, mode="selected", ids=[unread.pk, read.pk],
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_counts(self.patient.id)[Role.PATIENT], 0)
+        self.assertFalse(AppointmentNotification.objects.exists())
+
+
+@override_settings(CACHES=LOCMEM)
+class PendingInvitationBadgeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        owner = CustomUser.objects.create_user(
+            phone="0590000111", password="testpass", name="Dr. Owner", role="MAIN_DOCTOR"
+        )
+        self.doctor = CustomUser.objects.create_user(
+            phone="0590000112", password="testpass", name="Dr. Invitee", role="DOCTOR"
+        )
+        self.clinic = Clinic.objects.create(name="Clinic", address="Addr", main_doctor=owner)
+        self.request = RequestFactory().get("/")
+        self.request.user = self.doctor
+
+    def _invite(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ClinicInvitation.objects.create(
+                clinic=self.clinic, invited_by=self.clinic.main_doctor,
+                doctor_name="Dr. Invitee", doctor_phone=self.doctor.phone,
+                doctor_email="invitee@example.com",
+                expires_at=timezone.now() + timedelta(days=7),
+            )
+
+    def test_count_cached_and_invalidated_on_write(self):
+        invitation = self._invite()
+        self.assertEqual(doctor_context(self.request)["pending_invitations_count"], 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(doctor_context(self.request)["pending_invitations_count"], 1)
+
+        invitation.status = "ACCEPTED"
+        with self.captureOnCommitCallbacks(execute=True):
+            invitation.save()
+        self.assertEqual(doctor_context(self.request)["pending_invitations_count"], 0)
@@ -0,0 +1,152 @@
+"""
+Keyset-paginated notification centers and notification retention.
+
+Covers:
+- the first page holds NOTIFICATIONS_PAGE_SIZE cards and a cursor to the next
+- following the cursor as the scroll loader does returns only the next page's
+  cards, with no overlap or gaps even where created_at ties
+- a page costs a fixed number of queries however many notifications exist
+- a malformed cursor falls back to the first page
+- prune_notifications deletes only old READ rows, in batches, and can archive them
+"""
+
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from appointments.models import AppointmentNotification
+from appointments.notification_views import NOTIFICATIONS_PAGE_SIZE
+from appointments.services.notification_retention import prune_read_notifications
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+Role = AppointmentNotification.ContextRole
+
+
+def _seed(user, count, start, step=timedelta(minutes=1), **fields):
+    """``count`` notifications for ``user``, created ``step`` apart going back
+    from ``start`` — two per timestamp, so ties on created_at are exercised."""
+    created = AppointmentNotification.objects.bulk_create([
+        AppointmentNotification(
+            patient=user, context_role=Role.PATIENT,
+            notification_type=AppointmentNotification.Type.APPOINTMENT_REMINDER,
+            title=f"n{n}", message="m", **fields,
+        )
+        for n in range(count)
+    ])
+    for n, notif in enumerate(created):
+        notif.created_at = start - step * (n // 2)
+    AppointmentNotification.objects.bulk_update(created, ["created_at"])
+    return created
+
+
+@override_settings(CACHES=LOCMEM)
+class NotificationCenterPagingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.patient = CustomUser.objects.create_user(
+            phone="0590000201", password="testpass", name="Ali", role="PATIENT"
+        )
+        self.url = reverse("appointments:patient_notifications")
+        self.client.force_login(self.patient)
+
+    def _expected_order(self):
+        return list(
+            AppointmentNotification.objects.filter(patient=self.patient)
+            .order_by("-created_at", "-id").values_list("id", flat=True)
+        )
+
+    def test_scrolling_walks_every_notification_once(self):
+        _seed(self.patient, 2 * NOTIFICATIONS_PAGE_SIZE + 5, timezone.now(), is_read=True)
+        _seed(self.patient, 3, timezone.now() + timedelta(minutes=1))
+
+        response = self.client.get(self.url)
+        self.assertTemplateUsed(response, "appointments/notifications_center_patient.html")
+        self.assertEqual(response.context["total_count"], 2 * NOTIFICATIONS_PAGE_SIZE + 8)
+        self.assertEqual(response.context["unread_count"], 3)
+        seen = [n.id for n in response.context["notifications"]]
+        self.assertEqual(len(seen), NOTIFICATIONS_PAGE_SIZE)
+
+        cursor = response.context["next_cursor"]
+        while cursor:
+            self.assertContains(response, f"?cursor={cursor}")
+            response = self.client.get(self.url, {"cursor": cursor}, headers={"HX-Request": "true"})
+            self.assertTemplateNotUsed(response, "appointments/notifications_center_patient.html")
+            self.assertTemplateUsed(response, "appointments/partials/notif_items.html")
+            seen += [n.id for n in response.context["notifications"]]
+            cursor = response.context["next_cursor"]
+
+        self.assertEqual(seen, self._expected_order())
+
+    def test_page_query_count_does_not_grow_with_history(self):
+        _seed(self.patient, NOTIFICATIONS_PAGE_SIZE + 1, timezone.now())
+        self.client.get(self.url)  # warm session/user lookups and the badge counters
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url)
+
+        _seed(self.patient, 200, timezone.now() - timedelta(days=30))
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(self.url)
+        self.assertEqual(len(large), len(small))
+
+        with CaptureQueriesContext(connection) as fragment:
+            self.client.get(
+                self.url, {"cursor": response.context["next_cursor"]}, headers={"HX-Request": "true"}
+            )
+        self.assertLess(len(fragment), len(large))
+
+    def test_malformed_cursor_shows_first_page(self):
+        _seed(self.patient, 3, timezone.now())
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"}, headers={"HX-Request": "true"})
+        self.assertTemplateUsed(response, "appointments/notifications_center_patient.html")
+        self.assertEqual([n.id for n in response.context["notifications"]], self._expected_order())
+        self.assertIsNone(response.context["next_cursor"])
+
+
+class NotificationRetentionTests(TestCase):
+
+    def setUp(self):
+        self.patient = CustomUser.objects.create_user(
+            phone="0590000202", password="testpass", name="Ali", role="PATIENT"
+        )
+        now = timezone.now()
+        self.old_read = _seed(self.patient, 7, now - timedelta(days=200), is_read=True)
+        self.old_unread = _seed(self.patient, 2, now - timedelta(days=200))
+        self.recent_read = _seed(self.patient, 2, now - timedelta(days=10), is_read=True)
+
+    def _remaining(self):
+        return set(AppointmentNotification.objects.values_list("id", flat=True))
+
+    def test_deletes_only_old_read_notifications_in_batches(self):
+        with CaptureQueriesContext(connection) as ctx:
+            removed = prune_read_notifications(180, batch_size=3)
+        self.assertEqual(removed, 7)
+        deletes = [q for q in ctx.captured_queries if q["sql"].startswith("DELETE")]
+        self.assertEqual(len(deletes), 3)  # 3 + 3 + 1
+        self.assertEqual(self._remaining(), {n.id for n in self.old_unread + self.recent_read})
+
+    def test_command_archives_before_deleting(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "notifications.jsonl.gz")
+            call_command("prune_notifications", "--dry-run", stdout=open(os.devnull, "w"))
+            self.assertEqual(len(self._remaining()), 11)
+
+            call_command("prune_notifications", "--days", "180", "--batch-size", "4",
+                         "--archive", path, stdout=open(os.devnull, "w"))
+            with gzip.open(path, "rt", encoding="utf-8") as archive:
+                rows = [json.loads(line) for line in archive]
+
+        self.assertEqual(sorted(r["id"] for r in rows), sorted(n.id for n in self.old_read))
+        self.assertEqual(rows[0]["patient_id"], self.patient.id)
+        self.assertEqual(len(self._remaining()), 4)
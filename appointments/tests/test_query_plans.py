@@ -0,0 +1,171 @@
+"""
+Query-plan regression tests for the Appointment / AppointmentNotification
+hot paths (indexes declared in appointments/models.py).
+
+Each test EXPLAINs a hot query against a seeded, ANALYZEd fixture with
+sequential scans disabled. Postgres still picks a Seq Scan when no index can
+serve the predicate, so a missing or mismatched index shows up as a Seq Scan
+— or as a plan that no longer names the index designed for that query.
+"""
+
+from datetime import date, time, timedelta
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count, Q
+from django.test import TestCase
+
+from appointments.models import Appointment, AppointmentNotification, AppointmentType
+from appointments.services.notification_retention import expired_notifications
+from clinics.models import Clinic
+from doctors.services import SLOT_BLOCKING_STATUSES
+
+User = get_user_model()
+S = Appointment.Status
+Role = AppointmentNotification.ContextRole
+
+STATUS_CYCLE = [S.COMPLETED, S.COMPLETED, S.COMPLETED, S.CANCELLED, S.NO_SHOW, S.CONFIRMED]
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN assertions target PostgreSQL")
+class HotQueryPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(
+            phone="0590009001", password="pass", name="Owner", role="MAIN_DOCTOR"
+        )
+        clinics = [
+            Clinic.objects.create(name=f"Clinic {i}", address="Addr", main_doctor=owner)
+            for i in range(8)
+        ]
+        cls.clinic = clinics[0]
+        appt_type = AppointmentType.objects.create(
+            clinic=cls.clinic, name="General", duration_minutes=15, price=50
+        )
+        cls.doctors = [
+            User.objects.create_user(
+                phone=f"059001{i:04d}", password="pass", name=f"Dr {i}", role="DOCTOR"
+            )
+            for i in range(12)
+        ]
+        cls.patients = User.objects.bulk_create([
+            User(phone=f"059002{i:04d}", password="!", name=f"Patient {i}", role="PATIENT")
+            for i in range(400)
+        ])
+        cls.today = date(2030, 6, 1)
+
+        # ~2 years of history across clinics, mostly closed; the next month still active.
+        appointments = []
+        for n in range(6000):
+            day = cls.today - timedelta(days=720 - (n % 750))
+            appointments.append(Appointment(
+                patient=cls.patients[n % len(cls.patients)],
+                clinic=clinics[n % len(clinics)],
+                doctor=cls.doctors[n % len(cls.doctors)],
+                appointment_type=appt_type,
+                appointment_date=day,
+                appointment_time=time(8 + n % 10, 15 * (n % 4)),
+                status=S.CONFIRMED if day >= cls.today else STATUS_CYCLE[n % len(STATUS_CYCLE)],
+            ))
+        Appointment.objects.bulk_create(appointments)
+
+        roles = Role.values
+        AppointmentNotification.objects.bulk_create([
+            AppointmentNotification(
+                patient=cls.patients[n % len(cls.patients)],
+                context_role=roles[n % len(roles)],
+                notification_type=AppointmentNotification.Type.APPOINTMENT_BOOKED,
+                title="t", message="m",
+                is_read=n % 10 != 0,
+            )
+            for n in range(4000)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE appointments_appointment")
+            cursor.execute("ANALYZE appointments_appointmentnotification")
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")  # rolled back with the test
+
+    def assertUsesIndex(self, qs, *index_names):
+        plan = qs.explain()
+        self.assertNotIn("Seq Scan", plan, plan)
+        self.assertTrue(any(name in plan for name in index_names), plan)
+
+    # ── Appointment ─────────────────────────────────────────────────────────
+    def test_slot_engine_blocking_appointments(self):
+        qs = Appointment.objects.filter(
+            doctor_id__in=[self.doctors[0].id],
+            appointment_date__gte=self.today,
+            appointment_date__lte=self.today + timedelta(days=6),
+            status__in=SLOT_BLOCKING_STATUSES,
+        ).values_list("doctor_id", "appointment_date", "appointment_time")
+        self.assertUsesIndex(qs, "appt_doctor_date_status_idx")
+
+    def test_booking_lock(self):
+        qs = Appointment.objects.select_for_update().filter(
+            doctor_id=self.doctors[0].id,
+            appointment_date=self.today,
+            status__in=[S.CONFIRMED, S.CHECKED_IN, S.IN_PROGRESS],
+        ).values_list("appointment_time", flat=True)
+        self.assertUsesIndex(qs, "appt_doctor_active_idx", "appt_doctor_date_status_idx")
+
+    def test_clinic_day_board(self):
+        qs = Appointment.objects.filter(
+            clinic=self.clinic,
+            appointment_date=self.today,
+            status__in=[S.CONFIRMED, S.CHECKED_IN, S.IN_PROGRESS],
+        ).order_by("appointment_time")
+        self.assertUsesIndex(qs, "appt_clinic_date_status_idx")
+
+    def test_clinic_report_range(self):
+        qs = Appointment.objects.filter(
+            clinic=self.clinic,
+            appointment_date__range=(self.today - timedelta(days=29), self.today),
+        ).values("status").annotate(n=Count("id"))
+        self.assertUsesIndex(qs, "appt_clinic_date_status_idx")
+
+    def test_patient_upcoming(self):
+        qs = Appointment.objects.filter(
+            patient=self.patients[0],
+            appointment_date__gte=self.today,
+            status__in=[S.PENDING, S.CONFIRMED, S.CHECKED_IN, S.IN_PROGRESS],
+        ).order_by("appointment_date", "appointment_time")
+        self.assertUsesIndex(qs, "appt_patient_status_date_idx")
+
+    def test_global_no_show_sweep_candidates(self):
+        qs = Appointment.objects.filter(
+            status__in=[S.PENDING, S.CONFIRMED],
+            appointment_date__lte=self.today,
+        ).values_list("clinic_id", flat=True).distinct()
+        self.assertUsesIndex(qs, "appt_active_date_idx")
+
+    # ── AppointmentNotification ─────────────────────────────────────────────
+    def test_unread_badge_recount(self):
+        qs = (
+            AppointmentNotification.objects.filter(patient=self.patients[0], is_read=False)
+            .values("context_role")
+            .annotate(n=Count("id"))
+        )
+        self.assertUsesIndex(qs, "notif_unread_idx")
+
+    def test_notification_center_page(self):
+        qs = AppointmentNotification.objects.filter(
+            patient=self.patients[0], context_role=Role.PATIENT
+        ).order_by("-created_at")[:20]
+        self.assertUsesIndex(qs, "notif_patient_role_created_idx")
+
+    def test_notification_center_next_page(self):
+        newest = AppointmentNotification.objects.filter(patient=self.patients[0]).first()
+        qs = AppointmentNotification.objects.filter(
+            Q(created_at__lt=newest.created_at) | Q(created_at=newest.created_at, id__lt=newest.id),
+            patient=self.patients[0], context_role=Role.PATIENT,
+        ).order_by("-created_at", "-id")[:21]
+        self.assertUsesIndex(qs, "notif_patient_role_created_idx")
+
+    def test_retention_sweep_batch(self):
+        qs = expired_notifications(180).order_by("created_at", "id").values_list("id", flat=True)[:1000]
+        self.assertUsesIndex(qs, "notif_read_created_idx")
@@ -0,0 +1,116 @@
+"""
+Batched reminder dispatch (appointments/services/reminder_dispatcher.py).
+
+Covers:
+- only CONFIRMED, not-yet-reminded appointments inside the window are reminded
+- a batch costs one notification INSERT and one outbox INSERT, whatever its size
+- emails are queued only for verified addresses
+- a second run sends nothing; a failing batch is rolled back, claim included
+"""
+
+from datetime import date, datetime, time
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.models import CustomUser, OutboundMessage
+from appointments.models import Appointment, AppointmentNotification
+from appointments.services.reminder_dispatcher import dispatch_due_reminders
+from clinics.models import Clinic
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+S = Appointment.Status
+
+
+@override_settings(CACHES=LOCMEM)
+class ReminderDispatchTests(TestCase):
+
+    def setUp(self):
+        owner = CustomUser.objects.create_user(
+            phone="0590000301", password="testpass", name="Dr. Owner", role="MAIN_DOCTOR"
+        )
+        self.clinic = Clinic.objects.create(name="Clinic", address="Addr", main_doctor=owner)
+        self.verified = CustomUser.objects.create_user(
+            phone="0590000302", password="testpass", name="Ali", role="PATIENT",
+            email="ali@example.com", email_verified=True,
+        )
+        self.unverified = CustomUser.objects.create_user(
+            phone="0590000303", password="testpass", name="Sara", role="PATIENT",
+            email="sara@example.com",
+        )
+        self.now = timezone.make_aware(datetime(2030, 1, 15, 10, 0))
+        self.due = [
+            self._appointment(self.verified, date(2030, 1, 15), time(11, 0)),
+            self._appointment(self.unverified, date(2030, 1, 15), time(16, 30)),
+            self._appointment(self.verified, date(2030, 1, 16), time(9, 45)),
+            self._appointment(self.verified, date(2030, 1, 16), time(10, 0)),
+        ]
+        self.not_due = [
+            self._appointment(self.verified, date(2030, 1, 15), time(9, 0)),    # already started
+            self._appointment(self.verified, date(2030, 1, 16), time(10, 15)),  # beyond 24h
+            self._appointment(self.verified, date(2030, 1, 15), time(12, 0), status=S.PENDING),
+            self._appointment(self.verified, date(2030, 1, 15), time(13, 0), reminder_sent=True),
+        ]
+
+    def _appointment(self, patient, day, at, status=S.CONFIRMED, **fields):
+        return Appointment.objects.create(
+            patient=patient, clinic=self.clinic, appointment_date=day,
+            appointment_time=at, status=status, **fields,
+        )
+
+    def _dispatch(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return dispatch_due_reminders(now=self.now, **kwargs)
+
+    def _reminded_ids(self):
+        return set(
+            AppointmentNotification.objects.filter(
+                notification_type=AppointmentNotification.Type.APPOINTMENT_REMINDER
+            ).values_list("appointment_id", flat=True)
+        )
+
+    def test_reminds_exactly_the_due_window(self):
+        totals = self._dispatch()
+        self.assertEqual(totals, {"reminded": 4, "emailed": 3})
+        self.assertEqual(self._reminded_ids(), {a.id for a in self.due})
+        self.assertEqual(
+            set(Appointment.objects.filter(reminder_sent=True).values_list("id", flat=True)),
+            {a.id for a in self.due} | {self.not_due[3].id},
+        )
+        self.assertEqual(
+            sorted(OutboundMessage.objects.values_list("recipient", flat=True)),
+            ["ali@example.com"] * 3,
+        )
+        self.assertFalse(
+            AppointmentNotification.objects.filter(
+                patient=self.unverified, sent_via_email=True
+            ).exists()
+        )
+
+    def test_batches_insert_in_bulk(self):
+        with CaptureQueriesContext(connection) as ctx:
+            totals = self._dispatch(batch_size=3)
+        self.assertEqual(totals["reminded"], 4)
+        inserts = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(
+            sum("appointments_appointmentnotification" in sql for sql in inserts), 2
+        )
+        self.assertEqual(sum("accounts_outboundmessage" in sql for sql in inserts), 2)
+
+    def test_second_run_sends_nothing(self):
+        self._dispatch()
+        call_command("send_appointment_reminders", stdout=mock.MagicMock())
+        self.assertEqual(self._dispatch(), {"reminded": 0, "emailed": 0})
+        self.assertEqual(AppointmentNotification.objects.count(), 4)
+
+    def test_failed_batch_releases_its_claim(self):
+        with mock.patch("accounts.outbox.enqueue_emails", side_effect=RuntimeError("db down")):
+            self.assertEqual(self._dispatch(), {"reminded": 0, "emailed": 0})
+        self.assertEqual(self._reminded_ids(), set())
+        self.assertFalse(Appointment.objects.filter(pk__in=[a.pk for a in self.due], reminder_sent=True).exists())
+
+        self.assertEqual(self._dispatch()["reminded"], 4)
@@ -219,6 +219,19 @@ class GuestBrowseTests(TestCase):
         self.assertNotContains(resp, 'class="slot-pill"')    # slot links suppressed
         self.assertContains(resp, "Too many requests")       # guest sees a notice
 
+    @patch("browse.views.BROWSE_SLOTS_SLIDING", True)
+    @patch("browse.views.ratelimit.hit_rate_limit", return_value=False)
+    def test_slot_cap_uses_sliding_window_when_enabled(self, mock_rl):
+        self.client.get(
+            reverse("browse:doctor_detail", kwargs={"doctor_id": self.doctor.id}),
+            {
+                "clinic_id": self.clinic.id,
+                "date": self.future.isoformat(),
+                "appointment_type_id": self.appt_type.id,
+            },
+        )
+        self.assertTrue(mock_rl.call_args.kwargs["sliding"])
+
     def test_book_cta_is_contextual(self):
         url = reverse("browse:doctor_detail", kwargs={"doctor_id": self.doctor.id})
         book_path = reverse("appointments:book_appointment", kwargs={"clinic_id": self.clinic.id})
@@ -12,6 +12,7 @@ Security model (Option A — dedicated public namespace):
 import re
 from datetime import datetime, date
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.paginator import Paginator
 from django.db.models import Count, Q
@@ -26,11 +27,11 @@ from appointments.services.appointment_type_service import (
 )
 from clinics.models import Clinic, ClinicStaff
 from doctors.models import DoctorAvailability, DoctorProfile, DoctorReview, DoctorVerification
+from doctors.slot_cache import get_cached_slots_for_date
 from doctors.services import (
     doctor_rating_breakdown,
     doctor_rating_summaries,
     doctor_rating_summary,
-    generate_slots_for_date,
     patient_can_review_doctor,
     user_can_moderate_doctor_reviews,
     visible_reviews_for_doctor,
@@ -42,6 +43,8 @@ User = get_user_model()
 # so we use the plain rolling-window limiter (no lockout ladder). Fail-open.
 BROWSE_SLOTS_MAX = 40
 BROWSE_SLOTS_WINDOW = 5 * 60
+# Sliding window: no 2 × BROWSE_SLOTS_MAX burst across a window boundary.
+BROWSE_SLOTS_SLIDING = getattr(settings, "BROWSE_SLOTS_SLIDING_WINDOW", False)
 
 
 def _lang(request):
@@ -264,7 +267,9 @@ def doctor_detail(request, doctor_id):
     selected_type_id = (request.GET.get("appointment_type_id") or "").strip()
     if selected_date and selected_type_id:
         ip = ratelimit.client_ip(request)
-        if ratelimit.hit_rate_limit("browse_slots", ip, BROWSE_SLOTS_MAX, BROWSE_SLOTS_WINDOW):
+        if ratelimit.hit_rate_limit(
+            "browse_slots", ip, BROWSE_SLOTS_MAX, BROWSE_SLOTS_WINDOW, sliding=BROWSE_SLOTS_SLIDING,
+        ):
             slot_error = (
                 "Too many requests. Please try again shortly."
                 if _lang(request) == "en"
@@ -277,7 +282,7 @@ def doctor_detail(request, doctor_id):
                 target = None
             sel_type = next((t for t in types if str(t.id) == selected_type_id), None)
             if target and target >= date.today() and sel_type:
-                raw = generate_slots_for_date(
+                raw = get_cached_slots_for_date(
                     doctor.id, clinic.id, target, sel_type.duration_minutes
                 )
                 slots = [
@@ -86,6 +86,9 @@ REPORT_MAX_RANGE_DAYS = int(os.environ.get("REPORT_MAX_RANGE_DAYS", "366"))
 # Per-secretary bulk-export rate cap (accounts/ratelimit.export_rate_limited).
 EXPORT_MAX_PER_WINDOW = int(os.environ.get("EXPORT_MAX_PER_WINDOW", "20"))
 EXPORT_WINDOW_SECONDS = int(os.environ.get("EXPORT_WINDOW_SECONDS", "600"))
+# Public browse slot cap (browse/views.py): "1" counts requests over a sliding
+# window instead of fixed windows, which allow 2x the cap across a boundary.
+BROWSE_SLOTS_SLIDING_WINDOW = os.environ.get("BROWSE_SLOTS_SLIDING_WINDOW", "0") == "1"
 
 # ============================================
 # SMS PROVIDER (TweetsMS)
@@ -95,6 +98,20 @@ TWEETSMS_API_KEY = os.environ.get("TWEETSMS_API_KEY", "")
 TWEETSMS_SENDER = os.environ.get("TWEETSMS_SENDER", "")
 TWEETSMS_BASE_URL = os.environ.get("TWEETSMS_BASE_URL", "https://tweetsms.ps/api.php")
 
+# ============================================
+# OUTBOUND DELIVERY QUEUE (accounts/outbox.py)
+# ============================================
+# Email/SMS are queued in the DB and delivered by `manage.py deliver_outbox --loop`.
+OUTBOX_POLL_SECONDS = int(os.environ.get("OUTBOX_POLL_SECONDS", "2"))
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_RETRY_BASE_SECONDS = int(os.environ.get("OUTBOX_RETRY_BASE_SECONDS", "30"))
+# Max parallel sends (and pooled connections) per provider.
+OUTBOX_CONCURRENCY = {
+    "EMAIL": int(os.environ.get("OUTBOX_EMAIL_CONCURRENCY", "4")),
+    "SMS": int(os.environ.get("OUTBOX_SMS_CONCURRENCY", "2")),
+}
+
 # ============================================
 # AI SCRIBE (OpenRouter)
 # ============================================
@@ -183,6 +200,7 @@ MIDDLEWARE = [
     "csp.middleware.CSPMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    "accounts.middleware.SessionRefreshMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -247,6 +265,70 @@ CACHES = {
     }
 }
 
+# Slot-grid snapshot cache (doctors/slot_cache.py). Grids are invalidated by
+# version stamps on every relevant write; this TTL only bounds how long
+# unreachable (superseded) grids linger in Redis.
+SLOT_CACHE_TTL_SECONDS = int(os.environ.get("SLOT_CACHE_TTL_SECONDS", "300"))
+
+# Background no-show sweeper (`manage.py process_no_shows --loop`). Read views
+# skip their own sweep while the sweeper's watermark is younger than 2 intervals.
+NO_SHOW_SWEEP_INTERVAL_SECONDS = int(os.environ.get("NO_SHOW_SWEEP_INTERVAL_SECONDS", "60"))
+
+# Compliance rows forgiven per transaction by `manage.py run_auto_forgiveness`.
+AUTO_FORGIVENESS_BATCH_SIZE = int(os.environ.get("AUTO_FORGIVENESS_BATCH_SIZE", "500"))
+
+# Cached per-clinic blocked-patient sets (compliance/services/blocked_cache.py).
+# Dropped on every compliance write; the TTL bounds drift from writes that
+# bypass the services (admin edits, cascade deletes).
+COMPLIANCE_BLOCKED_CACHE_TTL_SECONDS = int(os.environ.get("COMPLIANCE_BLOCKED_CACHE_TTL_SECONDS", "300"))
+
+# Cached (clinic, doctor) booking eligibility (appointments/services/booking_context.py).
+# Invalidated by version stamps on every relevant write; the TTL bounds drift
+# from writes that bypass signals (queryset updates, raw SQL).
+BOOKING_CONTEXT_TTL_SECONDS = int(os.environ.get("BOOKING_CONTEXT_TTL_SECONDS", "60"))
+
+# How booking writers serialize per (doctor, date) (appointments/services/booking_locks.py):
+# "advisory" takes a PostgreSQL advisory lock; "rows" row-locks the day's
+# active appointments (previous behaviour, always used off PostgreSQL).
+BOOKING_LOCK_MODE = os.environ.get("BOOKING_LOCK_MODE", "advisory")
+
+# Order-picker catalog search (doctors/catalog_search.py): "trigram" (pg_trgm
+# GIN indexes), "memory" (per-process per-clinic n-gram index) or "auto" —
+# trigram when the pg_trgm extension is installed. The memory backend keeps
+# at most CATALOG_SEARCH_INDEX_CLINICS clinics' indexes per process.
+CATALOG_SEARCH_BACKEND = os.environ.get("CATALOG_SEARCH_BACKEND", "auto")
+CATALOG_SEARCH_INDEX_CLINICS = int(os.environ.get("CATALOG_SEARCH_INDEX_CLINICS", "64"))
+
+# Appointments claimed per transaction by `manage.py send_appointment_reminders`
+# (appointments/services/reminder_dispatcher.py).
+REMINDER_BATCH_SIZE = int(os.environ.get("REMINDER_BATCH_SIZE", "200"))
+
+# Navbar unread-notification counters (appointments/services/notification_counters.py).
+# Kept current by incr/decr on write; the TTL bounds drift from writes that
+# bypass the service (cascade deletes).
+NOTIFICATION_COUNTER_TTL_SECONDS = int(os.environ.get("NOTIFICATION_COUNTER_TTL_SECONDS", "900"))
+
+# Read notifications older than this are removed by `manage.py prune_notifications`
+# (appointments/services/notification_retention.py). Unread ones are always kept.
+NOTIFICATION_RETENTION_DAYS = int(os.environ.get("NOTIFICATION_RETENTION_DAYS", "180"))
+
+# Live waiting-room / My Day updates over SSE (secretary/queue_events.py).
+# "redis" fans events out across ASGI workers via pub/sub on REDIS_URL;
+# "local" keeps them in-process (tests, single-process dev server).
+QUEUE_EVENTS_BROKER = os.environ.get("QUEUE_EVENTS_BROKER", "redis")
+QUEUE_EVENTS_REDIS_URL = os.environ.get("REDIS_URL", "redis://127.0.0.1:6379")
+# Comment ping interval on idle streams, and how long one stream lives before
+# the browser reconnects (bounds connections pinned to a worker).
+QUEUE_EVENTS_HEARTBEAT_SECONDS = int(os.environ.get("QUEUE_EVENTS_HEARTBEAT_SECONDS", "20"))
+QUEUE_EVENTS_MAX_STREAM_SECONDS = int(os.environ.get("QUEUE_EVENTS_MAX_STREAM_SECONDS", "600"))
+
+# Document numbers (clinics/sequences.py). By default each number is allocated
+# in the writer's transaction (gapless, ordered). A kind listed here, e.g.
+# {"INVOICE": 20}, is reserved in blocks of that size per worker process
+# instead: no queueing on the counter row, at the cost of gaps and of numbers
+# out of order across workers.
+NUMBER_SEQUENCE_BLOCK_SIZES = {}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -337,9 +419,11 @@ SIMPLE_JWT = {
 # flags (SESSION_COOKIE_SECURE / CSRF_COOKIE_SECURE) live in the `if not DEBUG`
 # block below because they must stay off for local http dev.
 #
-# Backend: SESSION_ENGINE is unset -> django.contrib.sessions.backends.db.
-# Sessions are server-side in the `django_session` table; the cookie carries
-# only an opaque key, and auth.logout() flushes the record + cycles the key.
+# Backend: sessions live server-side in the cache (Redis); set
+# SESSION_STORE=cached_db to fall back to `django_session` with a cache
+# read-through (e.g. if Redis is not persistent enough for your deployment).
+# Either way the cookie carries only an opaque key, and auth.logout() flushes
+# the record + cycles the key.
 # ============================================
 
 # Block JavaScript from reading the SESSION cookie (XSS cookie theft).
@@ -351,11 +435,23 @@ SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SAMESITE = "Lax"
 CSRF_COOKIE_SAMESITE = "Lax"
 
-# Idle (rolling) timeout: 60 minutes of inactivity. SESSION_SAVE_EVERY_REQUEST
-# re-stamps the expiry on every request, so the countdown resets on activity
-# instead of being an absolute window from login.
+SESSION_ENGINE = (
+    "django.contrib.sessions.backends.cached_db"
+    if os.environ.get("SESSION_STORE", "cache") == "cached_db"
+    else "django.contrib.sessions.backends.cache"
+)
+
+# Idle (rolling) timeout: 60 minutes of inactivity. Instead of
+# SESSION_SAVE_EVERY_REQUEST (one session write per request, HTMX polls
+# included), accounts.middleware.SessionRefreshMiddleware re-stamps the expiry
+# only once the remaining TTL drops below SESSION_REFRESH_THRESHOLD_SECONDS —
+# at most one write per minute per session by default, so the idle timeout
+# stays within one minute of 60. Write/skip counts: `manage.py session_write_stats`.
 SESSION_COOKIE_AGE = 3600  # 60 minutes
-SESSION_SAVE_EVERY_REQUEST = True
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_THRESHOLD_SECONDS = int(
+    os.environ.get("SESSION_REFRESH_THRESHOLD_SECONDS", str(SESSION_COOKIE_AGE - 60))
+)
 
 # End the session when the browser is closed (defense for shared front-desk
 # machines). The cookie becomes a browser-session cookie; the server-side idle
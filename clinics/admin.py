@@ -6,7 +6,7 @@ from .models import (
     ClinicVerification, ClinicBookingSettings, InvitationAuditLog,
     ClinicHoliday, DoctorAvailabilityException,
     DrugFamily, DrugProduct, OrderCatalogItem,
-    ActivityLog,
+    ActivityLog, DailyClinicMetrics,
 )
 
 
@@ -273,6 +273,21 @@ class ActivityLogAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(DailyClinicMetrics)
+class DailyClinicMetricsAdmin(admin.ModelAdmin):
+    """Read-only view of the reporting rollup; fix drift with `rebuild_clinic_metrics`."""
+    list_display = ['date', 'clinic', 'doctor', 'appointments', 'completed', 'cancelled',
+                    'no_show', 'completed_revenue', 'payments_total', 'costs_total']
+    list_filter = ['clinic', 'date']
+    date_hierarchy = 'date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 
 class DrugProductInline(admin.TabularInline):
     model = DrugProduct
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from clinics.metrics import rebuild_clinic
+from clinics.models import Clinic
+
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes the DailyClinicMetrics reporting rollup from appointments, '
+        'payments and approved purchase requests. Run once after deploying the '
+        'rollup (backfill), and to reconcile it after bulk data fixes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clinic', type=int, action='append', dest='clinic_ids',
+            help='Only rebuild this clinic (repeatable). Default: every clinic.',
+        )
+
+    def handle(self, *args, **options):
+        clinics = Clinic.objects.order_by('id')
+        if options['clinic_ids']:
+            clinics = clinics.filter(id__in=options['clinic_ids'])
+
+        total = 0
+        for clinic_id in clinics.values_list('id', flat=True).iterator():
+            rows = rebuild_clinic(clinic_id)
+            total += rows
+            self.stdout.write(f'Clinic {clinic_id}: {rows} rollup row(s).')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} rollup row(s).'))
@@ -0,0 +1,239 @@
+"""
+Daily reporting rollup (DailyClinicMetrics).
+
+Owner, secretary and doctor reports used to re-aggregate every Appointment,
+Payment and PurchaseRequest row in range on each request — for "all time",
+the clinic's whole history. They now sum a handful of rollup rows instead:
+one per (clinic, doctor, day), plus a doctor=NULL row per day carrying
+clinic-level money (payments received, approved purchase costs).
+
+Maintenance
+-----------
+- ``clinics/signals.py`` snapshots each tracked row's contribution on load and
+  applies the difference on save/delete as ``F()`` increments, inside the
+  writer's transaction — a rolled-back write never moves the rollup and
+  concurrent writers never overwrite each other.
+- Bulk writers that bypass signals call ``apply_appointment_transitions``
+  (the no-show sweeper does).
+- ``manage.py rebuild_clinic_metrics`` recomputes from source rows (initial
+  backfill, and to reconcile after raw SQL or cascade deletes of users).
+
+Completed revenue is the service price at the time the visit is completed;
+a later price change does not rewrite history until a rebuild.
+"""
+
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, QuerySet, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from appointments.models import Appointment, AppointmentType
+from clinics.models import Clinic, DailyClinicMetrics
+
+logger = logging.getLogger(__name__)
+
+STATUS_FIELDS = {
+    Appointment.Status.PENDING: "pending",
+    Appointment.Status.CONFIRMED: "confirmed",
+    Appointment.Status.CHECKED_IN: "checked_in",
+    Appointment.Status.IN_PROGRESS: "in_progress",
+    Appointment.Status.COMPLETED: "completed",
+    Appointment.Status.CANCELLED: "cancelled",
+    Appointment.Status.NO_SHOW: "no_show",
+}
+COUNT_FIELDS = ("appointments", *STATUS_FIELDS.values())
+MONEY_FIELDS = ("completed_revenue", "payments_total", "costs_total")
+
+
+# ============================================
+# DELTAS
+# ============================================
+def _bump(clinic_id, doctor_id, day, deltas):
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+    row = DailyClinicMetrics.objects.filter(clinic_id=clinic_id, doctor_id=doctor_id, date=day)
+    increments = {field: F(field) + value for field, value in deltas.items()}
+    if row.update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            DailyClinicMetrics.objects.create(
+                clinic_id=clinic_id, doctor_id=doctor_id, date=day, **deltas
+            )
+    except IntegrityError:
+        # Another writer created the row between our UPDATE and INSERT.
+        row.update(**increments)
+
+
+def apply_contributions(old, new):
+    """Apply ``new - old``; both map (clinic_id, doctor_id, day) → {field: value}."""
+    merged = defaultdict(lambda: defaultdict(int))
+    for key, fields in new.items():
+        for field, value in fields.items():
+            merged[key][field] += value
+    for key, fields in old.items():
+        for field, value in fields.items():
+            merged[key][field] -= value
+    for (clinic_id, doctor_id, day), deltas in merged.items():
+        _bump(clinic_id, doctor_id, day, deltas)
+
+
+def appointment_state(appointment):
+    """The fields of ``appointment`` the rollup depends on, or None if any is deferred."""
+    values = appointment.__dict__
+    fields = ("clinic_id", "doctor_id", "appointment_date", "status", "appointment_type_id")
+    if not all(f in values for f in fields):
+        return None
+    return tuple(values[f] for f in fields)
+
+
+def appointment_contribution(states):
+    """Contribution map for an iterable of appointment states."""
+    states = [s for s in states if s is not None]
+    type_ids = {s[4] for s in states if s[3] == Appointment.Status.COMPLETED and s[4]}
+    prices = (
+        dict(AppointmentType.objects.filter(pk__in=type_ids).values_list("pk", "price"))
+        if type_ids else {}
+    )
+    contribution = defaultdict(lambda: defaultdict(int))
+    for clinic_id, doctor_id, day, status, type_id in states:
+        fields = contribution[(clinic_id, doctor_id, day)]
+        fields["appointments"] += 1
+        fields[STATUS_FIELDS[status]] += 1
+        if status == Appointment.Status.COMPLETED:
+            fields["completed_revenue"] += prices.get(type_id) or Decimal("0")
+    return contribution
+
+
+def apply_appointment_transitions(transitions):
+    """Rollup update for bulk writers: ``transitions`` is an iterable of
+    (old_state, new_state) pairs as returned by ``appointment_state``; either
+    side may be None for a created / deleted appointment."""
+    transitions = [(old, new) for old, new in transitions if old != new]
+    if transitions:
+        apply_contributions(
+            appointment_contribution(old for old, _new in transitions),
+            appointment_contribution(new for _old, new in transitions),
+        )
+
+
+def money_contribution(clinic_id, moment, field, amount):
+    """Clinic-level money contribution (doctor=NULL row) for one Payment or PurchaseRequest."""
+    if moment is None or not amount:
+        return {}
+    return {(clinic_id, None, timezone.localdate(moment)): {field: amount}}
+
+
+def is_clinic_cascade(origin):
+    """True when a delete was started by removing a Clinic (its rollup rows go too)."""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is Clinic
+
+
+# ============================================
+# REBUILD
+# ============================================
+def _source_totals(clinic_id):
+    totals = defaultdict(lambda: defaultdict(int))
+    appts = Appointment.objects.filter(clinic_id=clinic_id)
+    for doctor_id, day, status, n in (
+        appts.values("doctor_id", "appointment_date", "status")
+        .annotate(n=Count("id"))
+        .values_list("doctor_id", "appointment_date", "status", "n")
+    ):
+        fields = totals[(doctor_id, day)]
+        fields["appointments"] += n
+        fields[STATUS_FIELDS[status]] += n
+    for doctor_id, day, revenue in (
+        appts.filter(status=Appointment.Status.COMPLETED, appointment_type__isnull=False)
+        .values("doctor_id", "appointment_date")
+        .annotate(s=Sum("appointment_type__price"))
+        .values_list("doctor_id", "appointment_date", "s")
+    ):
+        totals[(doctor_id, day)]["completed_revenue"] = revenue
+
+    from secretary.models import Payment, PurchaseRequest
+
+    for day, amount in (
+        Payment.objects.filter(clinic_id=clinic_id)
+        .annotate(day=TruncDate("received_at"))
+        .values("day")
+        .annotate(s=Sum("amount"))
+        .values_list("day", "s")
+    ):
+        totals[(None, day)]["payments_total"] = amount
+    for day, amount in (
+        PurchaseRequest.objects.filter(
+            clinic_id=clinic_id,
+            status=PurchaseRequest.Status.APPROVED,
+            reviewed_at__isnull=False,
+        )
+        .annotate(day=TruncDate("reviewed_at"))
+        .values("day")
+        .annotate(s=Sum("total"))
+        .values_list("day", "s")
+    ):
+        totals[(None, day)]["costs_total"] = amount
+    return totals
+
+
+def rebuild_clinic(clinic_id):
+    """Replace a clinic's rollup rows with totals recomputed from source rows.
+
+    Deleting first locks the existing rows, so a concurrent writer's delta
+    either lands before the recount (and is included) or after it (and is
+    applied on top). Returns the number of rows written.
+    """
+    for attempt in (1, 2):
+        try:
+            with transaction.atomic():
+                DailyClinicMetrics.objects.filter(clinic_id=clinic_id).delete()
+                rows = [
+                    DailyClinicMetrics(clinic_id=clinic_id, doctor_id=doctor_id, date=day, **fields)
+                    for (doctor_id, day), fields in _source_totals(clinic_id).items()
+                ]
+                DailyClinicMetrics.objects.bulk_create(rows, batch_size=1000)
+            return len(rows)
+        except IntegrityError:
+            # A writer inserted a brand-new row mid-rebuild; its delta is in
+            # the source rows now, so one more pass is exact.
+            if attempt == 2:
+                raise
+            logger.warning("[metrics] rebuild of clinic_id=%s raced a writer — retrying", clinic_id)
+
+
+# ============================================
+# QUERIES
+# ============================================
+def metrics_for(clinic_ids=None, date_from=None, date_to=None, doctor_id=None):
+    """Rollup rows for ``clinic_ids`` (all clinics if None), optionally bounded
+    by date and doctor."""
+    qs = DailyClinicMetrics.objects.all()
+    if clinic_ids is not None:
+        qs = qs.filter(clinic_id__in=clinic_ids)
+    if date_from is not None:
+        qs = qs.filter(date__gte=date_from)
+    if date_to is not None:
+        qs = qs.filter(date__lte=date_to)
+    if doctor_id is not None:
+        qs = qs.filter(doctor_id=doctor_id)
+    return qs
+
+
+def totals(qs):
+    """Sum every counter and money column of ``qs`` in one query.
+
+    Returns {"appointments": n, "status_counts": {status: n}, "completed_revenue": …,
+    "payments_total": …, "costs_total": …}.
+    """
+    sums = qs.aggregate(**{f: Sum(f) for f in COUNT_FIELDS + MONEY_FIELDS})
+    return {
+        "appointments": sums["appointments"] or 0,
+        "status_counts": {status: sums[field] or 0 for status, field in STATUS_FIELDS.items()},
+        **{f: sums[f] or Decimal("0") for f in MONEY_FIELDS},
+    }
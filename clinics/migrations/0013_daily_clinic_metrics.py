@@ -0,0 +1,43 @@
+# Generated by Django 6.0.6 on 2026-10-16 19:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinics', '0012_activitylog_report_exported'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyClinicMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('appointments', models.IntegerField(default=0)),
+                ('pending', models.IntegerField(default=0)),
+                ('confirmed', models.IntegerField(default=0)),
+                ('checked_in', models.IntegerField(default=0)),
+                ('in_progress', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('cancelled', models.IntegerField(default=0)),
+                ('no_show', models.IntegerField(default=0)),
+                ('completed_revenue', models.DecimalField(decimal_places=2, default=0, help_text='Service price of appointments completed on this day.', max_digits=12)),
+                ('payments_total', models.DecimalField(decimal_places=2, default=0, help_text='Payments received on this day (doctor=NULL row only).', max_digits=12)),
+                ('costs_total', models.DecimalField(decimal_places=2, default=0, help_text='Purchase requests approved on this day (doctor=NULL row only).', max_digits=12)),
+                ('clinic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_metrics', to='clinics.clinic')),
+                ('doctor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_clinic_metrics', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Daily Clinic Metrics',
+                'verbose_name_plural': 'Daily Clinic Metrics',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['clinic', 'date'], name='metrics_clinic_date_idx'), models.Index(fields=['doctor', 'date'], name='metrics_doctor_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('clinic', 'doctor', 'date'), name='unique_daily_clinic_metrics', nulls_distinct=False)],
+            },
+        ),
+    ]
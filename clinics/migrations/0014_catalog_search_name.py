@@ -0,0 +1,40 @@
+from django.db import migrations, models
+
+from core.search_text import normalize_name
+
+
+def populate_search_names(apps, schema_editor):
+    """Fold the names of existing catalog rows (historical models have no save() hook)."""
+    DrugProduct = apps.get_model("clinics", "DrugProduct")
+    OrderCatalogItem = apps.get_model("clinics", "OrderCatalogItem")
+
+    products = list(DrugProduct.objects.only("id", "generic_name", "commercial_name"))
+    for product in products:
+        product.search_name = normalize_name(f"{product.generic_name} {product.commercial_name}")
+    DrugProduct.objects.bulk_update(products, ["search_name"], batch_size=1000)
+
+    items = list(OrderCatalogItem.objects.only("id", "name"))
+    for item in items:
+        item.search_name = normalize_name(item.name)
+    OrderCatalogItem.objects.bulk_update(items, ["search_name"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("clinics", "0013_daily_clinic_metrics"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="drugproduct",
+            name="search_name",
+            field=models.CharField(blank=True, default="", editable=False, max_length=512),
+        ),
+        migrations.AddField(
+            model_name="ordercatalogitem",
+            name="search_name",
+            field=models.CharField(blank=True, default="", editable=False, max_length=255),
+        ),
+        migrations.RunPython(populate_search_names, migrations.RunPython.noop),
+    ]
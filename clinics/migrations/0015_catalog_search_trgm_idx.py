@@ -0,0 +1,50 @@
+import logging
+
+from django.db import DatabaseError, migrations
+
+logger = logging.getLogger(__name__)
+
+# Created only where pg_trgm can be installed, so they are not part of the
+# model state; doctors/catalog_search.py falls back to its in-memory index
+# when the extension is missing.
+TRIGRAM_INDEXES = [
+    ("drug_search_trgm_idx", "clinics_drugproduct"),
+    ("catalog_item_search_trgm_idx", "clinics_ordercatalogitem"),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            # pg_trgm is a trusted extension (PG 13+): the database owner can create it.
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except DatabaseError as exc:
+            logger.warning("pg_trgm unavailable (%s); catalog search uses the in-memory index", exc)
+            return
+        for name, table in TRIGRAM_INDEXES:
+            cursor.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} USING gin (search_name gin_trgm_ops)"
+            )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for name, _table in TRIGRAM_INDEXES:
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+    # Built CONCURRENTLY so deploying does not block writes to the catalog.
+    atomic = False
+
+    dependencies = [
+        ("clinics", "0014_catalog_search_name"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes, atomic=False),
+    ]
@@ -0,0 +1,27 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinics', '0015_catalog_search_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('INVOICE', 'Invoice'), ('PURCHASE_REQUEST', 'Purchase request'), ('FILE_NUMBER', 'Patient file number')], max_length=20)),
+                ('year', models.PositiveIntegerField()),
+                ('last_value', models.PositiveBigIntegerField(default=0)),
+                ('clinic', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='number_sequences', to='clinics.clinic')),
+            ],
+            options={
+                'verbose_name': 'Number Sequence',
+                'verbose_name_plural': 'Number Sequences',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'clinic', 'year'), name='unique_number_sequence', nulls_distinct=False)],
+            },
+        ),
+    ]
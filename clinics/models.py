@@ -1,4 +1,5 @@
 import uuid
+from datetime import datetime, timedelta
 
 from django.db import models
 from django.conf import settings
@@ -8,6 +9,8 @@ from core.validators.file_validators import (
     validate_file_size,
 )
 
+from core.search_text import normalize_name
+
 
 class Clinic(models.Model):
     """Clinic model - each clinic has a main doctor and staff"""
@@ -567,6 +570,24 @@ class ClinicBookingSettings(models.Model):
         H6 = "6h", "6 hours"
         D1 = "1d", "End of the appointment day"
 
+    # Offset from the appointment start for every timed ``no_show_after``
+    # choice ('1d' is midnight after the day). Shared with the bulk sweeper
+    # (compliance/services/no_show_sweeper.py) so both agree on the cutoff.
+    NO_SHOW_DELTAS = {
+        NoShowAfter.M10: timedelta(minutes=10),
+        NoShowAfter.M15: timedelta(minutes=15),
+        NoShowAfter.M30: timedelta(minutes=30),
+        NoShowAfter.H1: timedelta(hours=1),
+        NoShowAfter.H2: timedelta(hours=2),
+        NoShowAfter.H4: timedelta(hours=4),
+        NoShowAfter.H6: timedelta(hours=6),
+    }
+
+    @classmethod
+    def no_show_delta(cls, no_show_after):
+        """Offset for a timed ``no_show_after`` value (1 hour if unknown)."""
+        return cls.NO_SHOW_DELTAS.get(no_show_after, cls.NO_SHOW_DELTAS[cls.NoShowAfter.H1])
+
     no_show_after = models.CharField(
         max_length=4,
         choices=NoShowAfter.choices,
@@ -595,17 +616,9 @@ class ClinicBookingSettings(models.Model):
     def no_show_cutoff(self, appt_date, appt_time):
         """Naive-local datetime after which an unattended appointment on
         appt_date/appt_time is a no-show. '1d' = midnight after that day."""
-        from datetime import datetime, timedelta
-        deltas = {
-            "10m": timedelta(minutes=10), "15m": timedelta(minutes=15),
-            "30m": timedelta(minutes=30), "1h": timedelta(hours=1),
-            "2h": timedelta(hours=2), "4h": timedelta(hours=4),
-            "6h": timedelta(hours=6),
-        }
         if self.no_show_after == self.NoShowAfter.D1:
             return datetime.combine(appt_date, datetime.min.time()) + timedelta(days=1)
-        start = datetime.combine(appt_date, appt_time)
-        return start + deltas.get(self.no_show_after, timedelta(hours=1))
+        return datetime.combine(appt_date, appt_time) + self.no_show_delta(self.no_show_after)
 
 
 class ClinicWorkingHours(models.Model):
@@ -832,6 +845,10 @@ class DrugProduct(models.Model):
     default_frequency = models.CharField(max_length=100, blank=True)
     default_duration = models.CharField(max_length=100, blank=True)
     is_active = models.BooleanField(default=True)
+    # Folded "generic commercial" (core/search_text.py), kept in step by
+    # save(); bulk_create / queryset.update() callers must set it themselves.
+    # Trigram-indexed where pg_trgm is available (migration 0015).
+    search_name = models.CharField(max_length=512, blank=True, default="", editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -842,6 +859,16 @@ class DrugProduct(models.Model):
     def __str__(self):
         return f"{self.generic_name} ({self.clinic.name})"
 
+    def build_search_name(self):
+        return normalize_name(f"{self.generic_name} {self.commercial_name}")
+
+    def save(self, *args, **kwargs):
+        self.search_name = self.build_search_name()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"generic_name", "commercial_name"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "search_name"}
+        super().save(*args, **kwargs)
+
 
 class OrderCatalogItem(models.Model):
     """Named catalog items for non-drug order types (Lab, Radiology, Microbiology, Procedure)."""
@@ -858,6 +885,8 @@ class OrderCatalogItem(models.Model):
     category = models.CharField(max_length=20, choices=Category.choices)
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
+    # Folded name (core/search_text.py), kept in step by save().
+    search_name = models.CharField(max_length=255, blank=True, default="", editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -868,3 +897,118 @@ class OrderCatalogItem(models.Model):
 
     def __str__(self):
         return f"[{self.category}] {self.name} ({self.clinic.name})"
+
+    def build_search_name(self):
+        return normalize_name(self.name)
+
+    def save(self, *args, **kwargs):
+        self.search_name = self.build_search_name()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "search_name"}
+        super().save(*args, **kwargs)
+
+
+class DailyClinicMetrics(models.Model):
+    """
+    Per-day reporting rollup for one clinic, keyed by (clinic, doctor, date).
+
+    Appointment counts (total and per status) and completed-visit revenue are
+    attributed to the appointment's doctor; payments received and approved
+    purchase costs are clinic-level and live on the doctor=NULL row.
+
+    Maintained by F() deltas from clinics/signals.py (and the bulk no-show
+    sweeper) in the same transaction as the write; rebuilt from source rows
+    by ``manage.py rebuild_clinic_metrics``. See clinics/metrics.py.
+    """
+
+    clinic = models.ForeignKey(Clinic, on_delete=models.CASCADE, related_name="daily_metrics")
+    doctor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="daily_clinic_metrics",
+    )
+    date = models.DateField()
+
+    appointments = models.IntegerField(default=0)
+    pending = models.IntegerField(default=0)
+    confirmed = models.IntegerField(default=0)
+    checked_in = models.IntegerField(default=0)
+    in_progress = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+    no_show = models.IntegerField(default=0)
+
+    completed_revenue = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0,
+        help_text="Service price of appointments completed on this day.",
+    )
+    payments_total = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0,
+        help_text="Payments received on this day (doctor=NULL row only).",
+    )
+    costs_total = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0,
+        help_text="Purchase requests approved on this day (doctor=NULL row only).",
+    )
+
+    class Meta:
+        verbose_name = "Daily Clinic Metrics"
+        verbose_name_plural = "Daily Clinic Metrics"
+        ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["clinic", "doctor", "date"],
+                nulls_distinct=False,
+                name="unique_daily_clinic_metrics",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["clinic", "date"], name="metrics_clinic_date_idx"),
+            models.Index(fields=["doctor", "date"], name="metrics_doctor_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.clinic.name} / {self.doctor_id or '-'} @ {self.date}"
+
+
+class NumberSequence(models.Model):
+    """
+    Counter behind one series of document numbers: invoices and purchase
+    requests (global per year, clinic=NULL) and patient file numbers (per
+    clinic and year). ``last_value`` is the last number handed out; it is only
+    advanced by clinics/sequences.py, with one atomic UPDATE … RETURNING.
+    """
+
+    class Kind(models.TextChoices):
+        INVOICE = "INVOICE", "Invoice"
+        PURCHASE_REQUEST = "PURCHASE_REQUEST", "Purchase request"
+        FILE_NUMBER = "FILE_NUMBER", "Patient file number"
+
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    clinic = models.ForeignKey(
+        Clinic,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="number_sequences",
+    )
+    year = models.PositiveIntegerField()
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Number Sequence"
+        verbose_name_plural = "Number Sequences"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "clinic", "year"],
+                nulls_distinct=False,
+                name="unique_number_sequence",
+            )
+        ]
+
+    def __str__(self):
+        scope = f"clinic {self.clinic_id}" if self.clinic_id else "global"
+        return f"{self.kind} {self.year} ({scope}): {self.last_value}"
@@ -0,0 +1,112 @@
+"""
+Race-free document numbers (NumberSequence).
+
+Invoice, purchase-request and patient file numbers used to be derived from
+the existing rows — ``ORDER BY number DESC LIMIT 1`` + 1, or ``COUNT(*) + 1``
+— so two concurrent writers could pick the same number and the callers had
+to retry on unique-constraint failures. Each series now has a counter row,
+advanced with a single ``UPDATE … SET last_value = last_value + n …
+RETURNING last_value``:
+
+- In-transaction (default): the UPDATE runs in the caller's transaction and
+  holds the counter row until it commits, so concurrent writers get
+  consecutive numbers and a rolled-back write gives its number back — the
+  series stays gapless.
+- Block pre-allocation (opt-in per kind via NUMBER_SEQUENCE_BLOCK_SIZES,
+  e.g. ``{"INVOICE": 20}``): each worker process reserves ``n`` numbers at
+  a time on a separate autocommit connection and hands them out from
+  memory, so busy writers do not queue on the counter row. Numbers stay
+  unique but may be out of order across workers, and numbers reserved by a
+  process that exits (or by a rolled-back write) are skipped.
+
+A series' counter row is created on first use, seeded by the caller from
+the numbers already issued, so it continues after them.
+"""
+
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .models import NumberSequence
+
+_blocks = {}
+_blocks_lock = threading.Lock()
+
+
+def _block_size(kind):
+    return max(1, int(getattr(settings, "NUMBER_SEQUENCE_BLOCK_SIZES", {}).get(kind, 1)))
+
+
+def _advance(connection, kind, year, clinic_id, count, seed):
+    """Add ``count`` to the counter on ``connection``; return the new last value."""
+    table = connection.ops.quote_name(NumberSequence._meta.db_table)
+    if clinic_id is None:
+        scope, params = "clinic_id IS NULL", [kind, year]
+    else:
+        scope, params = "clinic_id = %s", [kind, year, clinic_id]
+    update = (
+        f"UPDATE {table} SET last_value = last_value + %s "
+        f"WHERE kind = %s AND year = %s AND {scope} RETURNING last_value"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(update, [count, *params])
+        row = cursor.fetchone()
+        if row is None:
+            # First number of the series: create the counter (a concurrent
+            # creator wins harmlessly), then advance it.
+            cursor.execute(
+                f"INSERT INTO {table} (kind, clinic_id, year, last_value) "
+                f"VALUES (%s, %s, %s, %s) ON CONFLICT DO NOTHING",
+                [kind, clinic_id, year, seed() if seed else 0],
+            )
+            cursor.execute(update, [count, *params])
+            row = cursor.fetchone()
+    return row[0]
+
+
+def allocate(kind, year, clinic_id=None, count=1, seed=None, using=DEFAULT_DB_ALIAS):
+    """Reserve ``count`` consecutive numbers in the caller's transaction.
+
+    Returns the first one. ``seed()`` returns the last number already issued
+    and is only called when the series' counter row does not exist yet.
+    """
+    return _advance(connections[using], kind, year, clinic_id, count, seed) - count + 1
+
+
+def _reserve_block(kind, year, clinic_id, size, seed, using):
+    # A separate connection in autocommit mode: the block is committed at
+    # once, whatever happens to the caller's transaction.
+    connection = connections[using].copy()
+    try:
+        last = _advance(connection, kind, year, clinic_id, size, seed)
+    finally:
+        connection.close()
+    return [last - size + 1, last]
+
+
+def next_value(kind, year, clinic_id=None, seed=None, using=DEFAULT_DB_ALIAS):
+    """The next number of a series, from this process's block when the kind
+    is configured for block pre-allocation."""
+    size = _block_size(kind)
+    if size == 1:
+        return allocate(kind, year, clinic_id, seed=seed, using=using)
+    key = (using, kind, year, clinic_id)
+    with _blocks_lock:
+        block = _blocks.get(key)
+        if block is None or block[0] > block[1]:
+            block = _blocks[key] = _reserve_block(kind, year, clinic_id, size, seed, using)
+        value = block[0]
+        block[0] += 1
+    return value
+
+
+def last_numeric_suffix(numbers, separator="-"):
+    """Largest integer after the last ``separator`` in ``numbers`` (0 if none);
+    seeds a series from the numbers issued before it had a counter."""
+    last = 0
+    for number in numbers:
+        suffix = (number or "").rsplit(separator, 1)[-1]
+        if suffix.isdigit():
+            last = max(last, int(suffix))
+    return last
@@ -230,39 +230,13 @@ def apply_auto_forgiveness(clinic):
     Runs auto-forgiveness logic for a single clinic.
     Only applies if the clinic has auto_forgive_enabled=True.
     """
-    from compliance.services.compliance_service import run_auto_forgiveness as _run_all
-    from compliance.models import PatientClinicCompliance, ComplianceEvent
-    from django.utils import timezone as tz
-    from django.db import transaction as txn
+    from compliance.services.compliance_service import forgive_clinic
 
     settings = get_clinic_compliance_settings(clinic)
     if not settings.auto_forgive_enabled or not settings.auto_forgive_after_days:
         return
 
-    now = tz.now()
-    threshold_date = now - tz.timedelta(days=settings.auto_forgive_after_days)
-
-    with txn.atomic():
-        compliances = PatientClinicCompliance.objects.filter(
-            clinic=clinic,
-            bad_score__gt=0,
-            last_violation_at__lte=threshold_date,
-        )
-        for compliance in compliances:
-            old_score = compliance.bad_score
-            compliance.bad_score = 0
-            compliance.status = 'OK'
-            compliance.blocked_at = None
-            compliance.last_forgiven_at = now
-            compliance.save()
-
-            ComplianceEvent.objects.create(
-                clinic=clinic,
-                patient=compliance.patient,
-                event_type='AUTO_FORGIVENESS',
-                score_change=-old_score,
-                appointment=None,
-            )
+    forgive_clinic(clinic.id, settings.auto_forgive_after_days)
 
 # === Clinic Invitation Services ===
 
@@ -0,0 +1,112 @@
+"""
+DailyClinicMetrics maintenance (see clinics/metrics.py).
+
+Each tracked model remembers its rollup contribution when loaded; on save the
+difference to the new contribution is applied, on delete the contribution is
+removed. Deletes cascading from a Clinic are skipped — its rollup rows are
+deleted by the same cascade.
+"""
+
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from appointments.models import Appointment
+from secretary.models import Payment, PurchaseRequest
+
+from . import metrics
+
+
+# ── Appointments ─────────────────────────────────────────────────────────────
+@receiver(post_init, sender=Appointment)
+def remember_appointment_metrics(sender, instance, **kwargs):
+    instance._metrics_state = metrics.appointment_state(instance) if instance.pk else None
+
+
+@receiver(pre_save, sender=Appointment)
+def load_deferred_appointment_metrics(sender, instance, **kwargs):
+    # Loaded with .only()/.defer(): read the stored state before it is overwritten.
+    if instance.pk and not instance._state.adding and instance._metrics_state is None:
+        row = (
+            Appointment.objects.filter(pk=instance.pk)
+            .values_list("clinic_id", "doctor_id", "appointment_date", "status", "appointment_type_id")
+            .first()
+        )
+        instance._metrics_state = tuple(row) if row else None
+
+
+@receiver(post_save, sender=Appointment)
+def update_appointment_metrics(sender, instance, created, **kwargs):
+    old = None if created else instance._metrics_state
+    new = metrics.appointment_state(instance)
+    if new is None:  # saved with update_fields on a deferred instance
+        new = (
+            Appointment.objects.filter(pk=instance.pk)
+            .values_list("clinic_id", "doctor_id", "appointment_date", "status", "appointment_type_id")
+            .first()
+        )
+        new = tuple(new) if new else None
+    metrics.apply_appointment_transitions([(old, new)])
+    instance._metrics_state = new
+
+
+@receiver(post_delete, sender=Appointment)
+def remove_appointment_metrics(sender, instance, origin=None, **kwargs):
+    if not metrics.is_clinic_cascade(origin):
+        metrics.apply_appointment_transitions([(metrics.appointment_state(instance), None)])
+
+
+# ── Payments (clinic-level revenue collected) ────────────────────────────────
+def _payment_contribution(payment):
+    return metrics.money_contribution(
+        payment.clinic_id, payment.received_at, "payments_total", payment.amount
+    )
+
+
+@receiver(post_init, sender=Payment)
+def remember_payment_metrics(sender, instance, **kwargs):
+    if {"clinic_id", "received_at", "amount"} <= instance.__dict__.keys():
+        instance._metrics_contribution = _payment_contribution(instance) if instance.pk else {}
+
+
+@receiver(post_save, sender=Payment)
+def update_payment_metrics(sender, instance, created, **kwargs):
+    old = {} if created else getattr(instance, "_metrics_contribution", {})
+    new = _payment_contribution(instance)
+    metrics.apply_contributions(old, new)
+    instance._metrics_contribution = new
+
+
+@receiver(post_delete, sender=Payment)
+def remove_payment_metrics(sender, instance, origin=None, **kwargs):
+    if not metrics.is_clinic_cascade(origin):
+        metrics.apply_contributions(_payment_contribution(instance), {})
+
+
+# ── Purchase requests (clinic-level approved costs) ──────────────────────────
+def _purchase_contribution(purchase_request):
+    if purchase_request.status != PurchaseRequest.Status.APPROVED:
+        return {}
+    return metrics.money_contribution(
+        purchase_request.clinic_id, purchase_request.reviewed_at, "costs_total",
+        purchase_request.total,
+    )
+
+
+@receiver(post_init, sender=PurchaseRequest)
+def remember_purchase_metrics(sender, instance, **kwargs):
+    if {"clinic_id", "status", "reviewed_at", "total"} <= instance.__dict__.keys():
+        instance._metrics_contribution = _purchase_contribution(instance) if instance.pk else {}
+
+
+@receiver(post_save, sender=PurchaseRequest)
+def update_purchase_metrics(sender, instance, created, **kwargs):
+    old = {} if created else getattr(instance, "_metrics_contribution", {})
+    new = _purchase_contribution(instance)
+    metrics.apply_contributions(old, new)
+    instance._metrics_contribution = new
+
+
+@receiver(post_delete, sender=PurchaseRequest)
+def remove_purchase_metrics(sender, instance, origin=None, **kwargs):
+    if not metrics.is_clinic_cascade(origin):
+        metrics.apply_contributions(_purchase_contribution(instance), {})
@@ -0,0 +1,139 @@
+"""
+DailyClinicMetrics rollup tests (clinics/metrics.py, clinics/signals.py).
+
+Covers:
+- appointment create / status change / reschedule / delete move the counters
+- completed revenue, payments and approved purchase costs land on the right row
+- the bulk no-show sweeper keeps the rollup in step
+- rebuild_clinic_metrics reproduces the incrementally-maintained rows
+- report views read their counts from the rollup
+"""
+
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from appointments.models import Appointment
+from clinics import metrics
+from clinics.models import DailyClinicMetrics
+from compliance.services.no_show_sweeper import apply_due_no_shows
+from secretary.models import Invoice, Payment, PurchaseRequest
+from secretary.tests import SecretaryTestBase
+
+S = Appointment.Status
+
+
+class DailyClinicMetricsTests(SecretaryTestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.day = date(2030, 3, 4)
+
+    def _appt(self, appt_date=None, status=S.CONFIRMED, appt_time=time(10, 0)):
+        return Appointment.objects.create(
+            patient=self.patient_a, clinic=self.clinic_a, doctor=self.doctor_a,
+            appointment_type=self.appt_type_a, appointment_date=appt_date or self.day,
+            appointment_time=appt_time, status=status,
+        )
+
+    def _row(self, day=None, doctor=True):
+        return DailyClinicMetrics.objects.get(
+            clinic=self.clinic_a, doctor=self.doctor_a if doctor else None, date=day or self.day,
+        )
+
+    def _snapshot(self):
+        return sorted(
+            DailyClinicMetrics.objects.filter(clinic=self.clinic_a).values_list(
+                "doctor_id", "date", *metrics.COUNT_FIELDS, *metrics.MONEY_FIELDS
+            )
+        )
+
+    def test_status_transitions(self):
+        appt = self._appt()
+        self._appt(appt_time=time(11, 0), status=S.CANCELLED)
+        row = self._row()
+        self.assertEqual((row.appointments, row.confirmed, row.cancelled), (2, 1, 1))
+
+        appt.status = S.COMPLETED
+        appt.save()
+        row = self._row()
+        self.assertEqual((row.appointments, row.confirmed, row.completed), (2, 0, 1))
+        self.assertEqual(row.completed_revenue, Decimal("50.00"))
+
+    def test_unchanged_save_costs_no_query(self):
+        appt = self._appt()
+        appt.notes = "follow up in a week"
+        with self.assertNumQueries(1):
+            appt.save(update_fields=["notes"])
+
+    def test_reschedule_and_delete(self):
+        appt = self._appt()
+        new_day = self.day + timedelta(days=1)
+        # A deferred instance still moves the right counters.
+        deferred = Appointment.objects.only("id", "appointment_date").get(pk=appt.pk)
+        deferred.appointment_date = new_day
+        deferred.save(update_fields=["appointment_date"])
+        self.assertEqual(self._row().appointments, 0)
+        self.assertEqual(self._row(new_day).confirmed, 1)
+
+        Appointment.objects.get(pk=appt.pk).delete()
+        self.assertEqual(self._row(new_day).appointments, 0)
+
+    def test_payments_and_costs_on_clinic_row(self):
+        invoice = Invoice.objects.create(
+            clinic=self.clinic_a, patient=self.patient_a, invoice_number="INV-2030-000101",
+            status=Invoice.Status.PAID, subtotal=80, total=80, amount_paid=80,
+            balance_due=0, created_by=self.secretary_a,
+        )
+        Payment.objects.create(
+            invoice=invoice, clinic=self.clinic_a, amount=80, received_by=self.secretary_a,
+        )
+        pr = PurchaseRequest.objects.create(
+            clinic=self.clinic_a, requested_by=self.secretary_a,
+            request_number="PR-2030-000101", title="Gloves", total=30,
+        )
+        today = timezone.localdate()
+        self.assertEqual(self._row(today, doctor=False).costs_total, 0)
+
+        pr.status = PurchaseRequest.Status.APPROVED
+        pr.reviewed_at = timezone.now()
+        pr.save()
+        row = self._row(today, doctor=False)
+        self.assertEqual((row.payments_total, row.costs_total), (Decimal("80"), Decimal("30")))
+
+    def test_bulk_no_show_sweep(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        self._appt(yesterday)
+        self._appt(yesterday, appt_time=time(11, 0))
+        self.assertEqual(apply_due_no_shows(Appointment.objects.filter(clinic=self.clinic_a)), 2)
+        row = self._row(yesterday)
+        self.assertEqual((row.appointments, row.confirmed, row.no_show), (2, 0, 2))
+
+    def test_rebuild_matches_incremental_rows(self):
+        appt = self._appt()
+        self._appt(self.day + timedelta(days=2), status=S.PENDING)
+        appt.status = S.COMPLETED
+        appt.save()
+        incremental = self._snapshot()
+
+        DailyClinicMetrics.objects.all().delete()
+        out = StringIO()
+        call_command("rebuild_clinic_metrics", "--clinic", str(self.clinic_a.id), stdout=out)
+        self.assertIn("Rebuilt 2 rollup row(s)", out.getvalue())
+        self.assertEqual(self._snapshot(), incremental)
+
+    def test_reports_index_reads_rollup(self):
+        today = timezone.localdate()
+        self._appt(today, status=S.COMPLETED)
+        self.client.force_login(self.secretary_a)
+        response = self.client.get(reverse("secretary:reports_index"))
+        self.assertEqual(response.context["stats"]["today_completed"], 1)
+
+        # Counts come from the rollup, not from re-scanning appointments.
+        DailyClinicMetrics.objects.filter(clinic=self.clinic_a, date=today).update(completed=7)
+        response = self.client.get(reverse("secretary:reports_index"))
+        self.assertEqual(response.context["stats"]["today_completed"], 7)
@@ -0,0 +1,132 @@
+"""
+Document-number allocation (clinics/sequences.py, NumberSequence).
+
+Covers:
+- invoice / purchase-request / file-number series continue after numbers
+  issued before the series had a counter, per year and (file numbers) per
+  clinic
+- an allocation rolled back with its transaction is handed out again, and
+  registering an already-registered patient allocates nothing
+- no duplicates when many threads allocate at once, in-transaction and with
+  per-process block pre-allocation
+"""
+
+import threading
+from functools import partial
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from clinics import sequences
+from clinics.models import Clinic, NumberSequence
+from patients.models import ClinicPatient
+from secretary.billing import generate_invoice_number
+from secretary.models import Invoice
+from secretary.procurement import generate_request_number
+from secretary.views import _generate_file_number
+
+User = get_user_model()
+
+
+def _clinic(n):
+    owner = User.objects.create_user(phone=f"05981000{n:02d}", name=f"Owner {n}", role="MAIN_DOCTOR")
+    return Clinic.objects.create(name=f"Seq {n}", address="-", main_doctor=owner)
+
+
+class NumberSequenceTests(TestCase):
+
+    def setUp(self):
+        self.year = timezone.now().year
+        self.clinic_a, self.clinic_b = _clinic(1), _clinic(2)
+
+    def test_series_continue_after_existing_numbers(self):
+        patient = User.objects.create_user(phone="0598100099", name="Patient", role="PATIENT")
+        Invoice.objects.create(
+            clinic=self.clinic_a, patient=patient, invoice_number=f"INV-{self.year}-000041",
+            created_by=self.clinic_a.main_doctor,
+        )
+        self.assertEqual(generate_invoice_number(self.clinic_a), f"INV-{self.year}-000042")
+        self.assertEqual(generate_invoice_number(self.clinic_b), f"INV-{self.year}-000043")
+        self.assertEqual(generate_request_number(self.clinic_a), f"PR-{self.year}-000001")
+
+    def test_file_numbers_are_per_clinic(self):
+        patient = User.objects.create_user(phone="0598100098", name="Patient", role="PATIENT")
+        ClinicPatient.objects.create(clinic=self.clinic_a, patient=patient, file_number=f"{self.year}-0007")
+        self.assertEqual(_generate_file_number(self.clinic_a), f"{self.year}-0008")
+        self.assertEqual(_generate_file_number(self.clinic_b), f"{self.year}-0001")
+        self.assertEqual(
+            NumberSequence.objects.get(kind=NumberSequence.Kind.FILE_NUMBER, clinic=self.clinic_a).last_value, 8,
+        )
+
+    def test_rolled_back_number_is_reused(self):
+        kind = NumberSequence.Kind.INVOICE
+        self.assertEqual(sequences.allocate(kind, 2030), 1)
+        try:
+            with transaction.atomic():
+                self.assertEqual(sequences.allocate(kind, 2030), 2)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(sequences.allocate(kind, 2030, count=3), 2)
+        self.assertEqual(sequences.allocate(kind, 2030), 5)
+
+    def test_existing_registration_allocates_nothing(self):
+        patient = User.objects.create_user(phone="0598100097", name="Patient", role="PATIENT")
+        for _ in range(2):
+            ClinicPatient.objects.get_or_create(
+                clinic=self.clinic_a, patient=patient,
+                defaults={"file_number": partial(_generate_file_number, self.clinic_a)},
+            )
+        self.assertEqual(_generate_file_number(self.clinic_a), f"{self.year}-0002")
+
+
+@skipUnless(connection.vendor == "postgresql", "needs concurrent connections to one database")
+class ConcurrentNumberSequenceTests(TransactionTestCase):
+    THREADS = 16
+    PER_THREAD = 25
+
+    def setUp(self):
+        sequences._blocks.clear()
+        self.clinic = _clinic(3)
+
+    def _race(self):
+        barrier = threading.Barrier(self.THREADS)
+        numbers, errors = [], []
+
+        def worker():
+            try:
+                barrier.wait()
+                for _ in range(self.PER_THREAD):
+                    with transaction.atomic():
+                        numbers.append(generate_invoice_number(self.clinic))
+            except Exception as exc:  # surfaced by the assertion below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        return numbers
+
+    def test_in_transaction_allocation_is_unique_and_gapless(self):
+        numbers = self._race()
+        total = self.THREADS * self.PER_THREAD
+        self.assertEqual(len(set(numbers)), total)
+        self.assertEqual(sorted(int(n.rsplit("-", 1)[1]) for n in numbers), list(range(1, total + 1)))
+
+    @override_settings(NUMBER_SEQUENCE_BLOCK_SIZES={NumberSequence.Kind.INVOICE: 10})
+    def test_block_allocation_is_unique(self):
+        numbers = self._race()
+        self.assertEqual(len(set(numbers)), self.THREADS * self.PER_THREAD)
+        # Every reserved block of ten was handed out in full.
+        self.assertEqual(
+            NumberSequence.objects.get(kind=NumberSequence.Kind.INVOICE).last_value,
+            self.THREADS * self.PER_THREAD,
+        )
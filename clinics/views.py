@@ -1401,8 +1401,8 @@ def reports_view(request):
     from appointments.models import Appointment
     from patients.models import PatientProfile
     from django.db.models import Count, Sum
-    from secretary.models import Payment, PurchaseRequest
     from secretary import billing
+    from clinics import metrics
 
     # ── Clinics ──────────────────────────────────────────────────────────────
     clinics = Clinic.objects.filter(main_doctor=request.user, is_active=True).order_by("name")
@@ -1417,12 +1417,18 @@ def reports_view(request):
     date_range = request.GET.get("date_range", "all_time")
 
     base_qs = Appointment.objects.filter(clinic_id__in=clinic_ids)
-    
+    # Counts, trends and money come from the DailyClinicMetrics rollup
+    # (clinics/metrics.py); base_qs still serves the per-patient / per-hour /
+    # per-service breakdowns the rollup does not carry.
+    scope_clinic_ids = clinic_ids
+    doctor_id = None
+
     if selected_clinic:
         try:
             cid = int(selected_clinic)
             if cid in clinic_ids:
                 base_qs = base_qs.filter(clinic_id=cid)
+                scope_clinic_ids = [cid]
         except ValueError:
             pass
 
@@ -1430,27 +1436,32 @@ def reports_view(request):
         try:
             did = int(selected_doctor)
             base_qs = base_qs.filter(doctor_id=did)
+            doctor_id = did
         except ValueError:
             pass
 
     from datetime import timedelta
+    import calendar
     today_date = timezone.now().date()
+    appt_from, appt_to = None, None
     if date_range == "today":
-        base_qs = base_qs.filter(appointment_date=today_date)
+        appt_from, appt_to = today_date, today_date
     elif date_range == "this_week":
         # simple week starting monday
-        start_of_week = today_date - timedelta(days=today_date.weekday())
-        base_qs = base_qs.filter(appointment_date__gte=start_of_week)
+        appt_from = today_date - timedelta(days=today_date.weekday())
     elif date_range == "this_month":
-        base_qs = base_qs.filter(appointment_date__year=today_date.year, appointment_date__month=today_date.month)
+        appt_from = today_date.replace(day=1)
+        appt_to = today_date.replace(day=calendar.monthrange(today_date.year, today_date.month)[1])
     elif date_range == "last_month":
-        lm_month = today_date.month - 1 or 12
-        lm_year = today_date.year if today_date.month > 1 else today_date.year - 1
-        base_qs = base_qs.filter(appointment_date__year=lm_year, appointment_date__month=lm_month)
+        appt_to = today_date.replace(day=1) - timedelta(days=1)
+        appt_from = appt_to.replace(day=1)
     elif date_range == "ytd":
-        base_qs = base_qs.filter(appointment_date__year=today_date.year)
-    elif date_range == "all_time":
-        pass
+        appt_from, appt_to = _date_type(today_date.year, 1, 1), _date_type(today_date.year, 12, 31)
+    if appt_from is not None:
+        base_qs = base_qs.filter(appointment_date__gte=appt_from)
+    if appt_to is not None:
+        base_qs = base_qs.filter(appointment_date__lte=appt_to)
+    rollup_qs = metrics.metrics_for(scope_clinic_ids, appt_from, appt_to, doctor_id)
 
     # ── Financial window (mirrors the appointment date_range above) ────────────
     # Revenue (collected payments) and costs (approved purchases) respect the
@@ -1470,29 +1481,11 @@ def reports_view(request):
         fin_start, fin_end = None, None
 
     # Financial scope honours the clinic filter (single clinic when selected).
-    fin_clinic_ids = clinic_ids
-    if selected_clinic:
-        try:
-            cid = int(selected_clinic)
-            if cid in clinic_ids:
-                fin_clinic_ids = [cid]
-        except ValueError:
-            pass
+    fin_clinic_ids = scope_clinic_ids
+    finance = metrics.totals(metrics.metrics_for(fin_clinic_ids, fin_start, fin_end))
 
-    payments_qs = Payment.objects.filter(clinic_id__in=fin_clinic_ids)
-    costs_qs = PurchaseRequest.objects.filter(
-        clinic_id__in=fin_clinic_ids, status=PurchaseRequest.Status.APPROVED
-    )
-    if fin_start is not None:
-        payments_qs = payments_qs.filter(
-            received_at__date__gte=fin_start, received_at__date__lte=fin_end
-        )
-        costs_qs = costs_qs.filter(
-            reviewed_at__date__gte=fin_start, reviewed_at__date__lte=fin_end
-        )
-
-    gross_revenue = payments_qs.aggregate(s=Sum("amount"))["s"] or 0
-    total_costs = costs_qs.aggregate(s=Sum("total"))["s"] or 0
+    gross_revenue = finance["payments_total"]
+    total_costs = finance["costs_total"]
     net_revenue = gross_revenue - total_costs
 
     # Total outstanding patient debt — live running balance, NOT period-filtered.
@@ -1504,15 +1497,14 @@ def reports_view(request):
     all_doctors = ClinicStaff.objects.filter(clinic_id__in=clinic_ids, role="DOCTOR", is_active=True).select_related("user").order_by("user__name")
 
     # ── KPI totals ────────────────────────────────────────────────────────────
-    total_appointments    = base_qs.count()
+    rollup = metrics.totals(rollup_qs)
+    total_appointments    = rollup["appointments"]
     total_unique_patients = base_qs.values("patient").distinct().count()
     total_active_doctors  = ClinicStaff.objects.filter(
         clinic_id__in=clinic_ids, role="DOCTOR", is_active=True
     ).count()
 
-    status_counts = dict(
-        base_qs.values("status").annotate(n=Count("id")).values_list("status", "n")
-    )
+    status_counts = {status: n for status, n in rollup["status_counts"].items() if n}
     completed = status_counts.get("COMPLETED", 0)
     cancelled = status_counts.get("CANCELLED", 0)
     no_show   = status_counts.get("NO_SHOW", 0)
@@ -1532,22 +1524,22 @@ def reports_view(request):
     today = timezone.now().date()
     months_seq = [_months_ago(today, i) for i in range(11, -1, -1)]
     monthly_raw = (
-        base_qs
-        .filter(appointment_date__gte=months_seq[0])
-        .values("appointment_date__year", "appointment_date__month")
-        .annotate(n=Count("id"))
+        rollup_qs
+        .filter(date__gte=months_seq[0])
+        .values("date__year", "date__month")
+        .annotate(n=Sum("appointments"))
     )
-    monthly_dict   = {(r["appointment_date__year"], r["appointment_date__month"]): r["n"] for r in monthly_raw}
+    monthly_dict   = {(r["date__year"], r["date__month"]): r["n"] for r in monthly_raw}
     monthly_labels = [f"{_ARABIC_MONTHS[m.month]} {m.year}" for m in months_seq]
     monthly_data   = [monthly_dict.get((m.year, m.month), 0) for m in months_seq]
 
     # ── Day-of-week distribution (week_day: 1=Sun … 7=Sat) ───────────────────
     dow_raw = (
-        base_qs
-        .values("appointment_date__week_day")
-        .annotate(n=Count("id"))
+        rollup_qs
+        .values("date__week_day")
+        .annotate(n=Sum("appointments"))
     )
-    dow_map    = {r["appointment_date__week_day"]: r["n"] for r in dow_raw}
+    dow_map    = {r["date__week_day"]: r["n"] for r in dow_raw}
     arabic_days = [
         _("الأحد"), _("الإثنين"), _("الثلاثاء"), _("الأربعاء"),
         _("الخميس"), _("الجمعة"), _("السبت"),
@@ -1567,10 +1559,11 @@ def reports_view(request):
 
     # ── Top doctors ───────────────────────────────────────────────────────────
     doctor_qs = (
-        base_qs
+        rollup_qs
         .exclude(doctor=None)
         .values("doctor__name")
-        .annotate(n=Count("id"))
+        .annotate(n=Sum("appointments"))
+        .filter(n__gt=0)
         .order_by("-n")[:10]
     )
     doctor_labels = [r["doctor__name"] for r in doctor_qs]
@@ -1617,7 +1610,7 @@ def reports_view(request):
         .annotate(count=Count("id"))
         .order_by("-count")[:8]
     )
-    total_revenue = sum(float(r["appointment_type__price"]) * r["count"] for r in revenue_qs)
+    total_revenue = float(rollup["completed_revenue"])
     revenue_by_type = sorted(
         [
             {
@@ -1632,13 +1625,20 @@ def reports_view(request):
     )
 
     # ── Per-clinic breakdown ──────────────────────────────────────────────────
+    per_clinic = {
+        r["clinic_id"]: r
+        for r in rollup_qs.values("clinic_id").annotate(
+            total=Sum("appointments"), done=Sum("completed"),
+            can=Sum("cancelled"), ns=Sum("no_show"),
+        )
+    }
     clinic_stats = []
     for c in clinics:
-        c_qs    = base_qs.filter(clinic=c)
-        c_total = c_qs.count()
-        c_done  = c_qs.filter(status="COMPLETED").count()
-        c_can   = c_qs.filter(status="CANCELLED").count()
-        c_ns    = c_qs.filter(status="NO_SHOW").count()
+        row     = per_clinic.get(c.id, {})
+        c_total = row.get("total") or 0
+        c_done  = row.get("done") or 0
+        c_can   = row.get("can") or 0
+        c_ns    = row.get("ns") or 0
         c_docs  = ClinicStaff.objects.filter(clinic=c, role="DOCTOR",    is_active=True).count()
         c_secs  = ClinicStaff.objects.filter(clinic=c, role="SECRETARY", is_active=True).count()
         clinic_stats.append({
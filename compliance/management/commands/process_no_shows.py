@@ -1,15 +1,34 @@
+import time
+
 from django.core.management.base import BaseCommand
-from appointments.models import Appointment
-from compliance.services.compliance_service import apply_due_no_shows
+from compliance.services.no_show_sweeper import NO_SHOW_SWEEP_INTERVAL_SECONDS, sweep_all_clinics
 
 class Command(BaseCommand):
-    help = 'Backstop sweep: marks overdue appointments as no-shows per each clinic setting.'
-
-    def handle(self, *args, **kwargs):
-        self.stdout.write("Starting no-show processing...")
-        before = Appointment.objects.filter(status=Appointment.Status.NO_SHOW).count()
-        apply_due_no_shows(Appointment.objects.all())
-        after = Appointment.objects.filter(status=Appointment.Status.NO_SHOW).count()
-        self.stdout.write(self.style.SUCCESS(
-            f'Successfully processed and marked {after - before} new no-show appointments.'
-        ))
+    help = (
+        'Marks overdue appointments as no-shows per each clinic setting. '
+        'With --loop, keeps sweeping every --interval seconds (background sweeper).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Run forever, sweeping on an interval.')
+        parser.add_argument('--interval', type=int, default=NO_SHOW_SWEEP_INTERVAL_SECONDS)
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.stdout.write("Starting no-show processing...")
+            count = sweep_all_clinics()
+            self.stdout.write(self.style.SUCCESS(
+                f'Successfully processed and marked {count} new no-show appointments.'
+            ))
+            return
+
+        self.stdout.write(f"No-show sweeper running every {options['interval']}s...")
+        while True:
+            try:
+                count = sweep_all_clinics()
+                if count:
+                    self.stdout.write(f'Marked {count} new no-show appointments.')
+            except Exception as exc:
+                # Keep the loop alive; the next pass retries.
+                self.stderr.write(f'Sweep failed: {exc!r}')
+            time.sleep(options['interval'])
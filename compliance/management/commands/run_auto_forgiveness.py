@@ -1,10 +1,24 @@
 from django.core.management.base import BaseCommand
-from compliance.services.compliance_service import run_auto_forgiveness
+from compliance.services.compliance_service import AUTO_FORGIVENESS_BATCH_SIZE, run_auto_forgiveness
 
 class Command(BaseCommand):
-    help = 'Runs the auto-forgiveness logic for all clinics with the setting enabled.'
+    help = (
+        'Runs the auto-forgiveness logic for all clinics with the setting enabled, '
+        'one clinic and one --batch-size chunk per transaction.'
+    )
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=AUTO_FORGIVENESS_BATCH_SIZE)
+
+    def handle(self, *args, **options):
         self.stdout.write("Starting auto-forgiveness processing...")
-        run_auto_forgiveness()
-        self.stdout.write(self.style.SUCCESS('Successfully ran auto-forgiveness check across all clinics.'))
+
+        def progress(clinic_id, forgiven, seconds):
+            if forgiven or options['verbosity'] > 1:
+                self.stdout.write(f'  clinic {clinic_id}: forgave {forgiven} patient(s) in {seconds:.2f}s')
+
+        totals = run_auto_forgiveness(batch_size=options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully ran auto-forgiveness check across {totals['clinics']} clinic(s): "
+            f"forgave {totals['forgiven']} patient(s) in {totals['seconds']:.2f}s."
+        ))
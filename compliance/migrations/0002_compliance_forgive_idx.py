@@ -0,0 +1,20 @@
+# Generated by Django 6.0.6 on 2026-10-16 22:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Built CONCURRENTLY so deploying does not block writes to this table.
+    atomic = False
+
+    dependencies = [
+        ('compliance', '0001_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='patientcliniccompliance',
+            index=models.Index(condition=models.Q(('bad_score__gt', 0)), fields=['clinic', 'last_violation_at'], name='compliance_forgive_idx'),
+        ),
+    ]
@@ -28,6 +28,14 @@ class PatientClinicCompliance(models.Model):
     class Meta:
         unique_together = ('clinic', 'patient')
         verbose_name_plural = 'Patient Clinic Compliances'
+        indexes = [
+            # Nightly auto-forgiveness: a clinic's patients with a score, by last violation.
+            models.Index(
+                fields=['clinic', 'last_violation_at'],
+                name='compliance_forgive_idx',
+                condition=models.Q(bad_score__gt=0),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.patient} at {self.clinic} - {self.status} (Score: {self.bad_score})"
@@ -0,0 +1,83 @@
+"""
+Cached blocked-patient sets for the booking and dashboard read paths.
+
+``is_patient_blocked`` used to go through ``get_or_create_compliance``, so
+every booking attempt by a clean patient could INSERT a PatientClinicCompliance
+row just to learn "not blocked". Reads now check a per-clinic set of blocked
+patients' user ids kept in the default cache (Redis in production):
+
+    compliance:blocked:<clinic_id>   → frozenset of patient user ids
+
+Keyed by user id so callers holding only the user (booking) need no
+PatientProfile lookup; a user without a profile has no compliance row and is
+never blocked.
+
+- A miss rebuilds the clinic's set with one read-only query and caches it.
+- Writers that can move a patient into or out of BLOCKED — ``record_no_show``,
+  ``apply_manual_waiver``, auto-forgiveness and the bulk no-show sweeper — call
+  ``invalidate_blocked`` for the clinic. The set is dropped right away and
+  again on commit, so a reader that re-cached it mid-transaction (from
+  pre-commit data) cannot keep it past the commit.
+- Writes that bypass these services (admin edits, cascade deletes) are bounded
+  by COMPLIANCE_BLOCKED_CACHE_TTL_SECONDS.
+
+Fail-open: cache errors fall back to a direct (read-only) query.
+"""
+
+import logging
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from compliance.models import PatientClinicCompliance
+
+logger = logging.getLogger(__name__)
+
+COMPLIANCE_BLOCKED_CACHE_TTL_SECONDS = getattr(settings, "COMPLIANCE_BLOCKED_CACHE_TTL_SECONDS", 5 * 60)
+
+
+def _key(clinic_id):
+    return f"compliance:blocked:{clinic_id}"
+
+
+def _load(clinic_id):
+    return frozenset(
+        PatientClinicCompliance.objects.filter(clinic_id=clinic_id, status="BLOCKED")
+        .values_list("patient__user_id", flat=True)
+    )
+
+
+def blocked_patient_ids(clinic_id):
+    """User ids of the patients currently BLOCKED in ``clinic_id``."""
+    try:
+        blocked = cache.get(_key(clinic_id))
+    except Exception:
+        logger.warning("[compliance-cache] cache read failed — querying directly")
+        return _load(clinic_id)
+    if blocked is None:
+        blocked = _load(clinic_id)
+        try:
+            cache.set(_key(clinic_id), blocked, timeout=COMPLIANCE_BLOCKED_CACHE_TTL_SECONDS)
+        except Exception:
+            logger.warning("[compliance-cache] cache write failed for clinic_id=%s", clinic_id)
+    return blocked
+
+
+def is_blocked(clinic_id, patient_user_id):
+    return patient_user_id in blocked_patient_ids(clinic_id)
+
+
+def _drop(clinic_ids):
+    try:
+        cache.delete_many([_key(c) for c in clinic_ids])
+    except Exception:
+        logger.warning("[compliance-cache] invalidation failed for clinics %s", sorted(clinic_ids))
+
+
+def invalidate_blocked(*clinic_ids):
+    """Drop the cached sets of ``clinic_ids`` now and when the current transaction commits."""
+    if clinic_ids:
+        _drop(set(clinic_ids))
+        transaction.on_commit(partial(_drop, set(clinic_ids)))
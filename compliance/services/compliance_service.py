@@ -1,9 +1,19 @@
+import logging
+import time
+
+from django.conf import settings as django_settings
 from django.utils import timezone
 from compliance.models import PatientClinicCompliance, ComplianceEvent, ClinicComplianceSettings
 from clinics.models import Clinic
 from patients.models import PatientProfile
 from appointments.models import Appointment
 from django.db import transaction
+# Set-based bulk sweep; re-exported here for existing callers.
+from compliance.services.no_show_sweeper import apply_due_no_shows  # noqa: F401
+from compliance.services import blocked_cache
+from patients.visit_stats import refresh_blocked
+
+logger = logging.getLogger(__name__)
 
 def get_or_create_compliance(clinic: Clinic, patient: PatientProfile) -> PatientClinicCompliance:
     """
@@ -22,18 +32,16 @@ def get_or_create_compliance(clinic: Clinic, patient: PatientProfile) -> Patient
 def is_patient_blocked(clinic: Clinic, patient: PatientProfile) -> bool:
     """
     Returns True if the patient is blocked in the given clinic.
+    Read-only: checks the clinic's cached blocked set, never creates a row.
     """
-    compliance = get_or_create_compliance(clinic, patient)
-    return compliance.status == 'BLOCKED'
+    return blocked_cache.is_blocked(clinic.id, patient.user_id)
 
 def count_blocked_patients(clinic: Clinic) -> int:
     """
     Returns the number of patients currently BLOCKED in the given clinic.
     Shared by the clinic-owner dashboard and the secretary banner/list.
     """
-    return PatientClinicCompliance.objects.filter(
-        clinic=clinic, status='BLOCKED'
-    ).count()
+    return len(blocked_cache.blocked_patient_ids(clinic.id))
 
 @transaction.atomic
 def record_no_show(clinic: Clinic, patient: PatientProfile, appointment: Appointment = None) -> PatientClinicCompliance:
@@ -150,51 +158,83 @@ def process_appointment_no_show(appointment: Appointment):
             pass
 
 
-def apply_due_no_shows(appointments_qs):
-    """
-    Mark every overdue PENDING/CONFIRMED appointment in the queryset as
-    NO_SHOW (idempotent). Call before listing/filtering appointments so the
-    displayed/queried status is accurate without relying on the cron command.
-    """
-    candidates = appointments_qs.filter(
-        status__in=[Appointment.Status.PENDING, Appointment.Status.CONFIRMED],
-        appointment_date__lte=timezone.localtime(timezone.now()).date(),
-    ).select_related("clinic")
-    for appointment in candidates:
-        process_appointment_no_show(appointment)
+# Compliance rows forgiven per transaction. Each batch is one UPDATE plus one
+# bulk INSERT of events and commits on its own, so the nightly run never holds
+# locks across clinics and bookings reading compliance are not blocked by it.
+AUTO_FORGIVENESS_BATCH_SIZE = getattr(django_settings, "AUTO_FORGIVENESS_BATCH_SIZE", 500)
 
-@transaction.atomic
-def run_auto_forgiveness():
+
+def forgive_clinic(clinic_id, after_days, now=None, batch_size=None):
     """
-    Loops through all clinics and applies auto_forgiveness to patients according to clinic settings.
+    Auto-forgives one clinic: every patient whose last violation is at least
+    ``after_days`` old gets score 0 / OK and an AUTO_FORGIVENESS event.
+
+    Works in id batches of ``batch_size`` rows, one short transaction each.
+    Rows locked by a concurrent write (e.g. a no-show being recorded) are
+    skipped and picked up on the next run. Returns the number forgiven.
     """
-    clinics_with_auto_forgive = ClinicComplianceSettings.objects.filter(auto_forgive_enabled=True, auto_forgive_after_days__isnull=False)
-    
-    now = timezone.now()
-    
-    for settings in clinics_with_auto_forgive:
-        threshold_date = now - timezone.timedelta(days=settings.auto_forgive_after_days)
-        
-        # Find compliant users who have a bad score, are not blocked (or maybe blocked too, but usually forgiveness is applied to warn status),
-        # but the prompt didn't specify excluding blocks. Let's apply to anyone with a bad score.
-        compliances_to_forgive = PatientClinicCompliance.objects.filter(
-            clinic=settings.clinic,
-            bad_score__gt=0,
-            last_violation_at__lte=threshold_date
-        )
-        
-        for compliance in compliances_to_forgive:
-            old_score = compliance.bad_score
-            compliance.bad_score = 0
-            compliance.status = 'OK'
-            compliance.blocked_at = None
-            compliance.last_forgiven_at = now
-            compliance.save()
-            
-            ComplianceEvent.objects.create(
-                clinic=settings.clinic,
-                patient=compliance.patient,
-                event_type='AUTO_FORGIVENESS',
-                score_change=-old_score,
-                appointment=None
+    now = now or timezone.now()
+    batch_size = batch_size or AUTO_FORGIVENESS_BATCH_SIZE
+    eligible = PatientClinicCompliance.objects.filter(
+        clinic_id=clinic_id,
+        bad_score__gt=0,
+        last_violation_at__lte=now - timezone.timedelta(days=after_days),
+    )
+    forgiven = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                eligible.select_for_update(skip_locked=True)
+                .order_by('id')
+                .values_list('id', 'patient_id', 'bad_score', 'status')[:batch_size]
             )
+            if rows:
+                unblocked = [patient_id for _id, patient_id, _score, status in rows if status == 'BLOCKED']
+                if unblocked:
+                    blocked_cache.invalidate_blocked(clinic_id)
+                PatientClinicCompliance.objects.filter(pk__in=[r[0] for r in rows]).update(
+                    bad_score=0, status='OK', blocked_at=None, last_forgiven_at=now, updated_at=now,
+                )
+                refresh_blocked(clinic_id, unblocked)
+                ComplianceEvent.objects.bulk_create([
+                    ComplianceEvent(
+                        clinic_id=clinic_id,
+                        patient_id=patient_id,
+                        event_type='AUTO_FORGIVENESS',
+                        score_change=-old_score,
+                        appointment=None,
+                    )
+                    for _id, patient_id, old_score, _status in rows
+                ])
+        forgiven += len(rows)
+        if len(rows) < batch_size:
+            return forgiven
+
+
+def run_auto_forgiveness(batch_size=None, progress=None):
+    """
+    Applies auto-forgiveness to every clinic that has it enabled, one clinic
+    (and one batch) at a time — see ``forgive_clinic``.
+
+    ``progress(clinic_id, forgiven, seconds)`` is called after each clinic.
+    Returns {"clinics": n, "forgiven": n, "seconds": s}.
+    """
+    started = time.monotonic()
+    now = timezone.now()
+    clinics = ClinicComplianceSettings.objects.filter(
+        auto_forgive_enabled=True, auto_forgive_after_days__isnull=False
+    ).order_by('clinic_id').values_list('clinic_id', 'auto_forgive_after_days')
+
+    totals = {"clinics": 0, "forgiven": 0}
+    for clinic_id, after_days in clinics:
+        clinic_started = time.monotonic()
+        forgiven = forgive_clinic(clinic_id, after_days, now=now, batch_size=batch_size)
+        elapsed = time.monotonic() - clinic_started
+        totals["clinics"] += 1
+        totals["forgiven"] += forgiven
+        if forgiven:
+            logger.info("[auto-forgive] clinic=%s forgave %s patient(s) in %.2fs", clinic_id, forgiven, elapsed)
+        if progress:
+            progress(clinic_id, forgiven, elapsed)
+    totals["seconds"] = round(time.monotonic() - started, 3)
+    return totals
@@ -0,0 +1,252 @@
+"""
+Set-based no-show sweeper.
+
+Flips every overdue PENDING/CONFIRMED appointment to NO_SHOW with one bulk
+UPDATE and applies the compliance penalties in bulk, instead of the per-row
+``process_appointment_no_show`` loop. Runs on a schedule via
+``manage.py process_no_shows --loop``.
+
+Overdue rules are the same as ``process_appointment_no_show``:
+- the cutoff comes from each clinic's ClinicBookingSettings.no_show_after;
+- an unaccepted new-patient request (PENDING with no ClinicPatient row in the
+  clinic) is never a no-show;
+- a penalty is recorded at most once per appointment (NO_SHOW event check),
+  following the same score / threshold / max_score arithmetic as
+  ``record_no_show``.
+
+Read views don't sweep on every GET any more. ``ensure_no_shows_swept`` checks
+a cache watermark: if the background sweeper ran recently it costs one cache
+read; otherwise (sweeper not running, e.g. dev/tests) it falls back to a
+scoped bulk sweep and stamps its own short-lived watermark.
+"""
+
+import logging
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from appointments.models import Appointment
+from clinics.models import ClinicBookingSettings
+from compliance.models import ClinicComplianceSettings, ComplianceEvent, PatientClinicCompliance
+from compliance.services.blocked_cache import invalidate_blocked
+from patients.visit_stats import refresh_blocked
+
+logger = logging.getLogger(__name__)
+
+# How often the background loop sweeps, and so how fresh its watermark is.
+NO_SHOW_SWEEP_INTERVAL_SECONDS = getattr(settings, "NO_SHOW_SWEEP_INTERVAL_SECONDS", 60)
+
+GLOBAL_WATERMARK_KEY = "no_show_sweep:all"
+
+
+def _overdue_q(no_show_after, local_now):
+    """Q matching appointments whose no-show cutoff is before ``local_now``
+    (naive local). Mirrors ClinicBookingSettings.no_show_cutoff."""
+    if no_show_after == ClinicBookingSettings.NoShowAfter.D1:
+        # Cutoff is midnight after the appointment day.
+        return Q(appointment_date__lt=local_now.date())
+    # start + delta < now  ⇔  start < now - delta
+    threshold = local_now - ClinicBookingSettings.no_show_delta(no_show_after)
+    return Q(appointment_date__lt=threshold.date()) | Q(
+        appointment_date=threshold.date(), appointment_time__lt=threshold.time()
+    )
+
+
+def apply_due_no_shows(appointments_qs):
+    """
+    Mark every overdue PENDING/CONFIRMED appointment in the queryset as
+    NO_SHOW and record the compliance penalties. Idempotent.
+
+    Returns the number of appointments flipped.
+    """
+    from patients.models import ClinicPatient
+
+    local_now = timezone.localtime(timezone.now()).replace(tzinfo=None)
+    candidates = appointments_qs.filter(
+        status__in=[Appointment.Status.PENDING, Appointment.Status.CONFIRMED],
+        appointment_date__lte=local_now.date(),
+    )
+    clinic_ids = set(candidates.values_list("clinic_id", flat=True).distinct())
+    if not clinic_ids:
+        return 0
+
+    # One overdue condition per distinct no_show_after value.
+    by_setting = defaultdict(set)
+    configured = dict(
+        ClinicBookingSettings.objects.filter(clinic_id__in=clinic_ids)
+        .values_list("clinic_id", "no_show_after")
+    )
+    for clinic_id in clinic_ids:
+        by_setting[configured.get(clinic_id, ClinicBookingSettings.NoShowAfter.H1)].add(clinic_id)
+    overdue = Q()
+    for no_show_after, ids in by_setting.items():
+        overdue |= Q(clinic_id__in=ids) & _overdue_q(no_show_after, local_now)
+
+    registered = ClinicPatient.objects.filter(
+        clinic_id=OuterRef("clinic_id"), patient_id=OuterRef("patient_id")
+    )
+    due = candidates.filter(overdue).filter(
+        Q(status=Appointment.Status.CONFIRMED) | Q(Exists(registered))
+    )
+
+    with transaction.atomic():
+        rows = list(
+            Appointment.objects.select_for_update(skip_locked=True)
+            .filter(pk__in=due.values("pk"))
+            .values_list(
+                "id", "clinic_id", "patient_id", "doctor_id", "appointment_date",
+                "status", "appointment_type_id",
+            )
+        )
+        if not rows:
+            return 0
+        Appointment.objects.filter(pk__in=[r[0] for r in rows]).update(
+            status=Appointment.Status.NO_SHOW, updated_at=timezone.now()
+        )
+        _record_no_shows_bulk(rows)
+
+        from clinics.metrics import apply_appointment_transitions
+        apply_appointment_transitions(
+            ((clinic_id, doctor_id, day, status, type_id),
+             (clinic_id, doctor_id, day, Appointment.Status.NO_SHOW, type_id))
+            for _id, clinic_id, _patient_id, doctor_id, day, status, type_id in rows
+        )
+
+        from doctors import slot_cache
+        for doctor_id, appt_date in {(r[3], r[4]) for r in rows if r[3]}:
+            transaction.on_commit(partial(slot_cache.invalidate_doctor_day, doctor_id, appt_date))
+
+        from secretary.queue_events import publish_queue_change
+        today = local_now.date()
+        todays = defaultdict(lambda: (set(), set()))
+        for _id, clinic_id, _patient_id, doctor_id, day, status, _type_id in rows:
+            if day == today:
+                todays[clinic_id][0].add(status)
+                todays[clinic_id][1].add(doctor_id)
+        for clinic_id, (statuses, doctor_ids) in todays.items():
+            publish_queue_change(clinic_id, statuses=statuses, doctor_ids=doctor_ids)
+
+    logger.info("[no-show] swept %s appointment(s)", len(rows))
+    return len(rows)
+
+
+def _record_no_shows_bulk(rows):
+    """Bulk equivalent of calling ``record_no_show`` once per flipped appointment.
+
+    ``rows`` are (appointment_id, clinic_id, patient_user_id, ...) tuples.
+    Patients without a PatientProfile are skipped, as in the per-row path.
+    """
+    from patients.models import PatientProfile
+
+    already = set(
+        ComplianceEvent.objects.filter(
+            appointment_id__in=[r[0] for r in rows], event_type="NO_SHOW"
+        ).values_list("appointment_id", flat=True)
+    )
+    profiles = dict(
+        PatientProfile.objects.filter(user_id__in={r[2] for r in rows})
+        .values_list("user_id", "id")
+    )
+    pending = [
+        (appt_id, clinic_id, profiles[user_id])
+        for appt_id, clinic_id, user_id, *_ in rows
+        if appt_id not in already and user_id in profiles
+    ]
+    if not pending:
+        return
+
+    clinic_ids = {clinic_id for _, clinic_id, _ in pending}
+    rules = {s.clinic_id: s for s in ClinicComplianceSettings.objects.filter(clinic_id__in=clinic_ids)}
+    for clinic_id in clinic_ids - rules.keys():
+        rules[clinic_id] = ClinicComplianceSettings.objects.create(clinic_id=clinic_id)
+
+    compliances = {
+        (c.clinic_id, c.patient_id): c
+        for c in PatientClinicCompliance.objects.select_for_update().filter(
+            clinic_id__in=clinic_ids,
+            patient_id__in={profile_id for _, _, profile_id in pending},
+        )
+    }
+    new_compliances = {}
+    events = []
+    newly_blocked = defaultdict(list)
+    now = timezone.now()
+    for appt_id, clinic_id, profile_id in pending:
+        key = (clinic_id, profile_id)
+        compliance = compliances.get(key)
+        if compliance is None:
+            compliance = PatientClinicCompliance(
+                clinic_id=clinic_id, patient_id=profile_id, bad_score=0, status="OK"
+            )
+            compliances[key] = new_compliances[key] = compliance
+        rule = rules[clinic_id]
+        if compliance.bad_score >= rule.max_score:
+            continue
+        new_score = min(compliance.bad_score + rule.score_increment_per_no_show, rule.max_score)
+        events.append(ComplianceEvent(
+            clinic_id=clinic_id,
+            patient_id=profile_id,
+            event_type="NO_SHOW",
+            score_change=new_score - compliance.bad_score,
+            appointment_id=appt_id,
+        ))
+        compliance.bad_score = new_score
+        compliance.last_violation_at = now
+        compliance.updated_at = now
+        if new_score >= rule.score_threshold_block:
+            if compliance.status != "BLOCKED":
+                newly_blocked[clinic_id].append(profile_id)
+            compliance.status = "BLOCKED"
+            compliance.blocked_at = now
+        elif new_score > 0:
+            compliance.status = "WARNED"
+
+    PatientClinicCompliance.objects.bulk_create(new_compliances.values())
+    PatientClinicCompliance.objects.bulk_update(
+        [c for k, c in compliances.items() if k not in new_compliances],
+        ["bad_score", "status", "last_violation_at", "blocked_at", "updated_at"],
+    )
+    ComplianceEvent.objects.bulk_create(events)
+    invalidate_blocked(*newly_blocked)
+    for clinic_id, profile_ids in newly_blocked.items():
+        refresh_blocked(clinic_id, profile_ids)
+
+
+def sweep_all_clinics():
+    """One full background pass; stamps the global watermark on success."""
+    count = apply_due_no_shows(Appointment.objects.all())
+    try:
+        cache.set(GLOBAL_WATERMARK_KEY, timezone.now().timestamp(), timeout=None)
+    except Exception:
+        logger.warning("[no-show] could not write sweep watermark")
+    return count
+
+
+def ensure_no_shows_swept(scope, appointments_qs):
+    """Read-path guard: make sure overdue no-shows in ``appointments_qs`` are
+    persisted before a view lists them.
+
+    Cheap in the common case — one cache read of the background sweeper's
+    watermark. When the watermark is stale (sweeper not running) this runs a
+    bulk sweep over the scoped queryset and suppresses repeats for ``scope``
+    (e.g. "clinic:12") for one sweep interval.
+    """
+    max_age = 2 * NO_SHOW_SWEEP_INTERVAL_SECONDS
+    scope_key = f"no_show_sweep:{scope}"
+    try:
+        marks = cache.get_many([GLOBAL_WATERMARK_KEY, scope_key])
+    except Exception:
+        marks = {}
+    last = marks.get(GLOBAL_WATERMARK_KEY)
+    if scope_key in marks or (last and timezone.now().timestamp() - last < max_age):
+        return
+    apply_due_no_shows(appointments_qs)
+    try:
+        cache.set(scope_key, 1, timeout=NO_SHOW_SWEEP_INTERVAL_SECONDS)
+    except Exception:
+        pass
@@ -1,7 +1,9 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
 from clinics.models import Clinic
-from compliance.models import ClinicComplianceSettings
+from compliance.models import ClinicComplianceSettings, PatientClinicCompliance
+from compliance.services.blocked_cache import invalidate_blocked
+from patients.visit_stats import refresh_blocked
 
 @receiver(post_save, sender=Clinic)
 def create_default_compliance_settings(sender, instance, created, **kwargs):
@@ -10,3 +12,31 @@ def create_default_compliance_settings(sender, instance, created, **kwargs):
     """
     if created:
         ClinicComplianceSettings.objects.get_or_create(clinic=instance)
+
+
+@receiver(post_init, sender=PatientClinicCompliance)
+def remember_blocked_state(sender, instance, **kwargs):
+    status = instance.__dict__.get('status')  # absent when deferred: unknown
+    instance._was_blocked = None if status is None else status == 'BLOCKED'
+
+
+@receiver(post_save, sender=PatientClinicCompliance)
+def refresh_blocked_cache_on_save(sender, instance, created, **kwargs):
+    """
+    Drops the clinic's cached blocked set and updates the patient's roster
+    flag (ClinicPatient.is_blocked) when a save moves the patient into or out
+    of BLOCKED (record_no_show, apply_manual_waiver, admin edits).
+    Bulk writers call invalidate_blocked / refresh_blocked themselves.
+    """
+    blocked = instance.status == 'BLOCKED'
+    if (blocked if created else instance._was_blocked != blocked):
+        invalidate_blocked(instance.clinic_id)
+        refresh_blocked(instance.clinic_id, [instance.patient_id])
+    instance._was_blocked = blocked
+
+
+@receiver(post_delete, sender=PatientClinicCompliance)
+def refresh_blocked_cache_on_delete(sender, instance, **kwargs):
+    if instance.status == 'BLOCKED':
+        invalidate_blocked(instance.clinic_id)
+        refresh_blocked(instance.clinic_id, [instance.patient_id])
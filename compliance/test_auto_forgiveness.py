@@ -0,0 +1,81 @@
+"""
+Set-based auto-forgiveness (compliance_service.run_auto_forgiveness).
+
+Covers:
+- only patients past the clinic's forgiveness window are reset, and only in
+  clinics that enable it; each gets one AUTO_FORGIVENESS event
+- a clinic is forgiven in id batches: one UPDATE and one event INSERT per batch
+- the command reports per-clinic progress and totals
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from compliance.models import ClinicComplianceSettings, ComplianceEvent, PatientClinicCompliance
+from compliance.services.compliance_service import run_auto_forgiveness
+from patients.services import ensure_patient_profile
+
+from secretary.tests import SecretaryTestBase
+
+User = get_user_model()
+
+
+class AutoForgivenessTests(SecretaryTestBase):
+
+    def setUp(self):
+        super().setUp()
+        ClinicComplianceSettings.objects.filter(clinic=self.clinic_a).update(
+            auto_forgive_enabled=True, auto_forgive_after_days=30
+        )
+        now = timezone.now()
+        self.stale = [self._compliance(self.clinic_a, n, now - timedelta(days=45)) for n in range(5)]
+        self.recent = self._compliance(self.clinic_a, 5, now - timedelta(days=3))
+        self.other_clinic = self._compliance(self.clinic_b, 6, now - timedelta(days=400))
+
+    def _compliance(self, clinic, n, last_violation_at):
+        user = User.objects.create_user(
+            phone=f"05977700{n:02d}", password="pass", name=f"Patient {n}", role="PATIENT"
+        )
+        profile, _ = ensure_patient_profile(user)
+        return PatientClinicCompliance.objects.create(
+            clinic=clinic, patient=profile, bad_score=2 + n, status="BLOCKED",
+            blocked_at=last_violation_at, last_violation_at=last_violation_at,
+        )
+
+    def test_forgives_only_eligible_patients(self):
+        totals = run_auto_forgiveness()
+        self.assertEqual((totals["clinics"], totals["forgiven"]), (1, 5))
+
+        for row in self.stale:
+            row = PatientClinicCompliance.objects.get(pk=row.pk)
+            self.assertEqual((row.bad_score, row.status, row.blocked_at), (0, "OK", None))
+            self.assertIsNotNone(row.last_forgiven_at)
+        for row in (self.recent, self.other_clinic):
+            row.refresh_from_db()
+            self.assertEqual(row.status, "BLOCKED")
+
+        events = ComplianceEvent.objects.filter(event_type="AUTO_FORGIVENESS")
+        self.assertEqual(
+            sorted(events.values_list("score_change", flat=True)),
+            sorted(-row.bad_score for row in self.stale),
+        )
+        self.assertEqual(run_auto_forgiveness()["forgiven"], 0)
+
+    def test_clinic_is_forgiven_in_batches(self):
+        with CaptureQueriesContext(connection) as ctx:
+            run_auto_forgiveness(batch_size=2)
+        sql = [q["sql"] for q in ctx.captured_queries]
+        self.assertEqual(sum(s.startswith('UPDATE "compliance_patientcliniccompliance"') for s in sql), 3)
+        self.assertEqual(sum(s.startswith('INSERT INTO "compliance_complianceevent"') for s in sql), 3)
+
+    def test_command_reports_progress(self):
+        out = StringIO()
+        call_command("run_auto_forgiveness", "--batch-size", "2", stdout=out)
+        self.assertIn(f"clinic {self.clinic_a.id}: forgave 5 patient(s)", out.getvalue())
+        self.assertIn("across 1 clinic(s): forgave 5 patient(s)", out.getvalue())
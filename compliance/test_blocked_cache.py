@@ -0,0 +1,101 @@
+"""
+Cached blocked-patient lookup (compliance/services/blocked_cache.py).
+
+Covers:
+- checking a clean patient writes nothing and costs no query on a cache hit
+- record_no_show, apply_manual_waiver, auto-forgiveness and the bulk no-show
+  sweeper each refresh the clinic's cached set
+- booking is refused for a blocked patient, per clinic
+"""
+
+from datetime import time, timedelta
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils import timezone
+
+from appointments.models import Appointment
+from appointments.services.booking_service import BookingError, book_appointment
+from compliance.models import PatientClinicCompliance
+from compliance.services.compliance_service import (
+    apply_due_no_shows, apply_manual_waiver, count_blocked_patients, is_patient_blocked,
+    record_no_show, run_auto_forgiveness,
+)
+from patients.models import ClinicPatient
+from patients.services import ensure_patient_profile
+
+from secretary.tests import SecretaryTestBase
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM)
+class BlockedCacheTests(SecretaryTestBase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.profile, _ = ensure_patient_profile(self.patient_a)
+        self.rules = self.clinic_a.compliance_settings
+        self.rules.score_threshold_block = 2
+        self.rules.save()
+
+    def _blocked(self):
+        return is_patient_blocked(self.clinic_a, self.profile)
+
+    def test_clean_patient_check_is_read_only(self):
+        self.assertFalse(self._blocked())
+        self.assertFalse(PatientClinicCompliance.objects.exists())
+        with self.assertNumQueries(0):
+            self.assertFalse(self._blocked())
+            self.assertEqual(count_blocked_patients(self.clinic_a), 0)
+
+    def test_record_no_show_and_waiver_refresh_the_set(self):
+        self.assertFalse(self._blocked())
+        record_no_show(self.clinic_a, self.profile)
+        self.assertFalse(self._blocked())
+        record_no_show(self.clinic_a, self.profile)
+        self.assertTrue(self._blocked())
+        self.assertEqual(count_blocked_patients(self.clinic_a), 1)
+        self.assertEqual(count_blocked_patients(self.clinic_b), 0)
+
+        apply_manual_waiver(self.clinic_a, self.profile)
+        self.assertFalse(self._blocked())
+
+    def test_auto_forgiveness_refreshes_the_set(self):
+        self.rules.auto_forgive_enabled = True
+        self.rules.auto_forgive_after_days = 7
+        self.rules.save()
+        record_no_show(self.clinic_a, self.profile)
+        record_no_show(self.clinic_a, self.profile)
+        PatientClinicCompliance.objects.update(last_violation_at=timezone.now() - timedelta(days=8))
+        self.assertTrue(self._blocked())
+
+        run_auto_forgiveness()
+        self.assertFalse(self._blocked())
+
+    def test_bulk_no_show_sweep_refreshes_the_set(self):
+        ClinicPatient.objects.create(
+            clinic=self.clinic_a, patient=self.patient_a, registered_by=self.secretary_a
+        )
+        yesterday = timezone.localdate() - timedelta(days=1)
+        for hour in (9, 10):
+            self._make_appointment(appointment_date=yesterday, appointment_time=time(hour, 0))
+        self.assertFalse(self._blocked())
+
+        apply_due_no_shows(Appointment.objects.filter(clinic=self.clinic_a))
+        self.assertTrue(self._blocked())
+
+    def test_blocked_patient_cannot_book(self):
+        record_no_show(self.clinic_a, self.profile)
+        record_no_show(self.clinic_a, self.profile)
+        with self.assertRaises(BookingError) as caught:
+            book_appointment(
+                patient=self.patient_a,
+                clinic_id=self.clinic_a.id,
+                doctor_id=self.doctor_a.id,
+                appointment_type_id=self.appt_type_a.id,
+                appointment_date=timezone.localdate() + timedelta(days=2),
+                appointment_time=time(10, 0),
+            )
+        self.assertEqual(caught.exception.code, "patient_blocked")
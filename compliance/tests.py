@@ -1,3 +1,145 @@
-from django.test import TestCase
+"""
+Tests for the set-based no-show sweeper (compliance/services/no_show_sweeper.py).
 
-# Create your tests here.
+Reuses the SecretaryTestBase fixture (clinic_a + secretary_a + doctor_a +
+patient_a, plus an isolated clinic_b).
+"""
+
+from datetime import datetime, time, timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from appointments.models import Appointment
+from clinics.models import ClinicBookingSettings
+from compliance.models import ComplianceEvent, PatientClinicCompliance
+from compliance.services.no_show_sweeper import (
+    GLOBAL_WATERMARK_KEY,
+    apply_due_no_shows,
+    ensure_no_shows_swept,
+)
+from patients.models import ClinicPatient
+from patients.services import ensure_patient_profile
+
+from secretary.tests import SecretaryTestBase
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class NoShowSweeperTests(SecretaryTestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.profile, _ = ensure_patient_profile(self.patient_a)
+        ClinicPatient.objects.create(
+            clinic=self.clinic_a, patient=self.patient_a, registered_by=self.secretary_a
+        )
+        self.yesterday = timezone.localdate() - timedelta(days=1)
+
+    def _appt(self, appt_date, appt_time=time(10, 0), status=Appointment.Status.CONFIRMED,
+              patient=None):
+        return Appointment.objects.create(
+            patient=patient or self.patient_a, clinic=self.clinic_a, doctor=self.doctor_a,
+            appointment_type=self.appt_type_a, appointment_date=appt_date,
+            appointment_time=appt_time, status=status,
+        )
+
+    def _sweep(self):
+        return apply_due_no_shows(Appointment.objects.filter(clinic=self.clinic_a))
+
+    def test_overdue_appointment_flipped_and_penalized(self):
+        appt = self._appt(self.yesterday)
+        self.assertEqual(self._sweep(), 1)
+        appt.refresh_from_db()
+        self.assertEqual(appt.status, Appointment.Status.NO_SHOW)
+        comp = PatientClinicCompliance.objects.get(clinic=self.clinic_a, patient=self.profile)
+        self.assertEqual((comp.bad_score, comp.status), (1, "WARNED"))
+        event = ComplianceEvent.objects.get(appointment=appt)
+        self.assertEqual((event.event_type, event.score_change), ("NO_SHOW", 1))
+
+    def test_repeated_no_shows_block_patient(self):
+        for hour in (9, 10, 11, 12):
+            self._appt(self.yesterday, time(hour, 0))
+        self.assertEqual(self._sweep(), 4)
+        comp = PatientClinicCompliance.objects.get(clinic=self.clinic_a, patient=self.profile)
+        self.assertEqual((comp.bad_score, comp.status), (4, "BLOCKED"))
+        self.assertIsNotNone(comp.blocked_at)
+        self.assertEqual(ComplianceEvent.objects.filter(event_type="NO_SHOW").count(), 4)
+
+    def test_idempotent(self):
+        self._appt(self.yesterday)
+        self._sweep()
+        self.assertEqual(self._sweep(), 0)
+        self.assertEqual(ComplianceEvent.objects.count(), 1)
+
+    def test_unaccepted_request_is_skipped(self):
+        self._appt(self.yesterday, status=Appointment.Status.PENDING, patient=self.secretary_b)
+        registered = self._appt(self.yesterday, time(11, 0), status=Appointment.Status.PENDING)
+        self.assertEqual(self._sweep(), 1)
+        registered.refresh_from_db()
+        self.assertEqual(registered.status, Appointment.Status.NO_SHOW)
+
+    def test_per_clinic_cutoff(self):
+        started = timezone.localtime() - timedelta(minutes=30)
+        appt = self._appt(started.date(), started.time().replace(microsecond=0))
+        self._sweep()  # default 1h grace — not yet overdue
+        appt.refresh_from_db()
+        self.assertEqual(appt.status, Appointment.Status.CONFIRMED)
+
+        booking = self.clinic_a.get_or_create_booking_settings()
+        booking.no_show_after = ClinicBookingSettings.NoShowAfter.M15
+        booking.save()
+        self.assertEqual(self._sweep(), 1)
+
+    def test_end_of_day_cutoff(self):
+        booking = self.clinic_a.get_or_create_booking_settings()
+        booking.no_show_after = ClinicBookingSettings.NoShowAfter.D1
+        booking.save()
+        today = self._appt(timezone.localdate(), time(0, 0))
+        self._appt(self.yesterday, time(23, 30))
+        self.assertEqual(self._sweep(), 1)
+        today.refresh_from_db()
+        self.assertEqual(today.status, Appointment.Status.CONFIRMED)
+
+    def test_every_timed_choice_has_one_shared_delta(self):
+        timed = [c for c in ClinicBookingSettings.NoShowAfter if c != ClinicBookingSettings.NoShowAfter.D1]
+        self.assertEqual(set(ClinicBookingSettings.NO_SHOW_DELTAS), set(timed))
+        booking = ClinicBookingSettings(clinic=self.clinic_a)
+        for choice in timed:
+            booking.no_show_after = choice
+            self.assertEqual(
+                booking.no_show_cutoff(self.yesterday, time(10, 0)),
+                datetime.combine(self.yesterday, time(10, 0)) + ClinicBookingSettings.no_show_delta(choice),
+            )
+
+    def test_command_one_shot(self):
+        self._appt(self.yesterday)
+        out = StringIO()
+        call_command("process_no_shows", stdout=out)
+        self.assertIn("marked 1 new no-show", out.getvalue())
+
+
+@override_settings(CACHES=LOCMEM)
+class NoShowWatermarkTests(NoShowSweeperTests):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_fresh_global_watermark_skips_read_sweep(self):
+        cache.set(GLOBAL_WATERMARK_KEY, timezone.now().timestamp())
+        appt = self._appt(self.yesterday)
+        ensure_no_shows_swept("clinic:test", Appointment.objects.filter(clinic=self.clinic_a))
+        appt.refresh_from_db()
+        self.assertEqual(appt.status, Appointment.Status.CONFIRMED)
+
+    def test_stale_watermark_falls_back_to_scoped_sweep(self):
+        stale = datetime.now().timestamp() - 3600
+        cache.set(GLOBAL_WATERMARK_KEY, stale)
+        appt = self._appt(self.yesterday)
+        ensure_no_shows_swept("clinic:test", Appointment.objects.filter(clinic=self.clinic_a))
+        appt.refresh_from_db()
+        self.assertEqual(appt.status, Appointment.Status.NO_SHOW)
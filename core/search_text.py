@@ -0,0 +1,79 @@
+"""
+Text folding for indexed search (catalog names, patient names and phones).
+
+Names are typed in Arabic and Latin script, with or without hamza, tashkeel
+or accents, so both the stored ``search_name`` columns and the query are
+folded the same way before matching:
+
+- Unicode NFKC, then case-folded;
+- Arabic: tashkeel and tatweel dropped; أ إ آ ٱ → ا, ى → ي, ة → ه,
+  ؤ → و, ئ → ي; Arabic-Indic digits → ASCII digits;
+- Latin: accents dropped (é → e);
+- anything that is not a letter or digit becomes a single space.
+
+``phone_digits`` reduces a phone number to the local digits-only form
+(``0599123456``) whatever way it was typed.
+
+``trigrams`` mirrors pg_trgm's word trigrams (each word padded with two
+leading blanks and one trailing blank) so the in-memory fallback index in
+doctors/catalog_search.py scores matches the way the Postgres index does.
+"""
+
+import re
+import unicodedata
+
+_ARABIC_FOLD = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ئ": "ي", "ؤ": "و", "ة": "ه",
+    "ـ": None,  # tatweel
+    **{chr(0x0660 + d): str(d) for d in range(10)},  # Arabic-Indic digits
+    **{chr(0x06F0 + d): str(d) for d in range(10)},  # Extended (Persian) digits
+})
+
+_NON_WORD = re.compile(r"[\W_]+")
+_NON_DIGIT = re.compile(r"\D+")
+
+# International prefixes (+970 / +972, with or without 00) in front of a local 5XXXXXXXX number.
+_COUNTRY_PREFIXES = ("00970", "00972", "970", "972")
+
+
+def normalize_name(text):
+    """Fold ``text`` for catalog matching (see module docstring)."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    # Drops Latin accents and Arabic tashkeel alike (both are combining marks).
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = unicodedata.normalize("NFKC", text).translate(_ARABIC_FOLD)
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def fold_digits(text):
+    """Only the digits of ``text``, Arabic-Indic digits folded to ASCII."""
+    return _NON_DIGIT.sub("", (text or "").translate(_ARABIC_FOLD))
+
+
+def phone_digits(text):
+    """``fold_digits`` with a country prefix made local (``+970 599…`` → ``0599…``)."""
+    digits = fold_digits(text)
+    for prefix in _COUNTRY_PREFIXES:
+        if digits.startswith(prefix + "5"):
+            return "0" + digits[len(prefix):]
+    return digits
+
+
+def trigrams(normalized):
+    """pg_trgm-style trigrams of an already normalized string."""
+    grams = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def inner_trigrams(normalized):
+    """Unpadded trigrams of each word: every one occurs in any text containing ``normalized``."""
+    grams = set()
+    for word in normalized.split():
+        grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
@@ -15,7 +15,7 @@ from .serializers import (
     SpecialtySerializer,
     DoctorProfileListSerializer,
 )
-from .services import generate_slots_for_date
+from .slot_cache import get_cached_slots_for_date
 
 
 class SpecialtyListAPIView(APIView):
@@ -213,7 +213,7 @@ class DoctorAvailableSlotsAPIView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        slots = generate_slots_for_date(
+        slots = get_cached_slots_for_date(
             doctor_id=doctor_id,
             clinic_id=int(clinic_id),
             target_date=target_date,
@@ -0,0 +1,308 @@
+"""
+Search over a clinic's drug and order catalogs (the workspace order picker).
+
+The picker searches on every keystroke, so the old ``icontains`` scans over
+DrugProduct / OrderCatalogItem are replaced with two interchangeable
+backends. Both match on the folded ``search_name`` column
+(core/search_text.py), so "أموكسيسيلين", "اموكسيسيلين" and "AMOXIcillin"
+find the same rows:
+
+- ``trigram`` — PostgreSQL with pg_trgm. ``search_name`` carries a GIN
+  ``gin_trgm_ops`` index (drug_search_trgm_idx / catalog_item_search_trgm_idx,
+  clinics migration 0015) that serves both the substring ``LIKE`` and the
+  fuzzy ``%>`` (word similarity) predicates; similarity is ranked with
+  ``word_similarity()``.
+- ``memory`` — any other database, or a server without pg_trgm (the
+  migration then skips the indexes). A per-process,
+  per-clinic trigram + word-prefix index built from one query, scored with
+  the same trigram definition (an upper bound of pg_trgm's word similarity).
+  It is rebuilt lazily when the clinic's ``catalog:ver:clinic:<id>`` stamp
+  moves; doctors/signals.py bumps it on every DrugProduct, OrderCatalogItem
+  and DrugFamily save/delete — i.e. every catalog_views mutation. Writes that
+  bypass signals (queryset updates, bulk_create) must call
+  ``invalidate_clinic`` themselves.
+
+CATALOG_SEARCH_BACKEND picks one explicitly; "auto" (default) uses
+``trigram`` when the extension is installed.
+
+Matching: queries shorter than three characters only match a word prefix;
+longer ones match any substring or a typo within the word-similarity
+threshold. Ranking: the doctor's favourites, then word-prefix matches, then
+similarity, then name.
+"""
+
+import heapq
+import logging
+import threading
+import time as time_mod
+from collections import Counter, OrderedDict
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from clinics.models import DrugProduct, OrderCatalogItem
+from core.search_text import inner_trigrams, normalize_name, trigrams
+
+logger = logging.getLogger(__name__)
+
+TRIGRAM = "trigram"
+MEMORY = "memory"
+
+# pg_trgm.word_similarity_threshold default; the memory backend uses the same cut-off.
+WORD_SIMILARITY_THRESHOLD = 0.6
+MIN_FUZZY_LENGTH = 3
+RESULT_LIMIT = 60
+
+_DRUGS = "drugs"
+_ITEMS = "items"
+
+_trgm_installed = {}
+
+
+def search_backend():
+    """The backend in effect (``CATALOG_SEARCH_BACKEND`` may force one)."""
+    choice = getattr(settings, "CATALOG_SEARCH_BACKEND", "auto")
+    if choice in (TRIGRAM, MEMORY):
+        return choice
+    if connection.vendor != "postgresql":
+        return MEMORY
+    if connection.alias not in _trgm_installed:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trgm_installed[connection.alias] = cursor.fetchone() is not None
+    return TRIGRAM if _trgm_installed[connection.alias] else MEMORY
+
+
+# ── Public API ───────────────────────────────────────────────────────────────
+def search_drugs(clinic_id, query, *, favourite_ids=frozenset(), family_id=None, mode="generic",
+                 limit=RESULT_LIMIT):
+    """Active DrugProducts of ``clinic_id`` matching ``query``, best first.
+
+    ``mode="commercial"`` breaks ties on the commercial name, as the picker
+    shows it first. An empty query lists the catalog (favourites first).
+    """
+    q = normalize_name(query)
+    if search_backend() == TRIGRAM:
+        qs = DrugProduct.objects.filter(clinic_id=clinic_id, is_active=True)
+        if family_id:
+            qs = qs.filter(family_id=family_id)
+        names = ("commercial_name", "generic_name") if mode == "commercial" else ("generic_name",)
+        return list(_trigram_ranked(qs.select_related("family"), q, favourite_ids, names)[:limit])
+
+    ids = _clinic_index(clinic_id, _DRUGS).search(
+        q, favourite_ids, limit,
+        accept=(lambda entry: entry.group == family_id) if family_id else None,
+        sort_slot=1 if mode == "commercial" else 0,
+    )
+    return _fetch(DrugProduct.objects.select_related("family"), ids)
+
+
+def search_catalog_items(clinic_id, category, query, *, limit=RESULT_LIMIT):
+    """Active OrderCatalogItems of one ``category`` matching ``query``, best first."""
+    q = normalize_name(query)
+    if search_backend() == TRIGRAM:
+        qs = OrderCatalogItem.objects.filter(clinic_id=clinic_id, category=category, is_active=True)
+        return list(_trigram_ranked(qs, q, (), ("name",))[:limit])
+
+    ids = _clinic_index(clinic_id, _ITEMS).search(q, (), limit, accept=lambda entry: entry.group == category)
+    return _fetch(OrderCatalogItem.objects.all(), ids)
+
+
+def _fetch(qs, ids):
+    """Rows for ``ids`` (ranked by the memory index) in that order."""
+    rows = {row.id: row for row in qs.filter(id__in=ids)} if ids else {}
+    return [rows[i] for i in ids if i in rows]
+
+
+# ── pg_trgm backend ──────────────────────────────────────────────────────────
+def _word_prefix_q(q):
+    return Q(search_name__startswith=q) | Q(search_name__contains=f" {q}")
+
+
+def _trigram_ranked(qs, q, favourite_ids, names):
+    """``qs`` narrowed to matches of ``q`` and ordered best first (one query)."""
+    fav_rank = Case(When(id__in=list(favourite_ids), then=0), default=1, output_field=IntegerField())
+    if not q:
+        return qs.annotate(_fav_rank=fav_rank).order_by("_fav_rank", *names)
+
+    prefix_rank = Case(When(_word_prefix_q(q), then=0), default=1, output_field=IntegerField())
+    if len(q) < MIN_FUZZY_LENGTH:
+        qs = qs.filter(_word_prefix_q(q)).annotate(_similarity=Value(1.0))
+    else:
+        qs = qs.filter(
+            Q(search_name__contains=q) | Q(search_name__trigram_word_similar=q)
+        ).annotate(_similarity=TrigramWordSimilarity(q, "search_name"))
+    return (
+        qs.annotate(_fav_rank=fav_rank, _prefix_rank=prefix_rank)
+        .order_by("_fav_rank", "_prefix_rank", F("_similarity").desc(), *names)
+    )
+
+
+# ── In-memory backend ────────────────────────────────────────────────────────
+class _Entry:
+    __slots__ = ("id", "group", "text", "sort_keys")
+
+    def __init__(self, id, group, text, sort_keys):
+        self.id = id
+        self.group = group          # family_id for drugs, category for items
+        self.text = text            # search_name
+        self.sort_keys = sort_keys  # one casefolded name tuple per sort slot
+
+
+class _CatalogIndex:
+    """Trigram postings, a word-prefix map and presorted name orders over one
+    clinic's active rows. Searches rank by position and only order the
+    ``limit`` best, so an empty or one-letter query stays cheap on large
+    catalogs."""
+
+    def __init__(self, version, entries):
+        self.version = version
+        self.entries = entries
+        self.texts = [entry.text for entry in entries]
+        self.position = {entry.id: pos for pos, entry in enumerate(entries)}
+        self.postings = {}      # trigram -> [entry position]
+        self.prefixes = {}      # first 1-2 characters of a word -> {entry position}
+        for pos, text in enumerate(self.texts):
+            for gram in trigrams(text):
+                self.postings.setdefault(gram, []).append(pos)
+            for word in text.split():
+                for n in (1, 2):
+                    self.prefixes.setdefault(word[:n], set()).add(pos)
+        slots = len(entries[0].sort_keys) if entries else 1
+        self.by_name = [
+            sorted(range(len(entries)), key=lambda pos, slot=slot: (entries[pos].sort_keys[slot], entries[pos].id))
+            for slot in range(slots)
+        ]
+        self.name_rank = []
+        for order in self.by_name:
+            rank = [0] * len(entries)
+            for n, pos in enumerate(order):
+                rank[pos] = n
+            self.name_rank.append(rank)
+
+    def search(self, q, favourite_ids, limit, accept=None, sort_slot=0):
+        entries = self.entries
+        keep = (lambda pos: accept(entries[pos])) if accept is not None else (lambda pos: True)
+        favourites = {self.position[i] for i in favourite_ids if i in self.position}
+        rank = self.name_rank[sort_slot]
+
+        if len(q) >= MIN_FUZZY_LENGTH:
+            found = self._similar(q)
+            texts = self.texts
+            best = heapq.nsmallest(limit, filter(keep, found), key=lambda pos: (
+                pos not in favourites, not _word_prefix(texts[pos], q), -found[pos], rank[pos],
+            ))
+            return [self.entries[pos].id for pos in best]
+
+        # Empty or short query: every match is a word prefix of equal weight,
+        # so favourites then name order decide.
+        matches = self.prefixes.get(q, set()) if q else None
+        best = sorted(filter(keep, favourites if matches is None else favourites & matches), key=rank.__getitem__)
+        if matches is None:
+            rest = (pos for pos in self.by_name[sort_slot] if pos not in favourites)
+            best.extend(islice(filter(keep, rest), max(limit - len(best), 0)))
+        else:
+            rest = filter(keep, (pos for pos in matches if pos not in favourites))
+            best.extend(heapq.nsmallest(max(limit - len(best), 0), rest, key=rank.__getitem__))
+        return [self.entries[pos].id for pos in best[:limit]]
+
+    def _similar(self, q):
+        """{position: similarity} of substring matches and near misses."""
+        wanted = trigrams(q)
+        shared = Counter()
+        for gram in wanted:
+            shared.update(self.postings.get(gram, ()))
+        found = {
+            pos: count / len(wanted) for pos, count in shared.items()
+            if count / len(wanted) >= WORD_SIMILARITY_THRESHOLD
+        }
+        # A substring need not share the padded (word-start) trigrams, but it
+        # does contain every inner trigram of the query.
+        inner = inner_trigrams(q)
+        if inner:
+            postings = sorted((self.postings.get(gram, ()) for gram in inner), key=len)
+            exact = set(postings[0]).intersection(*postings[1:])
+        else:
+            exact = range(len(self.texts))
+        texts = self.texts
+        for pos in exact:
+            if pos not in found and q in texts[pos]:
+                found[pos] = shared[pos] / len(wanted)
+        return found
+
+
+def _word_prefix(text, q):
+    return text.startswith(q) or f" {q}" in text
+
+
+def _load_entries(clinic_id, kind):
+    if kind == _DRUGS:
+        rows = DrugProduct.objects.filter(clinic_id=clinic_id, is_active=True).order_by().values_list(
+            "id", "family_id", "search_name", "generic_name", "commercial_name",
+        )
+        return [
+            _Entry(pk, family_id, text, (
+                (generic.casefold(),),                          # mode="generic"
+                (commercial.casefold(), generic.casefold()),    # mode="commercial"
+            ))
+            for pk, family_id, text, generic, commercial in rows
+        ]
+    rows = OrderCatalogItem.objects.filter(clinic_id=clinic_id, is_active=True).order_by().values_list(
+        "id", "category", "search_name", "name",
+    )
+    return [_Entry(pk, category, text, ((name.casefold(),),)) for pk, category, text, name in rows]
+
+
+_indexes = OrderedDict()  # (clinic_id, kind) -> _CatalogIndex, least recently used first
+_indexes_lock = threading.Lock()
+
+
+def _version_key(clinic_id):
+    return f"catalog:ver:clinic:{clinic_id}"
+
+
+def _current_version(clinic_id):
+    """The clinic's catalog stamp, seeded with a fresh clock value if missing (fail-open: None)."""
+    key = _version_key(clinic_id)
+    try:
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, time_mod.time_ns(), timeout=None)
+            version = cache.get(key)
+        return version
+    except Exception:
+        logger.warning("[catalog-search] version read failed for clinic %s — rebuilding", clinic_id)
+        return None
+
+
+def _clinic_index(clinic_id, kind):
+    version = _current_version(clinic_id)
+    with _indexes_lock:
+        index = _indexes.get((clinic_id, kind))
+        if index is not None and version is not None and index.version == version:
+            _indexes.move_to_end((clinic_id, kind))
+            return index
+
+    index = _CatalogIndex(version, _load_entries(clinic_id, kind))
+    if version is not None:
+        with _indexes_lock:
+            _indexes[(clinic_id, kind)] = index
+            _indexes.move_to_end((clinic_id, kind))
+            while len(_indexes) > getattr(settings, "CATALOG_SEARCH_INDEX_CLINICS", 64):
+                _indexes.popitem(last=False)
+    return index
+
+
+def invalidate_clinic(clinic_id):
+    """Make every process rebuild the in-memory index of ``clinic_id`` on its next search."""
+    key = _version_key(clinic_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time_mod.time_ns(), timeout=None)
+    except Exception:
+        logger.warning("[catalog-search] version bump failed for %s", key)
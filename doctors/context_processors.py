@@ -4,12 +4,31 @@ Doctor-specific context processor.
 Injects `pending_invitations_count` for doctor/main_doctor users so the
 navigation badge stays accurate across all doctor pages without requiring
 each view to query it individually.
+
+The count is cached per phone number and dropped whenever an invitation for
+that phone is saved or deleted (doctors/signals.py), so a render normally
+costs no query.
 """
 
 import logging
 
+from django.core.cache import cache
+
 logger = logging.getLogger(__name__)
 
+PENDING_INVITATIONS_TTL_SECONDS = 15 * 60
+
+
+def _pending_invitations_key(phone):
+    return f"invitations:pending:{phone}"
+
+
+def invalidate_pending_invitations_count(phone):
+    try:
+        cache.delete(_pending_invitations_key(phone))
+    except Exception:
+        logger.warning("Failed to invalidate pending_invitations_count", exc_info=True)
+
 
 def doctor_context(request):
     if not request.user.is_authenticated:
@@ -26,9 +45,13 @@ def doctor_context(request):
         normalized_phone = PhoneNumberAuthBackend.normalize_phone_number(
             request.user.phone
         )
-        count = ClinicInvitation.objects.filter(
-            doctor_phone=normalized_phone, status="PENDING"
-        ).count()
+        key = _pending_invitations_key(normalized_phone)
+        count = cache.get(key)
+        if count is None:
+            count = ClinicInvitation.objects.filter(
+                doctor_phone=normalized_phone, status="PENDING"
+            ).count()
+            cache.set(key, count, timeout=PENDING_INVITATIONS_TTL_SECONDS)
         return {"pending_invitations_count": count}
     except Exception:
         # Runs on every doctor page — never let a badge query break the page,
@@ -0,0 +1,128 @@
+"""
+Management command: benchmark_catalog_search
+
+Latency benchmark for the order-picker catalog search
+(doctors/catalog_search.py). Builds a throw-away clinic whose drug catalog
+holds ``--drugs`` synthetic Latin and Arabic names, then times
+``search_drugs`` for a fixed mix of keystroke queries (one- and two-letter
+prefixes, substrings, typos, Arabic with and without hamza) against every
+available backend (trigram only where pg_trgm is installed). The memory
+backend is timed warm; its one-off build time is reported separately.
+
+Everything runs inside one transaction that is rolled back. Exits with an
+error when a backend's p95 exceeds ``--max-p95-ms`` (if given).
+
+Usage:
+    python manage.py benchmark_catalog_search
+    python manage.py benchmark_catalog_search --drugs 50000 --max-p95-ms 10
+"""
+
+import random
+import time as time_mod
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from appointments.management.commands.benchmark_booking import percentile
+from clinics.models import Clinic, DrugProduct
+from doctors import catalog_search
+
+User = get_user_model()
+
+LATIN = ["amo", "xi", "cil", "lin", "para", "ceta", "mol", "ibu", "pro", "fen", "met", "for",
+         "min", "ator", "vas", "tin", "lo", "sar", "tan", "pra", "zole", "dex", "tha", "son"]
+ARABIC = ["أمو", "كسي", "سيل", "لين", "بارا", "سيتا", "مول", "إيبو", "برو", "فين", "ميت", "فور",
+          "مين", "أتور", "فاس", "تين", "لو", "سار", "تان", "برا", "زول", "ديكس", "ثا", "سون"]
+QUERIES = ["a", "pa", "amox", "cilli", "ceta", "paracetamol", "amoxicilin",
+           "أ", "اموكسي", "أموكسي", "سيتا", "باراسيتامول"]
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _name(rng, syllables):
+    return "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+
+
+class Command(BaseCommand):
+    help = "Measure order-picker catalog search latency (p50/p95) per backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--drugs", type=int, default=20_000, help="Catalog size.")
+        parser.add_argument("--rounds", type=int, default=20, help="Passes over the query mix.")
+        parser.add_argument(
+            "--max-p95-ms", type=float, default=None,
+            help="Fail if any backend's p95 exceeds this many milliseconds.",
+        )
+
+    def handle(self, *args, **options):
+        backends = [catalog_search.MEMORY]
+        with override_settings(CATALOG_SEARCH_BACKEND="auto"):
+            if catalog_search.search_backend() == catalog_search.TRIGRAM:
+                backends.insert(0, catalog_search.TRIGRAM)
+
+        results = {}
+        try:
+            with transaction.atomic():
+                clinic = self._fixture(options["drugs"])
+                for backend in backends:
+                    with override_settings(CATALOG_SEARCH_BACKEND=backend):
+                        results[backend] = self._run(clinic, options["rounds"])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        worst = 0.0
+        for backend, (latencies, build_ms) in results.items():
+            latencies.sort()
+            p95 = percentile(latencies, 95)
+            worst = max(worst, p95)
+            build = f"  (index build {build_ms:.0f} ms)" if build_ms is not None else ""
+            self.stdout.write(
+                f"{backend:>8}: {len(latencies)} search(es) over {options['drugs']} drug(s)  "
+                f"p50 {percentile(latencies, 50):.2f} ms  p95 {p95:.2f} ms  "
+                f"max {latencies[-1]:.2f} ms{build}"
+            )
+
+        limit = options["max_p95_ms"]
+        if limit is not None and worst > limit:
+            raise CommandError(f"p95 {worst:.2f} ms exceeds {limit:.2f} ms.")
+        self.stdout.write(self.style.SUCCESS("Done (all writes rolled back)."))
+
+    def _fixture(self, drugs):
+        tag = uuid.uuid4().hex[:8]
+        owner = User.objects.create_user(phone=f"bench-{tag}-o", name="Bench Owner", role="MAIN_DOCTOR")
+        clinic = Clinic.objects.create(name=f"Bench {tag}", address="-", main_doctor=owner)
+        rng = random.Random(drugs)
+        products = [DrugProduct(clinic=clinic, generic_name="Paracetamol", commercial_name="باراسيتامول"),
+                    DrugProduct(clinic=clinic, generic_name="Amoxicillin", commercial_name="أموكسيسيلين")]
+        while len(products) < drugs:
+            products.append(DrugProduct(clinic=clinic, generic_name=_name(rng, LATIN),
+                                        commercial_name=_name(rng, ARABIC)))
+        for product in products:
+            product.search_name = product.build_search_name()  # bulk_create skips save()
+        DrugProduct.objects.bulk_create(products, batch_size=2000)
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE clinics_drugproduct")
+        catalog_search.invalidate_clinic(clinic.id)
+        return clinic
+
+    def _run(self, clinic, rounds):
+        build_ms = None
+        if catalog_search.search_backend() == catalog_search.MEMORY:
+            t0 = time_mod.perf_counter()
+            catalog_search.search_drugs(clinic.id, "")
+            build_ms = (time_mod.perf_counter() - t0) * 1000
+
+        latencies = []
+        for _ in range(rounds):
+            for query in QUERIES:
+                t0 = time_mod.perf_counter()
+                catalog_search.search_drugs(clinic.id, query, favourite_ids={1, 2, 3})
+                latencies.append((time_mod.perf_counter() - t0) * 1000)
+        return latencies, build_ms
@@ -0,0 +1,90 @@
+"""
+Management command: benchmark_slot_engine
+
+Micro-benchmark for the slot grid's booked-overlap check. Builds dense
+synthetic days (long availability blocks, small slot steps, many booked
+ranges) and, for every slot in each grid, compares the sorted-sweep check
+used by ``_build_day_slots`` against the linear ``_is_slot_booked``
+reference. Exits with an error if any slot disagrees.
+
+Pure in-memory — no database access.
+
+Usage:
+    python manage.py benchmark_slot_engine
+    python manage.py benchmark_slot_engine --days 50 --appointments 200 --step 5
+"""
+
+import random
+import time as time_mod
+from datetime import date, time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from doctors.services import (
+    _add_minutes_to_time,
+    _build_day_slots,
+    _index_booked_ranges,
+    _is_slot_booked,
+    _overlaps_booked,
+)
+
+
+def dense_day(rng, appointments, step_minutes):
+    """One synthetic day: a 00:00–23:55 block and *appointments* booked ranges
+    on the step grid (overlaps allowed, as R-03 cross-clinic bookings can)."""
+    blocks = [(time(0, 0), time(23, 55))]
+    booked = []
+    for _ in range(appointments):
+        start_min = rng.randrange(0, 23 * 60, step_minutes)
+        start = time(start_min // 60, start_min % 60)
+        booked.append((start, _add_minutes_to_time(start, rng.choice((10, 15, 20, 30, 45)))))
+    return blocks, booked
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the sorted-sweep slot overlap check against the linear "
+        "reference on dense schedules and verify identical output."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=20)
+        parser.add_argument("--appointments", type=int, default=150)
+        parser.add_argument("--step", type=int, default=5, help="Slot step (minutes).")
+        parser.add_argument("--duration", type=int, default=15, help="Slot duration (minutes).")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        step = options["step"]
+        duration = options["duration"]
+        target = date(2030, 1, 7)
+        days = [dense_day(rng, options["appointments"], step) for _ in range(options["days"])]
+
+        linear_s = 0.0
+        sweep_s = 0.0
+        slot_count = 0
+        for blocks, booked in days:
+            grid = _build_day_slots(target, blocks, booked, duration, step, None)
+            slot_count += len(grid)
+
+            t0 = time_mod.perf_counter()
+            expected = [_is_slot_booked(s["time"], s["end_time"], booked) for s in grid]
+            linear_s += time_mod.perf_counter() - t0
+
+            t0 = time_mod.perf_counter()
+            index = _index_booked_ranges(booked)
+            actual = [_overlaps_booked(s["time"], s["end_time"], index) for s in grid]
+            sweep_s += time_mod.perf_counter() - t0
+
+            if actual != expected or [s["is_booked"] for s in grid] != expected:
+                raise CommandError("Sorted-sweep overlap check disagrees with the linear reference.")
+
+        self.stdout.write(
+            f"{options['days']} day(s), {slot_count} slot(s), "
+            f"{options['appointments']} booked range(s)/day."
+        )
+        self.stdout.write(f"  linear scan:  {linear_s * 1000:.1f} ms")
+        self.stdout.write(f"  sorted sweep: {sweep_s * 1000:.1f} ms")
+        speedup = linear_s / sweep_s if sweep_s else float("inf")
+        self.stdout.write(self.style.SUCCESS(f"Identical output. Speed-up: {speedup:.1f}x"))
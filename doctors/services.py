@@ -5,14 +5,24 @@ Generates bookable time slots based on:
 1. Doctor's recurring weekly availability (DoctorAvailability)
 2. Appointment type duration
 3. Existing appointments across ALL clinics (R-03: global conflict check)
+
+``generate_slots_for_range`` is the batched entry point: it loads every input
+for a (doctors × dates) window in a constant number of queries and builds the
+grids in memory. ``generate_slots_for_date`` is the single-day convenience
+wrapper around it.
 """
 
+from bisect import bisect_left
+from collections import defaultdict
 from datetime import datetime, timedelta, date, time
 from django.utils import timezone
 
 from appointments.models import Appointment
 from .models import DoctorAvailability
 
+# Appointment statuses that occupy a slot (walk-ins / pending never block).
+SLOT_BLOCKING_STATUSES = ("CONFIRMED", "COMPLETED")
+
 
 def generate_slots_for_date(
     doctor_id: int,
@@ -42,83 +52,162 @@ def generate_slots_for_date(
     Returns:
         List of dicts: [{"time": time, "end_time": time, "is_available": bool}, ...]
     """
+    grids = generate_slots_for_range(
+        [doctor_id],
+        clinic_id,
+        target_date,
+        target_date,
+        duration_minutes,
+        slot_step_minutes=slot_step_minutes,
+        exclude_appointment_id=exclude_appointment_id,
+    )
+    return grids[(doctor_id, target_date)]
 
-    day_of_week = target_date.weekday()  # 0=Monday, 6=Sunday
 
-    # 0a. Check for active clinic holidays on this date — return no slots
-    from clinics.models import ClinicHoliday
-    is_holiday = ClinicHoliday.objects.filter(
-        clinic_id=clinic_id,
-        is_active=True,
-        start_date__lte=target_date,
-        end_date__gte=target_date,
-    ).exists()
-    if is_holiday:
-        return []
+def generate_slots_for_range(
+    doctor_ids,
+    clinic_id: int,
+    start_date: date,
+    end_date: date,
+    duration_minutes: int,
+    slot_step_minutes: int | None = None,
+    exclude_appointment_id: int | None = None,
+) -> dict[tuple[int, date], list[dict]]:
+    """
+    Generate slot grids for several doctors over an inclusive date range.
 
-    # 0b. Check for an active doctor availability exception on this date
-    from clinics.models import DoctorAvailabilityException
-    is_exception = DoctorAvailabilityException.objects.filter(
-        doctor_id=doctor_id,
+    Loads ClinicHoliday, DoctorAvailabilityException, DoctorAvailability and
+    the blocking appointments for the whole (doctors × dates) window in four
+    queries, then builds every day's grid in memory. Semantics per day are
+    identical to ``generate_slots_for_date``: holidays and active exceptions
+    yield ``[]``, and appointments block across ALL clinics (R-03).
+
+    Args:
+        doctor_ids: Iterable of doctor user IDs.
+        clinic_id: The clinic ID (availability is per-clinic).
+        start_date: First date of the window.
+        end_date: Last date of the window (inclusive).
+        duration_minutes / slot_step_minutes / exclude_appointment_id:
+            As for ``generate_slots_for_date``.
+
+    Returns:
+        Dict keyed by ``(doctor_id, date)`` holding that day's slot list.
+        Every requested pair is present (possibly with an empty list).
+    """
+    from clinics.models import ClinicHoliday, DoctorAvailabilityException
+
+    doctor_ids = list(dict.fromkeys(doctor_ids))
+    day_count = (end_date - start_date).days + 1
+    dates = [start_date + timedelta(days=i) for i in range(max(day_count, 0))]
+    grids = {(did, d): [] for did in doctor_ids for d in dates}
+    if not grids:
+        return grids
+
+    # 0a. Active clinic holidays overlapping the window — block all doctors.
+    holidays = list(
+        ClinicHoliday.objects.filter(
+            clinic_id=clinic_id,
+            is_active=True,
+            start_date__lte=end_date,
+            end_date__gte=start_date,
+        ).values_list("start_date", "end_date")
+    )
+
+    # 0b. Active per-doctor exceptions overlapping the window.
+    exceptions = defaultdict(list)
+    for did, exc_start, exc_end in DoctorAvailabilityException.objects.filter(
+        doctor_id__in=doctor_ids,
         clinic_id=clinic_id,
         is_active=True,
-        start_date__lte=target_date,
-        end_date__gte=target_date,
-    ).exists()
-    if is_exception:
-        return []
-
-    # 1. Get active availability blocks for this doctor + clinic + day
-    availability_blocks = DoctorAvailability.objects.filter(
-        doctor_id=doctor_id,
+        start_date__lte=end_date,
+        end_date__gte=start_date,
+    ).values_list("doctor_id", "start_date", "end_date"):
+        exceptions[did].append((exc_start, exc_end))
+
+    # 1. Weekly availability blocks, grouped by (doctor, weekday).
+    blocks = defaultdict(list)
+    for did, weekday, block_start, block_end in DoctorAvailability.objects.filter(
+        doctor_id__in=doctor_ids,
         clinic_id=clinic_id,
-        day_of_week=day_of_week,
+        day_of_week__in={d.weekday() for d in dates},
         is_active=True,
-    ).order_by("start_time")
-
-    if not availability_blocks.exists():
-        return []
+    ).order_by("start_time").values_list(
+        "doctor_id", "day_of_week", "start_time", "end_time"
+    ):
+        blocks[(did, weekday)].append((block_start, block_end))
 
-    # 2. Get ALL existing appointments for this doctor on this date
-    #    across ALL clinics (R-03: global conflict check)
+    if not blocks:
+        return grids
 
+    # 2. Blocking appointments for the window across ALL clinics (R-03).
     existing_appointments = Appointment.objects.filter(
-        doctor_id=doctor_id,
-        appointment_date=target_date,
-        status__in=["CONFIRMED", "COMPLETED"],
-    ).select_related("appointment_type")
+        doctor_id__in=doctor_ids,
+        appointment_date__gte=start_date,
+        appointment_date__lte=end_date,
+        status__in=SLOT_BLOCKING_STATUSES,
+    )
     if exclude_appointment_id is not None:
         existing_appointments = existing_appointments.exclude(pk=exclude_appointment_id)
 
-    # Build list of booked time ranges: [(start_time, end_time), ...]
-    booked_ranges = []
-    for appt in existing_appointments:
-        appt_start = appt.appointment_time
-        # Calculate end time from appointment_type duration, fallback to duration_minutes
-        appt_duration = duration_minutes
-        if appt.appointment_type and appt.appointment_type.duration_minutes:
-            appt_duration = appt.appointment_type.duration_minutes
-
-        appt_end = _add_minutes_to_time(appt_start, appt_duration)
-        booked_ranges.append((appt_start, appt_end))
+    # Build booked time ranges per day: [(start_time, end_time), ...]
+    booked = defaultdict(list)
+    for did, appt_date, appt_start, type_duration in existing_appointments.values_list(
+        "doctor_id", "appointment_date", "appointment_time",
+        "appointment_type__duration_minutes",
+    ):
+        # End time from appointment_type duration, fallback to duration_minutes
+        appt_end = _add_minutes_to_time(appt_start, type_duration or duration_minutes)
+        booked[(did, appt_date)].append((appt_start, appt_end))
+
+    # 3. Build each day's grid in memory.
+    today = timezone.localdate()
+    now_time = timezone.localtime().time()
+    for (did, d) in grids:
+        if _date_in_ranges(d, holidays) or _date_in_ranges(d, exceptions[did]):
+            continue
+        day_blocks = blocks.get((did, d.weekday()))
+        if not day_blocks:
+            continue
+        grids[(did, d)] = _build_day_slots(
+            d,
+            day_blocks,
+            booked.get((did, d), []),
+            duration_minutes,
+            slot_step_minutes,
+            now_time if d == today else None,
+        )
+    return grids
+
+
+def _build_day_slots(
+    target_date: date,
+    availability_blocks: list[tuple[time, time]],
+    booked_ranges: list[tuple[time, time]],
+    duration_minutes: int,
+    slot_step_minutes: int | None,
+    now_time: time | None,
+) -> list[dict]:
+    """Lay out one day's slot grid over *availability_blocks* (sorted by start).
 
-    # 3. Generate slots from each availability block
+    ``now_time`` is the current local time when *target_date* is today (slots
+    at or before it are past), otherwise None.
+    """
     slots = []
     duration = timedelta(minutes=duration_minutes)
     step = timedelta(minutes=slot_step_minutes) if slot_step_minutes else duration
-    is_today = target_date == timezone.localdate()
-    now_time = timezone.localtime().time() if is_today else None
+    is_today = now_time is not None
+    booked_index = _index_booked_ranges(booked_ranges)
 
-    for block in availability_blocks:
-        current = datetime.combine(target_date, block.start_time)
-        block_end = datetime.combine(target_date, block.end_time)
+    for block_start, block_end_time in availability_blocks:
+        current = datetime.combine(target_date, block_start)
+        block_end = datetime.combine(target_date, block_end_time)
 
         while current + duration <= block_end:
             slot_start = current.time()
             slot_end = (current + duration).time()
 
             is_past = is_today and slot_start <= now_time
-            is_booked = False if is_past else _is_slot_booked(slot_start, slot_end, booked_ranges)
+            is_booked = False if is_past else _overlaps_booked(slot_start, slot_end, booked_index)
             is_available = not is_past and not is_booked
 
             slots.append(
@@ -136,6 +225,45 @@ def generate_slots_for_date(
     return slots
 
 
+def _date_in_ranges(d: date, ranges: list[tuple[date, date]]) -> bool:
+    """True if *d* falls inside any inclusive (start_date, end_date) range."""
+    return any(start <= d <= end for start, end in ranges)
+
+
+def _index_booked_ranges(
+    booked_ranges: list[tuple[time, time]],
+) -> tuple[list[time], list[time]]:
+    """
+    Sort booked ranges once for ``_overlaps_booked``.
+
+    Returns ``(starts, max_ends)``: range starts in ascending order, and for
+    each position the latest end among the ranges up to and including it.
+    """
+    starts = []
+    max_ends = []
+    for booked_start, booked_end in sorted(booked_ranges):
+        starts.append(booked_start)
+        max_ends.append(booked_end if not max_ends else max(max_ends[-1], booked_end))
+    return starts, max_ends
+
+
+def _overlaps_booked(
+    slot_start: time,
+    slot_end: time,
+    booked_index: tuple[list[time], list[time]],
+) -> bool:
+    """
+    Sorted-sweep equivalent of ``_is_slot_booked`` in O(log n).
+
+    The ranges with booked_start < slot_end form a prefix of the sorted
+    starts; the slot overlaps one of them iff the latest end in that prefix
+    is after slot_start.
+    """
+    starts, max_ends = booked_index
+    k = bisect_left(starts, slot_end)
+    return k > 0 and max_ends[k - 1] > slot_start
+
+
 def _is_slot_booked(
     slot_start: time,
     slot_end: time,
@@ -144,6 +272,9 @@ def _is_slot_booked(
     """
     Check if a slot overlaps with any booked time range.
     Overlap exists when: booked_start < slot_end AND booked_end > slot_start
+
+    Linear reference for ``_overlaps_booked``; kept for the equivalence
+    tests and the slot-engine benchmark.
     """
     for booked_start, booked_end in booked_ranges:
         if booked_start < slot_end and booked_end > slot_start:
@@ -151,6 +282,78 @@ def _is_slot_booked(
     return False
 
 
+def is_slot_booked(
+    doctor_id: int,
+    target_date: date,
+    slot_start: time,
+    duration_minutes: int,
+    exclude_appointment_id: int | None = None,
+) -> bool:
+    """
+    Whether one slot of ``duration_minutes`` starting at ``slot_start``
+    overlaps a blocking appointment of the doctor on ``target_date`` at any
+    clinic (R-03).
+
+    Same rule as a grid's ``is_booked`` flag, in one query over the appointments
+    starting before the slot ends — the check ``book_appointment`` runs under
+    its doctor-day lock instead of regenerating the whole grid.
+    """
+    slot_end = _add_minutes_to_time(slot_start, duration_minutes)
+    appointments = Appointment.objects.filter(
+        doctor_id=doctor_id,
+        appointment_date=target_date,
+        status__in=SLOT_BLOCKING_STATUSES,
+    )
+    if slot_end > slot_start:  # a slot running past midnight wraps around
+        appointments = appointments.filter(appointment_time__lt=slot_end)
+    if exclude_appointment_id is not None:
+        appointments = appointments.exclude(pk=exclude_appointment_id)
+    booked = [
+        (appt_start, _add_minutes_to_time(appt_start, type_duration or duration_minutes))
+        for appt_start, type_duration in appointments.values_list(
+            "appointment_time", "appointment_type__duration_minutes"
+        )
+    ]
+    return _overlaps_booked(slot_start, slot_end, _index_booked_ranges(booked))
+
+
+def is_slot_in_availability(
+    doctor_id: int,
+    clinic_id: int,
+    target_date: date,
+    slot_start: time,
+    duration_minutes: int,
+    slot_step_minutes: int | None = None,
+) -> bool:
+    """
+    Whether ``slot_start`` is a slot of the doctor's grid at ``clinic_id`` on
+    ``target_date``: it lies on the step grid of an active weekly availability
+    block and the full ``duration_minutes`` fits inside that block.
+
+    Same layout rule as ``_build_day_slots``, in one query on the doctor's
+    availability rows — ``book_appointment`` runs it under its doctor-day lock
+    so a stale cached grid can never admit a slot the doctor no longer offers.
+    Holidays and exceptions are not checked here (see BookingContext).
+    """
+    duration = timedelta(minutes=duration_minutes)
+    step = timedelta(minutes=slot_step_minutes) if slot_step_minutes else duration
+    start = datetime.combine(target_date, slot_start)
+    for block_start, block_end in DoctorAvailability.objects.filter(
+        doctor_id=doctor_id,
+        clinic_id=clinic_id,
+        day_of_week=target_date.weekday(),
+        is_active=True,
+    ).values_list("start_time", "end_time"):
+        offset = start - datetime.combine(target_date, block_start)
+        if (
+            offset >= timedelta(0)
+            and offset % step == timedelta(0)
+            and start + duration <= datetime.combine(target_date, block_end)
+        ):
+            return True
+    return False
+
+
 def _add_minutes_to_time(t: time, minutes: int) -> time:
     """Add minutes to a time object, returning a new time object."""
     dt = datetime.combine(datetime.today(), t)
@@ -0,0 +1,86 @@
+"""
+Slot-cache invalidation (see doctors/slot_cache.py).
+
+Every write that can change a slot grid bumps the matching version stamp once
+the surrounding transaction commits. Invitation writes likewise drop the
+cached navbar badge count (doctors/context_processors.py). Catalog writes
+move the clinic's catalog-search stamp (doctors/catalog_search.py) right away
+and again on commit, so an index rebuilt mid-transaction is not kept.
+"""
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from appointments.models import Appointment
+from clinics.models import (
+    ClinicHoliday,
+    ClinicInvitation,
+    DoctorAvailabilityException,
+    DrugFamily,
+    DrugProduct,
+    OrderCatalogItem,
+)
+
+from . import catalog_search, slot_cache
+from .context_processors import invalidate_pending_invitations_count
+from .models import DoctorAvailability
+
+
+@receiver(post_init, sender=Appointment)
+def remember_appointment_slot(sender, instance, **kwargs):
+    """Stash the loaded (doctor, date) so a reschedule also frees the old day.
+
+    Reads __dict__ directly so deferred fields are never fetched here.
+    """
+    instance._slot_cache_origin = (
+        instance.__dict__.get("doctor_id"),
+        instance.__dict__.get("appointment_date"),
+    )
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def invalidate_appointment_slots(sender, instance, **kwargs):
+    days = {(instance.doctor_id, instance.appointment_date)}
+    days.add(getattr(instance, "_slot_cache_origin", (None, None)))
+    for doctor_id, appt_date in days:
+        if doctor_id and appt_date:
+            transaction.on_commit(
+                partial(slot_cache.invalidate_doctor_day, doctor_id, appt_date)
+            )
+    instance._slot_cache_origin = (instance.doctor_id, instance.appointment_date)
+
+
+@receiver(post_save, sender=DoctorAvailability)
+@receiver(post_delete, sender=DoctorAvailability)
+@receiver(post_save, sender=DoctorAvailabilityException)
+@receiver(post_delete, sender=DoctorAvailabilityException)
+def invalidate_doctor_slots(sender, instance, **kwargs):
+    transaction.on_commit(partial(slot_cache.invalidate_doctor, instance.doctor_id))
+
+
+@receiver(post_save, sender=ClinicHoliday)
+@receiver(post_delete, sender=ClinicHoliday)
+def invalidate_clinic_slots(sender, instance, **kwargs):
+    transaction.on_commit(partial(slot_cache.invalidate_clinic, instance.clinic_id))
+
+
+@receiver(post_save, sender=ClinicInvitation)
+@receiver(post_delete, sender=ClinicInvitation)
+def invalidate_invitation_badge(sender, instance, **kwargs):
+    transaction.on_commit(
+        partial(invalidate_pending_invitations_count, instance.doctor_phone)
+    )
+
+
+@receiver(post_save, sender=DrugProduct)
+@receiver(post_delete, sender=DrugProduct)
+@receiver(post_save, sender=OrderCatalogItem)
+@receiver(post_delete, sender=OrderCatalogItem)
+@receiver(post_delete, sender=DrugFamily)  # SET_NULLs its products without signals
+def invalidate_catalog_search(sender, instance, **kwargs):
+    catalog_search.invalidate_clinic(instance.clinic_id)
+    transaction.on_commit(partial(catalog_search.invalidate_clinic, instance.clinic_id))
@@ -0,0 +1,153 @@
+"""
+Read-through cache of slot grids for the read-heavy slot pickers.
+
+The public browse page, the slots API and the patient edit-slot loader all
+rebuild the same grid on every hit. This module stores each grid in the
+default cache (Redis in production) keyed by
+(doctor, clinic, date, duration, step, excluded appointment).
+
+Invalidation is by version stamps rather than key deletion, because one write
+can affect an open-ended set of (duration, step) keys:
+- ``slots:ver:doctor:<id>``      — DoctorAvailability / DoctorAvailabilityException
+- ``slots:ver:clinic:<id>``      — ClinicHoliday
+- ``slots:ver:day:<id>:<date>``  — Appointment writes for that doctor + date
+  (any clinic — R-03 global conflict check)
+The current stamps are folded into every grid key, so bumping one makes the
+old grids unreachable; they simply age out with ``SLOT_CACHE_TTL_SECONDS``.
+Bumps run on transaction commit (see doctors/signals.py) so a reader can never
+cache pre-commit data under the new stamp.
+
+This cache only serves *display* and fail-fast checks; a grid may be stale
+for up to the TTL. Under the doctor-day lock, ``book_appointment`` re-checks
+the requested slot against the doctor's availability and bookings
+(``is_slot_in_availability`` / ``is_slot_booked``) and the patient edit
+service regenerates the grid — those locked checks are the source of truth.
+Fail-open: any cache error falls back to a direct ``generate_slots_for_date``
+call.
+"""
+
+import logging
+import time as time_mod
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .services import generate_slots_for_date
+
+logger = logging.getLogger(__name__)
+
+SLOT_CACHE_TTL_SECONDS = getattr(settings, "SLOT_CACHE_TTL_SECONDS", 5 * 60)
+
+
+def _doctor_version_key(doctor_id):
+    return f"slots:ver:doctor:{doctor_id}"
+
+
+def _clinic_version_key(clinic_id):
+    return f"slots:ver:clinic:{clinic_id}"
+
+
+def _day_version_key(doctor_id, target_date):
+    return f"slots:ver:day:{doctor_id}:{target_date.isoformat()}"
+
+
+def _current_versions(keys):
+    """Read the version stamps, seeding any missing one.
+
+    Missing stamps are seeded with a nanosecond clock rather than 0 so an
+    evicted stamp can never fall back onto a value that older grids used.
+    """
+    versions = cache.get_many(keys)
+    missing = [k for k in keys if k not in versions]
+    if missing:
+        for k in missing:
+            cache.add(k, time_mod.time_ns(), timeout=None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(k, 0) for k in keys]
+
+
+def _bump(key):
+    """Advance one version stamp (fail-open)."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Never seeded (or evicted) — any fresh stamp differs from the old one.
+        cache.set(key, time_mod.time_ns(), timeout=None)
+    except Exception:
+        logger.warning("[slot-cache] version bump failed for %s", key)
+
+
+def invalidate_doctor(doctor_id):
+    """Drop every cached grid for a doctor (availability / exception change)."""
+    _bump(_doctor_version_key(doctor_id))
+
+
+def invalidate_clinic(clinic_id):
+    """Drop every cached grid at a clinic (holiday change)."""
+    _bump(_clinic_version_key(clinic_id))
+
+
+def invalidate_doctor_day(doctor_id, target_date):
+    """Drop a doctor's cached grids for one date, at every clinic."""
+    _bump(_day_version_key(doctor_id, target_date))
+
+
+def _refresh_past_flags(slots, now_time):
+    """Re-derive is_past for a cached grid of today. Time only moves forward,
+    so a slot that is not past now was not past when the grid was built and
+    its is_booked flag is still the computed one."""
+    refreshed = []
+    for slot in slots:
+        if slot["time"] <= now_time and not slot["is_past"]:
+            slot = dict(slot, is_past=True, is_booked=False, is_available=False)
+        refreshed.append(slot)
+    return refreshed
+
+
+def get_cached_slots_for_date(
+    doctor_id: int,
+    clinic_id: int,
+    target_date: date,
+    duration_minutes: int,
+    slot_step_minutes: int | None = None,
+    exclude_appointment_id: int | None = None,
+) -> list[dict]:
+    """Cached ``generate_slots_for_date`` — same arguments, same return shape."""
+    version_keys = [
+        _doctor_version_key(doctor_id),
+        _clinic_version_key(clinic_id),
+        _day_version_key(doctor_id, target_date),
+    ]
+    try:
+        versions = _current_versions(version_keys)
+        key = "slots:grid:{}:{}:{}:{}:{}:{}:{}".format(
+            doctor_id, clinic_id, target_date.isoformat(), duration_minutes,
+            slot_step_minutes or 0, exclude_appointment_id or 0,
+            ".".join(str(v) for v in versions),
+        )
+        slots = cache.get(key)
+    except Exception:
+        logger.warning("[slot-cache] cache read failed — computing directly")
+        key, slots = None, None
+
+    if slots is None:
+        slots = generate_slots_for_date(
+            doctor_id=doctor_id,
+            clinic_id=clinic_id,
+            target_date=target_date,
+            duration_minutes=duration_minutes,
+            slot_step_minutes=slot_step_minutes,
+            exclude_appointment_id=exclude_appointment_id,
+        )
+        if key is not None:
+            try:
+                cache.set(key, slots, timeout=SLOT_CACHE_TTL_SECONDS)
+            except Exception:
+                logger.warning("[slot-cache] cache write failed for %s", key)
+        return slots
+
+    if target_date == timezone.localdate():
+        slots = _refresh_past_flags(slots, timezone.localtime().time())
+    return slots
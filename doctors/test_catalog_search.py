@@ -0,0 +1,229 @@
+"""
+Order-picker catalog search (doctors/catalog_search.py, core/search_text.py).
+
+Covers:
+- Arabic / Latin folding of names and queries; save() keeps ``search_name``
+  in step
+- ranking (favourites, word prefix, similarity, name), substring and typo
+  matches, short-query prefix matching, family / category / active filters —
+  on the in-memory backend, and on pg_trgm where the extension is installed
+- catalog_views writes (create, edit, delete, family delete) reach the
+  in-memory index through the version stamp
+- the HTMX picker endpoints and the benchmark_catalog_search command
+"""
+
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from clinics.models import DrugFamily, DrugProduct, OrderCatalogItem
+from core.search_text import normalize_name
+from doctors import catalog_search
+from doctors.catalog_search import search_catalog_items, search_drugs
+from patients.models import ClinicPatient
+
+from doctors.test_views import DoctorViewTestBase
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "catalog-search-tests"}}
+
+
+def _pg_trgm_installed():
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+class NormalizeNameTests(TestCase):
+
+    def test_arabic_variants_fold_together(self):
+        self.assertEqual(normalize_name("أموكسيسيلين"), normalize_name("اَمُوكسِيسيلِين"))
+        self.assertEqual(normalize_name("إيبوبروفين"), "ايبوبروفين")
+        self.assertEqual(normalize_name("قطرة مضادة"), "قطره مضاده")
+        self.assertEqual(normalize_name("فيتامين د٣"), "فيتامين د3")
+
+    def test_latin_case_accents_and_punctuation(self):
+        self.assertEqual(normalize_name("  Amoxicillin/Clavulanate  625MG "), "amoxicillin clavulanate 625mg")
+        self.assertEqual(normalize_name("Café"), "cafe")
+
+    def test_save_keeps_search_name_in_step(self):
+        product = DrugProduct(clinic=self._clinic(), generic_name="Paracetamol", commercial_name="بنادول")
+        product.save()
+        product.commercial_name = "أدول"
+        product.save(update_fields=["commercial_name"])
+        product.refresh_from_db()
+        self.assertEqual(product.search_name, "paracetamol ادول")
+
+    def _clinic(self):
+        from clinics.models import Clinic
+        from django.contrib.auth import get_user_model
+        owner = get_user_model().objects.create_user(phone="0599100001", name="Owner", role="MAIN_DOCTOR")
+        return Clinic.objects.create(name="Fold", address="-", main_doctor=owner)
+
+
+class CatalogSearchMixin:
+    """Shared expectations, run once per backend."""
+
+    def setUp(self):
+        super().setUp()
+        catalog_search._indexes.clear()
+        self.antibiotics = DrugFamily.objects.create(clinic=self.clinic_a, name="Antibiotics")
+        self.amoxicillin = DrugProduct.objects.create(
+            clinic=self.clinic_a, family=self.antibiotics,
+            generic_name="Amoxicillin", commercial_name="أموكسيل",
+        )
+        self.co_amoxiclav = DrugProduct.objects.create(
+            clinic=self.clinic_a, family=self.antibiotics,
+            generic_name="Co-Amoxiclav", commercial_name="Augmentin",
+        )
+        self.paracetamol = DrugProduct.objects.create(
+            clinic=self.clinic_a, generic_name="Paracetamol", commercial_name="باراسيتامول",
+        )
+        self.pantoprazole = DrugProduct.objects.create(
+            clinic=self.clinic_a, generic_name="Pantoprazole", commercial_name="Controloc",
+        )
+        DrugProduct.objects.create(
+            clinic=self.clinic_a, generic_name="Amoxicillin Retard", commercial_name="Old", is_active=False,
+        )
+        DrugProduct.objects.create(clinic=self.clinic_b, generic_name="Amoxicillin", commercial_name="Other")
+
+    def _names(self, query, **kwargs):
+        return [d.generic_name for d in search_drugs(self.clinic_a.id, query, **kwargs)]
+
+    def test_word_prefix_ranks_above_substring(self):
+        self.assertEqual(self._names("amox"), ["Amoxicillin", "Co-Amoxiclav"])
+
+    def test_substring_inside_a_word(self):
+        self.assertEqual(self._names("toprazo"), ["Pantoprazole"])
+
+    def test_typo_is_tolerated(self):
+        self.assertEqual(self._names("paracetamoll"), ["Paracetamol"])
+
+    def test_arabic_query_without_hamza_finds_hamza_spelling(self):
+        self.assertEqual(self._names("اموكسيل"), ["Amoxicillin"])
+        self.assertEqual(self._names("باراسيتامول"), ["Paracetamol"])
+
+    def test_short_query_matches_word_prefixes_only(self):
+        self.assertEqual(self._names("pa"), ["Pantoprazole", "Paracetamol"])
+        self.assertEqual(self._names("x"), [])
+
+    def test_favourites_first(self):
+        self.assertEqual(
+            self._names("amox", favourite_ids={self.co_amoxiclav.id}), ["Co-Amoxiclav", "Amoxicillin"],
+        )
+        self.assertEqual(self._names("", favourite_ids={self.pantoprazole.id})[0], "Pantoprazole")
+
+    def test_family_filter_and_commercial_mode(self):
+        self.assertEqual(self._names("", family_id=self.antibiotics.id), ["Amoxicillin", "Co-Amoxiclav"])
+        self.assertEqual(
+            self._names("", family_id=self.antibiotics.id, mode="commercial"), ["Co-Amoxiclav", "Amoxicillin"],
+        )
+
+    def test_family_is_loaded_with_the_results(self):
+        drugs = search_drugs(self.clinic_a.id, "amoxicillin")
+        with self.assertNumQueries(0):
+            self.assertEqual(drugs[0].family.name, "Antibiotics")
+
+    def test_catalog_items_by_category(self):
+        for name in ("CBC", "Blood Culture", "Lipid Profile"):
+            OrderCatalogItem.objects.create(clinic=self.clinic_a, category="LAB", name=name)
+        OrderCatalogItem.objects.create(clinic=self.clinic_a, category="MICROBIOLOGY", name="Culture Swab")
+        found = [i.name for i in search_catalog_items(self.clinic_a.id, "LAB", "cult")]
+        self.assertEqual(found, ["Blood Culture"])
+        found = [i.name for i in search_catalog_items(self.clinic_a.id, "LAB", "")]
+        self.assertEqual(found, ["Blood Culture", "CBC", "Lipid Profile"])
+
+
+@override_settings(CACHES=LOCMEM, CATALOG_SEARCH_BACKEND="memory")
+class MemoryCatalogSearchTests(CatalogSearchMixin, DoctorViewTestBase):
+
+    def test_warm_search_is_one_query(self):
+        search_drugs(self.clinic_a.id, "amox")
+        with self.assertNumQueries(1):
+            search_drugs(self.clinic_a.id, "para")
+
+    def test_catalog_view_writes_rebuild_the_index(self):
+        self.assertEqual(self._names("ibu"), [])
+        self.client.force_login(self.doctor_a)
+
+        self.client.post(reverse("doctors:drug_product_create"), {
+            "clinic_id": self.clinic_a.id, "generic_name": "Ibuprofen", "commercial_name": "بروفين",
+        })
+        self.assertEqual(self._names("ibu"), ["Ibuprofen"])
+
+        ibuprofen = DrugProduct.objects.get(generic_name="Ibuprofen")
+        self.client.post(reverse("doctors:drug_product_edit", args=[ibuprofen.id]), {
+            "generic_name": "Ibuprofen", "commercial_name": "Brufen", "family_id": self.antibiotics.id,
+        })
+        self.assertEqual(self._names("brufen"), ["Ibuprofen"])
+        self.assertEqual(self._names("", family_id=self.antibiotics.id)[-1], "Ibuprofen")
+
+        self.client.post(reverse("doctors:drug_family_delete", args=[self.antibiotics.id]))
+        self.assertEqual(self._names("", family_id=self.antibiotics.id), [])
+
+        self.client.post(reverse("doctors:drug_product_delete", args=[ibuprofen.id]))
+        self.assertEqual(self._names("ibu"), [])
+
+
+@skipUnless(_pg_trgm_installed(), "pg_trgm is not installed on this server")
+@override_settings(CACHES=LOCMEM, CATALOG_SEARCH_BACKEND="trigram")
+class TrigramCatalogSearchTests(CatalogSearchMixin, DoctorViewTestBase):
+
+    def test_search_is_one_query_served_by_the_trigram_index(self):
+        with self.assertNumQueries(1):
+            search_drugs(self.clinic_a.id, "amox")
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")  # rolled back with the test
+        qs = DrugProduct.objects.filter(search_name__contains="amox")
+        self.assertIn("drug_search_trgm_idx", qs.explain())
+
+
+@override_settings(CACHES=LOCMEM)
+class CatalogPickerViewTests(DoctorViewTestBase):
+
+    def setUp(self):
+        super().setUp()
+        catalog_search._indexes.clear()
+        ClinicPatient.objects.get_or_create(patient=self.patient_a, clinic=self.clinic_a)
+        self.client.force_login(self.doctor_a)
+
+    def test_drug_picker_ranks_and_flags_favourites(self):
+        from doctors.models import DoctorFavouriteDrug
+        DrugProduct.objects.create(clinic=self.clinic_a, generic_name="Amoxicillin", commercial_name="Amoxil")
+        favourite = DrugProduct.objects.create(clinic=self.clinic_a, generic_name="Co-Amoxiclav")
+        DoctorFavouriteDrug.objects.create(user=self.doctor_a, drug_product=favourite)
+
+        resp = self.client.get(
+            reverse("doctors:htmx_catalog_drug_search", args=[self.patient_a.id]),
+            {"clinic_id": self.clinic_a.id, "drug_q": "AMOX", "family_id": "nope"},
+        )
+        self.assertEqual(resp.status_code, 200)
+        drugs = resp.context["drugs"]
+        self.assertEqual([d.generic_name for d in drugs], ["Co-Amoxiclav", "Amoxicillin"])
+        self.assertTrue(drugs[0].is_favourite)
+        self.assertFalse(drugs[1].is_favourite)
+
+    def test_nondrug_picker_searches_category(self):
+        OrderCatalogItem.objects.create(clinic=self.clinic_a, category="RADIOLOGY", name="أشعة صدر")
+        OrderCatalogItem.objects.create(clinic=self.clinic_a, category="LAB", name="اشعة وهمية")
+        resp = self.client.get(
+            reverse("doctors:htmx_catalog_nondrug_search", args=[self.patient_a.id]),
+            {"clinic_id": self.clinic_a.id, "category": "radiology", "q": "اشعه"},
+        )
+        self.assertEqual([i.name for i in resp.context["items"]], ["أشعة صدر"])
+
+
+@override_settings(CACHES=LOCMEM)
+class BenchmarkCatalogSearchCommandTests(TestCase):
+
+    def test_reports_each_backend_and_rolls_back(self):
+        out = StringIO()
+        call_command("benchmark_catalog_search", drugs=200, rounds=1, stdout=out)
+        self.assertIn("memory: 12 search(es) over 200 drug(s)", out.getvalue())
+        self.assertIn("p95", out.getvalue())
+        self.assertFalse(DrugProduct.objects.exists())
@@ -0,0 +1,257 @@
+"""
+Tests for the batched slot engine (doctors.services.generate_slots_for_range).
+
+Covers:
+- Every requested (doctor, date) pair is returned, grids match the single-day API
+- Holidays block every doctor; exceptions block only their doctor
+- Appointments block across ALL clinics (R-03) and honour exclude_appointment_id
+- The whole window is loaded in a constant number of queries
+- The sorted-sweep overlap check matches the linear reference
+- The slot snapshot cache serves repeat reads and is invalidated by writes
+
+Reuses the two-tenant fixture from test_views.DoctorViewTestBase.
+"""
+
+import random
+from datetime import time, timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from appointments.models import Appointment
+from clinics.models import ClinicHoliday, ClinicStaff, DoctorAvailabilityException
+from doctors.models import DoctorAvailability
+from doctors.services import (
+    _add_minutes_to_time,
+    _index_booked_ranges,
+    _is_slot_booked,
+    _overlaps_booked,
+    generate_slots_for_date,
+    generate_slots_for_range,
+    is_slot_in_availability,
+)
+from doctors.slot_cache import get_cached_slots_for_date
+
+from doctors.test_views import DoctorViewTestBase
+
+
+class SlotRangeEngineTests(DoctorViewTestBase):
+
+    def setUp(self):
+        super().setUp()
+        # Doctor B also practises at clinic A so the window has two doctors.
+        ClinicStaff.objects.create(
+            clinic=self.clinic_a, user=self.doctor_b, role="DOCTOR", is_active=True,
+        )
+        self.start = self.next_monday
+        self.end = self.next_monday + timedelta(days=6)
+        for doctor in (self.doctor_a, self.doctor_b):
+            for weekday in range(7):
+                DoctorAvailability.objects.create(
+                    doctor=doctor, clinic=self.clinic_a, day_of_week=weekday,
+                    start_time=time(9, 0), end_time=time(12, 0),
+                )
+
+    def _range(self, **kw):
+        return generate_slots_for_range(
+            [self.doctor_a.id, self.doctor_b.id], self.clinic_a.id,
+            self.start, self.end, 30, **kw,
+        )
+
+    def test_returns_every_doctor_date_pair(self):
+        grids = self._range()
+        self.assertEqual(len(grids), 14)
+        for slots in grids.values():
+            self.assertEqual(len(slots), 6)  # 09:00–12:00 in 30-min slots
+            self.assertTrue(all(s["is_available"] for s in slots))
+
+    def test_matches_single_day_api(self):
+        self._make_appt(self.doctor_a, self.clinic_a, self.patient_a, self.appt_type_a,
+                        appt_time=time(10, 0))
+        grids = self._range(slot_step_minutes=15)
+        for (doctor_id, day), slots in grids.items():
+            self.assertEqual(
+                slots,
+                generate_slots_for_date(doctor_id, self.clinic_a.id, day, 30, 15),
+            )
+
+    def test_constant_query_count(self):
+        with self.assertNumQueries(4):
+            self._range()
+
+    def test_holiday_blocks_all_doctors(self):
+        holiday_day = self.start + timedelta(days=2)
+        ClinicHoliday.objects.create(
+            clinic=self.clinic_a, title="Eid",
+            start_date=holiday_day, end_date=holiday_day,
+        )
+        grids = self._range()
+        self.assertEqual(grids[(self.doctor_a.id, holiday_day)], [])
+        self.assertEqual(grids[(self.doctor_b.id, holiday_day)], [])
+        self.assertTrue(grids[(self.doctor_a.id, holiday_day + timedelta(days=1))])
+
+    def test_exception_blocks_only_its_doctor(self):
+        DoctorAvailabilityException.objects.create(
+            doctor=self.doctor_b, clinic=self.clinic_a,
+            start_date=self.start - timedelta(days=3), end_date=self.start + timedelta(days=1),
+        )
+        grids = self._range()
+        self.assertEqual(grids[(self.doctor_b.id, self.start)], [])
+        self.assertEqual(grids[(self.doctor_b.id, self.start + timedelta(days=1))], [])
+        self.assertTrue(grids[(self.doctor_b.id, self.start + timedelta(days=2))])
+        self.assertTrue(grids[(self.doctor_a.id, self.start)])
+
+    def test_other_clinic_appointment_blocks_slot(self):
+        """R-03: doctor B's booking at clinic B blocks the same time at clinic A."""
+        self._make_appt(self.doctor_b, self.clinic_b, self.patient_b, self.appt_type_b,
+                        appt_time=time(9, 30))
+        slots = self._range()[(self.doctor_b.id, self.start)]
+        booked = [s["time"] for s in slots if s["is_booked"]]
+        self.assertEqual(booked, [time(9, 30)])
+
+    def test_exclude_appointment_id(self):
+        appt = self._make_appt(self.doctor_a, self.clinic_a, self.patient_a, self.appt_type_a,
+                               appt_time=time(9, 0))
+        slots = self._range(exclude_appointment_id=appt.id)[(self.doctor_a.id, self.start)]
+        self.assertTrue(all(s["is_available"] for s in slots))
+
+    def test_cancelled_appointment_does_not_block(self):
+        self._make_appt(self.doctor_a, self.clinic_a, self.patient_a, self.appt_type_a,
+                        appt_time=time(9, 0), status=Appointment.Status.CANCELLED)
+        slots = self._range()[(self.doctor_a.id, self.start)]
+        self.assertTrue(all(s["is_available"] for s in slots))
+
+    def test_slot_in_availability_matches_grid(self):
+        grid = {s["time"] for s in self._range(slot_step_minutes=15)[(self.doctor_a.id, self.start)]}
+        for minutes in range(8 * 60, 12 * 60 + 15, 5):
+            at = time(minutes // 60, minutes % 60)
+            self.assertEqual(
+                is_slot_in_availability(self.doctor_a.id, self.clinic_a.id, self.start, at, 30, 15),
+                at in grid,
+                at,
+            )
+        self.assertFalse(is_slot_in_availability(self.doctor_a.id, self.clinic_b.id, self.start, time(9, 0), 30))
+
+    def test_empty_inputs(self):
+        self.assertEqual(
+            generate_slots_for_range([], self.clinic_a.id, self.start, self.end, 30), {}
+        )
+        self.assertEqual(
+            generate_slots_for_range(
+                [self.doctor_a.id], self.clinic_a.id, self.end, self.start, 30
+            ),
+            {},
+        )
+
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM)
+class SlotSnapshotCacheTests(DoctorViewTestBase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.availability = DoctorAvailability.objects.create(
+            doctor=self.doctor_a, clinic=self.clinic_a, day_of_week=0,
+            start_time=time(9, 0), end_time=time(11, 0),
+        )
+
+    def _slots(self):
+        return get_cached_slots_for_date(
+            self.doctor_a.id, self.clinic_a.id, self.next_monday, 30
+        )
+
+    def _available(self):
+        return [s["time"] for s in self._slots() if s["is_available"]]
+
+    def test_repeat_read_hits_cache(self):
+        first = self._slots()
+        with self.assertNumQueries(0):
+            self.assertEqual(self._slots(), first)
+
+    def test_booking_invalidates_day(self):
+        self.assertIn(time(9, 0), self._available())
+        with self.captureOnCommitCallbacks(execute=True):
+            self._make_appt(self.doctor_a, self.clinic_a, self.patient_a, self.appt_type_a)
+        self.assertNotIn(time(9, 0), self._available())
+
+    def test_other_clinic_booking_invalidates_day(self):
+        """R-03: a booking at clinic B changes the doctor's grid at clinic A."""
+        ClinicStaff.objects.create(
+            clinic=self.clinic_b, user=self.doctor_a, role="DOCTOR", is_active=True,
+        )
+        self.assertIn(time(10, 0), self._available())
+        with self.captureOnCommitCallbacks(execute=True):
+            self._make_appt(self.doctor_a, self.clinic_b, self.patient_b, self.appt_type_b,
+                            appt_time=time(10, 0))
+        self.assertNotIn(time(10, 0), self._available())
+
+    def test_reschedule_frees_old_day(self):
+        appt = self._make_appt(self.doctor_a, self.clinic_a, self.patient_a, self.appt_type_a)
+        self.assertNotIn(time(9, 0), self._available())
+        appt = Appointment.objects.get(pk=appt.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            appt.appointment_date = self.next_monday + timedelta(days=7)
+            appt.save()
+        self.assertIn(time(9, 0), self._available())
+
+    def test_availability_change_invalidates(self):
+        self.assertEqual(len(self._slots()), 4)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.availability.end_time = time(10, 0)
+            self.availability.save()
+        self.assertEqual(len(self._slots()), 2)
+
+    def test_exception_and_holiday_invalidate(self):
+        self.assertTrue(self._slots())
+        with self.captureOnCommitCallbacks(execute=True):
+            exc = DoctorAvailabilityException.objects.create(
+                doctor=self.doctor_a, clinic=self.clinic_a,
+                start_date=self.next_monday, end_date=self.next_monday,
+            )
+        self.assertEqual(self._slots(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            exc.delete()
+        self.assertTrue(self._slots())
+        with self.captureOnCommitCallbacks(execute=True):
+            ClinicHoliday.objects.create(
+                clinic=self.clinic_a, title="Eid",
+                start_date=self.next_monday, end_date=self.next_monday,
+            )
+        self.assertEqual(self._slots(), [])
+
+
+class SlotOverlapSweepTests(SimpleTestCase):
+    """The sorted-sweep overlap check must agree with the linear reference."""
+
+    def test_matches_linear_reference_on_random_days(self):
+        rng = random.Random(7)
+        for _ in range(50):
+            booked = []
+            for _ in range(rng.randint(0, 40)):
+                start_min = rng.randrange(0, 24 * 60 - 5, 5)
+                start = time(start_min // 60, start_min % 60)
+                booked.append((start, _add_minutes_to_time(start, rng.choice((5, 20, 45, 90)))))
+            index = _index_booked_ranges(booked)
+            for slot_min in range(0, 24 * 60 - 15, 5):
+                slot_start = time(slot_min // 60, slot_min % 60)
+                slot_end = _add_minutes_to_time(slot_start, 15)
+                self.assertEqual(
+                    _overlaps_booked(slot_start, slot_end, index),
+                    _is_slot_booked(slot_start, slot_end, booked),
+                )
+
+    def test_touching_ranges_do_not_overlap(self):
+        index = _index_booked_ranges([(time(10, 0), time(10, 30))])
+        self.assertFalse(_overlaps_booked(time(9, 30), time(10, 0), index))
+        self.assertFalse(_overlaps_booked(time(10, 30), time(11, 0), index))
+        self.assertTrue(_overlaps_booked(time(10, 15), time(10, 45), index))
+
+    def test_benchmark_command_verifies_output(self):
+        out = StringIO()
+        call_command("benchmark_slot_engine", days=3, appointments=60, stdout=out)
+        self.assertIn("Identical output", out.getvalue())
@@ -9,6 +9,7 @@ urlpatterns = [
     # --- "My Day": live queue board + day timeline ---
     path("my-day/", views.my_day, name="my_day"),
     path("my-day/queue/", views.my_day_queue, name="my_day_queue"),
+    path("my-day/events/", views.my_day_events, name="my_day_events"),
     path(
         "my-day/<int:appointment_id>/advance/",
         views.my_day_transition,
@@ -3,8 +3,10 @@ import logging
 from datetime import datetime, date
 from functools import wraps
 
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.http import HttpResponse, HttpResponseForbidden
@@ -17,6 +19,8 @@ from appointments.models import Appointment, AppointmentType
 from clinics.models import ClinicStaff
 from .models import DoctorAvailability, DoctorProfile, DoctorVerification, ClinicDoctorCredential, DoctorIntakeFormTemplate, DoctorIntakeQuestion, DoctorIntakeRule, ClinicalNoteTemplate, ClinicalNoteTemplateElement, DoctorClinicalNoteSettings
 from .services import generate_slots_for_date
+from secretary import queue_events
+from secretary.services import QUEUE_ORDER
 from accounts.otp_utils import request_otp, verify_otp, is_in_cooldown, get_remaining_resends, get_cooldown_remaining
 
 User = get_user_model()
@@ -107,8 +111,8 @@ def appointments_list(request):
     """Doctor's full appointment list — filterable by date and status."""
     user = request.user
 
-    from compliance.services.compliance_service import apply_due_no_shows
-    apply_due_no_shows(Appointment.objects.filter(doctor=user))
+    from compliance.services.no_show_sweeper import ensure_no_shows_swept
+    ensure_no_shows_swept(f"doctor:{user.id}", Appointment.objects.filter(doctor=user))
 
     status_filter = request.GET.get("status", "")
     date_filter = request.GET.get("date", "")
@@ -367,10 +371,8 @@ def _my_day_data(doctor, target_date):
         base.filter(status=Appointment.Status.IN_PROGRESS)
         .order_by("checked_in_at", "appointment_time")
     )
-    checkedin_qs = (
-        base.filter(status=Appointment.Status.CHECKED_IN)
-        .order_by("checked_in_at", "queue_priority")
-    )
+    # Same queue order as the secretary's waiting room (drag-and-drop positions).
+    checkedin_qs = base.filter(status=Appointment.Status.CHECKED_IN).order_by(*QUEUE_ORDER)
     now = timezone.now()
     waiting = []
     for i, appt in enumerate(checkedin_qs, start=1):
@@ -415,6 +417,17 @@ def my_day_queue(request):
     return render(request, "doctors/partials/_my_day_queue.html", ctx)
 
 
+async def my_day_events(request):
+    """SSE stream telling the My Day board when today's queue changes, across
+    all of the doctor's clinics (see secretary/queue_events.py)."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    if not await sync_to_async(_is_doctor)(user):
+        return HttpResponseForbidden()
+    return await queue_events.stream_response(queue_events.doctor_channel(user.id))
+
+
 @login_required
 @doctor_required
 def my_day_transition(request, appointment_id):
@@ -1036,12 +1049,8 @@ def patients_list(request):
     # subquery so we never materialise the whole patient table. ─────────
     cp_qs = ClinicPatient.objects.filter(clinic_id__in=effective_clinic_ids)
     if q:
-        phone_q = q.replace(" ", "").replace("-", "")
-        cp_qs = cp_qs.filter(
-            Q(patient__name__icontains=q)
-            | Q(patient__phone__icontains=phone_q)
-            | Q(patient__national_id__icontains=q)
-        )
+        from patients.search import patient_match_q
+        cp_qs = cp_qs.filter(patient_match_q(q, path="patient__"))
 
     # ── Appointment recency/volume per patient (this doctor only). The
     # optional date window is applied inside the aggregate filter. ───────
@@ -1093,10 +1102,14 @@ def patients_list(request):
         followup_count = total_count if status_filter == "follow_up" else 0
         inactive_count = total_count if status_filter == "inactive" else 0
     else:
+        # One pass over the per-patient aggregate for all three buckets.
         display_qs = patients_qs
-        active_count   = patients_qs.filter(STATUS_FILTERS["active"]).count()
-        followup_count = patients_qs.filter(STATUS_FILTERS["follow_up"]).count()
-        inactive_count = patients_qs.filter(STATUS_FILTERS["inactive"]).count()
+        buckets = patients_qs.aggregate(**{
+            name: Count("id", filter=bucket) for name, bucket in STATUS_FILTERS.items()
+        })
+        active_count   = buckets["active"]
+        followup_count = buckets["follow_up"]
+        inactive_count = buckets["inactive"]
         total_count    = active_count + followup_count + inactive_count
 
     # ── Sort in the database; "id" is the stable tie-breaker. ─────────
@@ -3224,7 +3237,6 @@ def ws_order_delete(request, patient_id, order_id):
 @login_required
 def htmx_catalog_drug_search(request, patient_id):
     """HTMX endpoint: search clinic drug catalog for the order picker."""
-    from clinics.models import DrugProduct
     from django.http import HttpResponseForbidden
 
     ctx = _ws_access(request, patient_id)
@@ -3240,32 +3252,24 @@ def htmx_catalog_drug_search(request, patient_id):
     if not clinic_id:
         return render(request, "doctors/partials/catalog_drug_results.html", {"drugs": []})
 
-    from django.db.models import Q, Case, When, IntegerField
+    from doctors.catalog_search import search_drugs
     from doctors.models import DoctorFavouriteDrug
 
     mode = request.GET.get("mode", "generic")
-    qs = DrugProduct.objects.filter(clinic_id=clinic_id, is_active=True).select_related("family")
-
-    family_id = request.GET.get("family_id", "").strip()
-    if family_id:
-        qs = qs.filter(family_id=family_id)
-
-    q = request.GET.get("drug_q", "").strip()
-    if q:
-        qs = qs.filter(Q(generic_name__icontains=q) | Q(commercial_name__icontains=q))
+    try:
+        family_id = int(request.GET.get("family_id", "").strip() or 0) or None
+    except ValueError:
+        family_id = None
 
     fav_ids = set(
         DoctorFavouriteDrug.objects
         .filter(user=request.user, drug_product__clinic_id=clinic_id)
         .values_list("drug_product_id", flat=True)
     )
-    fav_rank = Case(When(id__in=fav_ids, then=0), default=1, output_field=IntegerField())
-    qs = qs.annotate(_fav_rank=fav_rank)
-
-    if mode == "commercial":
-        drugs = list(qs.order_by("_fav_rank", "commercial_name", "generic_name")[:60])
-    else:
-        drugs = list(qs.order_by("_fav_rank", "generic_name")[:60])
+    drugs = search_drugs(
+        clinic_id, request.GET.get("drug_q", ""),
+        favourite_ids=fav_ids, family_id=family_id, mode=mode,
+    )
 
     for d in drugs:
         d.is_favourite = d.id in fav_ids
@@ -3301,11 +3305,9 @@ def htmx_catalog_nondrug_search(request, patient_id):
     if category not in valid:
         return render(request, "doctors/partials/catalog_nondrug_results.html", {"items": []})
 
-    q = request.GET.get("q", "").strip()
-    qs = OrderCatalogItem.objects.filter(clinic_id=clinic_id, category=category, is_active=True)
-    if q:
-        qs = qs.filter(name__icontains=q)
-    items = list(qs.order_by("name")[:60])
+    from doctors.catalog_search import search_catalog_items
+
+    items = search_catalog_items(clinic_id, category, request.GET.get("q", ""))
 
     return render(request, "doctors/partials/catalog_nondrug_results.html", {"items": items})
 
@@ -4306,7 +4308,8 @@ def doctor_analytics(request):
     pattern but scoped to the doctor's own appointments. Operational metrics
     only — earnings/billing stay secretary-owned."""
     from datetime import date, timedelta, datetime as _dt
-    from django.db.models import Count
+    from django.db.models import Sum
+    from clinics import metrics
     from .services import doctor_rating_summary, doctor_rating_breakdown
 
     user = _require_doctor(request)
@@ -4326,14 +4329,10 @@ def doctor_analytics(request):
     if date_from > date_to:
         date_from, date_to = date_to, date_from
 
-    appts = Appointment.objects.filter(
-        doctor=user, appointment_date__range=(date_from, date_to)
-    )
-    total = appts.count()
-
-    status_counts = {val: 0 for val, _label in Appointment.Status.choices}
-    for row in appts.values("status").annotate(n=Count("id")):
-        status_counts[row["status"]] = row["n"]
+    rollup_qs = metrics.metrics_for(date_from=date_from, date_to=date_to, doctor_id=user.id)
+    rollup = metrics.totals(rollup_qs)
+    total = rollup["appointments"]
+    status_counts = rollup["status_counts"]
 
     completed = status_counts.get(Appointment.Status.COMPLETED, 0)
     no_show = status_counts.get(Appointment.Status.NO_SHOW, 0)
@@ -4353,9 +4352,9 @@ def doctor_analytics(request):
     ]
 
     clinic_completed = list(
-        appts.filter(status=Appointment.Status.COMPLETED)
-        .values("clinic__name")
-        .annotate(n=Count("id"))
+        rollup_qs.values("clinic__name")
+        .annotate(n=Sum("completed"))
+        .filter(n__gt=0)
         .order_by("-n")
     )
 
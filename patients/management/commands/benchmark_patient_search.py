@@ -0,0 +1,128 @@
+"""
+Management command: benchmark_patient_search
+
+Latency benchmark for roster search (patients/search.py). Builds a
+throw-away clinic with ``--patients`` registered patients (Arabic and Latin
+names, phones, national ids, file numbers) plus as many patients registered
+elsewhere, then times the secretary patient-list query — first page and
+count, as the paginator runs them — for a mix of searches: name fragments
+with and without hamza, full names, phone and national-id prefixes and file
+numbers. Reports p50 / p95 / max per kind.
+
+Everything runs inside one transaction that is rolled back. Exits with an
+error when any kind's p95 exceeds ``--max-p95-ms`` (if given).
+
+Usage:
+    python manage.py benchmark_patient_search
+    python manage.py benchmark_patient_search --patients 100000 --max-p95-ms 50
+"""
+
+import random
+import time as time_mod
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from appointments.management.commands.benchmark_booking import percentile
+from clinics.models import Clinic
+from core.search_text import normalize_name, phone_digits
+from patients.models import ClinicPatient
+from secretary.views import _patient_list_queryset
+
+User = get_user_model()
+
+FIRST = ["أحمد", "محمد", "إبراهيم", "فاطمة", "عائشة", "يوسف", "مريم", "خالد", "سارة", "ليلى",
+         "Ahmad", "Mohammad", "Sara", "Yousef", "Lina", "Omar", "Rami", "Huda"]
+LAST = ["الأحمد", "عبد الله", "النجار", "الخطيب", "حمدان", "أبو علي", "السعدي", "قاسم", "مصطفى",
+        "Haddad", "Nasser", "Khalil", "Saleh", "Odeh", "Barakat", "Darwish"]
+
+SEARCHES = {
+    "name fragment": ["احمد", "أحمد", "فاطمه", "sara", "khal"],
+    "full name": ["محمد النجار", "yousef haddad", "عائشة أبو علي"],
+    "phone prefix": ["0599", "059912", "+970 59"],
+    "national id prefix": ["4012", "40123"],
+    "file number": ["2026-00012", "00345"],
+}
+PAGE_SIZE = 25
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Measure secretary roster search latency (p50/p95) on a large clinic."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--patients", type=int, default=50_000, help="Patients registered in the clinic.")
+        parser.add_argument("--rounds", type=int, default=5, help="Passes over the search mix.")
+        parser.add_argument(
+            "--max-p95-ms", type=float, default=None,
+            help="Fail if any search kind's p95 exceeds this many milliseconds.",
+        )
+
+    def handle(self, *args, **options):
+        results = {}
+        try:
+            with transaction.atomic():
+                clinic = self._fixture(options["patients"])
+                for _ in range(options["rounds"]):
+                    for kind, queries in SEARCHES.items():
+                        for query in queries:
+                            results.setdefault(kind, []).append(self._time(clinic, query))
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        worst = 0.0
+        for kind, latencies in results.items():
+            latencies.sort()
+            p95 = percentile(latencies, 95)
+            worst = max(worst, p95)
+            self.stdout.write(
+                f"{kind:>18}: {len(latencies)} search(es) over {options['patients']} patient(s)  "
+                f"p50 {percentile(latencies, 50):.1f} ms  p95 {p95:.1f} ms  max {latencies[-1]:.1f} ms"
+            )
+
+        limit = options["max_p95_ms"]
+        if limit is not None and worst > limit:
+            raise CommandError(f"p95 {worst:.1f} ms exceeds {limit:.1f} ms.")
+        self.stdout.write(self.style.SUCCESS("Done (all writes rolled back)."))
+
+    def _time(self, clinic, query):
+        t0 = time_mod.perf_counter()
+        qs = _patient_list_queryset(clinic, search=query)
+        list(qs.select_related("patient")[:PAGE_SIZE])
+        qs.count()
+        return (time_mod.perf_counter() - t0) * 1000
+
+    def _fixture(self, patients):
+        tag = uuid.uuid4().hex[:8]
+        owner = User.objects.create_user(phone=f"bench-{tag}-o", name="Bench Owner", role="MAIN_DOCTOR")
+        clinic = Clinic.objects.create(name=f"Bench {tag}", address="-", main_doctor=owner)
+        other = Clinic.objects.create(name=f"Bench {tag} (other)", address="-", main_doctor=owner)
+
+        rng = random.Random(patients)
+        users = []
+        for n in range(patients * 2):
+            name = f"{rng.choice(FIRST)} {rng.choice(FIRST)} {rng.choice(LAST)}"
+            phone = f"05{rng.choice('69')}{n:07d}"
+            users.append(User(
+                phone=phone, password="!", name=name, role="PATIENT", roles=["PATIENT"],
+                national_id=f"4{n:08d}",
+                # bulk_create skips save(), which keeps the search keys.
+                search_name=normalize_name(name), search_phone=phone_digits(phone),
+            ))
+        users = User.objects.bulk_create(users, batch_size=5000)
+        ClinicPatient.objects.bulk_create([
+            ClinicPatient(
+                clinic=clinic if n % 2 == 0 else other, patient=user, file_number=f"2026-{n // 2:05d}",
+            )
+            for n, user in enumerate(users)
+        ], batch_size=5000)
+        with connection.cursor() as cursor:
+            for table in ("accounts_customuser", "patients_clinicpatient"):
+                cursor.execute(f"ANALYZE {table}")
+        return clinic
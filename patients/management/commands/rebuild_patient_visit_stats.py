@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from clinics.models import Clinic
+from patients.models import ClinicPatient
+from patients.visit_stats import refresh_visit_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes the ClinicPatient roster stats (last completed visit, '
+        'completed visit count, blocked flag) from appointments and compliance '
+        'records. Run to reconcile them after raw SQL, bulk_create or bulk data fixes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clinic', type=int, action='append', dest='clinic_ids',
+            help='Only rebuild this clinic (repeatable). Default: every clinic.',
+        )
+
+    def handle(self, *args, **options):
+        clinics = Clinic.objects.order_by('id')
+        if options['clinic_ids']:
+            clinics = clinics.filter(id__in=options['clinic_ids'])
+
+        total = 0
+        for clinic_id in clinics.values_list('id', flat=True).iterator():
+            rows = refresh_visit_stats(ClinicPatient.objects.filter(clinic_id=clinic_id))
+            total += rows
+            self.stdout.write(f'Clinic {clinic_id}: {rows} patient(s).')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {total} patient(s).'))
@@ -0,0 +1,57 @@
+from django.db import migrations, models
+from django.db.models import Count, Exists, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_visit_stats(apps, schema_editor):
+    """Same recount as patients.visit_stats.refresh_visit_stats, one clinic at a
+    time (historical models have no signals)."""
+    Appointment = apps.get_model("appointments", "Appointment")
+    ClinicPatient = apps.get_model("patients", "ClinicPatient")
+    PatientClinicCompliance = apps.get_model("compliance", "PatientClinicCompliance")
+
+    visits = (
+        Appointment.objects.filter(
+            clinic_id=OuterRef("clinic_id"), patient_id=OuterRef("patient_id"), status="COMPLETED",
+        )
+        .order_by()
+        .values("patient_id")
+    )
+    blocked = PatientClinicCompliance.objects.filter(
+        clinic_id=OuterRef("clinic_id"), patient__user_id=OuterRef("patient_id"), status="BLOCKED",
+    )
+    clinic_ids = ClinicPatient.objects.order_by("clinic_id").values_list("clinic_id", flat=True).distinct()
+    for clinic_id in list(clinic_ids):
+        ClinicPatient.objects.filter(clinic_id=clinic_id).update(
+            last_completed_visit=Subquery(visits.annotate(last=Max("appointment_date")).values("last")),
+            completed_visit_count=Coalesce(Subquery(visits.annotate(n=Count("id")).values("n")), 0),
+            is_blocked=Exists(blocked),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0020_notif_read_created_idx"),
+        ("compliance", "0002_compliance_forgive_idx"),
+        ("patients", "0014_order_allergy_acknowledged_at_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="clinicpatient",
+            name="last_completed_visit",
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="clinicpatient",
+            name="completed_visit_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="clinicpatient",
+            name="is_blocked",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(populate_visit_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Built CONCURRENTLY so deploying does not block writes to this table.
+    atomic = False
+
+    dependencies = [
+        ("patients", "0015_clinicpatient_visit_stats"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="clinicpatient",
+            index=models.Index(
+                models.F("clinic"),
+                models.OrderBy(models.F("last_completed_visit"), descending=True, nulls_last=True),
+                name="clinicpatient_last_visit_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="clinicpatient",
+            index=models.Index(
+                condition=models.Q(("is_blocked", True)),
+                fields=["clinic"],
+                name="clinicpatient_blocked_idx",
+            ),
+        ),
+    ]
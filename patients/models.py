@@ -96,12 +96,33 @@ class ClinicPatient(models.Model):
         default="",
         help_text="Auto-generated per-clinic file number (e.g. 2026-0001). Set by the secretary on registration.",
     )
+    # Roster stats for this clinic, maintained by patients/visit_stats.py from
+    # appointment and compliance writes; `manage.py rebuild_patient_visit_stats`
+    # reconciles them after raw SQL or bulk fixes.
+    last_completed_visit = models.DateField(null=True, blank=True, editable=False)
+    completed_visit_count = models.PositiveIntegerField(default=0, editable=False)
+    is_blocked = models.BooleanField(default=False, editable=False)
 
     class Meta:
         unique_together = [("clinic", "patient")]
         verbose_name = "Clinic Patient"
         verbose_name_plural = "Clinic Patients"
         ordering = ["-registered_at"]
+        indexes = [
+            # Secretary roster sorted by last visit (either direction: the
+            # ascending sort, nulls first, is a backward scan).
+            models.Index(
+                models.F("clinic"),
+                models.F("last_completed_visit").desc(nulls_last=True),
+                name="clinicpatient_last_visit_idx",
+            ),
+            # Secretary roster "blocked only" filter.
+            models.Index(
+                fields=["clinic"],
+                name="clinicpatient_blocked_idx",
+                condition=models.Q(is_blocked=True),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.patient.name} @ {self.clinic.name}"
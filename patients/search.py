@@ -0,0 +1,77 @@
+"""
+Patient search for the clinic rosters.
+
+The secretary patient list, check-in search, appointments list, waiting
+room, invoice list, registration lookup and the doctor patients list used to
+match ``name__icontains`` / ``phone__icontains`` / ``national_id__icontains``
+through ClinicPatient — a scan of the user table on every keystroke. They
+all build their filter here instead, against the search keys CustomUser
+keeps up to date on save (accounts/models.py):
+
+- a query made only of digits and phone punctuation (spaces, dashes, "+",
+  parentheses; Arabic-Indic digits too) is an identifier: a prefix of the
+  digits-only phone (``search_phone``, varchar_pattern_ops index — "599…"
+  also finds "0599…", "+970 599…" is read as "0599…") or of the national id
+  (its ``_like`` index);
+- otherwise each word must match: digit words as identifiers, other words
+  as a substring of the folded name (``search_name``, core/search_text.py —
+  "احمد" finds "أحمد"; GIN trigram index where pg_trgm is installed).
+
+File numbers belong to ClinicPatient; ``clinic_patient_match_q`` adds them
+for queries that contain a digit.
+"""
+
+import re
+
+from django.db.models import Q
+
+from core.search_text import fold_digits, normalize_name, phone_digits
+
+_IDENTIFIER = re.compile(r"[\d\s\-+()]*\d[\d\s\-+()]*")
+
+
+def _is_identifier(text):
+    return _IDENTIFIER.fullmatch(text) is not None
+
+
+def _identifier_q(text, path):
+    phone = phone_digits(text)
+    q = Q(**{f"{path}search_phone__startswith": phone})
+    if not phone.startswith("0"):
+        q |= Q(**{f"{path}search_phone__startswith": "0" + phone})
+    return q | Q(**{f"{path}national_id__startswith": fold_digits(text)})
+
+
+def patient_match_q(query, *, path=""):
+    """Q matching patients (CustomUser rows at ``path``) against ``query``.
+
+    ``path`` is the lookup prefix from the queried model, e.g. ``"patient__"``
+    for ClinicPatient or Appointment. An empty query matches everything.
+    """
+    query = (query or "").strip()
+    if not query:
+        return Q()
+    if _is_identifier(query):
+        return _identifier_q(query, path)
+
+    match = None
+    for word in query.split():
+        if _is_identifier(word):
+            word_q = _identifier_q(word, path)
+        else:
+            folded = normalize_name(word)
+            if not folded:
+                continue  # punctuation only
+            word_q = Q(**{f"{path}search_name__contains": folded})
+        match = word_q if match is None else match & word_q
+    # Nothing searchable (only punctuation) matches nobody, as icontains did.
+    return match if match is not None else Q(**{f"{path}pk__in": []})
+
+
+def clinic_patient_match_q(query, *, path=""):
+    """``patient_match_q`` for ClinicPatient rows (at ``path``), plus their file number."""
+    query = (query or "").strip()
+    match = patient_match_q(query, path=f"{path}patient__")
+    if any(ch.isdigit() for ch in query):
+        match |= Q(**{f"{path}file_number__icontains": query})
+    return match
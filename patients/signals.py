@@ -0,0 +1,63 @@
+"""
+ClinicPatient roster stats maintenance (see patients/visit_stats.py).
+
+Each appointment remembers its (clinic, patient, date, status) when loaded;
+on save the change is applied to the patient's ClinicPatient row, on delete
+the visit is removed. Deletes cascading from a Clinic are skipped — its
+ClinicPatient rows are deleted by the same cascade.
+"""
+
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from appointments.models import Appointment
+from clinics.metrics import is_clinic_cascade
+
+from . import visit_stats
+from .models import ClinicPatient
+
+
+def _stored_visit(pk):
+    row = (
+        Appointment.objects.filter(pk=pk)
+        .values_list("clinic_id", "patient_id", "appointment_date", "status")
+        .first()
+    )
+    return tuple(row) if row else None
+
+
+@receiver(post_init, sender=Appointment)
+def remember_appointment_visit(sender, instance, **kwargs):
+    instance._visit_state = visit_stats.appointment_visit(instance) if instance.pk else None
+
+
+@receiver(pre_save, sender=Appointment)
+def load_deferred_appointment_visit(sender, instance, **kwargs):
+    # Loaded with .only()/.defer(): read the stored state before it is overwritten.
+    if instance.pk and not instance._state.adding and instance._visit_state is None:
+        instance._visit_state = _stored_visit(instance.pk)
+
+
+@receiver(post_save, sender=Appointment)
+def update_appointment_visit(sender, instance, created, **kwargs):
+    old = None if created else instance._visit_state
+    new = visit_stats.appointment_visit(instance)
+    if new is None:  # saved with update_fields on a deferred instance
+        new = _stored_visit(instance.pk)
+    visit_stats.apply_visit_transitions([(old, new)])
+    instance._visit_state = new
+
+
+@receiver(post_delete, sender=Appointment)
+def remove_appointment_visit(sender, instance, origin=None, **kwargs):
+    if not is_clinic_cascade(origin):
+        visit_stats.apply_visit_transitions([(visit_stats.appointment_visit(instance), None)])
+
+
+@receiver(pre_save, sender=ClinicPatient)
+def fill_new_clinic_patient_stats(sender, instance, **kwargs):
+    # A patient can have visits (walk-ins) or a compliance record before they
+    # are registered in the clinic.
+    if instance._state.adding:
+        for field, value in visit_stats.source_stats(instance.clinic_id, instance.patient_id).items():
+            setattr(instance, field, value)
@@ -0,0 +1,114 @@
+"""
+Roster patient search (patients/search.py, core/search_text.py).
+
+Covers:
+- phone folding; save() keeps the ``search_name`` / ``search_phone`` keys
+  in step, including ``update_fields`` saves
+- name matches across hamza / taa-marbuta spellings and word order, phone
+  and national-id prefix matches, file numbers, clinic isolation — through
+  the secretary roster queryset
+- the registration lookup still needs an exact identifier outside the clinic
+- the benchmark_patient_search command
+"""
+
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from core.search_text import phone_digits
+from patients.models import ClinicPatient
+from patients.search import clinic_patient_match_q, patient_match_q
+from secretary.tests import SecretaryTestBase
+from secretary.views import _patient_list_queryset
+
+User = get_user_model()
+
+
+class SearchKeyTests(TestCase):
+
+    def test_phone_digits_folds_punctuation_prefixes_and_arabic_digits(self):
+        self.assertEqual(phone_digits("059-912 3456"), "0599123456")
+        self.assertEqual(phone_digits("+970 599 123 456"), "0599123456")
+        self.assertEqual(phone_digits("00972599123456"), "0599123456")
+        self.assertEqual(phone_digits("٠٥٩٩١٢٣٤٥٦"), "0599123456")
+        self.assertEqual(phone_digits(""), "")
+
+    def test_save_keeps_search_keys_in_step(self):
+        user = User.objects.create_user(phone="0599200001", name="فاطمة الأحمد", role="PATIENT")
+        self.assertEqual((user.search_name, user.search_phone), ("فاطمه الاحمد", "0599200001"))
+        user.name = "Fatima Ahmad"
+        user.phone = "0569200001"
+        user.save(update_fields=["name", "phone"])
+        user.refresh_from_db()
+        self.assertEqual((user.search_name, user.search_phone), ("fatima ahmad", "0569200001"))
+
+
+class RosterSearchTests(SecretaryTestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.fatima = self._register("0599200001", "فاطمة إبراهيم", "401234567", "2026-00012")
+        self.yousef = self._register("0569200002", "Yousef Haddad", "902345678", "2026-00345")
+        other = User.objects.create_user(
+            phone="0599200003", name="فاطمة خليل", role="PATIENT", national_id="401299999",
+        )
+        ClinicPatient.objects.create(clinic=self.clinic_b, patient=other, file_number="2026-00012")
+
+    def _register(self, phone, name, national_id, file_number):
+        patient = User.objects.create_user(phone=phone, name=name, role="PATIENT", national_id=national_id)
+        ClinicPatient.objects.create(clinic=self.clinic_a, patient=patient, file_number=file_number)
+        return patient
+
+    def _found(self, query):
+        return {cp.patient for cp in _patient_list_queryset(self.clinic_a, search=query)}
+
+    def test_name_folds_hamza_and_taa_marbuta(self):
+        self.assertEqual(self._found("فاطمه"), {self.fatima})
+        self.assertEqual(self._found("ابراهيم"), {self.fatima})
+        self.assertEqual(self._found("YOUSEF"), {self.yousef})
+
+    def test_every_word_must_match_in_any_order(self):
+        self.assertEqual(self._found("haddad yousef"), {self.yousef})
+        self.assertEqual(self._found("yousef ابراهيم"), set())
+
+    def test_phone_prefix_in_any_format(self):
+        self.assertEqual(self._found("0599"), {self.fatima})
+        self.assertEqual(self._found("599 200"), {self.fatima})
+        self.assertEqual(self._found("+970 56"), {self.yousef})
+        self.assertEqual(self._found("9200002"), set())  # prefixes only
+
+    def test_national_id_prefix_and_file_number(self):
+        self.assertEqual(self._found("40123"), {self.fatima})
+        self.assertEqual(self._found("2026-00345"), {self.yousef})
+        self.assertEqual(self._found("00012"), {self.fatima})
+
+    def test_punctuation_only_matches_nobody(self):
+        self.assertEqual(self._found("--"), set())
+        self.assertEqual(patient_match_q(""), patient_match_q("  "))
+
+    def test_file_numbers_only_searched_for_digit_queries(self):
+        self.assertNotIn("file_number", str(clinic_patient_match_q("fatima")))
+        self.assertIn("file_number", str(clinic_patient_match_q("00012")))
+
+    def test_registration_lookup_needs_exact_identifier_outside_the_clinic(self):
+        self.client.force_login(self.secretary_a)
+        url = reverse("secretary:patient_search")
+        partial = self.client.get(url, {"q": "فاطمه"})
+        self.assertEqual(list(partial.context["patients"]), [self.fatima])
+        exact = self.client.get(url, {"q": "401299999"})
+        self.assertEqual([p.phone for p in exact.context["patients"]], ["0599200003"])
+
+
+class BenchmarkPatientSearchCommandTests(TestCase):
+
+    def test_reports_each_kind_and_rolls_back(self):
+        users_before = User.objects.count()
+        out = StringIO()
+        call_command("benchmark_patient_search", patients=200, rounds=1, stdout=out)
+        self.assertIn("phone prefix: 3 search(es) over 200 patient(s)", out.getvalue())
+        self.assertIn("p95", out.getvalue())
+        self.assertEqual(User.objects.count(), users_before)
+        self.assertFalse(ClinicPatient.objects.exists())
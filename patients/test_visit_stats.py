@@ -0,0 +1,121 @@
+"""
+ClinicPatient roster stats (patients/visit_stats.py, patients/signals.py).
+
+Covers:
+- completing a visit through the status-transition service moves the count
+  and last visit; deleting a completed visit recounts
+- a ClinicPatient registered after earlier visits / a block starts from them
+- record_no_show, manual waivers, auto-forgiveness and the no-show sweeper
+  keep ``is_blocked`` in step
+- the secretary roster sorts and filters on the columns without touching
+  the appointments table
+- rebuild_patient_visit_stats reconciles rows written behind the signals
+"""
+
+from datetime import date, time, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from appointments.models import Appointment
+from compliance.models import ClinicComplianceSettings, PatientClinicCompliance
+from compliance.services.compliance_service import apply_manual_waiver, forgive_clinic, record_no_show
+from compliance.services.no_show_sweeper import apply_due_no_shows
+from patients.models import ClinicPatient
+from patients.services import ensure_patient_profile
+from secretary.services import transition_appointment_status
+from secretary.tests import SecretaryTestBase
+from secretary.views import _patient_list_queryset
+
+S = Appointment.Status
+
+
+class VisitStatsTests(SecretaryTestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.cp = ClinicPatient.objects.create(clinic=self.clinic_a, patient=self.patient_a)
+        self.profile, _ = ensure_patient_profile(self.patient_a)
+
+    def _visit(self, day, status=S.IN_PROGRESS, clinic=None):
+        return self._make_appointment(
+            clinic=clinic, status=status, appointment_date=day, appointment_time=time(10, 0),
+        )
+
+    def _stats(self, cp=None):
+        cp = cp or self.cp
+        cp.refresh_from_db()
+        return cp.last_completed_visit, cp.completed_visit_count, cp.is_blocked
+
+    def test_completing_visits_moves_count_and_last_visit(self):
+        early, late = date(2026, 3, 1), date(2026, 5, 1)
+        transition_appointment_status(self._visit(late), S.COMPLETED, actor=self.secretary_a)
+        transition_appointment_status(self._visit(early), S.COMPLETED, actor=self.secretary_a)
+        self._visit(date(2026, 6, 1), status=S.CONFIRMED)
+        self._visit(date(2026, 7, 1), status=S.COMPLETED, clinic=self.clinic_b)
+        self.assertEqual(self._stats(), (late, 2, False))
+
+    def test_deleting_a_completed_visit_recounts(self):
+        early = self._visit(date(2026, 3, 1), status=S.COMPLETED)
+        late = self._visit(date(2026, 5, 1), status=S.COMPLETED)
+        late.delete()
+        self.assertEqual(self._stats(), (date(2026, 3, 1), 1, False))
+        early.delete()
+        self.assertEqual(self._stats(), (None, 0, False))
+
+    def test_new_registration_starts_from_existing_rows(self):
+        self._visit(date(2026, 4, 1), status=S.COMPLETED, clinic=self.clinic_b)
+        PatientClinicCompliance.objects.create(clinic=self.clinic_b, patient=self.profile, status="BLOCKED")
+        cp = ClinicPatient.objects.create(clinic=self.clinic_b, patient=self.patient_a)
+        self.assertEqual(
+            (cp.last_completed_visit, cp.completed_visit_count, cp.is_blocked), (date(2026, 4, 1), 1, True),
+        )
+
+    def test_compliance_writers_keep_blocked_flag(self):
+        settings = ClinicComplianceSettings.objects.get(clinic=self.clinic_a)
+        for _ in range(-(-settings.score_threshold_block // settings.score_increment_per_no_show)):
+            record_no_show(self.clinic_a, self.profile)
+        self.assertTrue(self._stats()[2])
+
+        apply_manual_waiver(self.clinic_a, self.profile)
+        self.assertFalse(self._stats()[2])
+
+        PatientClinicCompliance.objects.filter(clinic=self.clinic_a).update(
+            bad_score=settings.score_threshold_block, status="BLOCKED",
+            last_violation_at=timezone.now() - timedelta(days=90),
+        )
+        call_command("rebuild_patient_visit_stats", clinic_ids=[self.clinic_a.id], stdout=StringIO())
+        self.assertTrue(self._stats()[2])
+        forgive_clinic(self.clinic_a.id, after_days=30)
+        self.assertFalse(self._stats()[2])
+
+    def test_no_show_sweeper_blocks_in_bulk(self):
+        ClinicComplianceSettings.objects.filter(clinic=self.clinic_a).update(score_threshold_block=1)
+        self._visit(date.today() - timedelta(days=2), status=S.CONFIRMED)
+        self.assertEqual(apply_due_no_shows(Appointment.objects.filter(clinic=self.clinic_a)), 1)
+        self.assertTrue(self._stats()[2])
+
+    def test_roster_reads_columns_only(self):
+        self._visit(date(2026, 5, 1), status=S.COMPLETED)
+        never = ClinicPatient.objects.create(
+            clinic=self.clinic_a, patient=self.secretary_b, file_number="2026-00002",
+        )
+        PatientClinicCompliance.objects.create(clinic=self.clinic_a, patient=self.profile, status="BLOCKED")
+        with CaptureQueriesContext(connection) as ctx:
+            by_visit = list(_patient_list_queryset(self.clinic_a, sort="-last_visit"))
+            blocked = list(_patient_list_queryset(self.clinic_a, blocked_only=True))
+        self.assertEqual(by_visit, [self.cp, never])
+        self.assertEqual(blocked, [self.cp])
+        self.assertFalse(any("appointments_appointment" in q["sql"] for q in ctx.captured_queries))
+        self.assertFalse(any("compliance_" in q["sql"] for q in ctx.captured_queries))
+
+    def test_rebuild_command_reconciles_bulk_writes(self):
+        self._visit(date(2026, 5, 1), status=S.COMPLETED)
+        ClinicPatient.objects.filter(pk=self.cp.pk).update(last_completed_visit=None, completed_visit_count=7)
+        out = StringIO()
+        call_command("rebuild_patient_visit_stats", stdout=out)
+        self.assertIn(f"Clinic {self.clinic_a.id}: 1 patient(s).", out.getvalue())
+        self.assertEqual(self._stats(), (date(2026, 5, 1), 1, False))
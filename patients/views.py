@@ -575,7 +575,7 @@ def load_edit_slots(request, appointment_id):
     """HTMX endpoint: load available slots for a date when editing an appointment."""
     from datetime import datetime as dt_cls
     from appointments.models import Appointment, AppointmentType
-    from doctors.services import generate_slots_for_date
+    from doctors.slot_cache import get_cached_slots_for_date
 
     if not request.user.has_role("PATIENT"):
         return HttpResponse("")
@@ -612,7 +612,7 @@ def load_edit_slots(request, appointment_id):
     if not apt_type:
         return HttpResponse("<p class='text-gray-400 text-sm'>لا يوجد نوع موعد محدد.</p>")
 
-    slots = generate_slots_for_date(
+    slots = get_cached_slots_for_date(
         doctor_id=appointment.doctor_id,
         clinic_id=appointment.clinic_id,
         target_date=target_date,
@@ -0,0 +1,125 @@
+"""
+Per-patient roster stats on ClinicPatient.
+
+The secretary roster used to annotate every ClinicPatient row with
+``Max`` / ``Count`` over the patient's appointments plus an ``Exists`` on
+compliance, joining the appointments table on every page and count. Each
+row now carries its own stats for its clinic:
+
+- ``last_completed_visit`` / ``completed_visit_count`` — COMPLETED
+  appointments of the patient in the clinic;
+- ``is_blocked`` — the patient's compliance status in the clinic is BLOCKED.
+
+Maintenance
+-----------
+- ``patients/signals.py`` remembers each appointment's (clinic, patient,
+  date, status) on load and applies the difference on save/delete. A visit
+  becoming COMPLETED is an ``F()`` increment plus ``GREATEST`` on the last
+  visit, so concurrent completions never overwrite each other; a visit
+  leaving COMPLETED (deletes, admin fixes) recounts that one row.
+- ``compliance/signals.py`` and the bulk compliance writers (no-show sweeper,
+  auto-forgiveness) call ``refresh_blocked`` wherever they drop the clinic's
+  cached blocked set.
+- A new ClinicPatient is filled from existing rows when it is created.
+- ``manage.py rebuild_patient_visit_stats`` recomputes every row from source
+  (initial backfill, and to reconcile after raw SQL or bulk_create).
+"""
+
+from collections import defaultdict
+
+from django.db.models import Count, Exists, F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from appointments.models import Appointment
+from compliance.models import PatientClinicCompliance
+from patients.models import ClinicPatient
+
+COMPLETED = Appointment.Status.COMPLETED
+
+
+def appointment_visit(appointment):
+    """The fields of ``appointment`` the stats depend on, or None if any is deferred."""
+    values = appointment.__dict__
+    fields = ("clinic_id", "patient_id", "appointment_date", "status")
+    if not all(f in values for f in fields):
+        return None
+    return tuple(values[f] for f in fields)
+
+
+def apply_visit_transitions(transitions):
+    """Stats update for ``transitions``, an iterable of (old, new) pairs as
+    returned by ``appointment_visit``; either side may be None for a created /
+    deleted appointment."""
+    gained = defaultdict(list)
+    lost = set()
+    for old, new in transitions:
+        old_done = old is not None and old[3] == COMPLETED
+        new_done = new is not None and new[3] == COMPLETED
+        if old_done and new_done and old[:3] == new[:3]:
+            continue
+        if old_done:
+            lost.add(old[:2])
+        if new_done:
+            gained[new[:2]].append(new[2])
+
+    for (clinic_id, patient_id), days in gained.items():
+        if (clinic_id, patient_id) in lost:
+            continue  # recounted below
+        latest = Value(max(days))
+        ClinicPatient.objects.filter(clinic_id=clinic_id, patient_id=patient_id).update(
+            completed_visit_count=F("completed_visit_count") + len(days),
+            last_completed_visit=Greatest(Coalesce("last_completed_visit", latest), latest),
+        )
+    for clinic_id, patient_id in lost:
+        refresh_visit_stats(ClinicPatient.objects.filter(clinic_id=clinic_id, patient_id=patient_id))
+
+
+def _completed_visits():
+    return (
+        Appointment.objects.filter(
+            clinic_id=OuterRef("clinic_id"), patient_id=OuterRef("patient_id"), status=COMPLETED,
+        )
+        .order_by()
+        .values("patient_id")
+    )
+
+
+def _blocked():
+    return Exists(
+        PatientClinicCompliance.objects.filter(
+            clinic_id=OuterRef("clinic_id"), patient__user_id=OuterRef("patient_id"), status="BLOCKED",
+        )
+    )
+
+
+def source_stats(clinic_id, patient_id):
+    """Stats of one (clinic, patient) pair read from appointments and compliance."""
+    visits = Appointment.objects.filter(clinic_id=clinic_id, patient_id=patient_id, status=COMPLETED).aggregate(
+        last=Max("appointment_date"), count=Count("id"),
+    )
+    return {
+        "last_completed_visit": visits["last"],
+        "completed_visit_count": visits["count"],
+        "is_blocked": PatientClinicCompliance.objects.filter(
+            clinic_id=clinic_id, patient__user_id=patient_id, status="BLOCKED",
+        ).exists(),
+    }
+
+
+def refresh_visit_stats(clinic_patients):
+    """Recompute every stat of the ``clinic_patients`` rows in one UPDATE.
+    Returns the number of rows updated."""
+    visits = _completed_visits()
+    return clinic_patients.update(
+        last_completed_visit=Subquery(visits.annotate(last=Max("appointment_date")).values("last")),
+        completed_visit_count=Coalesce(Subquery(visits.annotate(n=Count("id")).values("n")), 0),
+        is_blocked=_blocked(),
+    )
+
+
+def refresh_blocked(clinic_id, profile_ids):
+    """Re-read ``is_blocked`` for the patients (PatientProfile ids) of one clinic."""
+    if profile_ids:
+        ClinicPatient.objects.filter(
+            clinic_id=clinic_id, patient__patient_profile__in=profile_ids,
+        ).update(is_blocked=_blocked())
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class SecretaryConfig(AppConfig):
     name = 'secretary'
+
+    def ready(self):
+        import secretary.signals
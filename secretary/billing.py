@@ -15,18 +15,23 @@ All monetary values are :class:`~decimal.Decimal` with two decimal places
 import logging
 from decimal import Decimal, InvalidOperation
 
-from django.db import IntegrityError, transaction
-from django.db.models import Q, Sum
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.db.models.lookups import GreaterThan, LessThanOrEqual
 from django.utils import timezone
 from django.utils.translation import gettext as _
 
 from appointments.models import Appointment
+from clinics import sequences
+from clinics.models import NumberSequence
 from secretary.models import Invoice, InvoiceItem, Payment
 
 logger = logging.getLogger(__name__)
 
 TWOPLACES = Decimal("0.01")
 ZERO = Decimal("0.00")
+_MONEY = DecimalField(max_digits=10, decimal_places=2)
 
 # Upper bound for a single line item's total. The Invoice/InvoiceItem money columns
 # are DecimalField(max_digits=10) (≤ 99,999,999.99); capping each line well below that
@@ -78,21 +83,19 @@ def _to_money(value):
 
 
 def generate_invoice_number(clinic):
-    """Return a unique invoice number ``INV-{year}-{seq:06d}`` (global per year)."""
+    """Return a unique invoice number ``INV-{year}-{seq:06d}`` (global per year).
+
+    Allocated from the year's NumberSequence (clinics/sequences.py), inside
+    the caller's transaction.
+    """
     year = timezone.now().year
     prefix = f"INV-{year}-"
-    last = (
-        Invoice.objects.filter(invoice_number__startswith=prefix)
-        .order_by("-invoice_number")
-        .values_list("invoice_number", flat=True)
-        .first()
+    seq = sequences.next_value(
+        NumberSequence.Kind.INVOICE, year,
+        seed=lambda: sequences.last_numeric_suffix(
+            Invoice.objects.filter(invoice_number__startswith=prefix).values_list("invoice_number", flat=True)
+        ),
     )
-    seq = 1
-    if last:
-        try:
-            seq = int(last.rsplit("-", 1)[1]) + 1
-        except (ValueError, IndexError):
-            seq = Invoice.objects.filter(invoice_number__startswith=prefix).count() + 1
     return f"{prefix}{seq:06d}"
 
 
@@ -149,6 +152,97 @@ def recompute_invoice_totals(invoice):
     return invoice
 
 
+# Columns written by ``apply_invoice_delta``; reloaded on the instance afterwards.
+_TOTAL_FIELDS = ("subtotal", "discount", "total", "amount_paid", "balance_due", "status", "paid_at", "updated_at")
+
+
+def apply_invoice_delta(invoice, *, subtotal=ZERO, paid=ZERO):
+    """Move the invoice's totals by a line-item and/or payment delta.
+
+    The incremental twin of :func:`recompute_invoice_totals`: rather than
+    re-summing the items and saving the whole row on every charge, one UPDATE
+    adds ``subtotal``/``paid`` to the stored columns with F() expressions and
+    derives total, balance_due, the discount clamp and the payment status from
+    them in the same statement. The UPDATE holds the invoice's row lock until
+    the caller's transaction ends, so concurrent charges and payments apply
+    one after the other rather than overwriting each other.
+
+    Drift from writes that bypass this module is reported (and repaired) by
+    ``manage.py verify_invoice_totals``.
+    """
+    now = timezone.now()
+    new_subtotal = F("subtotal") + Value(subtotal, output_field=_MONEY)
+    new_discount = Greatest(Value(ZERO, output_field=_MONEY), Least(F("discount"), new_subtotal))
+    new_total = new_subtotal - new_discount
+    new_paid = F("amount_paid") + Value(paid, output_field=_MONEY)
+    new_balance = new_total - new_paid
+    live = ~Q(status__in=_VOID_STATUSES)
+    settled = live & Q(GreaterThan(new_total, ZERO)) & Q(LessThanOrEqual(new_balance, ZERO))
+    Invoice.objects.filter(pk=invoice.pk).update(
+        subtotal=new_subtotal,
+        discount=new_discount,
+        total=new_total,
+        amount_paid=new_paid,
+        balance_due=new_balance,
+        # Same transitions as recompute_invoice_totals: void invoices keep their
+        # status, and nothing moves back to DRAFT.
+        status=Case(
+            When(settled, then=Value(Invoice.Status.PAID)),
+            When(live & Q(GreaterThan(new_paid, ZERO)), then=Value(Invoice.Status.PARTIAL)),
+            default=F("status"),
+        ),
+        paid_at=Case(When(settled & Q(paid_at__isnull=True), then=Value(now)), default=F("paid_at")),
+        updated_at=now,
+    )
+    invoice.refresh_from_db(fields=_TOTAL_FIELDS)
+    return invoice
+
+
+def _sum_per_invoice(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(invoice=OuterRef("pk")).order_by().values("invoice")
+            .annotate(s=Sum(field)).values("s")
+        ),
+        Value(ZERO, output_field=_MONEY),
+    )
+
+
+def invoices_with_drift(invoices):
+    """The invoices in ``invoices`` whose stored totals disagree with their rows.
+
+    Re-derives subtotal from the line items, amount_paid from the payments, and
+    total/balance_due from those (with the stored discount, clamped as on
+    write). Rows are annotated with ``derived_subtotal``, ``derived_paid``,
+    ``derived_total`` and ``derived_balance``.
+    """
+    return (
+        invoices.annotate(
+            derived_subtotal=_sum_per_invoice(InvoiceItem.objects, "total"),
+            derived_paid=_sum_per_invoice(Payment.objects, "amount"),
+        )
+        .annotate(
+            derived_total=F("derived_subtotal")
+            - Greatest(Value(ZERO, output_field=_MONEY), Least(F("discount"), F("derived_subtotal")))
+        )
+        .annotate(derived_balance=F("derived_total") - F("derived_paid"))
+        .exclude(
+            subtotal=F("derived_subtotal"),
+            amount_paid=F("derived_paid"),
+            total=F("derived_total"),
+            balance_due=F("derived_balance"),
+        )
+    )
+
+
+@transaction.atomic
+def repair_invoice_totals(invoice):
+    """Reset amount_paid from the payments and recompute the rest from the items."""
+    invoice = Invoice.objects.select_for_update().get(pk=invoice.pk)
+    invoice.amount_paid = invoice.payments.aggregate(s=Sum("amount"))["s"] or ZERO
+    return recompute_invoice_totals(invoice)
+
+
 def patient_outstanding(clinic, patient, exclude_invoice=None):
     """Total *payable* by the patient: sum of ``balance_due`` over non-void invoices.
 
@@ -290,35 +384,26 @@ def open_billing_session(appointment, by_user, ip=None):
         return existing
 
     with transaction.atomic():
-        invoice = None
-        for _attempt in range(5):
-            try:
-                with transaction.atomic():
-                    invoice = Invoice.objects.create(
-                        clinic=appointment.clinic,
-                        patient=appointment.patient,
-                        appointment=appointment,
-                        invoice_number=generate_invoice_number(appointment.clinic),
-                        status=Invoice.Status.DRAFT,
-                        created_by=by_user,
-                    )
-                break
-            except IntegrityError:
-                invoice = None  # invoice_number collided — regenerate and retry
-        if invoice is None:
-            raise BillingError(_("تعذّر إنشاء رقم فاتورة فريد. يرجى المحاولة مرة أخرى."))
+        invoice = Invoice.objects.create(
+            clinic=appointment.clinic,
+            patient=appointment.patient,
+            appointment=appointment,
+            invoice_number=generate_invoice_number(appointment.clinic),
+            status=Invoice.Status.DRAFT,
+            created_by=by_user,
+        )
 
         # Seed the consultation fee from the appointment type (editable later).
         appt_type = appointment.appointment_type
         if appt_type is not None and appt_type.price is not None:
-            InvoiceItem.objects.create(
+            seed = InvoiceItem.objects.create(
                 invoice=invoice,
                 appointment_type=appt_type,
                 description=appt_type.name_ar or appt_type.name,
                 quantity=1,
                 unit_price=appt_type.price,
             )
-        recompute_invoice_totals(invoice)
+            apply_invoice_delta(invoice, subtotal=seed.total)
 
         # Audit trail: who opened this billing session.
         from clinics.audit import log_activity
@@ -338,7 +423,7 @@ def open_billing_session(appointment, by_user, ip=None):
 
 
 def add_charge(invoice, *, description, quantity, unit_price, actor=None, ip=None):
-    """Add a line item to an open session and recompute totals."""
+    """Add a line item to an open session and move the totals by its amount."""
     if not is_editable(invoice):
         raise BillingError(_("لا يمكن تعديل الرسوم بعد إغلاق جلسة الفوترة."))
     description = (description or "").strip()
@@ -359,7 +444,7 @@ def add_charge(invoice, *, description, quantity, unit_price, actor=None, ip=Non
             quantity=int(quantity),
             unit_price=unit_price,
         )
-        recompute_invoice_totals(invoice)
+        apply_invoice_delta(invoice, subtotal=item.total)
 
         # Audit trail: who added this charge.
         from clinics.audit import log_activity
@@ -381,7 +466,7 @@ def add_charge(invoice, *, description, quantity, unit_price, actor=None, ip=Non
 
 
 def remove_charge(item, actor=None, ip=None):
-    """Delete a line item from an open session and recompute totals."""
+    """Delete a line item from an open session and move the totals back by its amount."""
     invoice = item.invoice
     if not is_editable(invoice):
         raise BillingError(_("لا يمكن تعديل الرسوم بعد إغلاق جلسة الفوترة."))
@@ -389,8 +474,11 @@ def remove_charge(item, actor=None, ip=None):
     line_desc = item.description
     line_total = str(item.total)
     with transaction.atomic():
-        item.delete()
-        recompute_invoice_totals(invoice)
+        # Only subtract what this call actually deleted, so a double-submitted
+        # remove cannot take the line off the totals twice.
+        deleted, _rows = item.delete()
+        if deleted:
+            apply_invoice_delta(invoice, subtotal=-item.total)
 
         # Audit trail: who removed this charge.
         from clinics.audit import log_activity
@@ -511,8 +599,7 @@ def record_payment(*, primary_invoice, amount, method, reference="", breakdown="
                 received_by=by_user,
             )
         )
-        inv.amount_paid = (inv.amount_paid or ZERO) + portion
-        recompute_invoice_totals(inv)
+        apply_invoice_delta(inv, paid=portion)
         remaining -= portion
 
     # Audit trail: who recorded this payment and how it was allocated (FIFO).
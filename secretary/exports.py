@@ -0,0 +1,165 @@
+"""
+Streaming report exports for the secretary portal (CSV, optional XLSX).
+
+The report views used to build the whole appointment list in Python and then
+write it into an in-memory HttpResponse. Exports now take a ``values_list``
+projection of just the exported columns, read it through a server-side cursor
+(``.iterator(chunk_size=EXPORT_CHUNK_SIZE)``) and stream the encoded rows, so
+memory stays flat however wide the range or large the clinic.
+
+- CSV: ``StreamingHttpResponse`` fed row by row (UTF-8 with BOM, so Excel
+  opens Arabic text correctly).
+- XLSX: only when ``openpyxl`` is installed. The workbook is built in
+  write-only mode, which spools rows to a temporary file, and that file is
+  streamed back. ``?export=xlsx`` without openpyxl is not an export request.
+
+Under ASGI (the web process runs on uvicorn for the live queue streams)
+Django would read a *sync* streaming iterator with ``sync_to_async(list)``,
+buffering the whole export before the first byte. There the response body is
+an async iterator instead: CSV rows are pulled and encoded EXPORT_CHUNK_SIZE
+at a time through ``sync_to_async(..., thread_sensitive=True)`` — the thread
+holding the request's DB connection and its server-side cursor — and the XLSX
+spool is read back in FILE_CHUNK_SIZE pieces.
+
+Callers still apply the export rate cap and write the REPORT_EXPORTED
+ActivityLog (``row_count`` comes from a COUNT, before streaming starts).
+"""
+
+import codecs
+import csv
+import os
+import tempfile
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.translation import get_language
+
+try:
+    import openpyxl
+except ImportError:  # optional dependency — XLSX export is simply not offered
+    openpyxl = None
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Bytes per chunk when streaming the XLSX spool under ASGI.
+FILE_CHUNK_SIZE = 64 * 1024
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def xlsx_available():
+    return openpyxl is not None
+
+
+def export_format(request):
+    """The requested export format ("csv" / "xlsx"), or None for the HTML view."""
+    fmt = request.GET.get("export")
+    if fmt == "csv" or (fmt == "xlsx" and xlsx_available()):
+        return fmt
+    return None
+
+
+def iter_rows(queryset, *fields):
+    """Stream ``fields`` of ``queryset`` as tuples through a server-side cursor."""
+    return queryset.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def service_name_picker():
+    """Return ``pick(name, name_ar)`` mirroring AppointmentType.display_name for
+    the current language — resolved now, since streamed rows are rendered
+    after the view has returned."""
+    arabic = (get_language() or "ar").startswith("ar")
+
+    def pick(name, name_ar):
+        if arabic:
+            return name_ar or name or ""
+        return name or name_ar or ""
+
+    return pick
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_stream(header, rows):
+    writer = csv.writer(_Echo())
+    yield codecs.BOM_UTF8 + writer.writerow(header).encode("utf-8")
+    for row in rows:
+        yield writer.writerow(row).encode("utf-8")
+
+
+def _encode_batch(writer, rows):
+    """The next EXPORT_CHUNK_SIZE rows of ``rows`` as one CSV chunk (b"" at the end)."""
+    return "".join(writer.writerow(row) for row in islice(rows, EXPORT_CHUNK_SIZE)).encode("utf-8")
+
+
+async def _acsv_stream(header, rows):
+    writer = csv.writer(_Echo())
+    rows = iter(rows)
+    encode_batch = sync_to_async(_encode_batch, thread_sensitive=True)
+    try:
+        yield codecs.BOM_UTF8 + writer.writerow(header).encode("utf-8")
+        while chunk := await encode_batch(writer, rows):
+            yield chunk
+    finally:
+        # An aborted download leaves the server-side cursor open; close it on
+        # the thread that owns the connection.
+        if hasattr(rows, "close"):
+            await sync_to_async(rows.close, thread_sensitive=True)()
+
+
+async def _afile_stream(spool):
+    read = sync_to_async(spool.read, thread_sensitive=True)
+    try:
+        while chunk := await read(FILE_CHUNK_SIZE):
+            yield chunk
+    finally:
+        await sync_to_async(spool.close, thread_sensitive=True)()
+
+
+def _xlsx_file(header, rows):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(header)
+    for row in rows:
+        sheet.append(list(row))
+    spool = tempfile.TemporaryFile()
+    workbook.save(spool)
+    spool.seek(0)
+    return spool
+
+
+def _attachment(response, filename):
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def export_response(request, fmt, filename, header, rows):
+    """Response streaming ``header`` + ``rows`` as ``filename``.csv / .xlsx.
+
+    ``request`` only selects the body type: an async iterator when served
+    over ASGI, a plain generator / file otherwise.
+    """
+    served_async = isinstance(request, ASGIRequest)
+    if fmt == "xlsx":
+        spool = _xlsx_file(header, rows)
+        if not served_async:
+            return FileResponse(
+                spool,
+                as_attachment=True,
+                filename=f"{filename}.xlsx",
+                content_type=XLSX_CONTENT_TYPE,
+            )
+        response = StreamingHttpResponse(_afile_stream(spool), content_type=XLSX_CONTENT_TYPE)
+        response["Content-Length"] = os.fstat(spool.fileno()).st_size
+        return _attachment(response, f"{filename}.xlsx")
+    stream = _acsv_stream(header, rows) if served_async else _csv_stream(header, rows)
+    return _attachment(
+        StreamingHttpResponse(stream, content_type="text/csv; charset=utf-8"), f"{filename}.csv"
+    )
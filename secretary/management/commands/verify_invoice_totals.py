@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from secretary.billing import invoices_with_drift, repair_invoice_totals
+from secretary.models import Invoice
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-derives every invoice\'s subtotal, total, amount paid and balance '
+        'from its line items and payments, and reports invoices whose stored '
+        'totals have drifted (they are kept incrementally on write). Run '
+        'periodically, e.g. nightly; --fix rewrites the drifted invoices.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clinic', type=int, action='append', dest='clinic_ids',
+            help='Only check this clinic (repeatable). Default: every clinic.',
+        )
+        parser.add_argument('--fix', action='store_true', help='Recompute the drifted invoices.')
+
+    def handle(self, *args, **options):
+        invoices = Invoice.objects.order_by('id')
+        if options['clinic_ids']:
+            invoices = invoices.filter(clinic_id__in=options['clinic_ids'])
+
+        drifted = 0
+        for inv in invoices_with_drift(invoices).iterator():
+            drifted += 1
+            self.stdout.write(
+                f'{inv.invoice_number} (clinic {inv.clinic_id}): '
+                f'subtotal {inv.subtotal} vs {inv.derived_subtotal}, '
+                f'total {inv.total} vs {inv.derived_total}, '
+                f'paid {inv.amount_paid} vs {inv.derived_paid}, '
+                f'balance {inv.balance_due} vs {inv.derived_balance}'
+            )
+            if options['fix']:
+                repair_invoice_totals(inv)
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All invoice totals match their items and payments.'))
+        elif options['fix']:
+            self.stdout.write(self.style.WARNING(f'Repaired {drifted} drifted invoice(s).'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{drifted} invoice(s) drifted; run with --fix to repair.'))
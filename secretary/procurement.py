@@ -13,11 +13,13 @@ matching the PurchaseRequest/PurchaseRequestItem models.
 import logging
 from decimal import Decimal, InvalidOperation
 
-from django.db import IntegrityError, transaction
+from django.db import transaction
 from django.db.models import Sum
 from django.utils import timezone
 from django.utils.translation import gettext as _
 
+from clinics import sequences
+from clinics.models import NumberSequence
 from secretary.models import PurchaseRequest, PurchaseRequestItem
 
 logger = logging.getLogger(__name__)
@@ -43,21 +45,20 @@ def _to_money(value):
 
 
 def generate_request_number(clinic):
-    """Return a unique purchase request number ``PR-{year}-{seq:06d}`` (global per year)."""
+    """Return a unique purchase request number ``PR-{year}-{seq:06d}`` (global per year).
+
+    Allocated from the year's NumberSequence (clinics/sequences.py), inside
+    the caller's transaction.
+    """
     year = timezone.now().year
     prefix = f"PR-{year}-"
-    last = (
-        PurchaseRequest.objects.filter(request_number__startswith=prefix)
-        .order_by("-request_number")
-        .values_list("request_number", flat=True)
-        .first()
+    seq = sequences.next_value(
+        NumberSequence.Kind.PURCHASE_REQUEST, year,
+        seed=lambda: sequences.last_numeric_suffix(
+            PurchaseRequest.objects.filter(request_number__startswith=prefix)
+            .values_list("request_number", flat=True)
+        ),
     )
-    seq = 1
-    if last:
-        try:
-            seq = int(last.rsplit("-", 1)[1]) + 1
-        except (ValueError, IndexError):
-            seq = PurchaseRequest.objects.filter(request_number__startswith=prefix).count() + 1
     return f"{prefix}{seq:06d}"
 
 
@@ -102,24 +103,15 @@ def create_purchase_request(*, clinic, user, title, category, note="", items):
         raise ProcurementError(_("يرجى إضافة عنصر واحد على الأقل إلى الطلب."))
 
     with transaction.atomic():
-        request_obj = None
-        for _attempt in range(5):
-            try:
-                with transaction.atomic():
-                    request_obj = PurchaseRequest.objects.create(
-                        clinic=clinic,
-                        requested_by=user,
-                        request_number=generate_request_number(clinic),
-                        title=title,
-                        category=category,
-                        note=(note or "").strip(),
-                        status=PurchaseRequest.Status.PENDING,
-                    )
-                break
-            except IntegrityError:
-                request_obj = None  # request_number collided — regenerate and retry
-        if request_obj is None:
-            raise ProcurementError(_("تعذّر إنشاء رقم طلب فريد. يرجى المحاولة مرة أخرى."))
+        request_obj = PurchaseRequest.objects.create(
+            clinic=clinic,
+            requested_by=user,
+            request_number=generate_request_number(clinic),
+            title=title,
+            category=category,
+            note=(note or "").strip(),
+            status=PurchaseRequest.Status.PENDING,
+        )
 
         for description, quantity, unit_price in cleaned_items:
             PurchaseRequestItem.objects.create(
@@ -0,0 +1,235 @@
+"""
+Live queue updates for the waiting room, lobby display and doctor "My Day"
+board, pushed over Server-Sent Events.
+
+The boards used to re-query every column (and check the no-show sweep) every
+20–30 s for every open screen, busy or not. Writers now publish a small event
+when today's queue of a clinic actually changes, and each open screen holds
+one SSE stream that tells the page which columns to re-fetch. An idle clinic
+costs nothing; an active one costs one column refresh per change.
+
+Publishing
+----------
+- ``secretary/signals.py`` announces every Appointment save/delete that
+  changes a row on today's boards (status transitions, check-in, walk-ins,
+  cancellations, reschedules into or out of today).
+- Writers that bypass signals call ``publish_queue_change`` themselves
+  (``reorder_queue``, the bulk no-show sweeper).
+Events go out on commit, so a rolled-back write is never announced, and
+publishing never raises.
+
+Brokers
+-------
+``QUEUE_EVENTS_BROKER = "redis"`` fans events out through Redis pub/sub, so a
+stream served by one ASGI worker sees writes made by any worker or by the
+background sweeper. ``"local"`` keeps them in-process (tests, single-process
+dev server).
+
+Streams are served by async views (``secretary:waiting_room_events``,
+``doctors:my_day_events``) and end after ``QUEUE_EVENTS_MAX_STREAM_SECONDS``;
+the browser's EventSource reconnects on its own and resyncs the board.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import partial
+
+import redis
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import StreamingHttpResponse
+
+from appointments.models import Appointment
+
+logger = logging.getLogger(__name__)
+
+# Statuses that have a column on the boards; other transitions are not announced.
+BOARD_STATUSES = frozenset({
+    Appointment.Status.CONFIRMED,
+    Appointment.Status.CHECKED_IN,
+    Appointment.Status.IN_PROGRESS,
+})
+
+# EventSource reconnect delay sent to the browser.
+RECONNECT_MS = 5000
+
+
+def clinic_channel(clinic_id):
+    return f"queue:clinic:{clinic_id}"
+
+
+def doctor_channel(doctor_id):
+    return f"queue:doctor:{doctor_id}"
+
+
+# ============================================
+# BROKERS
+# ============================================
+class LocalBroker:
+    """In-process fan-out: one asyncio.Queue per open stream."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, channel, message):
+        with self._lock:
+            targets = list(self._subscribers.get(channel, ()))
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+            except RuntimeError:  # the stream's event loop has already closed
+                pass
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers[channel].add(entry)
+        try:
+            yield _LocalSubscription(entry[1])
+        finally:
+            with self._lock:
+                self._subscribers[channel].discard(entry)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+
+class _LocalSubscription:
+    def __init__(self, queue):
+        self._queue = queue
+
+    async def get(self, timeout):
+        """The next message, or None if none arrives within ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class RedisBroker:
+    """Redis pub/sub fan-out; one subscriber connection per open stream."""
+
+    def __init__(self, url):
+        self._url = url
+        self._client = None
+
+    def publish(self, channel, message):
+        if self._client is None:
+            self._client = redis.Redis.from_url(self._url, socket_timeout=2)
+        self._client.publish(channel, message)
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        client = aioredis.Redis.from_url(self._url)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(channel)
+            yield _RedisSubscription(pubsub)
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+
+class _RedisSubscription:
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+
+    async def get(self, timeout):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (remaining := deadline - loop.time()) > 0:
+            # Returns None early for (ignored) subscribe confirmations.
+            message = await self._pubsub.get_message(timeout=remaining)
+            if message is not None:
+                data = message["data"]
+                return data.decode() if isinstance(data, bytes) else data
+        return None
+
+
+_brokers = {}
+
+
+def get_broker():
+    kind = settings.QUEUE_EVENTS_BROKER
+    if kind not in _brokers:
+        _brokers[kind] = (
+            LocalBroker() if kind == "local" else RedisBroker(settings.QUEUE_EVENTS_REDIS_URL)
+        )
+    return _brokers[kind]
+
+
+# ============================================
+# PUBLISHING
+# ============================================
+def publish_queue_change(clinic_id, statuses, doctor_ids=(), appointment_id=None):
+    """Announce, on commit, that today's queue of ``clinic_id`` changed.
+
+    ``statuses`` are the board columns touched (old and new status);
+    ``doctor_ids`` also receive the event on their My Day stream.
+    """
+    statuses = sorted(set(statuses) & BOARD_STATUSES)
+    if not statuses:
+        return
+    doctor_ids = sorted({d for d in doctor_ids if d})
+    transaction.on_commit(partial(_publish, clinic_id, statuses, doctor_ids, appointment_id))
+
+
+def _publish(clinic_id, statuses, doctor_ids, appointment_id):
+    message = json.dumps({
+        "clinic": clinic_id,
+        "doctors": doctor_ids,
+        "appointment": appointment_id,
+        "statuses": statuses,
+    })
+    broker = get_broker()
+    # Each channel on its own: a broker error on one must not cost the others
+    # (e.g. the doctors' My Day boards) their event.
+    for channel in [clinic_channel(clinic_id), *map(doctor_channel, doctor_ids)]:
+        try:
+            broker.publish(channel, message)
+        except Exception:
+            logger.warning("[queue-events] could not publish to %s", channel, exc_info=True)
+
+
+# ============================================
+# STREAMING
+# ============================================
+async def _event_stream(channel):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.QUEUE_EVENTS_MAX_STREAM_SECONDS
+    yield f"retry: {RECONNECT_MS}\n\n"
+    try:
+        async with get_broker().subscribe(channel) as subscription:
+            yield ": connected\n\n"
+            while (remaining := deadline - loop.time()) > 0:
+                message = await subscription.get(
+                    min(settings.QUEUE_EVENTS_HEARTBEAT_SECONDS, remaining)
+                )
+                if message is None:
+                    yield ": ping\n\n"  # keeps proxies from closing an idle stream
+                else:
+                    yield f"event: queue\ndata: {message}\n\n"
+    except Exception:
+        logger.warning("[queue-events] stream on %s failed", channel, exc_info=True)
+
+
+def _release_db_connection():
+    # A stream stays open for minutes; don't pin a DB connection to it.
+    if not connection.in_atomic_block:
+        connection.close()
+
+
+async def stream_response(channel):
+    """SSE response relaying ``channel`` until the stream's time is up."""
+    await sync_to_async(_release_db_connection)()
+    response = StreamingHttpResponse(_event_stream(channel), content_type="text/event-stream")
+    response["Cache-Control"] = "no-store"
+    response["X-Accel-Buffering"] = "no"  # nginx: flush each event, don't buffer
+    return response
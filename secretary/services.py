@@ -6,29 +6,117 @@ patient-portal restrictions (doctor platform verification, subscription
 quota checks) since all operations are performed by clinic staff.
 """
 
+import hashlib
 from datetime import date as date_cls
 
 from django.db import transaction
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from django.db.models import Max
+from django.db.models import Case, F, Max, PositiveIntegerField, Value, When
 
 from appointments.models import Appointment, AppointmentType
 from appointments.services.booking_service import BookingError, SlotUnavailableError
+from appointments.services.booking_locks import lock_doctor_day
 
 
-def _next_queue_priority(clinic_id, today):
-    """Return the next queue_priority value to assign for a clinic's queue (max + 1, min 1)."""
-    result = Appointment.objects.filter(
+# ── Waiting-room queue ordering ───────────────────────────────────────────────
+
+# Queue order of CHECKED_IN patients: explicit position first (drag-and-drop,
+# check-in), then arrival. Shared by the waiting room, lobby display and the
+# doctor's My Day board so every screen shows the same order.
+QUEUE_ORDER = (F("queue_priority").asc(nulls_last=True), "checked_in_at")
+
+
+class QueueConflict(Exception):
+    """The queue changed since the user loaded it. ``order`` is the current
+    order of the ids they submitted that are still queued."""
+
+    def __init__(self, order):
+        super().__init__("The waiting-room queue changed; reload and try again.")
+        self.order = order
+
+
+def checked_in_queue(clinic_id, day):
+    """CHECKED_IN appointments of a clinic's queue on ``day``, in queue order."""
+    return Appointment.objects.filter(
         clinic_id=clinic_id,
-        appointment_date=today,
+        appointment_date=day,
         status=Appointment.Status.CHECKED_IN,
-        queue_priority__isnull=False,
-    ).aggregate(mx=Max("queue_priority"))
+    ).order_by(*QUEUE_ORDER)
+
+
+def queue_version(ids):
+    """Opaque token for a displayed queue order (a list of appointment ids)."""
+    return hashlib.sha1(",".join(map(str, ids)).encode()).hexdigest()[:16]
+
+
+def _next_queue_priority(clinic_id, today):
+    """Return the next queue_priority value to assign for a clinic's queue (max + 1, min 1)."""
+    result = checked_in_queue(clinic_id, today).aggregate(mx=Max("queue_priority"))
     return (result["mx"] or 0) + 1
 
 
+def reorder_checked_in_queue(clinic_id, day, order, expected_version=None):
+    """
+    Apply a drag-and-drop order to a clinic's CHECKED_IN queue in one UPDATE.
+
+    ``order`` lists appointment ids as the user arranged them: the whole queue,
+    or the subset a doctor filter showed. The listed patients are permuted
+    among the positions they already hold, so patients not on screen keep
+    theirs; ids that are not in the queue are ignored. The queue rows are
+    locked for the duration, so concurrent drags apply one after the other.
+
+    ``expected_version`` is the ``queue_version`` of the listed ids as the
+    user saw them. If another workstation reordered them, or one of them left
+    the queue, nothing is written and QueueConflict is raised.
+
+    Returns the listed ids that are queued, in their new order.
+    """
+    from secretary import queue_events
+
+    submitted = set(order)
+    with transaction.atomic():
+        queue = list(
+            checked_in_queue(clinic_id, day)
+            .select_for_update()
+            .values_list("id", "queue_priority", "doctor_id")
+        )
+        ids = [appt_id for appt_id, _priority, _doctor in queue]
+        current = [appt_id for appt_id in ids if appt_id in submitted]
+        if expected_version is not None and expected_version != queue_version(current):
+            raise QueueConflict(current)
+
+        queued = set(current)
+        wanted = [appt_id for appt_id in dict.fromkeys(order) if appt_id in queued]
+        new_ids = list(ids)
+        slots = [pos for pos, appt_id in enumerate(ids) if appt_id in queued]
+        for pos, appt_id in zip(slots, wanted):
+            new_ids[pos] = appt_id
+
+        # Renumber the whole queue densely, writing only rows whose position moved.
+        priorities = {appt_id: pos for pos, appt_id in enumerate(new_ids, start=1)}
+        changed = {
+            appt_id: priorities[appt_id]
+            for appt_id, priority, _doctor in queue
+            if priority != priorities[appt_id]
+        }
+        if changed:
+            # The clinic/date/status scope is re-asserted on the write itself.
+            checked_in_queue(clinic_id, day).filter(pk__in=changed).update(
+                queue_priority=Case(
+                    *(When(pk=appt_id, then=Value(p)) for appt_id, p in changed.items()),
+                    output_field=PositiveIntegerField(),
+                )
+            )
+            queue_events.publish_queue_change(
+                clinic_id,
+                statuses=[Appointment.Status.CHECKED_IN],
+                doctor_ids={doctor for appt_id, _p, doctor in queue if appt_id in changed},
+            )
+    return wanted
+
+
 # ── Valid status transitions ──────────────────────────────────────────────────
 
 VALID_TRANSITIONS = {
@@ -272,14 +360,14 @@ def secretary_book_appointment(
     except AppointmentType.DoesNotExist:
         raise BookingError("نوع الموعد المحدد غير موجود أو غير مفعّل في هذه العيادة.")
 
-    # 6. Slot conflict check with row-level lock
+    # 6. Slot conflict check under the doctor-day lock
     # Walk-ins are excluded from both sides: they don't reserve a slot, and an
     # existing walk-in shouldn't block a real booking (or another walk-in).
     with transaction.atomic():
         if not is_walk_in:
+            lock_doctor_day(doctor_id, appointment_date)
             conflict = (
-                Appointment.objects.select_for_update()
-                .filter(
+                Appointment.objects.filter(
                     doctor_id=doctor_id,
                     appointment_date=appointment_date,
                     appointment_time=appointment_time,
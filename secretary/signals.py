@@ -0,0 +1,64 @@
+"""
+Waiting-room live updates (see secretary/queue_events.py).
+
+Each Appointment remembers the fields today's boards display when loaded; a
+save or delete that changes them for a today row is announced to the clinic's
+and the doctor's streams.
+"""
+
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from appointments.models import Appointment
+
+from . import queue_events
+
+QUEUE_FIELDS = ("clinic_id", "doctor_id", "appointment_date", "appointment_time", "status", "queue_priority")
+_QUEUE_FIELD_NAMES = {f.removesuffix("_id") for f in QUEUE_FIELDS}
+
+
+def _queue_state(appointment):
+    values = appointment.__dict__
+    if not all(f in values for f in QUEUE_FIELDS):
+        return None
+    return tuple(values[f] for f in QUEUE_FIELDS)
+
+
+def _announce(instance, old, new):
+    if old == new:
+        return
+    today = timezone.localdate()
+    touched = [s for s in (old, new) if s is not None and s[2] == today]
+    for clinic_id in {s[0] for s in touched}:
+        queue_events.publish_queue_change(
+            clinic_id,
+            statuses={s[4] for s in touched},
+            doctor_ids={s[1] for s in touched},
+            appointment_id=instance.pk,
+        )
+
+
+@receiver(post_init, sender=Appointment)
+def remember_queue_state(sender, instance, **kwargs):
+    instance._queue_state = _queue_state(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Appointment)
+def announce_queue_save(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not (
+        _QUEUE_FIELD_NAMES & {f.removesuffix("_id") for f in update_fields}
+    ):
+        return
+    old = None if created else instance._queue_state
+    new = _queue_state(instance)
+    if new is None:  # saved from a deferred instance
+        row = Appointment.objects.filter(pk=instance.pk).values_list(*QUEUE_FIELDS).first()
+        new = tuple(row) if row else None
+    _announce(instance, old, new)
+    instance._queue_state = new
+
+
+@receiver(post_delete, sender=Appointment)
+def announce_queue_delete(sender, instance, **kwargs):
+    _announce(instance, _queue_state(instance), None)
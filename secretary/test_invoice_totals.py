@@ -0,0 +1,98 @@
+"""
+Incremental invoice totals (secretary/billing.py ``apply_invoice_delta``)
+and the ``verify_invoice_totals`` drift check.
+
+Covers:
+- charges and payments move subtotal/total/balance_due/amount_paid with one
+  narrow UPDATE, without re-aggregating the line items
+- removing lines clamps the discount; payment status and paid_at follow
+  the same rules as recompute_invoice_totals
+- a line removed twice is only taken off the totals once
+- verify_invoice_totals reports invoices written behind the service and
+  --fix re-derives them from items and payments
+"""
+
+from datetime import time
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from appointments.models import Appointment
+from secretary import billing
+from secretary.models import Invoice, InvoiceItem
+from secretary.tests import SecretaryTestBase
+
+
+class IncrementalInvoiceTotalsTests(SecretaryTestBase):
+
+    def setUp(self):
+        super().setUp()
+        appt = self._make_appointment(status=Appointment.Status.CHECKED_IN, appointment_time=time(10, 0))
+        self.inv = billing.open_billing_session(appt, by_user=self.secretary_a)  # consultation fee 50
+
+    def _totals(self):
+        self.inv.refresh_from_db()
+        return self.inv.subtotal, self.inv.total, self.inv.amount_paid, self.inv.balance_due, self.inv.status
+
+    def test_charge_updates_totals_without_aggregating_items(self):
+        with CaptureQueriesContext(connection) as ctx:
+            billing.add_charge(self.inv, description="حقنة", quantity=2, unit_price=Decimal("25.00"))
+        invoice_sql = [q["sql"] for q in ctx.captured_queries if "secretary_invoice" in q["sql"]]
+        self.assertFalse(any("SUM(" in sql.upper() for sql in invoice_sql))
+        self.assertEqual(self.inv.total, Decimal("100.00"))  # instance refreshed in place
+        self.assertEqual(
+            self._totals(), (Decimal("100.00"), Decimal("100.00"), Decimal("0.00"), Decimal("100.00"), "DRAFT"),
+        )
+
+    def test_remove_charge_clamps_discount(self):
+        extra = billing.add_charge(self.inv, description="ضماد", quantity=1, unit_price=Decimal("30.00"))
+        Invoice.objects.filter(pk=self.inv.pk).update(discount=Decimal("40.00"), total=Decimal("40.00"),
+                                                      balance_due=Decimal("40.00"))
+        billing.remove_charge(self.inv.items.exclude(pk=extra.pk).get())
+        self.inv.refresh_from_db()
+        self.assertEqual(self.inv.discount, Decimal("30.00"))
+        self.assertEqual(self._totals()[:4], (Decimal("30.00"), Decimal("0.00"), Decimal("0.00"), Decimal("0.00")))
+
+    def test_payments_move_status_and_paid_at(self):
+        billing.record_payment(primary_invoice=self.inv, amount=Decimal("20.00"), method="CASH",
+                               by_user=self.secretary_a)
+        self.assertEqual(self._totals()[2:], (Decimal("20.00"), Decimal("30.00"), Invoice.Status.PARTIAL))
+        self.assertIsNone(self.inv.paid_at)
+        billing.record_payment(primary_invoice=self.inv, amount=Decimal("30.00"), method="CASH",
+                               by_user=self.secretary_a)
+        self.assertEqual(self._totals()[2:], (Decimal("50.00"), Decimal("0.00"), Invoice.Status.PAID))
+        self.assertIsNotNone(self.inv.paid_at)
+
+    def test_double_remove_subtracts_once(self):
+        item = self.inv.items.get()
+        stale = InvoiceItem.objects.get(pk=item.pk)
+        billing.remove_charge(item)
+        billing.remove_charge(stale)
+        self.assertEqual(self._totals()[:2], (Decimal("0.00"), Decimal("0.00")))
+
+    def test_verify_command_reports_and_fixes_drift(self):
+        out = StringIO()
+        call_command("verify_invoice_totals", stdout=out)
+        self.assertIn("All invoice totals match", out.getvalue())
+
+        # Written behind the service: a bulk-created line and a hand-edited paid amount.
+        InvoiceItem.objects.bulk_create([
+            InvoiceItem(invoice=self.inv, description="x", quantity=1, unit_price=Decimal("5.00"),
+                        total=Decimal("5.00")),
+        ])
+        Invoice.objects.filter(pk=self.inv.pk).update(amount_paid=Decimal("9.00"))
+
+        out = StringIO()
+        call_command("verify_invoice_totals", clinic_ids=[self.clinic_a.id], stdout=out)
+        self.assertIn(f"{self.inv.invoice_number} (clinic {self.clinic_a.id})", out.getvalue())
+        self.assertIn("1 invoice(s) drifted", out.getvalue())
+        self.assertEqual(self._totals()[0], Decimal("50.00"))  # report only
+
+        call_command("verify_invoice_totals", fix=True, stdout=StringIO())
+        self.assertEqual(
+            self._totals(), (Decimal("55.00"), Decimal("55.00"), Decimal("0.00"), Decimal("55.00"), "DRAFT"),
+        )
+        self.assertFalse(billing.invoices_with_drift(Invoice.objects.all()).exists())
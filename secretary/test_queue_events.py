@@ -0,0 +1,171 @@
+"""
+Live waiting-room updates (secretary/queue_events.py, secretary/signals.py).
+
+Covers:
+- the local broker fans a message out to every stream on the channel, only;
+  a publish error on one channel does not stop the others
+- board-visible changes to today's appointments are announced on commit to the
+  clinic and doctor channels; other saves are not
+- reorder_queue announces a real reorder once and a no-op reorder not at all
+- the SSE endpoints relay events to the secretary, the lobby display and the
+  doctor, and refuse everyone else
+"""
+
+import asyncio
+import json
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from appointments.models import Appointment
+from secretary import queue_events
+from secretary.services import transition_appointment_status
+from secretary.tests import SecretaryTestBase
+
+S = Appointment.Status
+
+
+class LocalBrokerTests(SimpleTestCase):
+    def test_publish_failure_on_one_channel_spares_the_rest(self):
+        broker = mock.Mock()
+        broker.publish.side_effect = [ConnectionError("broker down"), None, None]
+        with mock.patch.object(queue_events, "get_broker", return_value=broker), \
+                self.assertLogs("secretary.queue_events", "WARNING"):
+            queue_events._publish(1, ["CHECKED_IN"], [7, 8], 3)
+        self.assertEqual(
+            [c.args[0] for c in broker.publish.call_args_list],
+            [queue_events.clinic_channel(1), queue_events.doctor_channel(7), queue_events.doctor_channel(8)],
+        )
+
+    def test_fan_out_per_channel(self):
+        broker = queue_events.LocalBroker()
+
+        async def scenario():
+            async with broker.subscribe("a") as first, broker.subscribe("a") as second, \
+                    broker.subscribe("b") as other:
+                broker.publish("a", "hello")
+                return [await first.get(1), await second.get(1), await other.get(0.01)]
+
+        self.assertEqual(asyncio.run(scenario()), ["hello", "hello", None])
+
+
+@override_settings(QUEUE_EVENTS_BROKER="local")
+class QueueChangePublishTests(SecretaryTestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+
+    def _events(self, action, channel=None):
+        """Run ``action`` with on-commit callbacks executed; return the events
+        published on ``channel`` (the clinic's by default)."""
+        channel = channel or queue_events.clinic_channel(self.clinic_a.id)
+
+        def run():
+            with self.captureOnCommitCallbacks(execute=True):
+                action()
+
+        async def scenario():
+            async with queue_events.get_broker().subscribe(channel) as subscription:
+                await sync_to_async(run)()
+                events = []
+                while (message := await subscription.get(0.05)) is not None:
+                    events.append(json.loads(message))
+                return events
+
+        return async_to_sync(scenario)()
+
+    def test_check_in_is_announced_to_clinic_and_doctor(self):
+        appt = self._make_appointment(appointment_date=self.today)
+        events = self._events(
+            lambda: transition_appointment_status(appt, S.CHECKED_IN, actor=self.secretary_a)
+        )
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["statuses"], [S.CHECKED_IN, S.CONFIRMED])
+        self.assertEqual(events[0]["appointment"], appt.id)
+
+        events = self._events(
+            lambda: transition_appointment_status(appt, S.IN_PROGRESS, actor=self.secretary_a),
+            channel=queue_events.doctor_channel(self.doctor_a.id),
+        )
+        self.assertEqual(events[0]["statuses"], [S.CHECKED_IN, S.IN_PROGRESS])
+
+    def test_saves_off_todays_board_are_not_announced(self):
+        later = self._make_appointment(appointment_date=self.today + timedelta(days=3))
+        today = self._make_appointment(appointment_date=self.today)
+
+        def edit():
+            transition_appointment_status(later, S.CHECKED_IN, actor=self.secretary_a)
+            today.notes = "bring previous x-rays"
+            today.save(update_fields=["notes"])
+
+        self.assertEqual(self._events(edit), [])
+
+    def test_reorder_queue_announces_only_real_changes(self):
+        first = self._make_appointment(appointment_date=self.today, status=S.CHECKED_IN)
+        second = self._make_appointment(
+            appointment_date=self.today, status=S.CHECKED_IN,
+            appointment_time=first.appointment_time.replace(hour=11),
+        )
+        self.client.force_login(self.secretary_a)
+
+        def reorder():
+            self.client.post(
+                reverse("secretary:reorder_queue"),
+                data=json.dumps({"order": [second.id, first.id]}),
+                content_type="application/json",
+            )
+
+        events = self._events(reorder)
+        self.assertEqual([e["statuses"] for e in events], [[S.CHECKED_IN]])
+        self.assertEqual(self._events(reorder), [])
+
+
+@override_settings(
+    QUEUE_EVENTS_BROKER="local",
+    QUEUE_EVENTS_HEARTBEAT_SECONDS=1,
+    QUEUE_EVENTS_MAX_STREAM_SECONDS=5,
+)
+class QueueEventStreamTests(SecretaryTestBase):
+
+    async def _relayed(self, response, channel):
+        """Publish one event on ``channel`` once the stream is subscribed and
+        return the chunk the stream sends for it."""
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = aiter(response.streaming_content)
+        try:
+            self.assertEqual(await anext(chunks), b"retry: 5000\n\n")
+            self.assertEqual(await anext(chunks), b": connected\n\n")
+            queue_events.get_broker().publish(channel, '{"statuses": ["CHECKED_IN"]}')
+            return await anext(chunks)
+        finally:
+            await chunks.aclose()
+
+    async def test_secretary_board_stream(self):
+        await self.async_client.aforce_login(self.secretary_a)
+        response = await self.async_client.get(reverse("secretary:waiting_room_events"))
+        chunk = await self._relayed(response, queue_events.clinic_channel(self.clinic_a.id))
+        self.assertEqual(chunk, b'event: queue\ndata: {"statuses": ["CHECKED_IN"]}\n\n')
+
+    async def test_lobby_display_stream_is_token_gated(self):
+        url = reverse("secretary:waiting_room_events")
+        response = await self.async_client.get(url, {"token": "not-a-token"})
+        self.assertEqual(response.status_code, 404)
+
+        response = await self.async_client.get(url, {"token": str(self.clinic_a.display_token)})
+        chunk = await self._relayed(response, queue_events.clinic_channel(self.clinic_a.id))
+        self.assertTrue(chunk.startswith(b"event: queue\n"))
+
+    async def test_doctor_my_day_stream(self):
+        url = reverse("doctors:my_day_events")
+        await self.async_client.aforce_login(self.patient_a)
+        self.assertEqual((await self.async_client.get(url)).status_code, 403)
+
+        await self.async_client.aforce_login(self.doctor_a)
+        response = await self.async_client.get(url)
+        chunk = await self._relayed(response, queue_events.doctor_channel(self.doctor_a.id))
+        self.assertTrue(chunk.startswith(b"event: queue\n"))
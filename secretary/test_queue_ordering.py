@@ -0,0 +1,99 @@
+"""
+Waiting-room queue ordering (secretary.services.reorder_checked_in_queue).
+
+Covers:
+- a drag is applied with a single UPDATE and returns the authoritative order
+- reordering a doctor-filtered subset leaves other patients in place
+- a stale board (version mismatch) writes nothing and gets a 409
+- the doctor's My Day board shows the same order as the waiting room
+"""
+
+import json
+from datetime import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from appointments.models import Appointment
+from secretary.services import (
+    QueueConflict, checked_in_queue, queue_version, reorder_checked_in_queue,
+)
+from secretary.tests import SecretaryTestBase
+
+S = Appointment.Status
+
+
+class QueueOrderingTests(SecretaryTestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        self.queue = [
+            self._checked_in(hour, doctor)
+            for hour, doctor in (
+                (9, self.doctor_a), (10, self.main_doctor_a), (11, self.doctor_a), (12, self.doctor_a),
+            )
+        ]
+        self.ids = [a.id for a in self.queue]
+
+    def _checked_in(self, hour, doctor):
+        return Appointment.objects.create(
+            patient=self.patient_a, clinic=self.clinic_a, doctor=doctor,
+            appointment_type=self.appt_type_a, appointment_date=self.today,
+            appointment_time=time(hour, 0), status=S.CHECKED_IN,
+            checked_in_at=timezone.now().replace(hour=hour, minute=0),
+        )
+
+    def _order(self):
+        return list(checked_in_queue(self.clinic_a.id, self.today).values_list("id", flat=True))
+
+    def test_reorder_is_one_update(self):
+        new = [self.ids[3], self.ids[0], self.ids[1], self.ids[2]]
+        with CaptureQueriesContext(connection) as ctx:
+            result = reorder_checked_in_queue(
+                self.clinic_a.id, self.today, new, expected_version=queue_version(self.ids)
+            )
+        updates = [q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(result, new)
+        self.assertEqual(self._order(), new)
+        self.assertEqual(
+            list(checked_in_queue(self.clinic_a.id, self.today).values_list("queue_priority", flat=True)),
+            [1, 2, 3, 4],
+        )
+
+    def test_filtered_subset_keeps_other_positions(self):
+        # The board filtered to doctor_a shows ids 0, 2, 3; the secretary moves 3 to the top.
+        mine = [self.ids[0], self.ids[2], self.ids[3]]
+        reorder_checked_in_queue(
+            self.clinic_a.id, self.today, [self.ids[3], self.ids[0], self.ids[2]],
+            expected_version=queue_version(mine),
+        )
+        self.assertEqual(self._order(), [self.ids[3], self.ids[1], self.ids[0], self.ids[2]])
+
+    def test_stale_version_is_rejected(self):
+        seen = queue_version(self.ids)
+        reorder_checked_in_queue(self.clinic_a.id, self.today, list(reversed(self.ids)))
+        with self.assertRaises(QueueConflict) as caught:
+            reorder_checked_in_queue(self.clinic_a.id, self.today, self.ids, expected_version=seen)
+        self.assertEqual(caught.exception.order, list(reversed(self.ids)))
+        self.assertEqual(self._order(), list(reversed(self.ids)))
+
+        self.client.force_login(self.secretary_a)
+        response = self.client.post(
+            reverse("secretary:reorder_queue"),
+            data=json.dumps({"order": self.ids, "version": seen}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["order"], list(reversed(self.ids)))
+
+    def test_my_day_board_uses_waiting_room_order(self):
+        new = [self.ids[2], self.ids[3], self.ids[0], self.ids[1]]
+        reorder_checked_in_queue(self.clinic_a.id, self.today, new)
+        self.client.force_login(self.doctor_a)
+        response = self.client.get(reverse("doctors:my_day_queue"))
+        waiting = [row["appt"].id for row in response.context["waiting"]]
+        self.assertEqual(waiting, [self.ids[2], self.ids[3], self.ids[0]])
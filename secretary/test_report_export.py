@@ -9,14 +9,18 @@ Covers the hardening added by the data-export audit:
 - every CSV export writes exactly one REPORT_EXPORTED ActivityLog row while the
   on-screen HTML view writes none;
 - the per-secretary export rate cap returns 429 once tripped, and fails open
-  when the cache is unavailable.
+  when the cache is unavailable;
+- exports are streamed (StreamingHttpResponse over a server-side cursor) —
+  under ASGI too, as an async iterator that reads one batch per chunk — and
+  the optional XLSX format is only honoured when openpyxl is installed.
 """
 
 import csv
 import io
 from datetime import date, time, timedelta
-from unittest import mock
+from unittest import mock, skipUnless
 
+from asgiref.sync import sync_to_async
 from django.core.cache import cache
 from django.test import override_settings
 from django.urls import reverse
@@ -24,12 +28,13 @@ from django.urls import reverse
 from accounts import ratelimit
 from appointments.models import Appointment
 from clinics.models import ActivityLog
+from secretary import exports
 from secretary.tests import SecretaryTestBase
 
 
 def _csv_rows(response):
-    """Decode a CSV export response into a list of rows (header included)."""
-    text = response.content.decode("utf-8-sig")
+    """Decode a streamed CSV export response into a list of rows (header included)."""
+    text = b"".join(response.streaming_content).decode("utf-8-sig")
     return list(csv.reader(io.StringIO(text)))
 
 
@@ -162,3 +167,106 @@ class ReportExportSecurityTests(SecretaryTestBase):
                 self.assertEqual(
                     self.client.get(url, {"export": "csv"}).status_code, 200
                 )
+
+
+class StreamingExportTests(SecretaryTestBase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.force_login(self.secretary_a)
+        self.recent = date.today() - timedelta(days=2)
+
+    def test_daily_export_streams_projected_rows(self):
+        self._make_appointment(
+            status=Appointment.Status.COMPLETED,
+            appointment_date=self.recent, appointment_time=time(9, 0),
+        )
+        with mock.patch.object(exports, "EXPORT_CHUNK_SIZE", 1):
+            resp = self.client.get(reverse("secretary:report_daily"), {
+                "date": self.recent.isoformat(), "export": "csv",
+            })
+            self.assertTrue(resp.streaming)
+            rows = _csv_rows(resp)
+        self.assertEqual(rows[0][0], "الوقت")
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][1:3], [self.patient_a.name, "Dr. Ahmad"])
+        self.assertEqual(rows[1][5], "50.00")
+
+    def test_noshows_export_lists_noshows_then_cancellations(self):
+        self._make_appointment(
+            status=Appointment.Status.CANCELLED,
+            appointment_date=self.recent, appointment_time=time(9, 0),
+        )
+        self._make_appointment(
+            status=Appointment.Status.NO_SHOW,
+            appointment_date=self.recent, appointment_time=time(10, 0),
+        )
+        resp = self.client.get(reverse("secretary:report_noshows"), {"export": "csv"})
+        self.assertEqual([r[0] for r in _csv_rows(resp)[1:]], ["لم يحضر", "ملغى"])
+        log = ActivityLog.objects.get(action=ActivityLog.Action.REPORT_EXPORTED)
+        self.assertEqual((log.metadata["row_count"], log.metadata["format"]), (2, "csv"))
+
+    async def test_csv_export_streams_under_asgi(self):
+        """Through the ASGI handler the body is an async iterator pulling one
+        batch per chunk — not a sync generator Django would buffer whole."""
+        for hour in (9, 10, 11):
+            await sync_to_async(self._make_appointment)(
+                status=Appointment.Status.COMPLETED,
+                appointment_date=self.recent, appointment_time=time(hour, 0),
+            )
+        await self.async_client.aforce_login(self.secretary_a)
+        with mock.patch.object(exports, "EXPORT_CHUNK_SIZE", 1), \
+                mock.patch.object(exports, "_encode_batch", wraps=exports._encode_batch) as encode:
+            resp = await self.async_client.get(reverse("secretary:report_daily"), {
+                "date": self.recent.isoformat(), "export": "csv",
+            })
+            self.assertTrue(resp.is_async)
+            chunks = aiter(resp.streaming_content)
+            header, first = await anext(chunks), await anext(chunks)
+            self.assertEqual(encode.call_count, 1)  # only the first batch read so far
+            rest = [chunk async for chunk in chunks]
+            self.assertEqual(encode.call_count, 4)  # three one-row batches + the empty end read
+        rows = list(csv.reader(io.StringIO(b"".join([header, first, *rest]).decode("utf-8-sig"))))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(len(rest), 2)
+
+    @skipUnless(exports.xlsx_available(), "openpyxl not installed")
+    async def test_xlsx_export_streams_spool_under_asgi(self):
+        import openpyxl
+
+        await sync_to_async(self._make_appointment)(
+            status=Appointment.Status.COMPLETED,
+            appointment_date=self.recent, appointment_time=time(9, 0),
+        )
+        await self.async_client.aforce_login(self.secretary_a)
+        with mock.patch.object(exports, "FILE_CHUNK_SIZE", 512):
+            resp = await self.async_client.get(reverse("secretary:report_visits"), {"export": "xlsx"})
+            self.assertTrue(resp.is_async)
+            chunks = [chunk async for chunk in resp.streaming_content]
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(int(resp["Content-Length"]), sum(map(len, chunks)))
+        sheet = openpyxl.load_workbook(io.BytesIO(b"".join(chunks))).active
+        self.assertEqual(sheet.max_row, 2)
+
+    @skipUnless(exports.xlsx_available(), "openpyxl not installed")
+    def test_xlsx_export(self):
+        import openpyxl
+
+        self._make_appointment(
+            status=Appointment.Status.COMPLETED,
+            appointment_date=self.recent, appointment_time=time(9, 0),
+        )
+        resp = self.client.get(reverse("secretary:report_visits"), {"export": "xlsx"})
+        self.assertEqual(resp["Content-Type"], exports.XLSX_CONTENT_TYPE)
+        sheet = openpyxl.load_workbook(io.BytesIO(b"".join(resp.streaming_content))).active
+        self.assertEqual(sheet.max_row, 2)
+
+    @skipUnless(not exports.xlsx_available(), "openpyxl installed")
+    def test_xlsx_without_openpyxl_renders_report(self):
+        resp = self.client.get(reverse("secretary:report_visits"), {"export": "xlsx"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(resp.context["xlsx_export"])
+        self.assertFalse(
+            ActivityLog.objects.filter(action=ActivityLog.Action.REPORT_EXPORTED).exists()
+        )
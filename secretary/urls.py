@@ -31,6 +31,7 @@ urlpatterns = [
     # --- Waiting Room ---
     path('waiting-room/', views.waiting_room, name='waiting_room'),
     path('waiting-room/display/', views.waiting_room_display, name='waiting_room_display'),
+    path('waiting-room/events/', views.waiting_room_events, name='waiting_room_events'),
     path('waiting-room/checkin/', views.checkin_search, name='checkin_search'),
     path('htmx/waiting-room-confirmed/', views.waiting_room_confirmed_htmx, name='waiting_room_confirmed_htmx'),
     path('htmx/waiting-room-checkedin/', views.waiting_room_checkedin_htmx, name='waiting_room_checkedin_htmx'),
@@ -2,10 +2,12 @@ import logging
 import functools
 from datetime import date, datetime, timedelta
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.contrib.auth import get_user_model
 from django.contrib import messages
 from django.db import transaction
@@ -18,6 +20,12 @@ from django.views.decorators.http import require_POST
 
 from appointments.models import Appointment, AppointmentType
 from patients.models import ClinicPatient, PatientProfile, StaffNote
+from patients.search import clinic_patient_match_q, patient_match_q
+from secretary.exports import (
+    export_format, export_response, iter_rows, service_name_picker, xlsx_available,
+)
+from secretary import queue_events
+from secretary.services import QUEUE_ORDER, queue_version
 from secretary.timefmt import format_clock
 from accounts.ratelimit import client_ip, export_rate_limited
 from accounts.validators import name_has_disallowed_chars, NAME_DISALLOWED_MESSAGE
@@ -49,10 +57,11 @@ def _clock(request, value):
 
 
 def _sweep_clinic_no_shows(clinic):
-    """Persist overdue no-shows for this clinic before listing/aggregating,
-    so every status badge, filter, and report stays accurate without the cron."""
-    from compliance.services.compliance_service import apply_due_no_shows
-    apply_due_no_shows(Appointment.objects.filter(clinic=clinic))
+    """Make sure overdue no-shows for this clinic are persisted before
+    listing/aggregating. Normally just a watermark check — the background
+    sweeper (process_no_shows --loop) does the work."""
+    from compliance.services.no_show_sweeper import ensure_no_shows_swept
+    ensure_no_shows_swept(f"clinic:{clinic.id}", Appointment.objects.filter(clinic=clinic))
 
 
 def _int_or_none(value):
@@ -113,6 +122,26 @@ def _export_blocked_response(request):
     return None
 
 
+def _stream_export(request, clinic, fmt, filename, header, rows, metadata):
+    """Audit-log an export, then stream it (see secretary/exports.py).
+
+    ``metadata`` must carry ``report`` and ``row_count``; the log row is
+    written before streaming so an aborted download is still audited.
+    """
+    log_activity(
+        actor=request.user, clinic=clinic,
+        action=ActivityLog.Action.REPORT_EXPORTED,
+        target=clinic, request=request,
+        metadata={**metadata, "format": fmt},
+    )
+    return export_response(request, fmt, filename, header, rows)
+
+
+def _status_labels():
+    """Appointment status → display label, resolved for the current language."""
+    return {value: str(label) for value, label in Appointment.Status.choices}
+
+
 def _require_secretary(request):
     """Return the secretary's ClinicStaff record, or None if not a secretary."""
     from clinics.models import ClinicStaff
@@ -194,7 +223,7 @@ def _build_today_rows(clinic, filter_type):
     Note: walk-ins (is_walk_in=True, status=CHECKED_IN) don't reserve slots —
     generate_slots_for_date only treats CONFIRMED/COMPLETED as blocking.
     """
-    from doctors.services import generate_slots_for_date
+    from doctors.services import generate_slots_for_range
     from clinics.models import ClinicStaff
 
     today = date.today()
@@ -226,19 +255,22 @@ def _build_today_rows(clinic, filter_type):
             .first()
         )
         if smallest:
-            doctor_staff = ClinicStaff.objects.filter(
-                clinic=clinic, role="DOCTOR", is_active=True
-            ).select_related("user")
+            doctor_staff = list(
+                ClinicStaff.objects.filter(
+                    clinic=clinic, role="DOCTOR", is_active=True
+                ).select_related("user")
+            )
             booked_keys = {(r["doctor"].id, r["time"]) for r in rows if r["kind"] == "appointment"}
+            grids = generate_slots_for_range(
+                [staff.user_id for staff in doctor_staff],
+                clinic.id,
+                today,
+                today,
+                smallest,
+            )
             for staff in doctor_staff:
                 doctor = staff.user
-                slots = generate_slots_for_date(
-                    doctor_id=doctor.id,
-                    clinic_id=clinic.id,
-                    target_date=today,
-                    duration_minutes=smallest,
-                )
-                for slot in slots:
+                for slot in grids[(doctor.id, today)]:
                     if not slot["is_available"] or slot["is_past"]:
                         continue
                     if (doctor.id, slot["time"]) in booked_keys:
@@ -666,7 +698,7 @@ def register_new_patient_only(request, staff, appointment_id):
                 patient=appointment.patient,
                 defaults={
                     "registered_by": request.user,
-                    "file_number": _generate_file_number(clinic),
+                    "file_number": functools.partial(_generate_file_number, clinic),
                 },
             )
             transition_appointment_status(
@@ -685,17 +717,14 @@ def register_new_patient_only(request, staff, appointment_id):
 def _filter_confirmed_by_query(qs, q: str):
     """
     Apply a free-text filter to the Column A (CONFIRMED) queryset.
-    Matches patient name (partial), patient phone, and appointment time.
+    Matches the patient (patients/search.py) and the appointment time.
     Doctor is filtered separately via the doctor_id dropdown.
     """
     q = (q or "").strip()
     if not q:
         return qs
 
-    filt = (
-        Q(patient__name__icontains=q)
-        | Q(patient__phone__icontains=q)
-    )
+    filt = patient_match_q(q, path="patient__")
     digits = q.replace(":", "")
     if digits.isdigit():
         try:
@@ -744,7 +773,7 @@ def waiting_room(request, staff):
             status=Appointment.Status.CHECKED_IN,
         )
         .select_related("patient", "doctor", "appointment_type")
-        .order_by(F("queue_priority").asc(nulls_last=True), "checked_in_at")
+        .order_by(*QUEUE_ORDER)
     )
 
     # Column C: IN_PROGRESS today (with the doctor — out of the queue, still billable)
@@ -841,6 +870,7 @@ def waiting_room(request, staff):
         "today": today,
         "confirmed_list": confirmed_list,
         "checkedin_list": checkedin_list,
+        "queue_version": queue_version([e["appt"].id for e in checkedin_list]),
         "inprogress_list": inprogress_list,
         "doctors": doctors,
         "doctor_filter": doctor_filter,
@@ -900,7 +930,7 @@ def waiting_room_display(request):
             status__in=[Appointment.Status.CHECKED_IN, Appointment.Status.IN_PROGRESS],
         )
         .select_related("patient", "doctor")
-        .order_by(F("queue_priority").asc(nulls_last=True), "checked_in_at")
+        .order_by(*QUEUE_ORDER)
     )
 
     queue_entries = []
@@ -991,7 +1021,7 @@ def waiting_room_checkedin_htmx(request, staff):
             status=Appointment.Status.CHECKED_IN,
         )
         .select_related("patient", "doctor", "appointment_type")
-        .order_by(F("queue_priority").asc(nulls_last=True), "checked_in_at")
+        .order_by(*QUEUE_ORDER)
     )
     if doctor_filter:
         qs = qs.filter(doctor_id=doctor_filter)
@@ -1028,6 +1058,7 @@ def waiting_room_checkedin_htmx(request, staff):
 
     return render(request, "secretary/htmx/waiting_room_checkedin_rows.html", {
         "checkedin_list": checkedin_list,
+        "queue_version": queue_version([e["appt"].id for e in checkedin_list]),
         "clinic": clinic,
     })
 
@@ -1116,45 +1147,74 @@ def waiting_room_notes_htmx(request, staff):
 
 @secretary_required
 def reorder_queue(request, staff):
-    """POST — secretary drags to reorder the CHECKED_IN queue; persists new priorities."""
+    """POST — secretary drags to reorder the CHECKED_IN queue; persists new priorities.
+
+    Body: {"order": [appointment ids], "version": <queue_version the board showed>}.
+    Responds with the authoritative order and its version; 409 when the queue
+    changed underneath (the board then reloads the column).
+    """
     if request.method != "POST":
         return HttpResponse(status=405)
 
     import json
+    from secretary.services import QueueConflict, queue_version, reorder_checked_in_queue
     try:
         data = json.loads(request.body)
         order = [int(x) for x in data.get("order", [])]
-    except (ValueError, TypeError, json.JSONDecodeError):
+        version = data.get("version")
+    except (ValueError, TypeError, AttributeError, json.JSONDecodeError):
         return HttpResponse(status=400)
 
     if not order:
         return HttpResponse(status=200)
 
-    today = date.today()
-    clinic = staff.clinic
+    try:
+        order = reorder_checked_in_queue(
+            staff.clinic_id, date.today(), order,
+            expected_version=version if isinstance(version, str) else None,
+        )
+    except QueueConflict as conflict:
+        return JsonResponse(
+            {"order": conflict.order, "version": queue_version(conflict.order)}, status=409
+        )
+    return JsonResponse({"order": order, "version": queue_version(order)})
 
-    valid_ids = set(
-        Appointment.objects.filter(
-            clinic=clinic,
-            appointment_date=today,
-            status=Appointment.Status.CHECKED_IN,
-            id__in=order,
-        ).values_list("id", flat=True)
-    )
 
-    for priority, appt_id in enumerate(order, start=1):
-        if appt_id in valid_ids:
-            # Re-assert the clinic/date/status scope on the write itself, so the
-            # update can never touch another clinic's appointment even if the
-            # valid_ids guard above is ever weakened.
-            Appointment.objects.filter(
-                id=appt_id,
-                clinic=clinic,
-                appointment_date=today,
-                status=Appointment.Status.CHECKED_IN,
-            ).update(queue_priority=priority)
+async def waiting_room_events(request):
+    """SSE stream of today's queue changes (see secretary/queue_events.py).
 
-    return HttpResponse(status=200)
+    Serves the secretary's waiting-room board, or — with ``?token=`` — the
+    public lobby display, gated by the clinic's display_token like the display
+    page itself. The page re-fetches only the columns named in each event.
+    """
+    token = request.GET.get("token", "").strip()
+    if token:
+        clinic_id = await sync_to_async(_display_clinic_id)(token)
+        if clinic_id is None:
+            return HttpResponse(status=404)
+    else:
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        staff = await sync_to_async(_require_secretary)(request)
+        if not staff:
+            return HttpResponseForbidden(_("هذه الصفحة متاحة للسكرتارية فقط."))
+        clinic_id = staff.clinic_id
+    return await queue_events.stream_response(queue_events.clinic_channel(clinic_id))
+
+
+def _display_clinic_id(token):
+    """Active clinic id for a lobby-display token, or None."""
+    from clinics.models import Clinic as ClinicModel
+    from django.core.exceptions import ValidationError
+    try:
+        return (
+            ClinicModel.objects.filter(display_token=token, is_active=True)
+            .values_list("id", flat=True)
+            .first()
+        )
+    except (ValidationError, ValueError):
+        return None
 
 
 @secretary_required
@@ -1173,12 +1233,9 @@ def checkin_search(request, staff):
     clinic_patient = None
 
     if search:
-        from accounts.backends import PhoneNumberAuthBackend
-        normalized = PhoneNumberAuthBackend.normalize_phone_number(search)
         found_patient = (
             User.objects.filter(
-                Q(name__icontains=search)
-                | Q(phone__icontains=normalized)
+                patient_match_q(search)
                 | Q(clinic_registrations__file_number__iexact=search, clinic_registrations__clinic=clinic)
             )
             .filter(clinic_registrations__clinic=clinic)
@@ -1267,9 +1324,7 @@ def billing_invoices(request, staff):
         invoices = invoices.filter(status=Invoice.Status.PAID)
     if q:
         invoices = invoices.filter(
-            Q(patient__name__icontains=q)
-            | Q(patient__phone__icontains=q)
-            | Q(invoice_number__icontains=q)
+            patient_match_q(q, path="patient__") | Q(invoice_number__icontains=q)
         )
 
     invoices = list(invoices[:200])
@@ -1614,25 +1669,26 @@ def purchase_request_delete(request, staff, request_id):
 @secretary_required
 def reports_index(request, staff):
     """Reports hub — quick stats + links to each sub-report."""
-    from django.db.models import Count
+    from clinics import metrics
 
 
     clinic = staff.clinic
     today = date.today()
     month_start = today.replace(day=1)
 
-    # Quick stats
-    today_qs = Appointment.objects.filter(clinic=clinic, appointment_date=today)
-    month_qs = Appointment.objects.filter(clinic=clinic, appointment_date__range=(month_start, today))
+    # Quick stats (DailyClinicMetrics rollup — two small aggregates)
+    today_totals = metrics.totals(metrics.metrics_for([clinic.id], today, today))
+    month_totals = metrics.totals(metrics.metrics_for([clinic.id], month_start, today))
+    S = Appointment.Status
 
     stats = {
-        "today_total": today_qs.count(),
-        "today_completed": today_qs.filter(status=Appointment.Status.COMPLETED).count(),
-        "today_noshows": today_qs.filter(status=Appointment.Status.NO_SHOW).count(),
-        "month_total": month_qs.count(),
-        "month_completed": month_qs.filter(status=Appointment.Status.COMPLETED).count(),
-        "month_cancelled": month_qs.filter(status=Appointment.Status.CANCELLED).count(),
-        "month_noshows": month_qs.filter(status=Appointment.Status.NO_SHOW).count(),
+        "today_total": today_totals["appointments"],
+        "today_completed": today_totals["status_counts"][S.COMPLETED],
+        "today_noshows": today_totals["status_counts"][S.NO_SHOW],
+        "month_total": month_totals["appointments"],
+        "month_completed": month_totals["status_counts"][S.COMPLETED],
+        "month_cancelled": month_totals["status_counts"][S.CANCELLED],
+        "month_noshows": month_totals["status_counts"][S.NO_SHOW],
     }
 
     return render(request, "secretary/reports/index.html", {
@@ -1644,10 +1700,7 @@ def reports_index(request, staff):
 
 @secretary_required
 def report_daily(request, staff):
-    """Daily appointments report. Supports ?export=csv."""
-    from django.db.models import Count, Sum
-    import csv as csv_module
-
+    """Daily appointments report. Supports ?export=csv / ?export=xlsx."""
 
     clinic = staff.clinic
     _sweep_clinic_no_shows(clinic)
@@ -1665,6 +1718,30 @@ def report_daily(request, staff):
         .order_by("appointment_time")
     )
 
+    fmt = export_format(request)
+    if fmt:
+        blocked = _export_blocked_response(request)
+        if blocked:
+            return blocked
+        labels, service = _status_labels(), service_name_picker()
+        rows = (
+            [
+                _clock(request, appt_time), patient, doctor or "",
+                service(type_name, type_name_ar), labels.get(status, status),
+                str(price) if price is not None else "",
+            ]
+            for appt_time, patient, doctor, type_name, type_name_ar, status, price in iter_rows(
+                qs, "appointment_time", "patient__name", "doctor__name",
+                "appointment_type__name", "appointment_type__name_ar", "status",
+                "appointment_type__price",
+            )
+        )
+        return _stream_export(
+            request, clinic, fmt, f"daily_report_{report_date}",
+            ["الوقت", "المريض", "الطبيب", "الخدمة", "الحالة", "السعر"], rows,
+            {"report": "daily", "date": str(report_date), "row_count": qs.count()},
+        )
+
     appointments = list(qs)
     total = len(appointments)
 
@@ -1699,35 +1776,9 @@ def report_daily(request, staff):
         elif appt.status == Appointment.Status.CANCELLED:
             doctor_stats[did]["cancelled"] += 1
 
-    # CSV export
-    if request.GET.get("export") == "csv":
-        blocked = _export_blocked_response(request)
-        if blocked:
-            return blocked
-        response = HttpResponse(content_type="text/csv; charset=utf-8-sig")
-        response["Content-Disposition"] = f'attachment; filename="daily_report_{report_date}.csv"'
-        writer = csv_module.writer(response)
-        writer.writerow(["الوقت", "المريض", "الطبيب", "الخدمة", "الحالة", "السعر"])
-        for appt in appointments:
-            writer.writerow([
-                _clock(request, appt.appointment_time),
-                appt.patient.name,
-                appt.doctor.name if appt.doctor else "",
-                appt.appointment_type.display_name if appt.appointment_type else "",
-                appt.get_status_display(),
-                str(appt.appointment_type.price) if appt.appointment_type else "",
-            ])
-        log_activity(
-            actor=request.user, clinic=clinic,
-            action=ActivityLog.Action.REPORT_EXPORTED,
-            target=clinic, request=request,
-            metadata={"report": "daily", "date": str(report_date),
-                      "row_count": total},
-        )
-        return response
-
     return render(request, "secretary/reports/daily.html", {
         "clinic": clinic,
+        "xlsx_export": xlsx_available(),
         "report_date": report_date,
         "today": today,
         "prev_date": report_date - timedelta(days=1),
@@ -1741,10 +1792,7 @@ def report_daily(request, staff):
 
 @secretary_required
 def report_visits(request, staff):
-    """Patient visits report with date range + doctor filter. Supports ?export=csv."""
-    from django.db.models import Count
-    import csv as csv_module
-
+    """Patient visits report with date range + doctor filter. Supports ?export=csv / ?export=xlsx."""
 
     clinic = staff.clinic
     _sweep_clinic_no_shows(clinic)
@@ -1774,6 +1822,29 @@ def report_visits(request, staff):
     if doctor_id is not None:
         qs = qs.filter(doctor_id=doctor_id)
 
+    fmt = export_format(request)
+    if fmt:
+        blocked = _export_blocked_response(request)
+        if blocked:
+            return blocked
+        labels, service = _status_labels(), service_name_picker()
+        rows = (
+            [
+                patient, appt_date.strftime("%Y/%m/%d"), _clock(request, appt_time),
+                doctor or "", service(type_name, type_name_ar), labels.get(status, status),
+            ]
+            for patient, appt_date, appt_time, doctor, type_name, type_name_ar, status in iter_rows(
+                qs, "patient__name", "appointment_date", "appointment_time", "doctor__name",
+                "appointment_type__name", "appointment_type__name_ar", "status",
+            )
+        )
+        return _stream_export(
+            request, clinic, fmt, f"visits_{date_from}_{date_to}",
+            ["المريض", "تاريخ الزيارة", "الوقت", "الطبيب", "الخدمة", "الحالة"], rows,
+            {"report": "visits", "date_from": str(date_from), "date_to": str(date_to),
+             "doctor_id": doctor_id, "row_count": qs.count()},
+        )
+
     appointments = list(qs)
 
     # New vs returning: a patient is "new" if their first appointment in this clinic
@@ -1815,36 +1886,9 @@ def report_visits(request, staff):
     ).select_related("user")
     doctors = [s.user for s in doctor_staff]
 
-    # CSV export
-    if request.GET.get("export") == "csv":
-        blocked = _export_blocked_response(request)
-        if blocked:
-            return blocked
-        response = HttpResponse(content_type="text/csv; charset=utf-8-sig")
-        response["Content-Disposition"] = f'attachment; filename="visits_{date_from}_{date_to}.csv"'
-        writer = csv_module.writer(response)
-        writer.writerow(["المريض", "تاريخ الزيارة", "الوقت", "الطبيب", "الخدمة", "الحالة"])
-        for appt in appointments:
-            writer.writerow([
-                appt.patient.name,
-                appt.appointment_date.strftime("%Y/%m/%d"),
-                _clock(request, appt.appointment_time),
-                appt.doctor.name if appt.doctor else "",
-                appt.appointment_type.display_name if appt.appointment_type else "",
-                appt.get_status_display(),
-            ])
-        log_activity(
-            actor=request.user, clinic=clinic,
-            action=ActivityLog.Action.REPORT_EXPORTED,
-            target=clinic, request=request,
-            metadata={"report": "visits", "date_from": str(date_from),
-                      "date_to": str(date_to), "doctor_id": doctor_id,
-                      "row_count": len(appointments)},
-        )
-        return response
-
     return render(request, "secretary/reports/visits.html", {
         "clinic": clinic,
+        "xlsx_export": xlsx_available(),
         "today": today,
         "date_from": date_from,
         "date_to": date_to,
@@ -1865,9 +1909,9 @@ def report_visits(request, staff):
 
 @secretary_required
 def report_noshows(request, staff):
-    """No-show & cancellation report. Supports ?export=csv."""
+    """No-show & cancellation report. Supports ?export=csv / ?export=xlsx."""
+    from itertools import chain
     from django.db.models import Count
-    import csv as csv_module
 
 
     clinic = staff.clinic
@@ -1887,6 +1931,42 @@ def report_noshows(request, staff):
     if doctor_id is not None:
         base_qs = base_qs.filter(doctor_id=doctor_id)
 
+    fmt = export_format(request)
+    if fmt:
+        blocked = _export_blocked_response(request)
+        if blocked:
+            return blocked
+        service = service_name_picker()
+        fields = (
+            "patient__name", "patient__phone", "appointment_date", "doctor__name",
+            "appointment_type__name", "appointment_type__name_ar", "cancellation_reason",
+        )
+
+        def export_rows(status, kind, with_reason):
+            return (
+                [
+                    kind, patient, phone, appt_date.strftime("%Y/%m/%d"), doctor or "",
+                    service(type_name, type_name_ar), reason if with_reason else "",
+                ]
+                for patient, phone, appt_date, doctor, type_name, type_name_ar, reason in iter_rows(
+                    base_qs.filter(status=status).order_by("-appointment_date"), *fields
+                )
+            )
+
+        rows = chain(
+            export_rows(Appointment.Status.NO_SHOW, "لم يحضر", False),
+            export_rows(Appointment.Status.CANCELLED, "ملغى", True),
+        )
+        row_count = base_qs.filter(
+            status__in=[Appointment.Status.NO_SHOW, Appointment.Status.CANCELLED]
+        ).count()
+        return _stream_export(
+            request, clinic, fmt, f"noshows_{date_from}_{date_to}",
+            ["النوع", "المريض", "الهاتف", "التاريخ", "الطبيب", "الخدمة", "السبب"], rows,
+            {"report": "noshows", "date_from": str(date_from), "date_to": str(date_to),
+             "doctor_id": doctor_id, "row_count": row_count},
+        )
+
     total = base_qs.count()
     # Evaluate each queryset once and reuse the lists for every breakdown below.
     noshows = list(
@@ -1944,38 +2024,9 @@ def report_noshows(request, staff):
     ).select_related("user")
     doctors = [s.user for s in doctor_staff]
 
-    # CSV export
-    if request.GET.get("export") == "csv":
-        blocked = _export_blocked_response(request)
-        if blocked:
-            return blocked
-        response = HttpResponse(content_type="text/csv; charset=utf-8-sig")
-        response["Content-Disposition"] = f'attachment; filename="noshows_{date_from}_{date_to}.csv"'
-        writer = csv_module.writer(response)
-        writer.writerow(["النوع", "المريض", "الهاتف", "التاريخ", "الطبيب", "الخدمة", "السبب"])
-        for appt in noshows:
-            writer.writerow(["لم يحضر", appt.patient.name, appt.patient.phone,
-                              appt.appointment_date.strftime("%Y/%m/%d"),
-                              appt.doctor.name if appt.doctor else "",
-                              appt.appointment_type.display_name if appt.appointment_type else "", ""])
-        for appt in cancellations:
-            writer.writerow(["ملغى", appt.patient.name, appt.patient.phone,
-                              appt.appointment_date.strftime("%Y/%m/%d"),
-                              appt.doctor.name if appt.doctor else "",
-                              appt.appointment_type.display_name if appt.appointment_type else "",
-                              appt.cancellation_reason])
-        log_activity(
-            actor=request.user, clinic=clinic,
-            action=ActivityLog.Action.REPORT_EXPORTED,
-            target=clinic, request=request,
-            metadata={"report": "noshows", "date_from": str(date_from),
-                      "date_to": str(date_to), "doctor_id": doctor_id,
-                      "row_count": len(noshows) + len(cancellations)},
-        )
-        return response
-
     return render(request, "secretary/reports/noshows.html", {
         "clinic": clinic,
+        "xlsx_export": xlsx_available(),
         "today": today,
         "date_from": date_from,
         "date_to": date_to,
@@ -1999,10 +2050,10 @@ def report_noshows(request, staff):
 
 @secretary_required
 def report_doctors(request, staff):
-    """Doctor utilization report. Supports ?export=csv."""
-    from django.db.models import Count
+    """Doctor utilization report. Supports ?export=csv / ?export=xlsx."""
+    from django.db.models import Count, Sum
+    from clinics import metrics
     from doctors.models import DoctorAvailability
-    import csv as csv_module
 
 
     clinic = staff.clinic
@@ -2026,6 +2077,16 @@ def report_doctors(request, staff):
     for i in range(num_days):
         weekday_counts[(date_from + timedelta(days=i)).weekday()] += 1
 
+    # Appointment counts by status for every doctor, from the daily rollup.
+    status_sums = {f: Sum(f) for f in metrics.COUNT_FIELDS}
+    rollup_by_doctor = {
+        row["doctor_id"]: row
+        for row in metrics.metrics_for([clinic.id], date_from, date_to)
+        .filter(doctor_id__in=[d.id for d in doctors])
+        .values("doctor_id")
+        .annotate(**status_sums)
+    }
+
     # Per-doctor stats
     doctor_rows = []
     for doctor in doctors:
@@ -2038,19 +2099,15 @@ def report_doctors(request, staff):
             weekday_counts.get(slot.day_of_week, 0) for slot in avail_slots
         )
 
-        # Appointment counts by status
         appt_qs = Appointment.objects.filter(
             clinic=clinic, doctor=doctor,
             appointment_date__range=(date_from, date_to),
         )
-        counts_by_status = {
-            row["status"]: row["count"]
-            for row in appt_qs.values("status").annotate(count=Count("id"))
-        }
-        total_booked = sum(counts_by_status.values())
-        completed = counts_by_status.get(Appointment.Status.COMPLETED, 0)
-        noshows = counts_by_status.get(Appointment.Status.NO_SHOW, 0)
-        cancelled = counts_by_status.get(Appointment.Status.CANCELLED, 0)
+        counts = rollup_by_doctor.get(doctor.id, {})
+        total_booked = counts.get("appointments") or 0
+        completed = counts.get("completed") or 0
+        noshows = counts.get("no_show") or 0
+        cancelled = counts.get("cancelled") or 0
 
         utilization = round(total_booked / scheduled_sessions * 100) if scheduled_sessions > 0 else 0
         avg_daily = round(total_booked / max(num_days, 1), 1)
@@ -2092,34 +2149,31 @@ def report_doctors(request, staff):
     doctor_rows.sort(key=lambda r: r["total_booked"], reverse=True)
     max_booked = max((r["total_booked"] for r in doctor_rows), default=1) or 1
 
-    # CSV export
-    if request.GET.get("export") == "csv":
+    # Export — one row per doctor, already aggregated above.
+    fmt = export_format(request)
+    if fmt:
         blocked = _export_blocked_response(request)
         if blocked:
             return blocked
-        response = HttpResponse(content_type="text/csv; charset=utf-8-sig")
-        response["Content-Disposition"] = f'attachment; filename="doctors_{date_from}_{date_to}.csv"'
-        writer = csv_module.writer(response)
-        writer.writerow(["الطبيب", "الجلسات المجدولة", "المواعيد المحجوزة",
-                          "مكتملة", "لم يحضر", "ملغاة",
-                          "نسبة الاستخدام %", "نسبة الإنجاز %", "متوسط يومي"])
-        for row in doctor_rows:
-            writer.writerow([
+        rows = (
+            [
                 row["doctor"].name, row["scheduled_sessions"], row["total_booked"],
                 row["completed"], row["noshows"], row["cancelled"],
                 row["utilization"], row["completion_rate"], row["avg_daily"],
-            ])
-        log_activity(
-            actor=request.user, clinic=clinic,
-            action=ActivityLog.Action.REPORT_EXPORTED,
-            target=clinic, request=request,
-            metadata={"report": "doctors", "date_from": str(date_from),
-                      "date_to": str(date_to), "row_count": len(doctor_rows)},
+            ]
+            for row in doctor_rows
+        )
+        return _stream_export(
+            request, clinic, fmt, f"doctors_{date_from}_{date_to}",
+            ["الطبيب", "الجلسات المجدولة", "المواعيد المحجوزة", "مكتملة", "لم يحضر", "ملغاة",
+             "نسبة الاستخدام %", "نسبة الإنجاز %", "متوسط يومي"], rows,
+            {"report": "doctors", "date_from": str(date_from), "date_to": str(date_to),
+             "row_count": len(doctor_rows)},
         )
-        return response
 
     return render(request, "secretary/reports/doctors.html", {
         "clinic": clinic,
+        "xlsx_export": xlsx_available(),
         "today": today,
         "date_from": date_from,
         "date_to": date_to,
@@ -2647,7 +2701,7 @@ def accept_new_patient_request(request, staff, appointment_id):
                 patient=appointment.patient,
                 defaults={
                     "registered_by": request.user,
-                    "file_number": _generate_file_number(clinic),
+                    "file_number": functools.partial(_generate_file_number, clinic),
                 },
             )
             transition_appointment_status(
@@ -3085,7 +3139,7 @@ def _unavailable_events_for_range(clinic, doctor_id, start_date, end_date):
       (intersection of unavailability == complement of union of working time).
     """
     from datetime import timedelta
-    from doctors.services import generate_slots_for_date
+    from doctors.services import generate_slots_for_range
     from clinics.models import ClinicStaff
 
     BUCKET_MIN = 15
@@ -3106,6 +3160,15 @@ def _unavailable_events_for_range(clinic, doctor_id, start_date, end_date):
             .values_list("user_id", flat=True)
         )
 
+    # One batched pass over the whole (doctors × days) window; end_date is
+    # FullCalendar's exclusive bound.
+    grids = {}
+    if doc_ids and start_date < end_date:
+        grids = generate_slots_for_range(
+            doc_ids, clinic.id, start_date, end_date - timedelta(days=1),
+            BUCKET_MIN, BUCKET_MIN,
+        )
+
     events = []
     d = start_date
     while d < end_date:
@@ -3114,7 +3177,7 @@ def _unavailable_events_for_range(clinic, doctor_id, start_date, end_date):
         working_idxs = set()
         if doc_ids:
             for did in doc_ids:
-                slots = generate_slots_for_date(did, clinic.id, d, BUCKET_MIN, BUCKET_MIN)
+                slots = grids.get((did, d), [])
                 for s in slots:
                     minutes = s["time"].hour * 60 + s["time"].minute
                     if minutes < start_h * 60 or minutes >= end_h * 60:
@@ -3213,12 +3276,23 @@ def _group_event(active_payloads, t_start, t_end):
 
 
 def _generate_file_number(clinic) -> str:
-    """Auto-generate per-clinic file number: YYYY-NNNN (e.g. 2026-0001)."""
+    """Auto-generate per-clinic file number: YYYY-NNNN (e.g. 2026-0001).
+
+    Allocated from the clinic's NumberSequence for the year
+    (clinics/sequences.py), inside the caller's transaction.
+    """
+    from clinics import sequences
+    from clinics.models import NumberSequence
+
     year = date.today().year
-    count = ClinicPatient.objects.filter(
-        clinic=clinic, registered_at__year=year
-    ).count() + 1
-    return f"{year}-{count:04d}"
+    seq = sequences.next_value(
+        NumberSequence.Kind.FILE_NUMBER, year, clinic_id=clinic.id,
+        seed=lambda: sequences.last_numeric_suffix(
+            ClinicPatient.objects.filter(clinic=clinic, file_number__startswith=f"{year}-")
+            .values_list("file_number", flat=True)
+        ),
+    )
+    return f"{year}-{seq:04d}"
 
 
 def _compute_age(dob) -> int | None:
@@ -3237,59 +3311,29 @@ _PATIENT_LIST_ALLOWED_SORTS = {
     "-file_number": "-file_number",
     "registered_at": "registered_at",
     "-registered_at": "-registered_at",
+    "last_visit": F("last_completed_visit").asc(nulls_first=True),
+    "-last_visit": F("last_completed_visit").desc(nulls_last=True),
 }
 
 
 def _patient_list_queryset(clinic, search="", sort="-registered_at", blocked_only=False):
     """Shared roster queryset for the patient list (full page + HTMX search).
 
-    Annotates each ClinicPatient with last_visit, visit_count and is_blocked
-    (compliance BLOCKED in this clinic, derived via an Exists subquery so
-    profile-less users simply yield is_blocked=False). Applies whitelisted
-    sort, optional search, and an optional blocked-only filter.
+    Last visit, visit count and the blocked flag are ClinicPatient columns
+    (patients/visit_stats.py), so sorting and filtering on them are plain
+    indexed reads. Applies whitelisted sort, optional search, and an optional
+    blocked-only filter.
     """
-    from django.db.models import Max, Count, Exists, OuterRef
-    from compliance.models import PatientClinicCompliance
-
     order_by = _PATIENT_LIST_ALLOWED_SORTS.get(sort, "-registered_at")
 
     qs = (
         ClinicPatient.objects.filter(clinic=clinic)
         .select_related("patient", "patient__patient_profile")
-        .annotate(
-            last_visit=Max(
-                "patient__appointments_as_patient__appointment_date",
-                filter=Q(
-                    patient__appointments_as_patient__clinic=clinic,
-                    patient__appointments_as_patient__status="COMPLETED",
-                ),
-            ),
-            visit_count=Count(
-                "patient__appointments_as_patient",
-                filter=Q(
-                    patient__appointments_as_patient__clinic=clinic,
-                    patient__appointments_as_patient__status="COMPLETED",
-                ),
-            ),
-            is_blocked=Exists(
-                PatientClinicCompliance.objects.filter(
-                    clinic=clinic,
-                    status="BLOCKED",
-                    patient=OuterRef("patient__patient_profile"),
-                )
-            ),
-        )
         .order_by(order_by)
     )
 
     if search:
-        normalized = PhoneNumberAuthBackend.normalize_phone_number(search)
-        qs = qs.filter(
-            Q(patient__name__icontains=search)
-            | Q(patient__phone__icontains=normalized)
-            | Q(patient__national_id__icontains=search)
-            | Q(file_number__icontains=search)
-        )
+        qs = qs.filter(clinic_patient_match_q(search))
 
     if blocked_only:
         qs = qs.filter(is_blocked=True)
@@ -3981,11 +4025,7 @@ def appointments_list(request, staff):
         except ValueError:
             pass
     if search:
-        from accounts.backends import PhoneNumberAuthBackend as _PH
-        norm = _PH.normalize_phone_number(search)
-        qs = qs.filter(
-            Q(patient__name__icontains=search) | Q(patient__phone__icontains=norm)
-        )
+        qs = qs.filter(patient_match_q(search, path="patient__"))
 
     paginator = Paginator(qs, 25)
     page = paginator.get_page(request.GET.get("page", 1))
@@ -4847,16 +4887,11 @@ def patient_search_htmx(request, staff):
     patients = []
 
     if len(q) >= 2:
-        normalized_q = PhoneNumberAuthBackend.normalize_phone_number(q)
         patient_role = Q(role="PATIENT") | Q(roles__contains=["PATIENT"])
         # Global reach: exact phone OR exact national id only.
         strong_match = _strong_identifier_q(q)
         # Broad reach (name / partial): only within this clinic's registered patients.
-        clinic_match = Q(clinic_registrations__clinic=clinic) & (
-            Q(name__icontains=q)
-            | Q(phone__icontains=normalized_q)
-            | Q(national_id__icontains=q)
-        )
+        clinic_match = Q(clinic_registrations__clinic=clinic) & patient_match_q(q)
         patients = list(
             User.objects.filter(patient_role)
             .filter(strong_match | clinic_match)